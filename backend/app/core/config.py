@@ -27,6 +27,63 @@ class Config:
     # Configuración de los hosts permitidos
     ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '*').split(',')
 
+    # Configuración del envío masivo (fan-out) de notificaciones
+    NOTIFICATION_FANOUT_CHUNK_SIZE = int(os.getenv('NOTIFICATION_FANOUT_CHUNK_SIZE', 1000))
+    # A partir de este tamaño de audiencia se usa el modelo de bandeja (fan-out en lectura)
+    NOTIFICATION_FANOUT_INBOX_THRESHOLD = int(os.getenv('NOTIFICATION_FANOUT_INBOX_THRESHOLD', 10000))
+
+    # Retención de notificaciones: las leídas expiran por TTL y las no leídas antiguas se archivan
+    NOTIFICATION_READ_TTL_DAYS = int(os.getenv('NOTIFICATION_READ_TTL_DAYS', 30))
+    NOTIFICATION_UNREAD_ARCHIVE_DAYS = int(os.getenv('NOTIFICATION_UNREAD_ARCHIVE_DAYS', 90))
+
+    # Worker de recordatorios: tamaño de lote, intervalo de sondeo y duración del lease
+    REMINDER_BATCH_SIZE = int(os.getenv('REMINDER_BATCH_SIZE', 500))
+    REMINDER_POLL_INTERVAL_SECONDS = float(os.getenv('REMINDER_POLL_INTERVAL_SECONDS', 5))
+    REMINDER_LEASE_SECONDS = int(os.getenv('REMINDER_LEASE_SECONDS', 60))
+
+    # Importación masiva de eventos: filas validadas e insertadas por lote
+    EVENT_IMPORT_BATCH_SIZE = int(os.getenv('EVENT_IMPORT_BATCH_SIZE', 1000))
+
+    # Cola de moderación: duración del lease de un moderador y elementos reclamados por lote
+    MODERATION_LEASE_SECONDS = int(os.getenv('MODERATION_LEASE_SECONDS', 300))
+    MODERATION_CLAIM_BATCH_SIZE = int(os.getenv('MODERATION_CLAIM_BATCH_SIZE', 20))
+
+    # Respuestas grandes: tamaño de bloque de los arrays JSON en streaming y compresión gzip/brotli
+    STREAM_JSON_BATCH_SIZE = int(os.getenv('STREAM_JSON_BATCH_SIZE', 500))
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+    COMPRESSION_LEVEL = int(os.getenv('COMPRESSION_LEVEL', 6))
+
+    # Consultas lentas: umbral de registro y fracción de ellas a las que se captura explain()
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 100))
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.getenv('SLOW_QUERY_EXPLAIN_SAMPLE_RATE', 0.1))
+
+    # Métricas de Prometheus en /metrics (si se define el token, se exige como Bearer)
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+    # Arranque: cola de mensajes de Socket.IO compartida entre workers y creación de índices al iniciar
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE', REDIS_URL)
+    ENSURE_INDEXES_ON_STARTUP = os.getenv('ENSURE_INDEXES_ON_STARTUP', 'true').lower() in ('true', '1', 'yes')
+
+    # Change feed: si está activo, el consumidor del change stream (flask change-feed-worker)
+    # invalida las cachés y publica los cambios en lugar de los controladores. Requiere replica set.
+    CHANGE_FEED_ENABLED = os.getenv('CHANGE_FEED_ENABLED', 'false').lower() in ('true', '1', 'yes')
+    CHANGE_FEED_CHECKPOINT_EVERY = int(os.getenv('CHANGE_FEED_CHECKPOINT_EVERY', 100))
+
+    # Lecturas de listados (calendarios públicos, eventos destacados, filtros de comunidades):
+    # read preference y retraso máximo admitido de los secundarios (mínimo 90 s). 'primary' las desactiva.
+    READ_LISTING_PREFERENCE = os.getenv('READ_LISTING_PREFERENCE', 'secondaryPreferred')
+    READ_MAX_STALENESS_SECONDS = int(os.getenv('READ_MAX_STALENESS_SECONDS', 90))
+
+    # Presencia en las salas de Socket.IO: caducidad sin latido y frecuencia máxima de publicación por sala
+    PRESENCE_TTL_SECONDS = int(os.getenv('PRESENCE_TTL_SECONDS', 90))
+    PRESENCE_BROADCAST_INTERVAL_SECONDS = float(os.getenv('PRESENCE_BROADCAST_INTERVAL_SECONDS', 2))
+
+    # Rollup de analíticas: retraso respecto al presente, tamaño de ventana, intervalo de sondeo y lease del worker
+    ANALYTICS_ROLLUP_LAG_SECONDS = int(os.getenv('ANALYTICS_ROLLUP_LAG_SECONDS', 120))
+    ANALYTICS_ROLLUP_WINDOW_SECONDS = int(os.getenv('ANALYTICS_ROLLUP_WINDOW_SECONDS', 3600))
+    ANALYTICS_ROLLUP_INTERVAL_SECONDS = float(os.getenv('ANALYTICS_ROLLUP_INTERVAL_SECONDS', 60))
+    ANALYTICS_ROLLUP_LEASE_SECONDS = int(os.getenv('ANALYTICS_ROLLUP_LEASE_SECONDS', 300))
+
     # Otras configuraciones generales
     DEBUG = False
     TESTING = False
@@ -36,12 +93,14 @@ class DevelopmentConfig(Config):
     DEBUG = True
     MONGODB_URI = os.getenv('DEV_MONGODB_URI', Config.MONGODB_URI)
     REDIS_URL = os.getenv('DEV_REDIS_URL', Config.REDIS_URL)
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE', REDIS_URL)
 
 class ProductionConfig(Config):
     """Configuración para el entorno de producción."""
     DEBUG = False
     MONGODB_URI = os.getenv('PROD_MONGODB_URI', Config.MONGODB_URI)
     REDIS_URL = os.getenv('PROD_REDIS_URL', Config.REDIS_URL)
+    SOCKETIO_MESSAGE_QUEUE = os.getenv('SOCKETIO_MESSAGE_QUEUE', REDIS_URL)
     TESTING = False
 
 # Selección de la configuración adecuada según el entorno
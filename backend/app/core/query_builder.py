@@ -0,0 +1,118 @@
+# relative path: app/core/query_builder.py
+
+import hashlib
+import json
+from datetime import datetime
+
+class FilterField:
+    """Describe un filtro permitido: campo en MongoDB, tipo del valor y operador."""
+
+    def __init__(self, db_field, value_type=str, operator=None):
+        self.db_field = db_field  # Nombre del campo en la colección
+        self.value_type = value_type  # str, int, float, bool o datetime
+        self.operator = operator  # None para igualdad, o '$gte', '$lte', etc.
+
+    def parse(self, name, raw_value):
+        """Convierte el valor recibido como texto al tipo declarado."""
+        try:
+            if self.value_type is bool:
+                value = str(raw_value).strip().lower()
+                if value in ('true', '1', 'yes'):
+                    return True
+                if value in ('false', '0', 'no'):
+                    return False
+                raise ValueError
+            if self.value_type is datetime:
+                if isinstance(raw_value, datetime):
+                    return raw_value
+                return datetime.fromisoformat(str(raw_value).replace('Z', '+00:00'))
+            return self.value_type(raw_value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Valor no válido para el filtro '{name}': {raw_value}")
+
+class BuiltQuery:
+    """Resultado normalizado de construir una consulta de filtrado."""
+
+    def __init__(self, query, sort, page, limit):
+        self.query = query
+        self.sort = sort  # Lista de tuplas (campo, dirección)
+        self.page = page
+        self.limit = limit
+
+    @property
+    def skip(self):
+        return (self.page - 1) * self.limit
+
+    def normalized(self):
+        """Representación canónica de la consulta (independiente del orden de los parámetros)."""
+        return json.dumps(
+            {'query': self.query, 'sort': self.sort, 'page': self.page, 'limit': self.limit},
+            sort_keys=True,
+            default=lambda value: value.isoformat() if isinstance(value, datetime) else str(value)
+        )
+
+    def cache_key(self, prefix):
+        """Genera una clave de caché estable a partir de la consulta normalizada."""
+        digest = hashlib.sha1(self.normalized().encode('utf-8')).hexdigest()
+        return f"{prefix}:{digest}"
+
+    def apply(self, collection, session=None):
+        """Ejecuta la consulta sobre la colección y devuelve el cursor."""
+        return collection.find(self.query, session=session).sort(self.sort).skip(self.skip).limit(self.limit)
+
+    def explain(self, collection):
+        """Devuelve el plan de ejecución de MongoDB para la consulta."""
+        return self.apply(collection).explain()
+
+class QueryBuilder:
+    """Construye consultas tipadas de MongoDB a partir de parámetros de la petición.
+
+    Solo se aceptan los filtros y campos de ordenamiento declarados, de modo que
+    la forma de la consulta siempre coincide con alguno de los índices creados
+    por el repositorio.
+    """
+
+    RESERVED_PARAMS = ('page', 'limit', 'sort')
+    MAX_LIMIT = 100
+
+    def __init__(self, filters, sort_fields, default_sort):
+        self.filters = filters  # Diccionario nombre_parametro -> FilterField
+        self.sort_fields = sort_fields  # Campos por los que se permite ordenar
+        self.default_sort = default_sort  # Lista de tuplas (campo, dirección)
+
+    def build(self, params, page=1, limit=10):
+        """Valida los parámetros y devuelve un BuiltQuery.
+
+        Lanza ValueError si llega un filtro no permitido o un valor con formato incorrecto.
+        """
+        query = {}
+        for name, raw_value in params.items():
+            if name in self.RESERVED_PARAMS:
+                continue
+            field = self.filters.get(name)
+            if field is None:
+                raise ValueError(f"Filtro no permitido: '{name}'")
+            value = field.parse(name, raw_value)
+            if field.operator is None:
+                query[field.db_field] = value
+            else:
+                condition = query.setdefault(field.db_field, {})
+                if not isinstance(condition, dict):
+                    raise ValueError(f"Filtros incompatibles sobre el campo '{field.db_field}'")
+                condition[field.operator] = value
+
+        sort = self._parse_sort(params.get('sort'))
+        page = max(int(page or 1), 1)
+        limit = min(max(int(limit or 10), 1), self.MAX_LIMIT)
+        return BuiltQuery(query, sort, page, limit)
+
+    def _parse_sort(self, raw_sort):
+        """Convierte 'campo' o '-campo' en la especificación de ordenamiento de pymongo."""
+        if not raw_sort:
+            return list(self.default_sort)
+        direction = -1 if raw_sort.startswith('-') else 1
+        field = raw_sort.lstrip('-')
+        if field not in self.sort_fields:
+            raise ValueError(f"Campo de ordenamiento no permitido: '{field}'")
+        # Desempatar por _id para que la paginación sea determinista
+        return [(field, direction), ('_id', direction)]
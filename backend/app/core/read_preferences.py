@@ -0,0 +1,67 @@
+# relative path: app/core/read_preferences.py
+
+from pymongo.read_preferences import Primary, PrimaryPreferred, SecondaryPreferred, Secondary, Nearest
+from app.core.config import Config
+
+# Políticas de lectura que eligen los repositorios para cada consulta
+PRIMARY = 'primary'  # Lecturas que deben ver las escrituras recientes (por defecto)
+LISTING = 'listing'  # Listados públicos y filtros que toleran un retraso acotado
+
+# Modos admitidos en READ_LISTING_PREFERENCE
+READ_PREFERENCE_MODES = {
+    'primary': Primary,
+    'primaryPreferred': PrimaryPreferred,
+    'secondaryPreferred': SecondaryPreferred,
+    'secondary': Secondary,
+    'nearest': Nearest,
+}
+
+# MongoDB no acepta un maxStalenessSeconds menor
+MIN_MAX_STALENESS_SECONDS = 90
+
+class ReadPreferencePolicies:
+    """Traduce las políticas de lectura de los repositorios a read preferences de MongoDB.
+
+    Los repositorios deciden qué consultas son de tipo LISTING; la configuración
+    decide a qué miembros del replica set van y con qué retraso máximo. Con el modo
+    'primary' (o sin replica set) todas las lecturas siguen yendo al primario.
+
+        events = read_policies.collection(self.events, LISTING)
+        events.find(query, session=session)
+    """
+
+    def __init__(self, listing_mode='secondaryPreferred', max_staleness_seconds=MIN_MAX_STALENESS_SECONDS):
+        self.configure(listing_mode, max_staleness_seconds)
+
+    def init_app(self, app):
+        self.configure(
+            app.config.get('READ_LISTING_PREFERENCE', self.listing_mode),
+            app.config.get('READ_MAX_STALENESS_SECONDS', self.max_staleness_seconds)
+        )
+
+    def configure(self, listing_mode, max_staleness_seconds):
+        if listing_mode not in READ_PREFERENCE_MODES:
+            raise ValueError(f"Read preference no soportada: '{listing_mode}'")
+        self.listing_mode = listing_mode
+        self.max_staleness_seconds = max(int(max_staleness_seconds), MIN_MAX_STALENESS_SECONDS)
+        mode = READ_PREFERENCE_MODES[listing_mode]
+        # Primary no admite max_staleness
+        listing = mode() if mode is Primary else mode(max_staleness=self.max_staleness_seconds)
+        self._preferences = {PRIMARY: Primary(), LISTING: listing}
+
+    def read_preference(self, policy):
+        return self._preferences[policy]
+
+    def collection(self, collection, policy):
+        """Devuelve la colección configurada con la read preference de la política."""
+        if policy == PRIMARY:
+            return collection
+        return collection.with_options(read_preference=self.read_preference(policy))
+
+    @property
+    def routes_to_secondaries(self):
+        """Indica si las lecturas LISTING pueden ir a un secundario."""
+        return self.listing_mode != 'primary'
+
+# Instancia global; init_app aplica la configuración de la app
+read_policies = ReadPreferencePolicies(Config.READ_LISTING_PREFERENCE, Config.READ_MAX_STALENESS_SECONDS)
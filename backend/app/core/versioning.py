@@ -0,0 +1,14 @@
+# relative path: app/core/versioning.py
+
+from datetime import datetime
+
+def versioned(update):
+    """Añade a una actualización de MongoDB el incremento de `version` y la fecha `updated_at`.
+
+    La versión de cada documento sirve para calcular su ETag: cualquier escritura
+    que pase por los repositorios la incrementa de forma atómica.
+    """
+    update = dict(update)
+    update['$inc'] = {**update.get('$inc', {}), 'version': 1}
+    update['$set'] = {**update.get('$set', {}), 'updated_at': datetime.utcnow()}
+    return update
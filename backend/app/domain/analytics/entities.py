@@ -0,0 +1,23 @@
+# relative path: app/domain/analytics/entities.py
+
+# Métricas acumuladas en cada bucket
+METRICS = ('attendance', 'comments', 'replies', 'likes', 'ratings', 'rating_sum')
+
+class AnalyticsBucket:
+    """Clase que representa la actividad agregada de una comunidad o un evento en una hora o un día."""
+
+    def __init__(self, scope, scope_id, granularity, bucket, community=None, **metrics):
+        self.scope = scope  # 'community' o 'event'
+        self.scope_id = scope_id  # ID de la comunidad o del evento
+        self.granularity = granularity  # 'hour' o 'day'
+        self.bucket = bucket  # Inicio de la hora o del día (UTC)
+        self.community = community  # Comunidad del evento (en los buckets de evento)
+        for metric in METRICS:
+            setattr(self, metric, metrics.get(metric, 0))
+
+    def to_dict(self):
+        """Convierte el bucket a la forma que se devuelve a los paneles."""
+        data = {'bucket': self.bucket, **{metric: getattr(self, metric) for metric in METRICS}}
+        # La media se calcula al leer: sumar medias de buckets no sería correcto
+        data['average_rating'] = round(self.rating_sum / self.ratings, 2) if self.ratings else None
+        return data
@@ -0,0 +1,69 @@
+# relative path: app/domain/analytics/repositories.py
+
+from pymongo import MongoClient, ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+from .entities import AnalyticsBucket, METRICS
+
+DUPLICATE_KEY_ERROR = 11000
+
+GRANULARITIES = ('hour', 'day')
+SCOPES = ('community', 'event')
+
+class AnalyticsRepository:
+    """Repositorio de los buckets de analíticas: actividad por comunidad o evento y hora o día.
+
+    Los paneles leen un rango de buckets con el índice único (scope, scope_id,
+    granularity, bucket), con coste proporcional al número de buckets. Los escribe
+    solo el rollup (ver EngagementRollup), una ventana de actividad cada vez.
+    """
+
+    def __init__(self, db: MongoClient):
+        self.buckets = db.analytics_buckets  # Colección de buckets agregados en MongoDB
+        self.state = db.analytics_state  # Marca de agua y lease del rollup
+
+    def ensure_indexes(self):
+        """Crea el índice único de buckets que sirve a las lecturas por rango."""
+        self.buckets.create_index(
+            [('scope', ASCENDING), ('scope_id', ASCENDING), ('granularity', ASCENDING), ('bucket', ASCENDING)],
+            unique=True
+        )
+
+    def apply_window(self, deltas, window_end):
+        """Suma a los buckets las métricas de una ventana; devuelve cuántos buckets se actualizaron.
+
+        `deltas` es {(scope, scope_id, granularity, bucket): (community, {métrica: valor})}.
+        Cada bucket guarda el final de la última ventana aplicada y solo acepta
+        ventanas posteriores: si se reprocesa una ventana tras un fallo, el filtro no
+        coincide, el upsert choca con el índice único y el bucket no se cuenta dos veces.
+        """
+        operations = [
+            UpdateOne(
+                {'scope': scope, 'scope_id': scope_id, 'granularity': granularity, 'bucket': bucket, 'window': {'$lt': window_end}},
+                {'$inc': metrics, '$set': {'window': window_end, 'community': community}},
+                upsert=True
+            )
+            for (scope, scope_id, granularity, bucket), (community, metrics) in deltas.items()
+        ]
+        if not operations:
+            return 0
+        try:
+            result = self.buckets.bulk_write(operations, ordered=False)
+            return result.modified_count + result.upserted_count
+        except BulkWriteError as e:
+            # Solo se toleran duplicados (buckets que ya tenían aplicada esta ventana)
+            if any(error.get('code') != DUPLICATE_KEY_ERROR for error in e.details.get('writeErrors', [])):
+                raise
+            return e.details.get('nModified', 0) + e.details.get('nUpserted', 0)
+
+    def get_buckets(self, scope, scope_id, granularity, start, end):
+        """Devuelve los buckets no vacíos del rango [start, end) en orden cronológico."""
+        buckets = self.buckets.find(
+            {'scope': scope, 'scope_id': scope_id, 'granularity': granularity, 'bucket': {'$gte': start, '$lt': end}},
+            {'_id': 0, 'bucket': 1, 'community': 1, **{metric: 1 for metric in METRICS}}
+        ).sort('bucket', ASCENDING)
+        return [AnalyticsBucket(scope, scope_id, granularity, **bucket).to_dict() for bucket in buckets]
+
+    def get_watermark(self, name):
+        """Devuelve hasta qué momento está agregada la actividad (None si el rollup no se ha ejecutado)."""
+        state = self.state.find_one({'_id': name}, {'watermark': 1})
+        return state.get('watermark') if state else None
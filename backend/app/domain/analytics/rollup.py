@@ -0,0 +1,210 @@
+# relative path: app/domain/analytics/rollup.py
+
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from pymongo import MongoClient, ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from bson.objectid import ObjectId
+from app.core.read_preferences import read_policies, LISTING
+from .repositories import AnalyticsRepository
+
+STATE_ID = 'engagement'
+HOUR_FORMAT = '%Y-%m-%dT%H'
+
+def _object_ids(ids):
+    """Convierte los IDs en ObjectId descartando los que no son válidos."""
+    object_ids = []
+    for value in ids:
+        try:
+            object_ids.append(ObjectId(value))
+        except Exception:
+            continue
+    return object_ids
+
+class EngagementRollup:
+    """Rollup incremental de la actividad (asistencia, comentarios, respuestas, likes y puntuaciones).
+
+    Procesa la actividad nueva desde una marca de agua por ventanas de tiempo y la
+    suma en buckets por hora y por día de cada evento y de su comunidad. Cada
+    ventana se lee por rango de _id (el ObjectId lleva la fecha de creación), así
+    que no necesita índices nuevos en las colecciones de origen, y se agrega en el
+    servidor con $group: se transfieren filas (evento, hora), no documentos.
+
+    - Las lecturas de origen usan la política LISTING (secundarios si están
+      configurados): el final de la ventana se retrasa `lag_seconds`, y al menos el
+      retraso máximo de los secundarios, para que ya estén replicadas.
+    - Un solo worker a la vez, con un lease en `analytics_state`.
+    - El final de la ventana en curso se guarda antes de procesarla: si el worker
+      muere, la siguiente ejecución repite exactamente la misma ventana y los
+      buckets que ya la tenían aplicada la ignoran (ver AnalyticsRepository.apply_window).
+    """
+
+    def __init__(self, db: MongoClient, lag_seconds=120, window_seconds=3600, lease_seconds=300):
+        self.db = db
+        self.analytics_repository = AnalyticsRepository(db)
+        self.state = db.analytics_state
+        self.lag_seconds = lag_seconds
+        self.window_seconds = window_seconds
+        self.lease_seconds = lease_seconds
+        self.owner = f"rollup-{uuid.uuid4().hex[:12]}"
+
+    def ensure_indexes(self):
+        self.analytics_repository.ensure_indexes()
+
+    def _source(self, name):
+        return read_policies.collection(self.db[name], LISTING)
+
+    def _safe_end(self):
+        """Momento hasta el que la actividad se considera completa (y replicada)."""
+        lag = self.lag_seconds
+        if read_policies.routes_to_secondaries:
+            lag = max(lag, read_policies.max_staleness_seconds + 30)
+        return datetime.utcnow() - timedelta(seconds=lag)
+
+    # --- Lease y marca de agua ---
+
+    def _claim(self):
+        """Toma (o renueva) el lease del rollup; devuelve el estado o None si lo tiene otro worker."""
+        now = datetime.utcnow()
+        try:
+            return self.state.find_one_and_update(
+                {'_id': STATE_ID, '$or': [{'lease_until': {'$lt': now}}, {'lease_until': None}, {'lease_owner': self.owner}]},
+                {'$set': {'lease_owner': self.owner, 'lease_until': now + timedelta(seconds=self.lease_seconds)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # El documento existe y el lease lo tiene otro worker
+            return None
+
+    def _set_state(self, values, unset=None):
+        """Guarda el estado solo si este worker conserva el lease; devuelve False si lo ha perdido."""
+        update = {'$set': {**values, 'lease_until': datetime.utcnow() + timedelta(seconds=self.lease_seconds)}}
+        if unset:
+            update['$unset'] = {field: '' for field in unset}
+        result = self.state.update_one({'_id': STATE_ID, 'lease_owner': self.owner}, update)
+        return result.matched_count > 0
+
+    def release(self):
+        self.state.update_one({'_id': STATE_ID, 'lease_owner': self.owner}, {'$set': {'lease_until': None}})
+
+    def _initial_watermark(self):
+        """Hora de la actividad más antigua (la primera ejecución agrega el histórico)."""
+        oldest = []
+        for name in ('event_attendance_log', 'comments', 'replies', 'likes', 'ratings'):
+            first = self.db[name].find_one({}, {'_id': 1}, sort=[('_id', ASCENDING)])
+            if first:
+                oldest.append(first['_id'].generation_time.replace(tzinfo=None))
+        if not oldest:
+            return None
+        return min(oldest).replace(minute=0, second=0, microsecond=0)
+
+    # --- Ejecución ---
+
+    def run_once(self, max_windows=24):
+        """Procesa hasta `max_windows` ventanas pendientes; devuelve cuántas se procesaron."""
+        state = self._claim()
+        if state is None:
+            return 0
+        processed = 0
+        try:
+            safe_end = self._safe_end()
+            watermark = state.get('watermark') or self._initial_watermark()
+            if watermark is None:
+                # Sin actividad todavía: se empieza desde ahora
+                self._set_state({'watermark': safe_end})
+                return 0
+            pending_end = state.get('pending_end')
+            while processed < max_windows and (pending_end or watermark < safe_end):
+                # Una ventana interrumpida se repite con los mismos límites
+                window_end = pending_end or min(watermark + timedelta(seconds=self.window_seconds), safe_end)
+                if not self._set_state({'watermark': watermark, 'pending_end': window_end}):
+                    break
+                self.process_window(watermark, window_end)
+                if not self._set_state({'watermark': window_end}, unset=['pending_end']):
+                    break
+                watermark, pending_end = window_end, None
+                processed += 1
+        finally:
+            self.release()
+        return processed
+
+    def process_window(self, start, end):
+        """Agrega la actividad de [start, end) y la suma a los buckets; devuelve cuántos se actualizaron."""
+        id_range = {'_id': {'$gte': ObjectId.from_datetime(start), '$lt': ObjectId.from_datetime(end)}}
+
+        # Filas (clave, hora, métricas) de cada origen
+        attendance = self._hourly('event_attendance_log', id_range, '$event', {'attendance': {'$sum': '$delta'}})
+        comments = self._hourly('comments', id_range, '$event', {'comments': {'$sum': 1}})
+        ratings = self._hourly('ratings', id_range, '$event', {'ratings': {'$sum': 1}, 'rating_sum': {'$sum': '$score'}})
+        replies = self._hourly('replies', id_range, '$parent_comment', {'replies': {'$sum': 1}})
+        likes = self._hourly('likes', id_range, {'type': '$target_type', 'target': '$target'}, {'likes': {'$sum': 1}})
+
+        # Resolver respuestas y likes hasta su evento con una consulta $in por colección
+        liked_replies = [key['target'] for key, _, _ in likes if key.get('type') == 'reply']
+        reply_comments = self._lookup('replies', liked_replies, 'parent_comment')
+        comment_ids = [key for key, _, _ in replies]
+        comment_ids += [key['target'] for key, _, _ in likes if key.get('type') == 'comment']
+        comment_ids += list(reply_comments.values())
+        comment_events = self._lookup('comments', comment_ids, 'event')
+
+        def like_event(key):
+            target = str(key.get('target'))
+            comment_id = target if key.get('type') == 'comment' else reply_comments.get(target)
+            return comment_events.get(comment_id)
+
+        per_event = defaultdict(Counter)  # (evento, hora) -> métricas
+        for rows, to_event in (
+            (attendance, str),
+            (comments, str),
+            (ratings, str),
+            (replies, lambda key: comment_events.get(str(key))),
+            (likes, like_event),
+        ):
+            for key, hour, metrics in rows:
+                event_id = to_event(key)
+                if event_id:
+                    per_event[(str(event_id), hour)].update(metrics)
+
+        event_communities = self._lookup('events', [event_id for event_id, _ in per_event], 'community')
+        deltas = {}
+        for (event_id, hour), metrics in per_event.items():
+            community_id = event_communities.get(event_id)
+            if community_id is None:
+                continue  # Evento eliminado
+            hour_start = datetime.strptime(hour, HOUR_FORMAT)
+            day_start = hour_start.replace(hour=0)
+            for scope, scope_id in (('event', event_id), ('community', str(community_id))):
+                for granularity, bucket in (('hour', hour_start), ('day', day_start)):
+                    key = (scope, scope_id, granularity, bucket)
+                    deltas.setdefault(key, (str(community_id), Counter()))[1].update(metrics)
+
+        # Las altas y bajas de asistencia pueden compensarse: no se escriben buckets sin cambios
+        deltas = {
+            key: (community_id, {metric: value for metric, value in metrics.items() if value})
+            for key, (community_id, metrics) in deltas.items() if any(metrics.values())
+        }
+        return self.analytics_repository.apply_window(deltas, end)
+
+    def _hourly(self, name, id_range, group_key, accumulators):
+        """Agrega en el servidor la actividad de la ventana por clave y hora de creación."""
+        rows = self._source(name).aggregate([
+            {'$match': id_range},
+            {'$group': {
+                '_id': {'key': group_key, 'hour': {'$dateToString': {'format': HOUR_FORMAT, 'date': {'$toDate': '$_id'}}}},
+                **accumulators,
+            }},
+        ])
+        return [
+            (row['_id']['key'], row['_id']['hour'], {metric: row[metric] for metric in accumulators})
+            for row in rows if row['_id'].get('key')
+        ]
+
+    def _lookup(self, name, ids, field):
+        """Devuelve {id: campo} de los documentos de una colección (una consulta $in)."""
+        object_ids = _object_ids(set(str(value) for value in ids))
+        if not object_ids:
+            return {}
+        documents = self._source(name).find({'_id': {'$in': object_ids}}, {field: 1})
+        return {str(document['_id']): str(document[field]) for document in documents if document.get(field)}
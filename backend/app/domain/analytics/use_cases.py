@@ -0,0 +1,89 @@
+# relative path: app/domain/analytics/use_cases.py
+
+from datetime import datetime, timedelta
+from bson.objectid import ObjectId
+from .repositories import AnalyticsRepository, GRANULARITIES
+from .rollup import STATE_ID
+from app.domain.moderation.use_cases import MODERATOR_ROLES
+
+# Rango por defecto y número máximo de buckets por consulta según la granularidad
+DEFAULT_RANGES = {'hour': timedelta(hours=48), 'day': timedelta(days=30)}
+MAX_BUCKETS = {'hour': 24 * 31, 'day': 366}
+BUCKET_SIZES = {'hour': timedelta(hours=1), 'day': timedelta(days=1)}
+
+def _parse_date(value):
+    """Convierte una fecha ISO en datetime UTC sin zona (lanza ValueError si no es válida)."""
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = (parsed - parsed.utcoffset()).replace(tzinfo=None)
+    return parsed
+
+class AnalyticsUseCases:
+    """Clase que define los casos de uso de las analíticas de comunidades y eventos."""
+
+    def __init__(self, db):
+        self.db = db
+        self.analytics_repository = AnalyticsRepository(db)
+
+    def can_view_community(self, community_id, user_id):
+        """Indica si el usuario administra o modera la comunidad, o tiene un rol de la plataforma que lo permite."""
+        try:
+            community = self.db.communities.find_one({'_id': ObjectId(community_id)}, {'admin': 1, 'moderators': 1})
+            user = self.db.users.find_one({'_id': ObjectId(user_id)}, {'role': 1})
+        except Exception:
+            return False
+        if not community:
+            return False
+        if user and user.get('role') in MODERATOR_ROLES:
+            return True
+        return str(user_id) == str(community.get('admin')) or str(user_id) in [str(moderator) for moderator in community.get('moderators') or []]
+
+    def get_community_trends(self, community_id, user_id, granularity='day', start=None, end=None):
+        """Obtiene los buckets de actividad de una comunidad."""
+        if not self.can_view_community(community_id, user_id):
+            return {"error": "No tienes acceso a las analíticas de esta comunidad"}
+        return self._trends('community', community_id, granularity, start, end)
+
+    def get_event_trends(self, event_id, user_id, granularity='day', start=None, end=None):
+        """Obtiene los buckets de actividad de un evento (visibles para quien puede ver los de su comunidad)."""
+        try:
+            event = self.db.events.find_one({'_id': ObjectId(event_id)}, {'community': 1})
+        except Exception:
+            event = None
+        if not event:
+            return {"error": "Evento no encontrado"}
+        if not self.can_view_community(event.get('community'), user_id):
+            return {"error": "No tienes acceso a las analíticas de este evento"}
+        return self._trends('event', event_id, granularity, start, end)
+
+    def _trends(self, scope, scope_id, granularity, start, end):
+        if granularity not in GRANULARITIES:
+            return {"error": f"Granularidad no válida: usa {' o '.join(GRANULARITIES)}."}
+        try:
+            end = _parse_date(end) if end else datetime.utcnow()
+            start = _parse_date(start) if start else end - DEFAULT_RANGES[granularity]
+        except ValueError:
+            return {"error": "Las fechas deben tener formato ISO 8601."}
+        if start >= end:
+            return {"error": "La fecha inicial debe ser anterior a la final."}
+        if (end - start) / BUCKET_SIZES[granularity] > MAX_BUCKETS[granularity]:
+            return {"error": f"El rango admite como máximo {MAX_BUCKETS[granularity]} buckets."}
+
+        # Alinear al inicio del bucket para incluir el que contiene la fecha inicial
+        start = start.replace(minute=0, second=0, microsecond=0)
+        if granularity == 'day':
+            start = start.replace(hour=0)
+        try:
+            buckets = self.analytics_repository.get_buckets(scope, scope_id, granularity, start, end)
+            return {
+                "scope": scope,
+                "id": scope_id,
+                "granularity": granularity,
+                "from": start,
+                "to": end,
+                "buckets": buckets,
+                # Los buckets incluyen la actividad hasta esta fecha
+                "updated_until": self.analytics_repository.get_watermark(STATE_ID),
+            }
+        except Exception as ex:
+            return {"error": str(ex)}
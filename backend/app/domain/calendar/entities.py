@@ -2,7 +2,7 @@
 
 import uuid
 from datetime import datetime
-from marshmallow import Schema, fields, validate, validates, ValidationError
+from marshmallow import Schema, fields, validate
 
 class Calendar:
     """Clase que representa un calendario dentro del sistema."""
@@ -26,16 +26,3 @@ class CalendarSchema(Schema):
     is_public = fields.Boolean(default=True)
     shared_url = fields.Url(dump_only=True)  # URL pública generada
     created_at = fields.DateTime(dump_only=True)
-
-    @validates('name')
-    def validate_unique_name(self, name, **kwargs):
-        """
-        Valida que no exista ya un calendario con el mismo nombre para el mismo propietario (owner).
-        Se debe usar un repositorio para verificar la existencia de un nombre duplicado.
-        """
-        db = kwargs.get('db_instance')  # Obtener instancia de base de datos
-        owner = kwargs.get('owner')  # El propietario se pasa como parámetro
-        existing_calendar = db.calendars.find_one({"name": name, "owner": owner})
-        if existing_calendar:
-            raise ValidationError(f"Ya existe un calendario con el nombre '{name}' para este propietario.")
-
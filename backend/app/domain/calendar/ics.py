@@ -0,0 +1,105 @@
+# relative path: app/domain/calendar/ics.py
+
+from datetime import datetime, timezone
+
+PRODID = '-//Calend-ar//Community Platform//ES'
+
+# Patrones de recurrencia de los eventos -> FREQ de RFC 5545
+RECURRENCE_FREQUENCIES = {
+    'daily': 'DAILY', 'diario': 'DAILY', 'diaria': 'DAILY',
+    'weekly': 'WEEKLY', 'semanal': 'WEEKLY',
+    'monthly': 'MONTHLY', 'mensual': 'MONTHLY',
+    'yearly': 'YEARLY', 'annual': 'YEARLY', 'anual': 'YEARLY',
+}
+
+def escape_text(value):
+    """Escapa un valor de texto según RFC 5545 (barra, punto y coma, coma y saltos de línea)."""
+    return (str(value)
+            .replace('\\', '\\\\')
+            .replace(';', '\\;')
+            .replace(',', '\\,')
+            .replace('\r\n', '\\n')
+            .replace('\n', '\\n'))
+
+def fold_line(line):
+    """Divide una línea en fragmentos de como máximo 75 octetos (RFC 5545, 3.1)."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    start = 0
+    limit = 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # No cortar en medio de un carácter multibyte
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode('utf-8'))
+        start = end
+        limit = 74  # Las líneas de continuación empiezan con un espacio
+    return '\r\n '.join(parts) + '\r\n'
+
+def format_datetime(value):
+    """Convierte una fecha en formato UTC de iCalendar (YYYYMMDDTHHMMSSZ)."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime('%Y%m%dT%H%M%SZ')
+
+def build_rrule(event):
+    """Devuelve la regla RRULE del evento, o None si no es recurrente."""
+    if not event.get('is_recurring'):
+        return None
+    frequency = RECURRENCE_FREQUENCIES.get(str(event.get('recurrence_pattern') or '').lower())
+    if not frequency:
+        return None
+    rule = f"FREQ={frequency}"
+    if event.get('recurrence_end'):
+        rule += f";UNTIL={format_datetime(event['recurrence_end'])}"
+    return rule
+
+def render_event(event, dtstamp):
+    """Genera las líneas VEVENT de un evento."""
+    if not event.get('date_time'):
+        return
+    event_id = str(event['_id'])
+    lines = [
+        'BEGIN:VEVENT',
+        f"UID:{event_id}@calend-ar",
+        f"DTSTAMP:{dtstamp}",
+        f"DTSTART:{format_datetime(event['date_time'])}",
+        f"SUMMARY:{escape_text(event.get('title', ''))}",
+    ]
+    if event.get('description'):
+        lines.append(f"DESCRIPTION:{escape_text(event['description'])}")
+    if event.get('location'):
+        lines.append(f"LOCATION:{escape_text(event['location'])}")
+    rrule = build_rrule(event)
+    if rrule:
+        lines.append(f"RRULE:{rrule}")
+    if event.get('status') == 'cancelled':
+        lines.append('STATUS:CANCELLED')
+    last_modified = event.get('updated_at') or event.get('created_at')
+    if last_modified:
+        lines.append(f"LAST-MODIFIED:{format_datetime(last_modified)}")
+    lines.append('END:VEVENT')
+    for line in lines:
+        yield fold_line(line)
+
+def render_calendar(calendar, events):
+    """Genera el documento ICS de un calendario línea a línea.
+
+    `events` puede ser un cursor: los eventos se renderizan a medida que llegan.
+    """
+    # DTSTAMP fijo por calendario para que el contenido (y su hash) solo cambie si cambian los eventos
+    dtstamp = format_datetime(calendar.get('updated_at') or calendar.get('created_at') or datetime(1970, 1, 1))
+    yield fold_line('BEGIN:VCALENDAR')
+    yield fold_line('VERSION:2.0')
+    yield fold_line(f"PRODID:{PRODID}")
+    yield fold_line('CALSCALE:GREGORIAN')
+    yield fold_line('METHOD:PUBLISH')
+    yield fold_line(f"X-WR-CALNAME:{escape_text(calendar.get('name', ''))}")
+    for event in events:
+        yield from render_event(event, dtstamp)
+    yield fold_line('END:VCALENDAR')
@@ -0,0 +1,251 @@
+# relative path: app/domain/calendar/reminders.py
+
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pymongo import MongoClient, ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+from bson.objectid import ObjectId
+
+DUPLICATE_KEY_ERROR = 11000
+
+def _naive_utc(value):
+    """MongoDB guarda fechas en UTC sin zona; normalizar para comparar con utcnow()."""
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def parse_reminder_times(reminder_data, event_date_time=None):
+    """Convierte los datos del recordatorio en la lista de pares (fecha de envío, minutes_before).
+
+    Acepta un diccionario o una lista de diccionarios con `remind_at` (fecha ISO)
+    o `minutes_before` (minutos antes de la fecha del evento). `minutes_before` es
+    None en los recordatorios con fecha fija.
+    """
+    if reminder_data is None:
+        raise ValueError("Los datos del recordatorio son obligatorios.")
+    entries = reminder_data if isinstance(reminder_data, list) else [reminder_data]
+
+    due_times = []
+    for entry in entries:
+        if not isinstance(entry, dict):
+            raise ValueError("Formato de recordatorio no válido.")
+        if entry.get('remind_at'):
+            remind_at = entry['remind_at']
+            if not isinstance(remind_at, datetime):
+                try:
+                    remind_at = datetime.fromisoformat(str(remind_at).replace('Z', '+00:00'))
+                except ValueError:
+                    raise ValueError(f"Fecha de recordatorio no válida: {entry['remind_at']}")
+            remind_at = _naive_utc(remind_at)
+            due_times.append((remind_at, None))
+        elif entry.get('minutes_before') is not None:
+            if event_date_time is None:
+                raise ValueError("El evento no tiene fecha; usa 'remind_at'.")
+            try:
+                minutes_before = int(entry['minutes_before'])
+            except (TypeError, ValueError):
+                raise ValueError(f"Valor no válido para 'minutes_before': {entry['minutes_before']}")
+            due_times.append((_naive_utc(event_date_time) - timedelta(minutes=minutes_before), minutes_before))
+        else:
+            raise ValueError("Cada recordatorio necesita 'remind_at' o 'minutes_before'.")
+    return due_times
+
+class ReminderScheduler:
+    """Programación y envío de recordatorios de eventos.
+
+    Los recordatorios viven en la colección `reminders` indexada por (status, due_at),
+    de modo que el worker solo lee los que vencen en la ventana actual sin recorrer
+    calendarios. Cada lote se reclama con un lease: si el worker muere, el lease
+    caduca y otro worker lo vuelve a tomar (entrega al menos una vez). El envío es
+    idempotente porque la notificación usa `reminder:{id}` como dedupe_key.
+    """
+
+    def __init__(self, db: MongoClient, unread_counter=None, publisher=None, lease_seconds=60):
+        self.reminders = db.reminders  # Colección de recordatorios programados
+        self.events = db.events
+        self.notifications = db.notifications
+        self.unread_counter = unread_counter
+        self.publisher = publisher  # Publicador en tiempo real (to_users)
+        self.lease_seconds = lease_seconds
+
+    def ensure_indexes(self):
+        """Crea los índices de la cola de recordatorios."""
+        self.reminders.create_index([('status', ASCENDING), ('due_at', ASCENDING)])
+        self.reminders.create_index([('status', ASCENDING), ('lease_until', ASCENDING)])
+        self.reminders.create_index([('lease_owner', ASCENDING)], sparse=True)
+        self.reminders.create_index(
+            [('calendar', ASCENDING), ('event', ASCENDING), ('user', ASCENDING), ('due_at', ASCENDING)],
+            unique=True
+        )
+        # Reprogramación y cancelación cuando cambia la fecha o el estado del evento
+        self.reminders.create_index([('event', ASCENDING), ('status', ASCENDING)])
+
+    def schedule(self, calendar_id, event_id, user_id, due_times):
+        """Programa (o reprograma) los recordatorios de un evento para un usuario.
+
+        `due_times` son pares (fecha de envío, minutes_before) de parse_reminder_times;
+        los relativos guardan `minutes_before` para seguir al evento si cambia de fecha.
+        """
+        now = datetime.utcnow()
+        operations = [UpdateOne(
+            # Los ya enviados no se reprograman: el upsert choca con el índice único y se ignora
+            {'calendar': calendar_id, 'event': event_id, 'user': user_id, 'due_at': due_at, 'status': {'$ne': 'sent'}},
+            {
+                '$set': {'status': 'pending', 'lease_until': None, 'lease_owner': None, 'minutes_before': minutes_before},
+                '$setOnInsert': {'attempts': 0, 'created_at': now},
+            },
+            upsert=True
+        ) for due_at, minutes_before in due_times]
+
+        # Los recordatorios anteriores de este evento que ya no forman parte de la configuración se cancelan
+        self.reminders.delete_many({
+            'calendar': calendar_id, 'event': event_id, 'user': user_id,
+            'status': 'pending', 'due_at': {'$nin': [due_at for due_at, _ in due_times]}
+        })
+        if operations:
+            try:
+                self.reminders.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                if any(error.get('code') != DUPLICATE_KEY_ERROR for error in e.details.get('writeErrors', [])):
+                    raise
+        return len(operations)
+
+    def cancel_for_event(self, calendar_id, event_id):
+        """Elimina los recordatorios pendientes de un evento en un calendario."""
+        result = self.reminders.delete_many({'calendar': calendar_id, 'event': event_id, 'status': {'$ne': 'sent'}})
+        return result.deleted_count
+
+    def reschedule_for_event(self, event_id, event_date_time):
+        """Mueve los recordatorios relativos pendientes de un evento a su nueva fecha.
+
+        Los de fecha fija (`remind_at`) no cambian. Si la nueva fecha de envío coincide
+        con otro recordatorio del mismo usuario, el índice único rechaza la
+        actualización y el recordatorio sobrante se elimina.
+        """
+        event_date_time = _naive_utc(event_date_time)
+        reminders = list(self.reminders.find(
+            {'event': event_id, 'status': 'pending', 'minutes_before': {'$ne': None}},
+            {'minutes_before': 1}
+        ))
+        operations = [UpdateOne(
+            {'_id': reminder['_id'], 'status': 'pending'},
+            {'$set': {'due_at': event_date_time - timedelta(minutes=reminder['minutes_before'])}}
+        ) for reminder in reminders]
+        if not operations:
+            return 0
+        try:
+            return self.reminders.bulk_write(operations, ordered=False).modified_count
+        except BulkWriteError as e:
+            write_errors = e.details.get('writeErrors', [])
+            if any(error.get('code') != DUPLICATE_KEY_ERROR for error in write_errors):
+                raise
+            duplicated = [reminders[error['index']]['_id'] for error in write_errors]
+            self.reminders.delete_many({'_id': {'$in': duplicated}, 'status': 'pending'})
+            return e.details.get('nModified', 0)
+
+    def cancel_all_for_event(self, event_id):
+        """Elimina los recordatorios pendientes de un evento en todos los calendarios (evento cancelado o eliminado)."""
+        result = self.reminders.delete_many({'event': event_id, 'status': {'$ne': 'sent'}})
+        return result.deleted_count
+
+    def list_for_calendar(self, calendar_id, event_id=None):
+        """Devuelve los recordatorios programados de un calendario."""
+        query = {'calendar': calendar_id}
+        if event_id:
+            query['event'] = event_id
+        reminders = self.reminders.find(query).sort('due_at', ASCENDING)
+        return [{**reminder, '_id': str(reminder['_id'])} for reminder in reminders]
+
+    def claim_due(self, batch_size=500, now=None):
+        """Reclama un lote de recordatorios vencidos (pendientes o con lease caducado)."""
+        now = now or datetime.utcnow()
+        due_query = {
+            'due_at': {'$lte': now},
+            '$or': [
+                {'status': 'pending'},
+                {'status': 'processing', 'lease_until': {'$lt': now}},
+            ]
+        }
+        candidate_ids = [reminder['_id'] for reminder in self.reminders.find(due_query, {'_id': 1}).sort('due_at', ASCENDING).limit(batch_size)]
+        if not candidate_ids:
+            return None, []
+
+        lease_owner = uuid.uuid4().hex
+        self.reminders.update_many(
+            {'_id': {'$in': candidate_ids}, **due_query},
+            {
+                '$set': {'status': 'processing', 'lease_owner': lease_owner, 'lease_until': now + timedelta(seconds=self.lease_seconds)},
+                '$inc': {'attempts': 1},
+            }
+        )
+        # Solo los que realmente quedaron con nuestro lease (otro worker pudo ganar la carrera)
+        return lease_owner, list(self.reminders.find({'lease_owner': lease_owner}))
+
+    def dispatch(self, reminders):
+        """Crea las notificaciones y emite los mensajes en tiempo real de un lote."""
+        if not reminders:
+            return 0
+
+        event_ids = {reminder['event'] for reminder in reminders}
+        object_ids = [ObjectId(event_id) for event_id in event_ids if ObjectId.is_valid(event_id)]
+        events = {str(event['_id']): event for event in self.events.find({'_id': {'$in': object_ids}}, {'title': 1, 'date_time': 1})}
+
+        documents = []
+        for reminder in reminders:
+            event = events.get(reminder['event'], {})
+            title = event.get('title', 'Evento')
+            documents.append({
+                'user': reminder['user'],
+                'message': f"Recordatorio: {title}",
+                'type': 'recordatorio',
+                'status': 'unread',
+                'dedupe_key': f"reminder:{reminder['_id']}",
+                'source': {'type': 'event', 'id': reminder['event']},
+                'created_at': datetime.utcnow(),
+            })
+
+        inserted_users = self._insert_notifications(documents)
+        if inserted_users and self.unread_counter is not None:
+            self.unread_counter.incr_many(inserted_users)
+
+        # Agrupar por evento para emitir un único mensaje por lote de usuarios
+        users_by_event = defaultdict(list)
+        for reminder in reminders:
+            users_by_event[reminder['event']].append(reminder['user'])
+        if self.publisher is not None:
+            for event_id, user_ids in users_by_event.items():
+                event = events.get(event_id, {})
+                payload = {'event_id': event_id, 'title': event.get('title'), 'date_time': str(event.get('date_time'))}
+                self.publisher.to_users(user_ids, payload)
+        return len(reminders)
+
+    def complete(self, lease_owner):
+        """Marca como enviados los recordatorios del lease."""
+        result = self.reminders.update_many(
+            {'lease_owner': lease_owner, 'status': 'processing'},
+            {'$set': {'status': 'sent', 'sent_at': datetime.utcnow(), 'lease_until': None}}
+        )
+        return result.modified_count
+
+    def run_once(self, batch_size=500, now=None):
+        """Procesa todos los recordatorios vencidos en lotes y devuelve cuántos se enviaron."""
+        sent = 0
+        while True:
+            lease_owner, reminders = self.claim_due(batch_size, now)
+            if not reminders:
+                return sent
+            self.dispatch(reminders)
+            sent += self.complete(lease_owner)
+
+    def _insert_notifications(self, documents):
+        """Inserta las notificaciones ignorando las ya creadas en un intento anterior."""
+        try:
+            self.notifications.insert_many(documents, ordered=False)
+            return [document['user'] for document in documents]
+        except BulkWriteError as e:
+            write_errors = e.details.get('writeErrors', [])
+            if any(error.get('code') != DUPLICATE_KEY_ERROR for error in write_errors):
+                raise
+            failed_indexes = {error['index'] for error in write_errors}
+            return [document['user'] for index, document in enumerate(documents) if index not in failed_indexes]
@@ -1,23 +1,39 @@
 # relative path: app/domain/calendar/repositories.py
 
-from pymongo import MongoClient
+import secrets
+from pymongo import MongoClient, ASCENDING
+from pymongo.errors import DuplicateKeyError, OperationFailure
 from bson.objectid import ObjectId
+from app.core.versioning import versioned
+from app.core.read_preferences import read_policies, LISTING
+from app.domain.membership.repositories import MembershipRepository
+from .reminders import ReminderScheduler, parse_reminder_times
 
 class CalendarRepository:
     """Repositorio que maneja todas las operaciones CRUD relacionadas con los calendarios."""
 
     def __init__(self, db: MongoClient):
         self.calendars = db.calendars  # Colección de calendarios en MongoDB
+        self.events = db.events  # Colección de eventos (fecha de los recordatorios relativos)
+        self.reminder_scheduler = ReminderScheduler(db)  # Cola de recordatorios programados
+        self.membership_repository = MembershipRepository(db)  # Suscriptores (colección de membresías)
+
+    def ensure_indexes(self):
+        """Crea el índice para localizar los calendarios que contienen un evento y el de nombre único por propietario."""
+        self.calendars.create_index([('events', ASCENDING)])
+        try:
+            self.calendars.create_index([('owner', ASCENDING), ('name', ASCENDING)], unique=True, name='owner_name_unique')
+        except OperationFailure as e:
+            print(f"No se pudo crear el índice único de calendarios (¿duplicados existentes?): {e}")
 
     def create_calendar(self, data):
         """Crea un nuevo calendario en la base de datos, asegurando que no exista un duplicado."""
-        # Verificar si ya existe un calendario con el mismo nombre y propietario
-        existing_calendar = self.calendars.find_one({'name': data['name'], 'owner': data['owner']})
-        if existing_calendar:
+        # El índice único (owner, name) rechaza los duplicados al insertar
+        data['subscriber_count'] = 0
+        try:
+            result = self.calendars.insert_one(data)
+        except DuplicateKeyError:
             return {"error": "Ya existe un calendario con este nombre para el mismo propietario."}
-
-        # Insertar el nuevo calendario si no hay duplicados
-        result = self.calendars.insert_one(data)
         return str(result.inserted_id)
 
     def update_calendar(self, calendar_id, data):
@@ -28,7 +44,7 @@ class CalendarRepository:
             return {"error": "El calendario no existe."}
 
         # Actualizar el calendario
-        result = self.calendars.update_one({'_id': ObjectId(calendar_id)}, {'$set': data})
+        result = self.calendars.update_one({'_id': ObjectId(calendar_id)}, versioned({'$set': data}))
         return result.modified_count > 0
 
     def delete_calendar(self, calendar_id):
@@ -39,12 +55,14 @@ class CalendarRepository:
             return {"error": "El calendario no existe."}
 
         result = self.calendars.delete_one({'_id': ObjectId(calendar_id)})
+        self.membership_repository.delete_parent_memberships('calendar', calendar_id)
         return result.deleted_count > 0
 
     def get_calendar_by_id(self, calendar_id):
         """Obtiene un calendario por su ID."""
         try:
-            calendar = self.calendars.find_one({'_id': ObjectId(calendar_id)})
+            # Los suscriptores viven en la colección de membresías (el array es de versiones anteriores)
+            calendar = self.calendars.find_one({'_id': ObjectId(calendar_id)}, {'subscribers': 0})
             if calendar:
                 calendar['_id'] = str(calendar['_id'])
             return calendar
@@ -54,7 +72,7 @@ class CalendarRepository:
     def get_all_calendars(self, page=1, limit=10):
         """Obtiene una lista paginada de todos los calendarios."""
         skip = (page - 1) * limit
-        calendars = self.calendars.find().skip(skip).limit(limit)
+        calendars = self.calendars.find({}, {'feed_token': 0, 'subscribers': 0}).skip(skip).limit(limit)
         return [{'_id': str(calendar['_id']), **calendar} for calendar in calendars]
 
     def add_event_to_calendar(self, calendar_id, event_id):
@@ -71,7 +89,7 @@ class CalendarRepository:
         # Agregar el evento
         result = self.calendars.update_one(
             {'_id': ObjectId(calendar_id)},
-            {'$addToSet': {'events': event_id}}
+            versioned({'$addToSet': {'events': event_id}})
         )
         return result.modified_count > 0
 
@@ -85,38 +103,74 @@ class CalendarRepository:
         # Eliminar el evento del calendario
         result = self.calendars.update_one(
             {'_id': ObjectId(calendar_id)},
-            {'$pull': {'events': event_id}}
+            versioned({'$pull': {'events': event_id}})
         )
+        # Los recordatorios pendientes de ese evento dejan de tener sentido
+        self.reminder_scheduler.cancel_for_event(calendar_id, event_id)
         return result.modified_count > 0
 
-    def get_public_calendars(self, page=1, limit=10):
-        """Devuelve una lista de calendarios públicos."""
+    def get_public_calendars(self, page=1, limit=10, session=None):
+        """Devuelve una lista de calendarios públicos (admite lectura desde secundarios)."""
         skip = (page - 1) * limit
-        public_calendars = self.calendars.find({'is_public': True}).skip(skip).limit(limit)
+        calendars = read_policies.collection(self.calendars, LISTING)
+        public_calendars = calendars.find({'is_public': True}, {'feed_token': 0, 'subscribers': 0}, session=session).skip(skip).limit(limit)
         return [{'_id': str(calendar['_id']), **calendar} for calendar in public_calendars]
 
     def share_calendar(self, calendar_id):
-        """Genera una URL compartida para el calendario si existe."""
+        """Genera la URL compartida del calendario y el token de su feed ICS si existe."""
         # Verificar si el calendario existe
         existing_calendar = self.get_calendar_by_id(calendar_id)
-        if not existing_calendar:
+        if not existing_calendar or "error" in existing_calendar:
             return {"error": "El calendario no existe."}
 
-        # Generar y actualizar la URL compartida
+        # Generar la URL compartida; el token del feed se conserva entre llamadas
         shared_url = f'/calendars/{calendar_id}/share'
-        result = self.calendars.update_one(
+        feed_token = existing_calendar.get('feed_token') or secrets.token_urlsafe(24)
+        self.calendars.update_one(
             {'_id': ObjectId(calendar_id)},
-            {'$set': {'shared_url': shared_url}}
+            versioned({'$set': {'shared_url': shared_url, 'feed_token': feed_token}})
         )
-        return shared_url if result.modified_count > 0 else None
-
-    def get_subscribers(self, calendar_id):
-        """Devuelve la lista de usuarios suscritos a un calendario."""
-        calendar = self.get_calendar_by_id(calendar_id)
-        return calendar.get('subscribers', []) if calendar else {"error": "El calendario no existe."}
-
-    def set_event_reminder(self, calendar_id, event_id, reminder_data):
-        """Configura recordatorios personalizados para eventos si el evento existe en el calendario."""
+        return {
+            'shared_url': shared_url,
+            'feed_url': f'/calendars/{calendar_id}/feed.ics?token={feed_token}',
+        }
+
+    def get_calendar_events_cursor(self, calendar, batch_size=500):
+        """Devuelve un cursor con los eventos del calendario ordenados por fecha."""
+        event_ids = [ObjectId(event_id) for event_id in calendar.get('events', []) if ObjectId.is_valid(event_id)]
+        return self.events.find({'_id': {'$in': event_ids}}).sort([('date_time', ASCENDING), ('_id', ASCENDING)]).batch_size(batch_size)
+
+    def get_calendar_ids_for_event(self, event_id):
+        """Devuelve los IDs de los calendarios que contienen un evento."""
+        return [str(calendar['_id']) for calendar in self.calendars.find({'events': event_id}, {'_id': 1})]
+
+    def get_subscribers(self, calendar_id, after=None, limit=50):
+        """Devuelve una página de los suscriptores de un calendario (paginada por cursor) y su total."""
+        calendar = self.calendars.find_one({'_id': ObjectId(calendar_id)}, {'subscriber_count': 1})
+        if not calendar:
+            return {"error": "El calendario no existe."}
+        page = self.membership_repository.get_members('calendar', calendar_id, after, limit)
+        return {'subscribers': page['members'], 'total': calendar.get('subscriber_count', 0), 'next_cursor': page['next_cursor']}
+
+    def add_subscriber(self, calendar_id, user_id):
+        """Suscribe a un usuario al calendario."""
+        if not self.membership_repository.add_member('calendar', calendar_id, user_id):
+            return {"error": "El usuario ya está suscrito a este calendario."}
+        return True
+
+    def remove_subscriber(self, calendar_id, user_id):
+        """Cancela la suscripción de un usuario al calendario."""
+        if not self.membership_repository.remove_member('calendar', calendar_id, user_id):
+            return {"error": "El usuario no está suscrito a este calendario."}
+        return True
+
+    def set_event_reminder(self, calendar_id, event_id, reminder_data, user_id=None):
+        """Programa recordatorios personalizados para un evento del calendario.
+
+        Los recordatorios se guardan en la colección `reminders` (indexada por fecha de
+        envío) para que el worker los entregue; `user_id` es el destinatario y por
+        defecto es el propietario del calendario.
+        """
         # Verificar si el calendario y el evento existen
         calendar = self.get_calendar_by_id(calendar_id)
         if not calendar:
@@ -125,9 +179,16 @@ class CalendarRepository:
         if event_id not in calendar.get('events', []):
             return {"error": "El evento no está en el calendario."}
 
-        # Configurar el recordatorio
-        result = self.calendars.update_one(
-            {'_id': ObjectId(calendar_id), 'events': event_id},
-            {'$set': {'reminders': reminder_data}}
-        )
-        return result.modified_count > 0
+        event = self.events.find_one({'_id': ObjectId(event_id)}, {'date_time': 1}) if ObjectId.is_valid(event_id) else None
+        try:
+            due_times = parse_reminder_times(reminder_data, event.get('date_time') if event else None)
+        except ValueError as e:
+            return {"error": str(e)}
+
+        # Programar los recordatorios
+        scheduled = self.reminder_scheduler.schedule(calendar_id, event_id, user_id or calendar['owner'], due_times)
+        return scheduled > 0
+
+    def get_event_reminders(self, calendar_id, event_id=None):
+        """Devuelve los recordatorios programados de un calendario (opcionalmente de un evento)."""
+        return self.reminder_scheduler.list_for_calendar(calendar_id, event_id)
@@ -7,9 +7,10 @@ from .entities import CalendarSchema
 class CalendarUseCases:
     """Clase que define los casos de uso para la entidad Calendar."""
 
+    calendar_schema = CalendarSchema()
+
     def __init__(self, db):
         self.calendar_repository = CalendarRepository(db)
-        self.calendar_schema = CalendarSchema()
 
     def create_calendar(self, calendar_data):
         """Crea un nuevo calendario."""
@@ -114,32 +115,88 @@ class CalendarUseCases:
         except Exception as ex:
             return {"error": str(ex)}
 
-    def list_public_calendars(self, page=1, limit=10):
+    def list_public_calendars(self, page=1, limit=10, session=None):
         """Lista los calendarios públicos con paginación."""
         try:
-            calendars = self.calendar_repository.get_public_calendars(page, limit)
+            calendars = self.calendar_repository.get_public_calendars(page, limit, session)
             return calendars
         except Exception as ex:
             return {"error": str(ex)}
 
-    def share_calendar(self, calendar_id):
-        """Genera una URL pública para compartir un calendario."""
+    def share_calendar(self, user_id, calendar_id):
+        """Genera una URL pública para compartir un calendario y la URL de su feed ICS verificando si el usuario es el propietario."""
         try:
-            shared_url = self.calendar_repository.share_calendar(calendar_id)
-            if shared_url:
-                return {"shared_url": shared_url}
-            return {"error": "Error al generar la URL pública"}
+            calendar = self.calendar_repository.get_calendar_by_id(calendar_id)
+            if not calendar or "error" in calendar:
+                return {"error": "Calendario no encontrado"}
+
+            # El token del feed es el único control de acceso de los calendarios privados
+            if calendar['owner'] != user_id:
+                return {"error": "No tienes permisos para compartir este calendario"}
+
+            return self.calendar_repository.share_calendar(calendar_id)
         except Exception as ex:
             return {"error": str(ex)}
 
-    def list_calendar_subscribers(self, calendar_id):
-        """Lista los suscriptores de un calendario."""
+    def get_calendar_feed(self, calendar_id, token=None):
+        """Devuelve el calendario y el cursor de sus eventos si el feed es accesible.
+
+        Los calendarios públicos no necesitan token; los privados exigen el token
+        generado al compartirlos.
+        """
+        try:
+            calendar = self.calendar_repository.get_calendar_by_id(calendar_id)
+            if not calendar or "error" in calendar:
+                return {"error": "Calendario no encontrado"}, None
+            if not calendar.get('is_public', True) and (not token or token != calendar.get('feed_token')):
+                return {"error": "No tienes acceso a este calendario"}, None
+            return calendar, self.calendar_repository.get_calendar_events_cursor(calendar)
+        except Exception as ex:
+            return {"error": str(ex)}, None
+
+    def list_calendar_ids_for_event(self, event_id):
+        """Lista los calendarios que contienen un evento (para invalidar sus feeds)."""
         try:
-            subscribers = self.calendar_repository.get_subscribers(calendar_id)
+            return self.calendar_repository.get_calendar_ids_for_event(event_id)
+        except Exception:
+            return []
+
+    def list_calendar_subscribers(self, calendar_id, after=None, limit=50):
+        """Lista una página de los suscriptores de un calendario."""
+        try:
+            subscribers = self.calendar_repository.get_subscribers(calendar_id, after, limit)
             return subscribers
         except Exception as ex:
             return {"error": str(ex)}
 
+    def subscribe_to_calendar(self, user_id, calendar_id):
+        """Suscribe al usuario a un calendario público o propio."""
+        try:
+            calendar = self.calendar_repository.get_calendar_by_id(calendar_id)
+            if not calendar or "error" in calendar:
+                return {"error": "Calendario no encontrado"}
+
+            # Los calendarios privados solo admiten la suscripción de su propietario
+            if not calendar.get('is_public', True) and calendar['owner'] != user_id:
+                return {"error": "No tienes acceso a este calendario"}
+
+            subscribed = self.calendar_repository.add_subscriber(calendar_id, user_id)
+            if isinstance(subscribed, dict):
+                return subscribed
+            return {"message": "Suscripción registrada exitosamente"}
+        except Exception as ex:
+            return {"error": str(ex)}
+
+    def unsubscribe_from_calendar(self, user_id, calendar_id):
+        """Cancela la suscripción del usuario a un calendario."""
+        try:
+            unsubscribed = self.calendar_repository.remove_subscriber(calendar_id, user_id)
+            if isinstance(unsubscribed, dict):
+                return unsubscribed
+            return {"message": "Suscripción cancelada exitosamente"}
+        except Exception as ex:
+            return {"error": str(ex)}
+
     def set_event_reminder(self, user_id, calendar_id, event_id, reminder_data):
         """Configura un recordatorio personalizado para un evento verificando si el usuario es el propietario."""
         try:
@@ -152,9 +209,25 @@ class CalendarUseCases:
             if calendar['owner'] != user_id:
                 return {"error": "No tienes permisos para configurar recordatorios en este calendario"}
 
-            reminder_set = self.calendar_repository.set_event_reminder(calendar_id, event_id, reminder_data)
+            reminder_set = self.calendar_repository.set_event_reminder(calendar_id, event_id, reminder_data, user_id)
+            if isinstance(reminder_set, dict):
+                return reminder_set
             if reminder_set:
                 return {"message": "Recordatorio configurado exitosamente"}
             return {"error": "Error al configurar el recordatorio"}
         except Exception as ex:
             return {"error": str(ex)}
+
+    def list_event_reminders(self, user_id, calendar_id, event_id=None):
+        """Lista los recordatorios programados de un calendario verificando si el usuario es el propietario."""
+        try:
+            calendar = self.calendar_repository.get_calendar_by_id(calendar_id)
+            if not calendar:
+                return {"error": "Calendario no encontrado"}
+
+            if calendar['owner'] != user_id:
+                return {"error": "No tienes permisos para ver los recordatorios de este calendario"}
+
+            return self.calendar_repository.get_event_reminders(calendar_id, event_id)
+        except Exception as ex:
+            return {"error": str(ex)}
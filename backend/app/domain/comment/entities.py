@@ -2,7 +2,8 @@
 
 import uuid
 from datetime import datetime
-from marshmallow import Schema, fields, validate, validates, ValidationError, validates_schema
+from marshmallow import Schema, fields, validate, validates, ValidationError
+from app.domain.validation import reference_exists
 
 class Comment:
     """Clase que representa un comentario dentro del sistema."""
@@ -29,6 +30,9 @@ class CommentSchema(Schema):
     created_at = fields.DateTime(dump_only=True)
     report_count = fields.Integer(default=0)
 
+    # Campos que referencian otros documentos: se resuelven por lote en el ValidationContext
+    references = {'user': 'users', 'event': 'events'}
+
     @validates('content')
     def validate_content_length(self, content):
         """Validar que el contenido no esté vacío y que su longitud esté entre 1 y 500 caracteres."""
@@ -38,23 +42,11 @@ class CommentSchema(Schema):
     @validates('user')
     def validate_user_exists(self, user, **kwargs):
         """Valida que el usuario exista en la base de datos."""
-        db = kwargs.get('db_instance')
-        if not db.users.find_one({"_id": user}):
+        if not reference_exists('users', user):
             raise ValidationError(f"El usuario con ID {user} no existe.")
 
     @validates('event')
     def validate_event_exists(self, event, **kwargs):
         """Valida que el evento relacionado exista en la base de datos."""
-        db = kwargs.get('db_instance')
-        if not db.events.find_one({"_id": event}):
+        if not reference_exists('events', event):
             raise ValidationError(f"El evento con ID {event} no existe.")
-
-    @validates_schema
-    def validate_unique_comment(self, data, **kwargs):
-        """Validar que el usuario no comente el mismo evento más de una vez."""
-        db = kwargs.get('db_instance')
-        user = data['user']
-        event = data['event']
-        existing_comment = db.comments.find_one({"user": user, "event": event})
-        if existing_comment:
-            raise ValidationError(f"El usuario con ID {user} ya ha comentado el evento con ID {event}.")
@@ -1,22 +1,46 @@
 # relative path: app/domain/comment/repositories.py
 
-from pymongo import MongoClient
+from pymongo import MongoClient, ASCENDING
+from pymongo.errors import DuplicateKeyError, OperationFailure
 from bson.objectid import ObjectId
+from app.domain.like.repositories import LikeRepository
+from app.domain.moderation.repositories import ModerationRepository
+
+# Número de likes: el contador desnormalizado `like_count`, o el array `likes` de los documentos sin migrar
+LIKE_COUNT_EXPRESSION = {
+    '$ifNull': ['$like_count', {'$cond': [{'$isArray': '$likes'}, {'$size': '$likes'}, 0]}]
+}
 
 class CommentRepository:
     """Repositorio que maneja todas las operaciones CRUD relacionadas con los comentarios."""
 
     def __init__(self, db: MongoClient):
         self.comments = db.comments  # Colección de comentarios en MongoDB
+        self.replies = db.replies  # Colección de respuestas (hilos de discusión)
+        self.like_repository = LikeRepository(db)  # Likes en su propia colección
+        self.moderation_repository = ModerationRepository(db)  # Reportes y cola de moderación
+
+    def ensure_indexes(self):
+        """Crea los índices usados por los listados de comentarios y el hilo de discusión."""
+        self.comments.create_index([('event', ASCENDING), ('_id', ASCENDING)])
+        self.replies.create_index([('parent_comment', ASCENDING), ('_id', ASCENDING)])
+        try:
+            # Un mismo usuario no repite el mismo comentario en un evento
+            self.comments.create_index(
+                [('event', ASCENDING), ('user', ASCENDING), ('content', ASCENDING)],
+                unique=True,
+                name='event_user_content_unique'
+            )
+        except OperationFailure as e:
+            print(f"No se pudo crear el índice único de comentarios (¿duplicados existentes?): {e}")
 
     def create_comment(self, data):
         """Crea un nuevo comentario en la base de datos."""
-        # Validar que no haya comentarios duplicados con el mismo contenido del mismo usuario para el mismo evento
-        existing_comment = self.comments.find_one({'user': data['user'], 'event': data['event'], 'content': data['content']})
-        if existing_comment:
+        # El índice único (event, user, content) rechaza los comentarios duplicados al insertar
+        try:
+            result = self.comments.insert_one(data)
+        except DuplicateKeyError:
             return {"error": "Ya existe un comentario con el mismo contenido para este usuario y evento."}
-
-        result = self.comments.insert_one(data)
         return str(result.inserted_id)
 
     def update_comment(self, comment_id, data):
@@ -37,6 +61,8 @@ class CommentRepository:
             return {"error": "El comentario no existe."}
 
         result = self.comments.delete_one({'_id': ObjectId(comment_id)})
+        if result.deleted_count > 0:
+            self.like_repository.delete_target_likes('comment', comment_id)
         return result.deleted_count > 0
 
     def get_comment_by_id(self, comment_id):
@@ -50,54 +76,130 @@ class CommentRepository:
             return {"error": "Formato de ID no válido."}
 
     def get_comments_by_event(self, event_id, page=1, limit=10):
-        """Obtiene una lista paginada de comentarios para un evento."""
+        """Obtiene una lista paginada de comentarios visibles para un evento (sin los ocultados por moderación)."""
         skip = (page - 1) * limit
-        comments = self.comments.find({'event': event_id}).skip(skip).limit(limit)
+        comments = self.comments.find({'event': event_id, 'hidden': {'$ne': True}}).skip(skip).limit(limit)
         return [{'_id': str(comment['_id']), **comment} for comment in comments]
 
     def like_comment(self, comment_id, user_id):
         """Da like a un comentario si no ha sido ya dado por el mismo usuario."""
         # Verificar si el comentario existe
-        existing_comment = self.get_comment_by_id(comment_id)
-        if not existing_comment:
+        if not self.comments.find_one({'_id': ObjectId(comment_id)}, {'_id': 1}):
             return {"error": "El comentario no existe."}
 
-        # Verificar si el usuario ya ha dado like
-        if user_id in existing_comment.get('likes', []):
+        # El índice único de la colección de likes rechaza el like repetido
+        if not self.like_repository.add_like('comment', comment_id, user_id):
             return {"error": "El usuario ya ha dado like a este comentario."}
+        return True
 
-        # Agregar el like
-        result = self.comments.update_one(
-            {'_id': ObjectId(comment_id)},
-            {'$addToSet': {'likes': user_id}}
-        )
-        return result.modified_count > 0
+    def unlike_comment(self, comment_id, user_id):
+        """Retira el like de un usuario a un comentario."""
+        if not self.like_repository.remove_like('comment', comment_id, user_id):
+            return {"error": "El usuario no ha dado like a este comentario."}
+        return True
 
-    def get_comment_likes(self, comment_id):
-        """Devuelve la lista de usuarios que dieron like a un comentario."""
-        comment = self.get_comment_by_id(comment_id)
-        return comment.get('likes', []) if comment else {"error": "El comentario no existe."}
+    def get_comment_likes(self, comment_id, page=1, limit=50):
+        """Devuelve una página de los usuarios que dieron like a un comentario."""
+        return self.like_repository.get_likers('comment', comment_id, page, limit)
 
-    def report_comment(self, comment_id, report_data):
+    def get_comment_like_count(self, comment_id):
+        """Devuelve el número de likes de un comentario sin cargar la lista de usuarios."""
+        return self.like_repository.get_like_count('comment', comment_id)
+
+    def get_liked_comments(self, user_id, comment_ids):
+        """Indica qué comentarios de la lista ha marcado el usuario (una sola consulta)."""
+        return self.like_repository.get_liked_targets('comment', user_id, comment_ids)
+
+    def report_comment(self, comment_id, report_data, user_id=None):
         """Reporta un comentario inapropiado si no ha sido ya reportado por el mismo usuario."""
         # Verificar si el comentario existe
-        existing_comment = self.get_comment_by_id(comment_id)
+        existing_comment = self.comments.find_one({'_id': ObjectId(comment_id)}, {'event': 1})
         if not existing_comment:
             return {"error": "El comentario no existe."}
 
-        # Verificar si el comentario ya fue reportado con el mismo detalle
-        if existing_comment.get('report_data') == report_data:
-            return {"error": "Este comentario ya fue reportado con el mismo detalle."}
+        # El reporte se guarda aparte (sin sobrescribir los anteriores) y entra en la cola de moderación
+        if not self.moderation_repository.add_report('comment', comment_id, user_id, report_data, existing_comment.get('event')):
+            return {"error": "El usuario ya ha reportado este comentario."}
 
-        # Reportar el comentario y aumentar el contador de reportes
-        result = self.comments.update_one(
-            {'_id': ObjectId(comment_id)},
-            {'$set': {'report_data': report_data}, '$inc': {'report_count': 1}}
-        )
-        return result.modified_count > 0
+        self.comments.update_one({'_id': ObjectId(comment_id)}, {'$inc': {'report_count': 1}})
+        return True
 
     def get_reported_comments(self, page=1, limit=10):
-        """Devuelve una lista paginada de comentarios reportados."""
-        skip = (page - 1) * limit
-        reported_comments = self.comments.find({'report_count': {'$gt': 0}}).skip(skip).limit(limit)
-        return [{'_id': str(comment['_id']), **comment} for comment in reported_comments]
+        """Devuelve una página de comentarios reportados pendientes, en el orden de la cola de moderación."""
+        items = self.moderation_repository.get_queue(page, limit)
+        comment_ids = [ObjectId(item['target']) for item in items if item['target_type'] == 'comment' and ObjectId.is_valid(item['target'])]
+        comments = {str(comment['_id']): comment for comment in self.comments.find({'_id': {'$in': comment_ids}})}
+        return [{**comments[item['target']], '_id': item['target']} for item in items if item['target'] in comments]
+
+    def get_event_discussion(self, event_id, after=None, limit=10, replies_limit=3):
+        """Devuelve una página del hilo de discusión de un evento en dos consultas.
+
+        1. Los comentarios de la página (paginados por cursor sobre _id) con su número de likes.
+        2. Las primeras `replies_limit` respuestas de todos esos comentarios con un único $in
+           ($firstN en el $group: cada hilo aporta como mucho `replies_limit + 1`).
+
+        Cada comentario incluye `replies_next_cursor` para seguir paginando sus respuestas,
+        y el resultado incluye `next_cursor` para la siguiente página de comentarios.
+        """
+        # Los comentarios ocultados por moderación (y sus respuestas) no forman parte del hilo
+        match = {'event': event_id, 'hidden': {'$ne': True}}
+        if after:
+            match['_id'] = {'$gt': ObjectId(after)}
+
+        comments = list(self.comments.aggregate([
+            {'$match': match},
+            {'$sort': {'_id': ASCENDING}},
+            {'$limit': limit + 1},
+            {'$addFields': {'like_count': LIKE_COUNT_EXPRESSION}},
+            {'$project': {'likes': 0, 'report_data': 0}},
+        ]))
+        has_more = len(comments) > limit
+        comments = comments[:limit]
+
+        # Las respuestas guardan parent_comment como string o como ObjectId según su origen
+        comment_ids = [comment['_id'] for comment in comments]
+        parent_ids = comment_ids + [str(comment_id) for comment_id in comment_ids]
+        threads = {}
+        if comment_ids:
+            for thread in self.replies.aggregate([
+                {'$match': {'parent_comment': {'$in': parent_ids}}},
+                {'$sort': {'parent_comment': ASCENDING, '_id': ASCENDING}},
+                {'$addFields': {'like_count': LIKE_COUNT_EXPRESSION}},
+                {'$project': {'likes': 0}},
+                # $firstN conserva solo replies_limit + 1 respuestas por comentario en el $group
+                # (no acumula el hilo completo); reply_count sigue contando todas
+                {'$group': {
+                    '_id': {'$toString': '$parent_comment'},
+                    'replies': {'$firstN': {'input': '$$ROOT', 'n': replies_limit + 1}},
+                    'reply_count': {'$sum': 1},
+                }},
+            ]):
+                threads[thread['_id']] = thread
+
+        result = []
+        for comment in comments:
+            comment_id = str(comment['_id'])
+            thread = threads.get(comment_id, {})
+            replies = thread.get('replies', [])
+            replies_has_more = len(replies) > replies_limit
+            replies = replies[:replies_limit]
+            result.append({
+                **comment,
+                '_id': comment_id,
+                'reply_count': thread.get('reply_count', 0),
+                'replies': [{**reply, '_id': str(reply['_id']), 'parent_comment': str(reply['parent_comment'])} for reply in replies],
+                'replies_next_cursor': str(replies[-1]['_id']) if replies_has_more else None,
+            })
+
+        return {
+            'comments': result,
+            'next_cursor': result[-1]['_id'] if has_more else None,
+        }
+
+    def get_event_id_for_comment(self, comment_id):
+        """Devuelve el evento al que pertenece un comentario (para invalidar su caché)."""
+        try:
+            comment = self.comments.find_one({'_id': ObjectId(comment_id)}, {'event': 1})
+        except Exception:
+            return None
+        return comment.get('event') if comment else None
@@ -3,20 +3,27 @@
 from marshmallow import ValidationError
 from .repositories import CommentRepository
 from .entities import CommentSchema
+from app.domain.moderation.entities import ReportSchema
+from app.domain.validation import FastValidator, ValidationContext
 
 
 class CommentUseCases:
     """Clase que define los casos de uso para la entidad Comment."""
 
+    comment_schema = CommentSchema()
+    comment_validator = FastValidator(comment_schema)  # Ruta rápida: endpoint de mucho volumen
+    report_schema = ReportSchema()
+
     def __init__(self, db):
+        self.db = db
         self.comment_repository = CommentRepository(db)
-        self.comment_schema = CommentSchema()
 
     def create_comment(self, comment_data):
         """Crea un nuevo comentario."""
         try:
             # Validar los datos del comentario utilizando Marshmallow
-            validated_data = self.comment_schema.load(comment_data)
+            with ValidationContext(self.db, self.comment_schema, [comment_data]):
+                validated_data = self.comment_validator.load(comment_data)
             comment_id = self.comment_repository.create_comment(validated_data)
             return comment_id
         except ValidationError as e:
@@ -37,7 +44,8 @@ class CommentUseCases:
                 return {"error": "No tienes permisos para actualizar este comentario"}
 
             # Validar los nuevos datos del comentario
-            validated_data = self.comment_schema.load(new_data, partial=True)
+            with ValidationContext(self.db, self.comment_schema, [new_data]):
+                validated_data = self.comment_validator.load(new_data, partial=True)
             updated = self.comment_repository.update_comment(comment_id, validated_data)
             if updated:
                 return {"message": "Comentario actualizado exitosamente"}
@@ -85,30 +93,78 @@ class CommentUseCases:
         except Exception as ex:
             return {"error": str(ex)}
 
+    def get_event_discussion(self, event_id, after=None, limit=10, replies_limit=3):
+        """Obtiene una página del hilo de discusión de un evento (comentarios, primeras respuestas y likes)."""
+        try:
+            return self.comment_repository.get_event_discussion(event_id, after, limit, replies_limit)
+        except Exception as ex:
+            return {"error": str(ex)}
+
+    def get_comment_event_id(self, comment_id):
+        """Obtiene el evento al que pertenece un comentario."""
+        try:
+            return self.comment_repository.get_event_id_for_comment(comment_id)
+        except Exception:
+            return None
+
     def like_comment(self, comment_id, user_id):
         """Da like a un comentario."""
         try:
             liked = self.comment_repository.like_comment(comment_id, user_id)
-            if liked:
-                return {"message": "Like registrado exitosamente"}
-            return {"error": "Error al registrar el like"}
+            if isinstance(liked, dict):
+                return liked
+            return {"message": "Like registrado exitosamente"}
         except Exception as ex:
             return {"error": str(ex)}
 
-    def get_comment_likes(self, comment_id):
-        """Obtiene la lista de usuarios que dieron like a un comentario."""
+    def unlike_comment(self, comment_id, user_id):
+        """Retira el like de un comentario."""
         try:
-            likes = self.comment_repository.get_comment_likes(comment_id)
+            unliked = self.comment_repository.unlike_comment(comment_id, user_id)
+            if isinstance(unliked, dict):
+                return unliked
+            return {"message": "Like eliminado exitosamente"}
+        except Exception as ex:
+            return {"error": str(ex)}
+
+    def get_comment_likes(self, comment_id, page=1, limit=50):
+        """Obtiene una página de los usuarios que dieron like a un comentario."""
+        try:
+            likes = self.comment_repository.get_comment_likes(comment_id, page, limit)
             return likes
         except Exception as ex:
             return {"error": str(ex)}
 
-    def report_comment(self, comment_id, report_data):
+    def get_comment_like_count(self, comment_id):
+        """Obtiene el número de likes de un comentario."""
+        try:
+            return self.comment_repository.get_comment_like_count(comment_id)
+        except Exception as ex:
+            return {"error": str(ex)}
+
+    def get_liked_comments(self, user_id, comment_ids):
+        """Indica qué comentarios de la lista ha marcado el usuario."""
+        try:
+            return self.comment_repository.get_liked_comments(user_id, comment_ids)
+        except Exception as ex:
+            return {"error": str(ex)}
+
+    def report_comment(self, comment_id, report_data, user_id=None):
         """Reporta un comentario inapropiado."""
         try:
-            reported = self.comment_repository.report_comment(comment_id, report_data)
-            if reported:
-                return {"message": "Comentario reportado exitosamente"}
-            return {"error": "Error al reportar el comentario"}
+            validated_data = self.report_schema.load(report_data or {})
+            reported = self.comment_repository.report_comment(comment_id, validated_data, user_id)
+            if isinstance(reported, dict):
+                return reported
+            return {"message": "Comentario reportado exitosamente"}
+        except ValidationError as e:
+            return {"error": e.messages}
+        except Exception as ex:
+            return {"error": str(ex)}
+
+    def list_reported_comments(self, page=1, limit=10):
+        """Lista los comentarios reportados en orden de prioridad de moderación."""
+        try:
+            return self.comment_repository.get_reported_comments(page, limit)
         except Exception as ex:
             return {"error": str(ex)}
@@ -3,6 +3,7 @@
 import uuid
 from datetime import datetime
 from marshmallow import Schema, fields, validate, validates, ValidationError
+from app.domain.validation import reference_exists
 
 class Community:
     """Clase que representa una comunidad dentro del sistema."""
@@ -39,41 +40,31 @@ class CommunitySchema(Schema):
     featured = fields.Boolean(default=False)
     created_at = fields.DateTime(dump_only=True)
 
-    @validates('name')
-    def validate_unique_name(self, name, **kwargs):
-        """Valida que el nombre de la comunidad sea único."""
-        db = kwargs.get('db_instance')
-        existing_community = db.communities.find_one({"name": name})
-        if existing_community:
-            raise ValidationError(f"El nombre '{name}' ya está en uso por otra comunidad.")
+    references = {'admin': 'users', 'moderators': 'users', 'members': 'users', 'events': 'events'}
 
     @validates('admin')
     def validate_admin_exists(self, admin, **kwargs):
         """Valida que el administrador de la comunidad exista en la base de datos."""
-        db = kwargs.get('db_instance')
-        if not db.users.find_one({"_id": admin}):
+        if not reference_exists('users', admin):
             raise ValidationError(f"El usuario con ID {admin} no existe.")
 
     @validates('moderators')
     def validate_moderators_exist(self, moderators, **kwargs):
         """Valida que todos los moderadores existan en la base de datos."""
-        db = kwargs.get('db_instance')
         for moderator in moderators:
-            if not db.users.find_one({"_id": moderator}):
+            if not reference_exists('users', moderator):
                 raise ValidationError(f"El moderador con ID {moderator} no existe.")
 
     @validates('members')
     def validate_members_exist(self, members, **kwargs):
         """Valida que todos los miembros existan en la base de datos."""
-        db = kwargs.get('db_instance')
         for member in members:
-            if not db.users.find_one({"_id": member}):
+            if not reference_exists('users', member):
                 raise ValidationError(f"El miembro con ID {member} no existe.")
 
     @validates('events')
     def validate_events_exist(self, events, **kwargs):
         """Valida que todos los eventos relacionados existan en la base de datos."""
-        db = kwargs.get('db_instance')
         for event in events:
-            if not db.events.find_one({"_id": event}):
+            if not reference_exists('events', event):
                 raise ValidationError(f"El evento con ID {event} no existe.")
@@ -1,11 +1,48 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError, OperationFailure
 from bson.objectid import ObjectId
+from app.core.versioning import versioned
+from app.core.query_builder import QueryBuilder, FilterField
+from app.core.read_preferences import read_policies, LISTING
+from app.domain.membership.repositories import MembershipRepository
+
+# Filtros permitidos en filter_communities; cada combinación queda cubierta por uno de los índices de ensure_indexes
+COMMUNITY_FILTERS = {
+    'category': FilterField('category'),
+    'location': FilterField('location'),
+    'type': FilterField('type'),
+    'featured': FilterField('featured', bool),
+    'popularity': FilterField('popularity', int, '$gte'),
+    'participation': FilterField('participation', int, '$gte'),
+}
+COMMUNITY_SORT_FIELDS = ('name', 'popularity', 'participation', 'created_at')
 
 class CommunityRepository:
     """Repositorio que maneja todas las operaciones CRUD relacionadas con las comunidades."""
 
+    query_builder = QueryBuilder(COMMUNITY_FILTERS, COMMUNITY_SORT_FIELDS, [('popularity', DESCENDING), ('_id', DESCENDING)])
+
     def __init__(self, db: MongoClient):
         self.communities = db.communities  # Colección de comunidades en MongoDB
+        self.membership_repository = MembershipRepository(db)  # Miembros (colección de membresías)
+
+    def ensure_indexes(self):
+        """Crea los índices que sirven a las consultas de filtrado y ordenamiento."""
+        self.communities.create_index([('popularity', DESCENDING)])
+        self.communities.create_index([('category', ASCENDING), ('popularity', DESCENDING)])
+        self.communities.create_index([('location', ASCENDING), ('popularity', DESCENDING)])
+        self.communities.create_index([('type', ASCENDING), ('popularity', DESCENDING)])
+        self.communities.create_index([('featured', ASCENDING), ('popularity', DESCENDING)])
+        self.communities.create_index([('participation', DESCENDING)])
+        self.communities.create_index([('created_at', DESCENDING)])
+        try:
+            # Nombre único: sustituye al índice simple por nombre de versiones anteriores
+            indexes = self.communities.index_information()
+            if 'name_1' in indexes and not indexes['name_1'].get('unique'):
+                self.communities.drop_index('name_1')
+            self.communities.create_index([('name', ASCENDING)], unique=True)
+        except OperationFailure as e:
+            print(f"No se pudo crear el índice único de comunidades (¿duplicados existentes?): {e}")
 
     def create_community(self, data):
         """Crea una nueva comunidad en la base de datos."""
@@ -13,9 +50,17 @@ class CommunityRepository:
             # Asegurarse de que image_url esté presente en los datos
             if 'image_url' not in data:
                 data['image_url'] = None  # O una URL por defecto
-                
+
+            # Los miembros iniciales se guardan en la colección de membresías, no en el documento
+            members = data.pop('members', None) or []
+            data['member_count'] = 0
             result = self.communities.insert_one(data)
-            return str(result.inserted_id)
+            community_id = str(result.inserted_id)
+            if members:
+                self.membership_repository.add_members('community', community_id, members)
+            return community_id
+        except DuplicateKeyError:
+            return {"error": f"El nombre '{data.get('name')}' ya está en uso por otra comunidad."}
         except Exception as e:
             print(f"Error en create_community: {e}")
             raise Exception("Error al crear la comunidad")
@@ -26,7 +71,12 @@ class CommunityRepository:
             if not self.get_community_by_id(community_id):
                 raise ValueError("La comunidad no existe.")
 
-            result = self.communities.update_one({'_id': ObjectId(community_id)}, {'$set': data})
+            # Una lista completa de miembros sustituye a las membresías actuales
+            members = data.pop('members', None)
+            if members is not None:
+                self.membership_repository.replace_members('community', community_id, members)
+
+            result = self.communities.update_one({'_id': ObjectId(community_id)}, versioned({'$set': data}))
             return result.modified_count > 0
         except Exception as e:
             print(f"Error en update_community: {e}")
@@ -39,6 +89,7 @@ class CommunityRepository:
                 raise ValueError("La comunidad no existe.")
 
             result = self.communities.delete_one({'_id': ObjectId(community_id)})
+            self.membership_repository.delete_parent_memberships('community', community_id)
             return result.deleted_count > 0
         except Exception as e:
             print(f"Error en delete_community: {e}")
@@ -47,7 +98,8 @@ class CommunityRepository:
     def get_community_by_id(self, community_id):
         """Obtiene una comunidad por su ID."""
         try:
-            community = self.communities.find_one({'_id': ObjectId(community_id)})
+            # Los miembros viven en la colección de membresías (el array es de versiones anteriores)
+            community = self.communities.find_one({'_id': ObjectId(community_id)}, {'members': 0})
             if community:
                 community['_id'] = str(community['_id'])
             return community
@@ -55,11 +107,15 @@ class CommunityRepository:
             print(f"Error en get_community_by_id: {e}")
             raise Exception("Error al obtener la comunidad por ID")
 
+    def iter_all_communities(self, page=1, limit=10):
+        """Devuelve un cursor paginado de todas las comunidades (para respuestas en streaming)."""
+        skip = (page - 1) * limit
+        return self.communities.find({}, {'members': 0}).sort('_id', ASCENDING).skip(skip).limit(limit)
+
     def get_all_communities(self, page=1, limit=10):
         """Obtiene una lista paginada de todas las comunidades."""
         try:
-            skip = (page - 1) * limit
-            communities = self.communities.find().skip(skip).limit(limit)
+            communities = self.iter_all_communities(page, limit)
             return [{'_id': str(community['_id']), **community} for community in communities]
         except Exception as e:
             print(f"Error en get_all_communities: {e}")
@@ -77,7 +133,7 @@ class CommunityRepository:
 
             result = self.communities.update_one(
                 {'_id': ObjectId(community_id)},
-                {'$addToSet': {'moderators': user_id}}
+                versioned({'$addToSet': {'moderators': user_id}})
             )
             return result.modified_count > 0
         except Exception as e:
@@ -96,41 +152,65 @@ class CommunityRepository:
 
             result = self.communities.update_one(
                 {'_id': ObjectId(community_id)},
-                {'$pull': {'moderators': user_id}}
+                versioned({'$pull': {'moderators': user_id}})
             )
             return result.modified_count > 0
         except Exception as e:
             print(f"Error en remove_moderator: {e}")
             raise Exception("Error al eliminar moderador")
 
+    def get_members(self, community_id, after=None, limit=50):
+        """Devuelve una página de los miembros de una comunidad (paginada por cursor) y su total."""
+        community = self.communities.find_one({'_id': ObjectId(community_id)}, {'member_count': 1})
+        if not community:
+            raise ValueError("La comunidad no existe.")
+        page = self.membership_repository.get_members('community', community_id, after, limit)
+        return {'members': page['members'], 'total': community.get('member_count', 0), 'next_cursor': page['next_cursor']}
+
+    def get_member_count(self, community_id):
+        """Lee el contador de miembros de la comunidad."""
+        return self.membership_repository.get_member_count('community', community_id)
+
+    def add_member(self, community_id, user_id):
+        """Agrega un miembro a una comunidad."""
+        if not self.communities.find_one({'_id': ObjectId(community_id)}, {'_id': 1}):
+            return {"error": "La comunidad no existe."}
+        if not self.membership_repository.add_member('community', community_id, user_id):
+            return {"error": "El usuario ya es miembro de esta comunidad."}
+        return True
+
+    def remove_member(self, community_id, user_id):
+        """Elimina a un miembro de una comunidad."""
+        if not self.membership_repository.remove_member('community', community_id, user_id):
+            return {"error": "El usuario no es miembro de esta comunidad."}
+        return True
+
+    def iter_featured_communities(self, page=1, limit=10):
+        """Devuelve un cursor paginado de comunidades destacadas (para respuestas en streaming)."""
+        skip = (page - 1) * limit
+        return self.communities.find({'featured': True}, {'members': 0}).sort('_id', ASCENDING).skip(skip).limit(limit)
+
     def get_featured_communities(self, page=1, limit=10):
         """Devuelve una lista paginada de comunidades destacadas."""
         try:
-            skip = (page - 1) * limit
-            featured_communities = self.communities.find({'featured': True}).skip(skip).limit(limit)
+            featured_communities = self.iter_featured_communities(page, limit)
             return [{'_id': str(community['_id']), **community} for community in featured_communities]
         except Exception as e:
             print(f"Error en get_featured_communities: {e}")
             raise Exception("Error al obtener comunidades destacadas")
 
-    def filter_communities(self, filters, page=1, limit=10):
-        """Filtra las comunidades según los filtros proporcionados con paginación."""
+    def build_filter_query(self, filters, page=1, limit=10):
+        """Valida los filtros y construye la consulta normalizada (lanza ValueError si no son válidos)."""
+        return self.query_builder.build(filters, page, limit)
+
+    def filter_communities(self, filters, page=1, limit=10, session=None):
+        """Filtra las comunidades según los filtros proporcionados con ordenamiento y paginación (admite lectura desde secundarios)."""
         try:
-            query = {}
-            if 'category' in filters:
-                query['category'] = filters['category']
-            if 'location' in filters:
-                query['location'] = filters['location']
-            if 'type' in filters:
-                query['type'] = filters['type']
-            if 'popularity' in filters:
-                query['popularity'] = {'$gte': filters['popularity']}
-            if 'participation' in filters:
-                query['participation'] = {'$gte': filters['participation']}
-
-            skip = (page - 1) * limit
-            communities = self.communities.find(query).skip(skip).limit(limit)
+            built_query = self.build_filter_query(filters, page, limit)
+            communities = built_query.apply(read_policies.collection(self.communities, LISTING), session)
             return [{'_id': str(community['_id']), **community} for community in communities]
+        except ValueError:
+            raise  # Errores de validación de filtros: se propagan tal cual
         except Exception as e:
             print(f"Error en filter_communities: {e}")
             raise Exception("Error al filtrar comunidades")
@@ -3,13 +3,16 @@ from .repositories import CommunityRepository
 from .entities import CommunitySchema
 from app.domain.event.repositories import EventRepository  # Repositorio de eventos
 from app.domain.user.repositories import UserRepository  # Repositorio de usuarios
+from app.domain.validation import ValidationContext
 
 class CommunityUseCases:
     """Clase que define los casos de uso para la entidad Community."""
 
+    community_schema = CommunitySchema()
+
     def __init__(self, db):
+        self.db = db
         self.community_repository = CommunityRepository(db)
-        self.community_schema = CommunitySchema()
         self.event_repository = EventRepository(db)  # Inicializa el repositorio de eventos
         self.user_repository = UserRepository(db)  # Inicializa el repositorio de usuarios
 
@@ -17,7 +20,8 @@ class CommunityUseCases:
         """Crea una nueva comunidad."""
         try:
             # Validar los datos de la comunidad utilizando Marshmallow
-            validated_data = self.community_schema.load(community_data)
+            with ValidationContext(self.db, self.community_schema, [community_data]):
+                validated_data = self.community_schema.load(community_data)
             community_id = self.community_repository.create_community(validated_data)
             return {"community_id": community_id}
         except ValidationError as e:
@@ -29,7 +33,8 @@ class CommunityUseCases:
         """Actualiza la información de una comunidad."""
         try:
             # Validar los nuevos datos
-            validated_data = self.community_schema.load(new_data, partial=True)
+            with ValidationContext(self.db, self.community_schema, [new_data]):
+                validated_data = self.community_schema.load(new_data, partial=True)
             updated = self.community_repository.update_community(community_id, validated_data)
             if updated:
                 return {"message": "Comunidad actualizada exitosamente"}
@@ -73,6 +78,64 @@ class CommunityUseCases:
             print(f"Error en list_all_communities: {str(ex)}")
             return {"error": "Error al listar comunidades"}
 
+    def list_community_members(self, community_id, after=None, limit=50):
+        """Lista una página de los miembros de una comunidad."""
+        try:
+            return self.community_repository.get_members(community_id, after, limit)
+        except Exception as ex:
+            return {"error": str(ex)}
+
+    def get_member_count(self, community_id):
+        """Obtiene el número de miembros de una comunidad (None si el ID no es válido)."""
+        try:
+            return self.community_repository.get_member_count(community_id)
+        except Exception:
+            return None
+
+    def get_calendar_month(self, community_id, month):
+        """Obtiene el número de eventos y de destacados por día de un mes ('YYYY-MM') de la comunidad."""
+        try:
+            days = self.event_repository.get_community_month(community_id, month)
+        except ValueError:
+            return {"error": "El mes debe tener el formato YYYY-MM."}
+        except Exception as ex:
+            return {"error": str(ex)}
+        return {
+            "community_id": community_id,
+            "month": month,
+            "days": days,
+            "total": sum(day.get('count', 0) for day in days),
+            "featured_total": sum(day.get('featured_count', 0) for day in days),
+        }
+
+    def join_community(self, community_id, user_id):
+        """Agrega al usuario como miembro de una comunidad."""
+        try:
+            joined = self.community_repository.add_member(community_id, user_id)
+            if isinstance(joined, dict):
+                return joined
+            return {"message": "Te has unido a la comunidad exitosamente"}
+        except Exception as ex:
+            return {"error": str(ex)}
+
+    def leave_community(self, community_id, user_id):
+        """Elimina al usuario de los miembros de una comunidad."""
+        try:
+            left = self.community_repository.remove_member(community_id, user_id)
+            if isinstance(left, dict):
+                return left
+            return {"message": "Has abandonado la comunidad exitosamente"}
+        except Exception as ex:
+            return {"error": str(ex)}
+
+    def iter_all_communities(self, page=1, limit=10):
+        """Obtiene un cursor de todas las comunidades para responder en streaming."""
+        return self.community_repository.iter_all_communities(page, limit)
+
+    def iter_featured_communities(self, page=1, limit=10):
+        """Obtiene un cursor de comunidades destacadas para responder en streaming."""
+        return self.community_repository.iter_featured_communities(page, limit)
+
     def get_featured_communities(self, page=1, limit=10):
         """Obtiene una lista paginada de comunidades destacadas."""
         try:
@@ -80,3 +143,14 @@ class CommunityUseCases:
             return communities if communities else []
         except Exception as ex:
             return {"error": str(ex)}
+
+    def build_filter_query(self, filters, page=1, limit=10):
+        """Valida los filtros y devuelve la consulta normalizada (lanza ValueError si no son válidos)."""
+        return self.community_repository.build_filter_query(filters, page, limit)
+
+    def filter_communities(self, filters, page=1, limit=10, session=None):
+        """Filtra las comunidades basadas en los criterios especificados."""
+        try:
+            return self.community_repository.filter_communities(filters, page, limit, session)
+        except Exception as ex:
+            return {"error": str(ex)}
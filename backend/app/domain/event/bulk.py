@@ -0,0 +1,187 @@
+# relative path: app/domain/event/bulk.py
+
+import csv
+import io
+import json
+from datetime import datetime
+from marshmallow import ValidationError
+from pymongo import MongoClient, ASCENDING
+from pymongo.errors import BulkWriteError
+from bson.objectid import ObjectId
+from app.domain.validation import ValidationContext
+from app.domain.moderation.use_cases import MODERATOR_ROLES
+from .entities import EventImportSchema
+from .day_counts import EventDayCounts
+
+DUPLICATE_KEY_ERROR = 11000
+
+# Columnas del CSV de exportación (NDJSON exporta el documento completo)
+EXPORT_CSV_FIELDS = (
+    '_id', 'title', 'description', 'community', 'date_time', 'location', 'created_by', 'image_url',
+    'is_recurring', 'recurrence_pattern', 'recurrence_end', 'featured', 'status',
+)
+
+def parse_ndjson(lines):
+    """Convierte líneas NDJSON en tuplas (número de línea, fila, error)."""
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, None, f"JSON no válido: {e.msg}"
+            continue
+        if not isinstance(row, dict):
+            yield line_number, None, "Cada línea debe ser un objeto JSON."
+            continue
+        yield line_number, row, None
+
+def parse_csv(lines):
+    """Convierte líneas CSV (con cabecera) en tuplas (número de línea, fila, error)."""
+    for line_number, row in enumerate(csv.DictReader(lines), start=2):
+        # Las celdas vacías equivalen a campos ausentes
+        yield line_number, {key: value for key, value in row.items() if key and value not in (None, '')}, None
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+class EventImporter:
+    """Importación masiva de eventos en streaming.
+
+    Las filas se validan con EventImportSchema y se insertan por lotes con
+    insert_many(ordered=False). Los duplicados los rechaza el índice único
+    (community, title, date_time) sin consultas previas, y la existencia de
+    comunidades y usuarios se comprueba con una consulta $in por lote.
+
+    Con `user_id` (importación desde la API) todos los eventos se crean a nombre de
+    ese usuario, aunque la fila indique otro `created_by`, y solo se aceptan en las
+    comunidades que administra o modera (o en cualquiera si tiene un rol de la
+    plataforma que lo permite). Sin `user_id` (CLI del operador) se respetan las filas.
+    """
+
+    schema = EventImportSchema()
+
+    def __init__(self, db: MongoClient, batch_size=1000, max_errors=100, user_id=None):
+        self.db = db
+        self.events = db.events
+        self.day_counts = EventDayCounts(db)
+        self.batch_size = batch_size
+        self.max_errors = max_errors  # Errores detallados que se devuelven en el resumen
+        self.user_id = user_id  # Usuario que importa (None: sin comprobación de permisos)
+        self.allowed_communities = {}  # Caché {comunidad: puede importar} de la importación
+        self.unrestricted = user_id is None
+        if user_id is not None:
+            user = db.users.find_one({'_id': ObjectId(user_id)}, {'role': 1}) if ObjectId.is_valid(user_id) else None
+            self.unrestricted = bool(user) and user.get('role') in MODERATOR_ROLES
+
+    def import_rows(self, parsed_rows, defaults=None):
+        """Importa las filas (número de línea, fila, error) y devuelve un resumen."""
+        summary = {'processed': 0, 'inserted': 0, 'duplicates': 0, 'invalid': 0, 'errors': []}
+        batch = []
+        for line_number, row, error in parsed_rows:
+            summary['processed'] += 1
+            if error:
+                self._add_error(summary, line_number, error)
+                continue
+            try:
+                data = {**(defaults or {}), **row}
+                if self.user_id is not None:
+                    # El creador es siempre quien importa: la fila no puede suplantar a otro usuario
+                    data['created_by'] = self.user_id
+                batch.append((line_number, self.schema.load(data)))
+            except ValidationError as e:
+                self._add_error(summary, line_number, e.messages)
+                continue
+            if len(batch) >= self.batch_size:
+                self._flush(batch, summary)
+                batch = []
+        if batch:
+            self._flush(batch, summary)
+        return summary
+
+    def _flush(self, batch, summary):
+        """Comprueba las referencias del lote e inserta los eventos válidos."""
+        # Una consulta $in por colección para todo el lote (menos los IDs ya en la caché de existencia)
+        references = ValidationContext(self.db, self.schema, [document for _, document in batch])
+
+        self._load_community_rights([document['community'] for _, document in batch])
+
+        documents = []
+        now = datetime.utcnow()
+        for line_number, document in batch:
+            if not references.exists('communities', document['community']):
+                self._add_error(summary, line_number, f"La comunidad con ID {document['community']} no existe.")
+            elif not self.unrestricted and not self.allowed_communities.get(str(document['community'])):
+                self._add_error(summary, line_number, f"No tienes permisos para importar eventos en la comunidad {document['community']}.")
+            elif not references.exists('users', document['created_by']):
+                self._add_error(summary, line_number, f"El usuario con ID {document['created_by']} no existe.")
+            else:
+                documents.append({**document, 'created_at': now})
+        if not documents:
+            return
+
+        rejected = set()
+        try:
+            result = self.events.insert_many(documents, ordered=False)
+            summary['inserted'] += len(result.inserted_ids)
+        except BulkWriteError as e:
+            write_errors = e.details.get('writeErrors', [])
+            if any(error.get('code') != DUPLICATE_KEY_ERROR for error in write_errors):
+                raise
+            summary['inserted'] += e.details.get('nInserted', 0)
+            summary['duplicates'] += len(write_errors)
+            rejected = {error['index'] for error in write_errors}
+        # Un solo bulk_write al rollup por lote con los eventos realmente insertados
+        self.day_counts.apply_many([(None, document) for index, document in enumerate(documents) if index not in rejected])
+
+    def _load_community_rights(self, community_ids):
+        """Comprueba con una consulta $in qué comunidades nuevas del lote administra o modera el usuario."""
+        if self.unrestricted:
+            return
+        pending = {str(community_id) for community_id in community_ids} - set(self.allowed_communities)
+        object_ids = [ObjectId(community_id) for community_id in pending if ObjectId.is_valid(community_id)]
+        user_id = str(self.user_id)
+        for community in self.db.communities.find({'_id': {'$in': object_ids}}, {'admin': 1, 'moderators': 1}):
+            self.allowed_communities[str(community['_id'])] = (
+                str(community.get('admin')) == user_id
+                or user_id in [str(moderator) for moderator in community.get('moderators') or []]
+            )
+        for community_id in pending:
+            self.allowed_communities.setdefault(community_id, False)
+
+    def _add_error(self, summary, line_number, error):
+        summary['invalid'] += 1
+        if len(summary['errors']) < self.max_errors:
+            summary['errors'].append({'line': line_number, 'error': error})
+
+class EventExporter:
+    """Exportación de eventos en streaming con un cursor del servidor (memoria constante)."""
+
+    def __init__(self, db: MongoClient, batch_size=1000):
+        self.events = db.events
+        self.batch_size = batch_size
+
+    def _cursor(self, community_id=None):
+        query = {'community': community_id} if community_id else {}
+        return self.events.find(query).sort([('community', ASCENDING), ('date_time', ASCENDING), ('_id', ASCENDING)]).batch_size(self.batch_size)
+
+    def iter_ndjson(self, community_id=None):
+        """Genera un evento por línea en formato NDJSON."""
+        for event in self._cursor(community_id):
+            yield json.dumps(event, default=_json_default, ensure_ascii=False) + '\n'
+
+    def iter_csv(self, community_id=None):
+        """Genera el CSV línea a línea, empezando por la cabecera."""
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=EXPORT_CSV_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for event in self._cursor(community_id):
+            writer.writerow({field: _json_default(event[field]) if field in event and event[field] is not None else '' for field in EXPORT_CSV_FIELDS})
+            if buffer.tell() >= 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
@@ -0,0 +1,112 @@
+# relative path: app/domain/event/day_counts.py
+
+import calendar
+from collections import Counter
+from datetime import datetime
+from pymongo import MongoClient, ASCENDING, UpdateOne
+
+# Formato del día (UTC) y del mes en las claves del rollup
+DAY_FORMAT = '%Y-%m-%d'
+MONTH_FORMAT = '%Y-%m'
+
+class EventDayCounts:
+    """Rollup (comunidad, día) -> número de eventos y de eventos destacados.
+
+    Alimenta la vista mensual del calendario de una comunidad con una lectura
+    indexada de como mucho 31 documentos, en lugar de recorrer los eventos. Se
+    mantiene de forma incremental en cada escritura de eventos: `apply` recibe el
+    documento antes y después del cambio y aplica la diferencia con `$inc`. Los
+    eventos cancelados no cuentan y los días que quedan a cero se eliminan.
+    """
+
+    def __init__(self, db: MongoClient):
+        self.events = db.events
+        self.day_counts = db.event_day_counts  # Colección del rollup en MongoDB
+
+    def ensure_indexes(self):
+        """Crea el índice único (comunidad, día) que sirve a la lectura de un mes."""
+        self.day_counts.create_index([('community', ASCENDING), ('day', ASCENDING)], unique=True)
+
+    @staticmethod
+    def contribution(event):
+        """Devuelve la clave (comunidad, día, destacado) con la que cuenta un evento, o None."""
+        if not event or event.get('status') == 'cancelled':
+            return None
+        community, date_time = event.get('community'), event.get('date_time')
+        if not community or not isinstance(date_time, datetime):
+            return None
+        return str(community), date_time.strftime(DAY_FORMAT), bool(event.get('featured'))
+
+    def apply(self, before, after):
+        """Aplica al rollup el cambio de un evento (`before` None al crear, `after` None al borrar)."""
+        self.apply_many([(before, after)])
+
+    def apply_many(self, changes):
+        """Aplica varios cambios en un único bulk_write (por ejemplo, un lote importado)."""
+        deltas = Counter()
+        featured_deltas = Counter()
+        for before, after in changes:
+            old, new = self.contribution(before), self.contribution(after)
+            if old == new:
+                continue
+            for key, sign in ((old, -1), (new, 1)):
+                if key is not None:
+                    community, day, featured = key
+                    deltas[(community, day)] += sign
+                    featured_deltas[(community, day)] += sign if featured else 0
+
+        operations = [
+            UpdateOne(
+                {'community': community, 'day': day},
+                {'$inc': {'count': count, 'featured_count': featured_deltas[(community, day)]}},
+                upsert=count > 0
+            )
+            for (community, day), count in deltas.items() if count or featured_deltas[(community, day)]
+        ]
+        if not operations:
+            return
+        self.day_counts.bulk_write(operations, ordered=False)
+
+        emptied = [{'community': community, 'day': day} for (community, day), count in deltas.items() if count < 0]
+        if emptied:
+            self.day_counts.delete_many({'$or': emptied, 'count': {'$lte': 0}})
+
+    def get_month(self, community_id, month):
+        """Devuelve los días con eventos de un mes ('YYYY-MM') de la comunidad."""
+        start = datetime.strptime(month, MONTH_FORMAT)
+        last_day = calendar.monthrange(start.year, start.month)[1]
+        days = self.day_counts.find(
+            {'community': community_id, 'day': {'$gte': f"{month}-01", '$lte': f"{month}-{last_day:02d}"}},
+            {'_id': 0, 'day': 1, 'count': 1, 'featured_count': 1}
+        ).sort('day', ASCENDING)
+        return list(days)
+
+    def rebuild(self, community_id=None):
+        """Recalcula el rollup desde la colección de eventos (migración o reparación).
+
+        Agrega en el servidor y sustituye los días de las comunidades afectadas;
+        devuelve el número de días escritos.
+        """
+        match = {'status': {'$ne': 'cancelled'}, 'community': {'$nin': [None, '']}, 'date_time': {'$type': 'date'}}
+        if community_id:
+            match['community'] = community_id
+        days = self.events.aggregate([
+            {'$match': match},
+            {'$group': {
+                '_id': {'community': '$community', 'day': {'$dateToString': {'format': DAY_FORMAT, 'date': '$date_time'}}},
+                'count': {'$sum': 1},
+                'featured_count': {'$sum': {'$cond': [{'$eq': ['$featured', True]}, 1, 0]}},
+            }},
+        ], allowDiskUse=True)
+
+        self.day_counts.delete_many({'community': community_id} if community_id else {})
+        written = 0
+        batch = []
+        for day in days:
+            batch.append({'community': day['_id']['community'], 'day': day['_id']['day'], 'count': day['count'], 'featured_count': day['featured_count']})
+            if len(batch) >= 1000:
+                written += len(self.day_counts.insert_many(batch, ordered=False).inserted_ids)
+                batch = []
+        if batch:
+            written += len(self.day_counts.insert_many(batch, ordered=False).inserted_ids)
+        return written
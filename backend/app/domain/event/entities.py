@@ -1,6 +1,7 @@
 import uuid
 from datetime import datetime
-from marshmallow import Schema, fields, validate, validates, ValidationError
+from marshmallow import Schema, fields, validate, validates, validates_schema, ValidationError, EXCLUDE
+from app.domain.validation import reference_exists
 
 class Event:
     """Clase que representa un evento dentro del sistema."""
@@ -47,27 +48,19 @@ class EventSchema(Schema):
     report_count = fields.Integer(default=0)
     created_at = fields.DateTime(dump_only=True)
 
-    @validates('title')
-    def validate_unique_title(self, title, **kwargs):
-        """Valida que el título del evento sea único dentro de la misma comunidad."""
-        db = kwargs.get('db_instance')
-        community_id = kwargs.get('community_id')
-        existing_event = db.events.find_one({"title": title, "community": community_id})
-        if existing_event:
-            raise ValidationError(f"El título '{title}' ya está en uso para otro evento en la misma comunidad.")
+    # Campos que referencian otros documentos: se resuelven por lote en el ValidationContext
+    references = {'community': 'communities', 'created_by': 'users'}
 
     @validates('community')
     def validate_community_exists(self, community, **kwargs):
         """Valida que la comunidad asociada exista en la base de datos."""
-        db = kwargs.get('db_instance')
-        if not db.communities.find_one({"_id": community}):
+        if not reference_exists('communities', community):
             raise ValidationError(f"La comunidad con ID {community} no existe.")
 
     @validates('created_by')
     def validate_user_exists(self, created_by, **kwargs):
         """Valida que el usuario que crea el evento exista en la base de datos."""
-        db = kwargs.get('db_instance')
-        if not db.users.find_one({"_id": created_by}):
+        if not reference_exists('users', created_by):
             raise ValidationError(f"El usuario con ID {created_by} no existe.")
 
     @validates('recurrence_end')
@@ -76,3 +69,31 @@ class EventSchema(Schema):
         date_time = kwargs.get('date_time')
         if recurrence_end and recurrence_end <= date_time:
             raise ValidationError("La fecha de finalización de recurrencia debe ser posterior a la fecha del evento.")
+
+class EventImportSchema(EventSchema):
+    """Esquema de EventSchema para la importación masiva.
+
+    Las comprobaciones que consultan la base de datos por cada evento se sustituyen
+    por comprobaciones por lote en EventImporter y por el índice único
+    (community, title, date_time).
+    """
+
+    class Meta:
+        unknown = EXCLUDE  # Columnas adicionales del CSV/NDJSON se ignoran
+
+    def validate_community_exists(self, community, **kwargs):
+        """La existencia de las comunidades se comprueba por lote."""
+
+    def validate_user_exists(self, created_by, **kwargs):
+        """La existencia de los usuarios se comprueba por lote."""
+
+    def validate_recurrence_dates(self, recurrence_end, **kwargs):
+        """Se valida a nivel de esquema, donde date_time está disponible."""
+
+    @validates_schema
+    def validate_recurrence_end_after_start(self, data, **kwargs):
+        """Valida que la fecha de finalización de recurrencia sea posterior a la fecha del evento."""
+        recurrence_end = data.get('recurrence_end')
+        date_time = data.get('date_time')
+        if recurrence_end and date_time and recurrence_end <= date_time:
+            raise ValidationError("La fecha de finalización de recurrencia debe ser posterior a la fecha del evento.", 'recurrence_end')
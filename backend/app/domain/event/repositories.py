@@ -1,26 +1,71 @@
 # relative path: app/domain/event/repositories.py
 
-from pymongo import MongoClient
+from datetime import datetime
+from pymongo import MongoClient, ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
 from bson.objectid import ObjectId
+from app.core.versioning import versioned
+from app.core.query_builder import QueryBuilder, FilterField
+from app.core.read_preferences import read_policies, LISTING
+from app.domain.calendar.reminders import ReminderScheduler
+from .day_counts import EventDayCounts
+
+# Filtros permitidos en filter_events; cada combinación queda cubierta por uno de los índices de ensure_indexes
+EVENT_FILTERS = {
+    'community': FilterField('community'),
+    'category': FilterField('category'),
+    'featured': FilterField('featured', bool),
+    'status': FilterField('status'),
+    'date': FilterField('date_time', datetime, '$gte'),  # Compatibilidad con el parámetro anterior
+    'date_from': FilterField('date_time', datetime, '$gte'),
+    'date_to': FilterField('date_time', datetime, '$lte'),
+    'popularity': FilterField('popularity', int, '$gte'),
+}
+EVENT_SORT_FIELDS = ('date_time', 'popularity', 'created_at')
+
+# Días que se conserva el registro de asistencia (el rollup de analíticas lo procesa en minutos)
+ATTENDANCE_LOG_TTL_DAYS = 30
 
 class EventRepository:
     """Repositorio que maneja todas las operaciones CRUD relacionadas con los eventos."""
 
+    query_builder = QueryBuilder(EVENT_FILTERS, EVENT_SORT_FIELDS, [('date_time', ASCENDING), ('_id', ASCENDING)])
+
     def __init__(self, db: MongoClient):
         self.events = db.events  # Colección de eventos en MongoDB
+        self.day_counts = EventDayCounts(db)  # Rollup por comunidad y día para la vista mensual
+        self.attendance_log = db.event_attendance_log  # Altas y bajas de asistencia para las analíticas
+        self.reminder_scheduler = ReminderScheduler(db)  # Recordatorios de calendario que siguen al evento
+
+    def ensure_indexes(self):
+        """Crea los índices que sirven a las consultas de filtrado y ordenamiento."""
+        self.events.create_index([('date_time', ASCENDING)])
+        self.events.create_index([('community', ASCENDING), ('date_time', ASCENDING)])
+        self.events.create_index([('category', ASCENDING), ('date_time', ASCENDING)])
+        self.events.create_index([('featured', ASCENDING), ('date_time', ASCENDING)])
+        self.events.create_index([('status', ASCENDING), ('date_time', ASCENDING)])
+        self.events.create_index([('popularity', DESCENDING)])
+        self.events.create_index([('created_at', DESCENDING)])
+        # El rollup de analíticas lee el registro por _id; pasado el TTL ya está agregado
+        self.attendance_log.create_index([('created_at', ASCENDING)], expireAfterSeconds=ATTENDANCE_LOG_TTL_DAYS * 86400)
+        try:
+            # Un evento por comunidad, título y fecha (creación individual e importación masiva)
+            self.events.create_index(
+                [('community', ASCENDING), ('title', ASCENDING), ('date_time', ASCENDING)],
+                unique=True,
+                name='community_title_date_time_unique'
+            )
+        except OperationFailure as e:
+            print(f"No se pudo crear el índice único de eventos (¿duplicados existentes?): {e}")
 
     def create_event(self, data):
         """Crea un nuevo evento en la base de datos."""
-        # Validar si ya existe un evento con el mismo título y fecha en la comunidad
-        existing_event = self.events.find_one({
-            'title': data['title'],
-            'date_time': data['date_time'],
-            'community': data['community']
-        })
-        if existing_event:
+        # El índice único (community, title, date_time) rechaza los duplicados en el mismo round trip
+        try:
+            result = self.events.insert_one(data)
+        except DuplicateKeyError:
             return {"error": "Ya existe un evento con el mismo título y fecha en esta comunidad."}
-        
-        result = self.events.insert_one(data)
+        self.day_counts.apply(None, data)
         return str(result.inserted_id)
 
     def update_event(self, event_id, data):
@@ -29,8 +74,15 @@ class EventRepository:
         if not self.get_event_by_id(event_id):
             return {"error": "El evento no existe."}
 
-        result = self.events.update_one({'_id': ObjectId(event_id)}, {'$set': data})
-        return result.modified_count > 0
+        # El documento anterior permite aplicar al rollup el cambio de día, comunidad o destacado
+        before = self.events.find_one_and_update({'_id': ObjectId(event_id)}, versioned({'$set': data}), return_document=ReturnDocument.BEFORE)
+        if before is None:
+            return False
+        self.day_counts.apply(before, {**before, **data})
+        if data.get('date_time') and data['date_time'] != before.get('date_time'):
+            # Los recordatorios relativos (minutes_before) se mueven con la nueva fecha
+            self.reminder_scheduler.reschedule_for_event(event_id, data['date_time'])
+        return True
 
     def delete_event(self, event_id):
         """Elimina un evento de la base de datos."""
@@ -38,8 +90,12 @@ class EventRepository:
         if not self.get_event_by_id(event_id):
             return {"error": "El evento no existe."}
 
-        result = self.events.delete_one({'_id': ObjectId(event_id)})
-        return result.deleted_count > 0
+        deleted = self.events.find_one_and_delete({'_id': ObjectId(event_id)})
+        if deleted is None:
+            return False
+        self.day_counts.apply(deleted, None)
+        self.reminder_scheduler.cancel_all_for_event(event_id)
+        return True
 
     def get_event_by_id(self, event_id):
         """Obtiene un evento por su ID."""
@@ -70,8 +126,10 @@ class EventRepository:
 
         result = self.events.update_one(
             {'_id': ObjectId(event_id)},
-            {'$addToSet': {'attendees': user_id}}
+            versioned({'$addToSet': {'attendees': user_id}})
         )
+        if result.modified_count > 0:
+            self._log_attendance(event_id, user_id, 1)
         return result.modified_count > 0
 
     def remove_attendee(self, event_id, user_id):
@@ -87,33 +145,51 @@ class EventRepository:
 
         result = self.events.update_one(
             {'_id': ObjectId(event_id)},
-            {'$pull': {'attendees': user_id}}
+            versioned({'$pull': {'attendees': user_id}})
         )
+        if result.modified_count > 0:
+            self._log_attendance(event_id, user_id, -1)
         return result.modified_count > 0
 
+    def _log_attendance(self, event_id, user_id, delta):
+        self.attendance_log.insert_one({'event': event_id, 'user': user_id, 'delta': delta, 'created_at': datetime.utcnow()})
+
     def get_event_attendees(self, event_id):
         """Devuelve la lista de asistentes a un evento."""
         event = self.get_event_by_id(event_id)
         return event.get('attendees', []) if event else {"error": "El evento no existe."}
 
-    def get_featured_events(self, page=1, limit=10):
-        """Devuelve una lista de eventos destacados."""
+    def get_attendee_count(self, event_id):
+        """Devuelve el número de asistentes sin transferir la lista (None si el evento no existe)."""
+        result = list(self.events.aggregate([
+            {'$match': {'_id': ObjectId(event_id)}},
+            {'$project': {'count': {'$size': {'$ifNull': ['$attendees', []]}}}},
+        ]))
+        return result[0]['count'] if result else None
+
+    def iter_featured_events(self, page=1, limit=10, session=None):
+        """Devuelve un cursor paginado de eventos destacados (para respuestas en streaming; admite lectura desde secundarios)."""
         skip = (page - 1) * limit
-        featured_events = self.events.find({'featured': True}).skip(skip).limit(limit)
+        events = read_policies.collection(self.events, LISTING)
+        return events.find({'featured': True}, session=session).sort([('date_time', ASCENDING), ('_id', ASCENDING)]).skip(skip).limit(limit)
+
+    def get_community_month(self, community_id, month):
+        """Devuelve los contadores por día de un mes ('YYYY-MM') de la comunidad desde el rollup."""
+        return self.day_counts.get_month(community_id, month)
+
+    def get_featured_events(self, page=1, limit=10, session=None):
+        """Devuelve una lista de eventos destacados."""
+        featured_events = self.iter_featured_events(page, limit, session)
         return [{'_id': str(event['_id']), **event} for event in featured_events]
 
+    def build_filter_query(self, filters, page=1, limit=10):
+        """Valida los filtros y construye la consulta normalizada (lanza ValueError si no son válidos)."""
+        return self.query_builder.build(filters, page, limit)
+
     def filter_events(self, filters, page=1, limit=10):
-        """Filtra los eventos según los filtros proporcionados, con paginación."""
-        query = {}
-        if 'category' in filters:
-            query['category'] = filters['category']
-        if 'date' in filters:
-            query['date_time'] = {'$gte': filters['date']}
-        if 'popularity' in filters:
-            query['popularity'] = {'$gte': filters['popularity']}
-        
-        skip = (page - 1) * limit
-        events = self.events.find(query).skip(skip).limit(limit)
+        """Filtra los eventos según los filtros proporcionados, con ordenamiento y paginación."""
+        built_query = self.build_filter_query(filters, page, limit)
+        events = built_query.apply(self.events)
         return [{'_id': str(event['_id']), **event} for event in events]
 
     def manage_event_recurrence(self, event_id, recurrence_data):
@@ -129,7 +205,7 @@ class EventRepository:
 
         result = self.events.update_one(
             {'_id': ObjectId(event_id)},
-            {'$set': {'recurrence_pattern': recurrence_data['pattern'], 'recurrence_end': recurrence_data['end'], 'is_recurring': True}}
+            versioned({'$set': {'recurrence_pattern': recurrence_data['pattern'], 'recurrence_end': recurrence_data['end'], 'is_recurring': True}})
         )
         return result.modified_count > 0
 
@@ -139,8 +215,13 @@ class EventRepository:
         if not self.get_event_by_id(event_id):
             return {"error": "El evento no existe."}
 
-        result = self.events.update_one(
+        before = self.events.find_one_and_update(
             {'_id': ObjectId(event_id)},
-            {'$set': {'status': 'cancelled'}}
+            versioned({'$set': {'status': 'cancelled'}}),
+            return_document=ReturnDocument.BEFORE
         )
-        return result.modified_count > 0
+        if before is None:
+            return False
+        self.day_counts.apply(before, {**before, 'status': 'cancelled'})
+        self.reminder_scheduler.cancel_all_for_event(event_id)
+        return True
@@ -3,19 +3,28 @@
 from marshmallow import ValidationError
 from .repositories import EventRepository
 from .entities import EventSchema
+from .bulk import EventImporter, EventExporter, parse_ndjson, parse_csv
+from app.domain.validation import ValidationContext
+
+# Formatos admitidos por la importación y exportación masiva
+BULK_FORMATS = ('ndjson', 'csv')
 
 class EventUseCases:
     """Clase que define los casos de uso para la entidad Event."""
 
+    # Los esquemas se comparten en todo el proceso: construir uno por petición es costoso
+    event_schema = EventSchema()
+
     def __init__(self, db):
         self.event_repository = EventRepository(db)
-        self.event_schema = EventSchema()
+        self.db = db
 
     def create_event(self, event_data):
         """Crea un nuevo evento."""
         try:
             # Validar los datos del evento utilizando Marshmallow
-            validated_data = self.event_schema.load(event_data)
+            with ValidationContext(self.db, self.event_schema, [event_data]):
+                validated_data = self.event_schema.load(event_data)
             event_id = self.event_repository.create_event(validated_data)
             return event_id
         except ValidationError as e:
@@ -27,7 +36,8 @@ class EventUseCases:
         """Actualiza los detalles de un evento."""
         try:
             # Validar los nuevos datos del evento
-            validated_data = self.event_schema.load(new_data, partial=True)
+            with ValidationContext(self.db, self.event_schema, [new_data]):
+                validated_data = self.event_schema.load(new_data, partial=True)
             updated = self.event_repository.update_event(event_id, validated_data)
             if updated:
                 return {"message": "Evento actualizado exitosamente"}
@@ -65,6 +75,13 @@ class EventUseCases:
         except Exception as ex:
             return {"error": str(ex)}
 
+    def get_attendee_count(self, event_id):
+        """Obtiene el número de asistentes de un evento (None si no existe o el ID no es válido)."""
+        try:
+            return self.event_repository.get_attendee_count(event_id)
+        except Exception:
+            return None
+
     def add_attendee_to_event(self, event_id, user_id):
         """Añade un asistente a un evento."""
         try:
@@ -95,14 +112,22 @@ class EventUseCases:
         except Exception as ex:
             return {"error": str(ex)}
 
-    def list_featured_events(self, page=1, limit=10):
+    def list_featured_events(self, page=1, limit=10, session=None):
         """Obtiene una lista paginada de eventos destacados."""
         try:
-            featured_events = self.event_repository.get_featured_events(page, limit)
+            featured_events = self.event_repository.get_featured_events(page, limit, session)
             return featured_events
         except Exception as ex:
             return {"error": str(ex)}
 
+    def iter_featured_events(self, page=1, limit=10, session=None):
+        """Obtiene un cursor de eventos destacados para responder en streaming."""
+        return self.event_repository.iter_featured_events(page, limit, session)
+
+    def build_filter_query(self, filters, page=1, limit=10):
+        """Valida los filtros y devuelve la consulta normalizada (lanza ValueError si no son válidos)."""
+        return self.event_repository.build_filter_query(filters, page, limit)
+
     def filter_events(self, filters, page=1, limit=10):
         """Filtra los eventos basados en los criterios especificados."""
         try:
@@ -130,3 +155,25 @@ class EventUseCases:
             return {"error": "Error al cancelar el evento"}
         except Exception as ex:
             return {"error": str(ex)}
+
+    def import_events(self, lines, file_format='ndjson', defaults=None, batch_size=1000, user_id=None):
+        """Importa eventos desde un iterable de líneas NDJSON o CSV.
+
+        Con `user_id` los eventos se crean a su nombre y solo en comunidades que administra o modera.
+        """
+        if file_format not in BULK_FORMATS:
+            return {"error": f"Formato no soportado: '{file_format}'"}
+        try:
+            parsed_rows = parse_ndjson(lines) if file_format == 'ndjson' else parse_csv(lines)
+            return EventImporter(self.db, batch_size, user_id=user_id).import_rows(parsed_rows, defaults)
+        except Exception as ex:
+            return {"error": str(ex)}
+
+    def export_events(self, community_id=None, file_format='ndjson'):
+        """Devuelve un generador con los eventos exportados en NDJSON o CSV."""
+        if file_format not in BULK_FORMATS:
+            raise ValueError(f"Formato no soportado: '{file_format}'")
+        exporter = EventExporter(self.db)
+        if file_format == 'csv':
+            return exporter.iter_csv(community_id)
+        return exporter.iter_ndjson(community_id)
@@ -0,0 +1,12 @@
+# relative path: app/domain/like/entities.py
+
+from datetime import datetime
+
+class Like:
+    """Clase que representa el like de un usuario sobre un comentario o una respuesta."""
+
+    def __init__(self, target_type, target, user):
+        self.target_type = target_type  # 'comment' o 'reply'
+        self.target = target  # ID del comentario o de la respuesta
+        self.user = user  # UUID del usuario que dio el like
+        self.created_at = datetime.utcnow()
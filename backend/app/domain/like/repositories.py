@@ -0,0 +1,119 @@
+# relative path: app/domain/like/repositories.py
+
+from datetime import datetime
+from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from bson.objectid import ObjectId
+
+DUPLICATE_KEY_ERROR = 11000
+
+# Colección padre de cada tipo de objetivo (donde vive el contador like_count)
+TARGET_COLLECTIONS = {
+    'comment': 'comments',
+    'reply': 'replies',
+}
+
+class LikeRepository:
+    """Repositorio de likes: un documento por (objetivo, usuario) y un contador en el padre.
+
+    El índice único (target_type, target, user) hace que un like duplicado falle en la
+    propia inserción, sin leer antes el documento padre, y `like_count` se actualiza
+    con $inc para que mostrar el número de likes no requiera cargar la lista de usuarios.
+    """
+
+    def __init__(self, db: MongoClient):
+        self.db = db
+        self.likes = db.likes  # Colección de likes en MongoDB
+
+    def ensure_indexes(self):
+        """Crea el índice único de likes y el de consulta por usuario."""
+        self.likes.create_index([('target_type', ASCENDING), ('target', ASCENDING), ('user', ASCENDING)], unique=True)
+        self.likes.create_index([('target_type', ASCENDING), ('target', ASCENDING), ('_id', DESCENDING)])
+        self.likes.create_index([('user', ASCENDING), ('target_type', ASCENDING), ('target', ASCENDING)])
+
+    def _parent(self, target_type):
+        return self.db[TARGET_COLLECTIONS[target_type]]
+
+    def add_like(self, target_type, target_id, user_id):
+        """Registra un like. Devuelve False si el usuario ya había dado like."""
+        try:
+            self.likes.insert_one({
+                'target_type': target_type,
+                'target': target_id,
+                'user': user_id,
+                'created_at': datetime.utcnow(),
+            })
+        except DuplicateKeyError:
+            return False
+        self._parent(target_type).update_one({'_id': ObjectId(target_id)}, {'$inc': {'like_count': 1}})
+        return True
+
+    def remove_like(self, target_type, target_id, user_id):
+        """Elimina un like. Devuelve False si el usuario no había dado like."""
+        result = self.likes.delete_one({'target_type': target_type, 'target': target_id, 'user': user_id})
+        if result.deleted_count == 0:
+            return False
+        self._parent(target_type).update_one(
+            {'_id': ObjectId(target_id), 'like_count': {'$gt': 0}},
+            {'$inc': {'like_count': -1}}
+        )
+        return True
+
+    def get_likers(self, target_type, target_id, page=1, limit=50):
+        """Devuelve una página de los usuarios que dieron like (más recientes primero)."""
+        skip = (page - 1) * limit
+        likes = self.likes.find(
+            {'target_type': target_type, 'target': target_id},
+            {'user': 1, '_id': 0}
+        ).sort('_id', DESCENDING).skip(skip).limit(limit)
+        return [like['user'] for like in likes]
+
+    def get_like_count(self, target_type, target_id):
+        """Lee el contador desnormalizado del documento padre."""
+        parent = self._parent(target_type).find_one({'_id': ObjectId(target_id)}, {'like_count': 1})
+        return parent.get('like_count', 0) if parent else 0
+
+    def get_liked_targets(self, target_type, user_id, target_ids):
+        """Indica, con una única consulta $in, cuáles de los objetivos ha marcado el usuario."""
+        liked = self.likes.find(
+            {'user': user_id, 'target_type': target_type, 'target': {'$in': list(target_ids)}},
+            {'target': 1, '_id': 0}
+        )
+        liked_ids = {like['target'] for like in liked}
+        return {target_id: target_id in liked_ids for target_id in target_ids}
+
+    def delete_target_likes(self, target_type, target_id):
+        """Elimina todos los likes de un objetivo (al borrar el comentario o la respuesta)."""
+        return self.likes.delete_many({'target_type': target_type, 'target': target_id}).deleted_count
+
+    def migrate_embedded_likes(self, target_type, batch_size=1000):
+        """Mueve los arrays `likes` embebidos a la colección de likes y fija `like_count`.
+
+        Recorre la colección padre con un cursor (memoria constante), inserta los likes
+        por lotes ignorando duplicados y recalcula el contador desde la colección de likes.
+        Es idempotente: puede relanzarse si se interrumpe.
+        """
+        parent = self._parent(target_type)
+        migrated_documents = 0
+        cursor = parent.find({'likes': {'$type': 'array'}}, {'likes': 1}, batch_size=batch_size)
+        for document in cursor:
+            target_id = str(document['_id'])
+            user_ids = [str(user_id) for user_id in dict.fromkeys(document.get('likes', []))]
+            for start in range(0, len(user_ids), batch_size):
+                chunk = [{
+                    'target_type': target_type,
+                    'target': target_id,
+                    'user': user_id,
+                    'created_at': document['_id'].generation_time.replace(tzinfo=None),
+                } for user_id in user_ids[start:start + batch_size]]
+                try:
+                    self.likes.insert_many(chunk, ordered=False)
+                except BulkWriteError as e:
+                    # Solo se toleran duplicados de una ejecución anterior
+                    if any(error.get('code') != DUPLICATE_KEY_ERROR for error in e.details.get('writeErrors', [])):
+                        raise
+
+            like_count = self.likes.count_documents({'target_type': target_type, 'target': target_id})
+            parent.update_one({'_id': document['_id']}, {'$set': {'like_count': like_count}, '$unset': {'likes': ''}})
+            migrated_documents += 1
+        return migrated_documents
@@ -0,0 +1,12 @@
+# relative path: app/domain/membership/entities.py
+
+from datetime import datetime
+
+class Membership:
+    """Clase que representa la relación de un usuario con un calendario (suscriptor) o una comunidad (miembro)."""
+
+    def __init__(self, parent_type, parent, user):
+        self.parent_type = parent_type  # 'calendar' o 'community'
+        self.parent = parent  # ID del calendario o de la comunidad
+        self.user = user  # UUID del usuario
+        self.created_at = datetime.utcnow()
@@ -0,0 +1,210 @@
+# relative path: app/domain/membership/repositories.py
+
+from datetime import datetime
+from pymongo import MongoClient, ASCENDING
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from bson.objectid import ObjectId
+from app.core.versioning import versioned
+
+DUPLICATE_KEY_ERROR = 11000
+
+# Marcador (colección `migrations`) que indica que ya no quedan arrays embebidos
+MIGRATION_MARKER = 'memberships_embedded'
+
+# Tipo de padre -> (colección padre, array embebido de versiones anteriores, contador desnormalizado)
+PARENT_COLLECTIONS = {
+    'calendar': ('calendars', 'subscribers', 'subscriber_count'),
+    'community': ('communities', 'members', 'member_count'),
+}
+
+class MembershipRepository:
+    """Repositorio de membresías: un documento por (padre, usuario) y un contador en el padre.
+
+    Sustituye a los arrays `subscribers` de los calendarios y `members` de las
+    comunidades, que crecían sin límite y se cargaban con cada lectura del padre.
+    Los índices cubren las dos direcciones: los usuarios de un padre (paginados por
+    cursor sobre _id) y los padres de un usuario. El contador incrementa la
+    `version` del padre para que su ETag cambie con el número de miembros.
+    """
+
+    def __init__(self, db: MongoClient):
+        self.db = db
+        self.memberships = db.memberships  # Colección de membresías en MongoDB
+
+    def ensure_indexes(self, migrate=True):
+        """Crea el índice único de membresías, el de paginación por padre y el de consulta por usuario.
+
+        Con `migrate` (por defecto) migra además los arrays embebidos pendientes.
+        """
+        self.memberships.create_index([('parent_type', ASCENDING), ('parent', ASCENDING), ('user', ASCENDING)], unique=True)
+        self.memberships.create_index([('parent_type', ASCENDING), ('parent', ASCENDING), ('_id', ASCENDING)])
+        self.memberships.create_index([('user', ASCENDING), ('parent_type', ASCENDING), ('parent', ASCENDING)])
+        if migrate:
+            self.migrate_all_embedded_members()
+
+    def migrate_all_embedded_members(self, batch_size=1000, force=False):
+        """Migra los arrays embebidos de todos los tipos de padre si aún no consta hecho.
+
+        Las lecturas solo consultan la colección de membresías, así que un despliegue
+        con datos antiguos vería padres sin miembros hasta migrar. Por eso se lanza
+        desde ensure_indexes (arranque y `flask ensure-indexes`); al terminar deja un
+        marcador en `migrations` para que los siguientes arranques no recorran los padres.
+        Devuelve los documentos migrados por tipo (vacío si el marcador ya existía).
+        """
+        if not force and self.db.migrations.find_one({'_id': MIGRATION_MARKER}):
+            return {}
+        migrated = {
+            parent_type: self.migrate_embedded_members(parent_type, batch_size)
+            for parent_type in PARENT_COLLECTIONS
+        }
+        self.db.migrations.update_one(
+            {'_id': MIGRATION_MARKER},
+            {'$set': {'done_at': datetime.utcnow(), 'migrated': migrated}},
+            upsert=True,
+        )
+        return migrated
+
+    def _parent(self, parent_type):
+        return self.db[PARENT_COLLECTIONS[parent_type][0]]
+
+    def _counter(self, parent_type):
+        return PARENT_COLLECTIONS[parent_type][2]
+
+    def add_member(self, parent_type, parent_id, user_id):
+        """Registra la membresía. Devuelve False si el usuario ya pertenecía al padre."""
+        try:
+            self.memberships.insert_one({
+                'parent_type': parent_type,
+                'parent': parent_id,
+                'user': user_id,
+                'created_at': datetime.utcnow(),
+            })
+        except DuplicateKeyError:
+            return False
+        self._parent(parent_type).update_one({'_id': ObjectId(parent_id)}, versioned({'$inc': {self._counter(parent_type): 1}}))
+        return True
+
+    def add_members(self, parent_type, parent_id, user_ids, batch_size=1000):
+        """Registra varias membresías por lotes ignorando las existentes; devuelve cuántas se crearon."""
+        user_ids = list(dict.fromkeys(str(user_id) for user_id in user_ids))
+        inserted = 0
+        created_at = datetime.utcnow()
+        for start in range(0, len(user_ids), batch_size):
+            chunk = [{
+                'parent_type': parent_type,
+                'parent': parent_id,
+                'user': user_id,
+                'created_at': created_at,
+            } for user_id in user_ids[start:start + batch_size]]
+            inserted += self._insert_chunk(chunk)
+        if inserted:
+            self._parent(parent_type).update_one({'_id': ObjectId(parent_id)}, versioned({'$inc': {self._counter(parent_type): inserted}}))
+        return inserted
+
+    def _insert_chunk(self, documents):
+        """Inserta un bloque ignorando duplicados; devuelve el número de documentos insertados."""
+        try:
+            return len(self.memberships.insert_many(documents, ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            # Solo se toleran duplicados (membresías ya existentes)
+            if any(error.get('code') != DUPLICATE_KEY_ERROR for error in e.details.get('writeErrors', [])):
+                raise
+            return e.details.get('nInserted', 0)
+
+    def remove_member(self, parent_type, parent_id, user_id):
+        """Elimina la membresía. Devuelve False si el usuario no pertenecía al padre."""
+        result = self.memberships.delete_one({'parent_type': parent_type, 'parent': parent_id, 'user': user_id})
+        if result.deleted_count == 0:
+            return False
+        self._parent(parent_type).update_one(
+            {'_id': ObjectId(parent_id), self._counter(parent_type): {'$gt': 0}},
+            versioned({'$inc': {self._counter(parent_type): -1}})
+        )
+        return True
+
+    def replace_members(self, parent_type, parent_id, user_ids):
+        """Deja como membresías exactamente `user_ids` (al actualizar la lista completa) y recalcula el contador."""
+        wanted = set(str(user_id) for user_id in user_ids)
+        current = set(self.iter_member_ids(parent_type, parent_id))
+        removed = list(current - wanted)
+        if removed:
+            self.memberships.delete_many({'parent_type': parent_type, 'parent': parent_id, 'user': {'$in': removed}})
+        self.add_members(parent_type, parent_id, [user_id for user_id in user_ids if str(user_id) not in current])
+        return self.recount(parent_type, parent_id)
+
+    def recount(self, parent_type, parent_id):
+        """Fija el contador del padre a partir de la colección de membresías."""
+        count = self.memberships.count_documents({'parent_type': parent_type, 'parent': parent_id})
+        self._parent(parent_type).update_one({'_id': ObjectId(parent_id)}, versioned({'$set': {self._counter(parent_type): count}}))
+        return count
+
+    def get_members(self, parent_type, parent_id, after=None, limit=50):
+        """Devuelve una página de miembros (los más antiguos primero) paginada por cursor sobre _id.
+
+        `after` es el `next_cursor` de la página anterior; el resultado incluye el
+        siguiente cursor o None si no hay más.
+        """
+        query = {'parent_type': parent_type, 'parent': parent_id}
+        if after:
+            query['_id'] = {'$gt': ObjectId(after)}
+        memberships = list(self.memberships.find(query, {'user': 1, 'created_at': 1}).sort('_id', ASCENDING).limit(limit + 1))
+        has_more = len(memberships) > limit
+        memberships = memberships[:limit]
+        return {
+            'members': [{'user': membership['user'], 'joined_at': membership.get('created_at')} for membership in memberships],
+            'next_cursor': str(memberships[-1]['_id']) if has_more else None,
+        }
+
+    def iter_member_ids(self, parent_type, parent_id, batch_size=1000):
+        """Recorre con un cursor los IDs de usuario de un padre (memoria constante)."""
+        cursor = self.memberships.find(
+            {'parent_type': parent_type, 'parent': parent_id},
+            {'user': 1, '_id': 0},
+            batch_size=batch_size
+        ).sort('_id', ASCENDING)
+        for membership in cursor:
+            yield membership['user']
+
+    def get_parent_ids(self, parent_type, user_id):
+        """Devuelve los IDs de los calendarios o comunidades a los que pertenece un usuario."""
+        memberships = self.memberships.find({'user': user_id, 'parent_type': parent_type}, {'parent': 1, '_id': 0})
+        return [membership['parent'] for membership in memberships]
+
+    def is_member(self, parent_type, parent_id, user_id):
+        return self.memberships.count_documents({'parent_type': parent_type, 'parent': parent_id, 'user': user_id}, limit=1) > 0
+
+    def get_member_count(self, parent_type, parent_id):
+        """Lee el contador desnormalizado del documento padre."""
+        parent = self._parent(parent_type).find_one({'_id': ObjectId(parent_id)}, {self._counter(parent_type): 1})
+        return parent.get(self._counter(parent_type), 0) if parent else 0
+
+    def delete_parent_memberships(self, parent_type, parent_id):
+        """Elimina todas las membresías de un padre (al borrar el calendario o la comunidad)."""
+        return self.memberships.delete_many({'parent_type': parent_type, 'parent': parent_id}).deleted_count
+
+    def migrate_embedded_members(self, parent_type, batch_size=1000):
+        """Mueve los arrays embebidos (`subscribers` o `members`) a la colección de membresías.
+
+        Recorre la colección padre con un cursor (memoria constante), inserta las
+        membresías por lotes ignorando duplicados, fija el contador desde la colección
+        de membresías y elimina el array. Es idempotente: puede relanzarse si se interrumpe.
+        """
+        parent = self._parent(parent_type)
+        field = PARENT_COLLECTIONS[parent_type][1]
+        migrated_documents = 0
+        cursor = parent.find({field: {'$type': 'array'}}, {field: 1}, batch_size=batch_size)
+        for document in cursor:
+            parent_id = str(document['_id'])
+            user_ids = [str(user_id) for user_id in dict.fromkeys(document.get(field, []))]
+            for start in range(0, len(user_ids), batch_size):
+                self._insert_chunk([{
+                    'parent_type': parent_type,
+                    'parent': parent_id,
+                    'user': user_id,
+                    'created_at': document['_id'].generation_time.replace(tzinfo=None),
+                } for user_id in user_ids[start:start + batch_size]])
+
+            count = self.memberships.count_documents({'parent_type': parent_type, 'parent': parent_id})
+            parent.update_one({'_id': document['_id']}, {'$set': {self._counter(parent_type): count}, '$unset': {field: ''}})
+            migrated_documents += 1
+        return migrated_documents
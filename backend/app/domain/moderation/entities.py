@@ -0,0 +1,34 @@
+# relative path: app/domain/moderation/entities.py
+
+from datetime import datetime
+from marshmallow import Schema, fields, validate, EXCLUDE
+
+# Acciones con las que un moderador puede resolver un elemento de la cola
+RESOLUTION_ACTIONS = ('dismiss', 'hide', 'remove')
+
+class Report:
+    """Clase que representa el reporte de un usuario sobre un contenido."""
+
+    def __init__(self, target_type, target, reporter, reason, details=None):
+        self.target_type = target_type  # Tipo de contenido reportado ('comment')
+        self.target = target  # ID del contenido reportado
+        self.reporter = reporter  # UUID del usuario que reporta
+        self.reason = reason
+        self.details = details
+        self.created_at = datetime.utcnow()
+
+class ReportSchema(Schema):
+    """Esquema de validación de los datos de un reporte."""
+
+    class Meta:
+        unknown = EXCLUDE  # Los clientes antiguos envían campos libres en el reporte
+
+    reason = fields.String(validate=validate.Length(min=1, max=100), allow_none=True)
+    details = fields.String(validate=validate.Length(max=1000), allow_none=True)
+
+class ResolutionSchema(Schema):
+    """Esquema de validación de una resolución en lote de la cola de moderación."""
+
+    item_ids = fields.List(fields.String(), required=True, validate=validate.Length(min=1, max=100))
+    action = fields.String(required=True, validate=validate.OneOf(RESOLUTION_ACTIONS))
+    note = fields.String(validate=validate.Length(max=1000), allow_none=True)
@@ -0,0 +1,188 @@
+# relative path: app/domain/moderation/repositories.py
+
+import uuid
+from datetime import datetime, timedelta
+from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError
+from bson.objectid import ObjectId
+
+# Orden de la cola: más reportados primero y, a igualdad, el que lleva más tiempo esperando
+QUEUE_ORDER = [('report_count', DESCENDING), ('last_reported_at', ASCENDING), ('_id', ASCENDING)]
+
+class ModerationRepository:
+    """Reportes de contenido y cola de moderación priorizada.
+
+    Cada reporte se guarda en `reports` (un reporte por usuario y contenido, sin
+    sobrescribir los anteriores) y actualiza con $inc el elemento del contenido en
+    `moderation_queue`. La cola se lee por el índice (status, report_count, last_reported_at)
+    y los elementos se reclaman con un lease para que dos moderadores no procesen lo mismo;
+    si el lease caduca, el elemento vuelve a la cola.
+    """
+
+    def __init__(self, db: MongoClient, lease_seconds=300):
+        self.reports = db.reports  # Colección de reportes individuales
+        self.queue = db.moderation_queue  # Un elemento por contenido reportado
+        self.comments = db.comments
+        self.likes = db.likes
+        self.lease_seconds = lease_seconds
+
+    def ensure_indexes(self):
+        """Crea los índices de reportes y de la cola de moderación."""
+        self.reports.create_index([('target_type', ASCENDING), ('target', ASCENDING), ('reporter', ASCENDING)], unique=True)
+        self.queue.create_index([('target_type', ASCENDING), ('target', ASCENDING)], unique=True)
+        self.queue.create_index([('status', ASCENDING)] + QUEUE_ORDER)
+        self.queue.create_index([('status', ASCENDING), ('lease_until', ASCENDING)])
+
+    def add_report(self, target_type, target_id, reporter_id, report_data, event_id=None):
+        """Registra un reporte y actualiza el elemento de la cola.
+
+        Devuelve False si el usuario ya había reportado este contenido.
+        """
+        now = datetime.utcnow()
+        try:
+            self.reports.insert_one({
+                'target_type': target_type,
+                'target': target_id,
+                'reporter': reporter_id,
+                'reason': report_data.get('reason'),
+                'details': report_data.get('details'),
+                'status': 'open',
+                'created_at': now,
+            })
+        except DuplicateKeyError:
+            return False
+
+        self.queue.update_one(
+            {'target_type': target_type, 'target': target_id},
+            {
+                '$inc': {'report_count': 1},
+                '$max': {'last_reported_at': now},
+                '$setOnInsert': {'status': 'open', 'event': event_id, 'first_reported_at': now},
+            },
+            upsert=True
+        )
+        # Un contenido descartado que vuelve a recibir reportes regresa a la cola
+        self.queue.update_one(
+            {'target_type': target_type, 'target': target_id, 'status': 'resolved', 'resolution.action': 'dismiss'},
+            {'$set': {'status': 'open'}, '$unset': {'resolution': ''}}
+        )
+        return True
+
+    def get_reports(self, target_type, target_id, page=1, limit=20):
+        """Devuelve el historial de reportes de un contenido (más recientes primero)."""
+        skip = (page - 1) * limit
+        reports = self.reports.find({'target_type': target_type, 'target': target_id}).sort('_id', DESCENDING).skip(skip).limit(limit)
+        return [{**report, '_id': str(report['_id'])} for report in reports]
+
+    def release_expired(self, now=None):
+        """Devuelve a la cola los elementos cuyo lease ha caducado."""
+        now = now or datetime.utcnow()
+        result = self.queue.update_many(
+            {'status': 'claimed', 'lease_until': {'$lt': now}},
+            {'$set': {'status': 'open'}, '$unset': {'claimed_by': '', 'lease_id': '', 'lease_until': ''}}
+        )
+        return result.modified_count
+
+    def get_queue(self, page=1, limit=10, status='open'):
+        """Devuelve una página de la cola en orden de prioridad."""
+        skip = (page - 1) * limit
+        items = self.queue.find({'status': status}).sort(QUEUE_ORDER).skip(skip).limit(limit)
+        return [{**item, '_id': str(item['_id'])} for item in items]
+
+    def claim(self, moderator_id, batch_size=20, now=None):
+        """Reclama los siguientes elementos de la cola para un moderador.
+
+        Devuelve el identificador del lease y los elementos reclamados (con el contenido).
+        """
+        now = now or datetime.utcnow()
+        self.release_expired(now)
+
+        candidate_ids = [item['_id'] for item in self.queue.find({'status': 'open'}, {'_id': 1}).sort(QUEUE_ORDER).limit(batch_size)]
+        if not candidate_ids:
+            return None, []
+
+        lease_id = uuid.uuid4().hex
+        self.queue.update_many(
+            {'_id': {'$in': candidate_ids}, 'status': 'open'},
+            {'$set': {
+                'status': 'claimed',
+                'claimed_by': moderator_id,
+                'lease_id': lease_id,
+                'lease_until': now + timedelta(seconds=self.lease_seconds),
+            }}
+        )
+        # Solo los que realmente quedaron con nuestro lease (otro moderador pudo ganar la carrera)
+        items = list(self.queue.find({'lease_id': lease_id}).sort(QUEUE_ORDER))
+        return lease_id, self._with_content(items)
+
+    def release(self, moderator_id, item_ids):
+        """Devuelve a la cola elementos reclamados por el moderador sin resolverlos."""
+        result = self.queue.update_many(
+            {'_id': {'$in': self._object_ids(item_ids)}, 'status': 'claimed', 'claimed_by': moderator_id},
+            {'$set': {'status': 'open'}, '$unset': {'claimed_by': '', 'lease_id': '', 'lease_until': ''}}
+        )
+        return result.modified_count
+
+    def resolve(self, moderator_id, item_ids, action, note=None, now=None):
+        """Resuelve en lote elementos con lease vigente del moderador y aplica la acción al contenido.
+
+        Devuelve los elementos resueltos (con su contenido y evento) para invalidar cachés.
+        """
+        now = now or datetime.utcnow()
+        leased_query = {
+            '_id': {'$in': self._object_ids(item_ids)},
+            'status': 'claimed',
+            'claimed_by': moderator_id,
+            'lease_until': {'$gte': now},
+        }
+        items = list(self.queue.find(leased_query, {'target_type': 1, 'target': 1, 'event': 1}))
+        if not items:
+            return []
+
+        self.queue.update_many(
+            {**leased_query, '_id': {'$in': [item['_id'] for item in items]}},
+            {
+                '$set': {
+                    'status': 'resolved',
+                    'resolution': {'action': action, 'moderator': moderator_id, 'note': note, 'resolved_at': now},
+                },
+                '$unset': {'claimed_by': '', 'lease_id': '', 'lease_until': ''},
+            }
+        )
+
+        comment_ids = [item['target'] for item in items if item['target_type'] == 'comment']
+        self._apply_to_comments(comment_ids, action)
+        self.reports.update_many(
+            {'target_type': 'comment', 'target': {'$in': comment_ids}, 'status': 'open'},
+            {'$set': {'status': 'resolved', 'resolved_at': now}}
+        )
+        return [{**item, '_id': str(item['_id'])} for item in items]
+
+    def _apply_to_comments(self, comment_ids, action):
+        """Aplica la acción de moderación a todos los comentarios con una sola escritura."""
+        object_ids = self._object_ids(comment_ids)
+        if not object_ids:
+            return
+        if action == 'remove':
+            self.comments.delete_many({'_id': {'$in': object_ids}})
+            self.likes.delete_many({'target_type': 'comment', 'target': {'$in': comment_ids}})
+        elif action == 'hide':
+            self.comments.update_many({'_id': {'$in': object_ids}}, {'$set': {'hidden': True, 'moderation_status': 'hidden'}})
+        else:
+            self.comments.update_many({'_id': {'$in': object_ids}}, {'$set': {'moderation_status': 'approved'}})
+
+    def _with_content(self, items):
+        """Añade a cada elemento el comentario reportado (una sola consulta $in)."""
+        comment_ids = self._object_ids([item['target'] for item in items if item['target_type'] == 'comment'])
+        comments = {str(comment['_id']): comment for comment in self.comments.find({'_id': {'$in': comment_ids}})}
+        result = []
+        for item in items:
+            content = comments.get(item['target'])
+            if content:
+                content = {**content, '_id': str(content['_id'])}
+            result.append({**item, '_id': str(item['_id']), 'content': content})
+        return result
+
+    @staticmethod
+    def _object_ids(ids):
+        return [ObjectId(value) for value in ids if ObjectId.is_valid(value)]
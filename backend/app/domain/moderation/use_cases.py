@@ -0,0 +1,72 @@
+# relative path: app/domain/moderation/use_cases.py
+
+from marshmallow import ValidationError
+from bson.objectid import ObjectId
+from .repositories import ModerationRepository
+from .entities import ResolutionSchema
+
+# Roles de usuario con acceso a la cola de moderación
+MODERATOR_ROLES = ('admin', 'moderator')
+
+class ModerationUseCases:
+    """Clase que define los casos de uso de reportes y de la cola de moderación."""
+
+    resolution_schema = ResolutionSchema()
+
+    def __init__(self, db, lease_seconds=300):
+        self.db = db
+        self.moderation_repository = ModerationRepository(db, lease_seconds)
+
+    def is_moderator(self, user_id):
+        """Indica si el usuario tiene rol de administrador o moderador."""
+        try:
+            user = self.db.users.find_one({'_id': ObjectId(user_id)}, {'role': 1})
+        except Exception:
+            return False
+        return bool(user) and user.get('role') in MODERATOR_ROLES
+
+    def get_queue(self, page=1, limit=10, status='open'):
+        """Obtiene una página de la cola de moderación en orden de prioridad."""
+        try:
+            return self.moderation_repository.get_queue(page, limit, status)
+        except Exception as ex:
+            return {"error": str(ex)}
+
+    def get_reports(self, target_type, target_id, page=1, limit=20):
+        """Obtiene el historial de reportes de un contenido."""
+        try:
+            return self.moderation_repository.get_reports(target_type, target_id, page, limit)
+        except Exception as ex:
+            return {"error": str(ex)}
+
+    def claim_items(self, moderator_id, batch_size=20):
+        """Reclama los siguientes elementos de la cola para el moderador."""
+        try:
+            lease_id, items = self.moderation_repository.claim(moderator_id, batch_size)
+            return {"lease_id": lease_id, "items": items}
+        except Exception as ex:
+            return {"error": str(ex)}
+
+    def release_items(self, moderator_id, item_ids):
+        """Devuelve a la cola elementos reclamados sin resolverlos."""
+        try:
+            released = self.moderation_repository.release(moderator_id, item_ids or [])
+            return {"released": released}
+        except Exception as ex:
+            return {"error": str(ex)}
+
+    def resolve_items(self, moderator_id, resolution_data):
+        """Resuelve en lote elementos reclamados por el moderador."""
+        try:
+            validated_data = self.resolution_schema.load(resolution_data or {})
+            resolved = self.moderation_repository.resolve(
+                moderator_id,
+                validated_data['item_ids'],
+                validated_data['action'],
+                validated_data.get('note')
+            )
+            return {"resolved": resolved}
+        except ValidationError as e:
+            return {"error": e.messages}
+        except Exception as ex:
+            return {"error": str(ex)}
@@ -3,6 +3,7 @@
 import uuid
 from datetime import datetime
 from marshmallow import Schema, fields, validate, validates, ValidationError
+from app.domain.validation import reference_exists
 
 class Notification:
     """Clase que representa una notificación dentro del sistema."""
@@ -25,18 +26,10 @@ class NotificationSchema(Schema):
     status = fields.String(validate=validate.OneOf(["unread", "read"]), default="unread")
     created_at = fields.DateTime(dump_only=True)
 
+    references = {'user': 'users'}
+
     @validates('user')
     def validate_user_exists(self, user, **kwargs):
         """Valida que el usuario destinatario exista en la base de datos."""
-        db = kwargs.get('db_instance')
-        if not db.users.find_one({"_id": user}):
+        if not reference_exists('users', user):
             raise ValidationError(f"El usuario con ID {user} no existe.")
-    
-    @validates('message')
-    def validate_unique_message_for_user(self, message, **kwargs):
-        """Valida que el mensaje de notificación no sea un duplicado para el mismo usuario."""
-        db = kwargs.get('db_instance')
-        user = kwargs.get('user_id')
-        existing_notification = db.notifications.find_one({"message": message, "user": user})
-        if existing_notification:
-            raise ValidationError(f"El mensaje '{message}' ya existe para el usuario con ID {user}.")
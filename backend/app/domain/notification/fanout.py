@@ -0,0 +1,207 @@
+# relative path: app/domain/notification/fanout.py
+
+import hashlib
+from datetime import datetime, timedelta
+from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError
+from bson.objectid import ObjectId
+from app.domain.membership.repositories import MembershipRepository
+
+DUPLICATE_KEY_ERROR = 11000
+
+# Tipos de audiencia soportados: colección y campo que contiene los IDs de usuario
+# (None: los usuarios están en la colección de membresías)
+AUDIENCES = {
+    'event': ('events', 'attendees'),
+    'community': ('communities', None),
+    'calendar': ('calendars', None),
+}
+
+# Sin dedupe_key explícita, el mismo mensaje a la misma audiencia se descarta solo dentro de esta ventana
+# (reintentos y dobles envíos); un recordatorio semanal con el mismo texto sí se entrega
+DEFAULT_DEDUPE_WINDOW = timedelta(hours=1)
+
+# Ventana máxima de difusiones que recibe un usuario la primera vez que se sincroniza su bandeja
+INBOX_INITIAL_WINDOW = timedelta(days=30)
+
+class NotificationFanout:
+    """Envía una misma notificación a todos los usuarios de una audiencia.
+
+    Para audiencias normales escribe una notificación por usuario con insert_many
+    por bloques (ordered=False); los duplicados se descartan mediante el índice único
+    (user, dedupe_key). Para audiencias muy grandes guarda una única difusión en
+    `notification_broadcasts` y cada usuario la materializa al leer su bandeja.
+    """
+
+    def __init__(self, db: MongoClient, unread_counter=None, publisher=None, chunk_size=1000, inbox_threshold=10000):
+        self.db = db
+        self.notifications = db.notifications  # Colección de notificaciones en MongoDB
+        self.broadcasts = db.notification_broadcasts  # Difusiones para el modelo de bandeja
+        self.inbox_state = db.notification_inbox_state  # Marca de agua de la bandeja de cada usuario
+        self.membership_repository = MembershipRepository(db)  # Miembros de comunidades y suscriptores de calendarios
+        self.unread_counter = unread_counter
+        self.publisher = publisher  # Publicador en tiempo real (to_users / broadcast)
+        self.chunk_size = chunk_size
+        self.inbox_threshold = inbox_threshold
+
+    def ensure_indexes(self):
+        """Crea los índices de deduplicación y de lectura de difusiones."""
+        self.notifications.create_index(
+            [('user', ASCENDING), ('dedupe_key', ASCENDING)],
+            unique=True,
+            partialFilterExpression={'dedupe_key': {'$exists': True}}
+        )
+        self.broadcasts.create_index([('audience_type', ASCENDING), ('audience_id', ASCENDING), ('_id', DESCENDING)])
+        for collection_name, field in AUDIENCES.values():
+            if field:
+                self.db[collection_name].create_index([(field, ASCENDING)])
+
+    @staticmethod
+    def build_dedupe_key(audience_type, audience_id, message, dedupe_key=None, now=None, window=DEFAULT_DEDUPE_WINDOW):
+        """Clave de deduplicación por defecto: audiencia + mensaje (+ ventana de tiempo si `window` no es None).
+
+        Sin ventana la clave no caduca: el mismo mensaje a la misma audiencia se rechaza siempre.
+        """
+        if dedupe_key:
+            return dedupe_key
+        raw_key = f"{audience_type}:{audience_id}:{message}"
+        if window is not None:
+            now = now or datetime.utcnow()
+            raw_key += f":{int((now - datetime(1970, 1, 1)) / window)}"
+        return hashlib.sha1(raw_key.encode('utf-8')).hexdigest()
+
+    def resolve_audience(self, audience_type, audience_id):
+        """Devuelve la lista de IDs de usuario de la audiencia."""
+        if audience_type not in AUDIENCES:
+            raise ValueError(f"Tipo de audiencia no soportado: '{audience_type}'")
+        collection_name, field = AUDIENCES[audience_type]
+        try:
+            object_id = ObjectId(audience_id)
+        except Exception:
+            raise ValueError("Formato de ID no válido.")
+
+        document = self.db[collection_name].find_one({'_id': object_id}, {field: 1} if field else {'_id': 1})
+        if document is None:
+            raise ValueError(f"No existe el recurso '{audience_type}' con ID {audience_id}.")
+        if field is None:
+            return list(self.membership_repository.iter_member_ids(audience_type, str(object_id)))
+        # Eliminar duplicados conservando el orden
+        return list(dict.fromkeys(str(user_id) for user_id in document.get(field, [])))
+
+    def fanout(self, audience_type, audience_id, message, notification_type, dedupe_key=None):
+        """Envía la notificación a la audiencia y devuelve un resumen de la operación."""
+        user_ids = self.resolve_audience(audience_type, audience_id)
+        dedupe_key = self.build_dedupe_key(audience_type, audience_id, message, dedupe_key)
+
+        if len(user_ids) >= self.inbox_threshold:
+            return self._fanout_on_read(audience_type, audience_id, message, notification_type, dedupe_key, len(user_ids))
+        return self._fanout_on_write(user_ids, message, notification_type, dedupe_key, audience_type, audience_id)
+
+    def _fanout_on_write(self, user_ids, message, notification_type, dedupe_key, audience_type, audience_id):
+        """Escribe una notificación por usuario en bloques de insert_many."""
+        inserted_total = 0
+        created_at = datetime.utcnow()
+        for start in range(0, len(user_ids), self.chunk_size):
+            chunk = user_ids[start:start + self.chunk_size]
+            documents = [{
+                'user': user_id,
+                'message': message,
+                'type': notification_type,
+                'status': 'unread',
+                'dedupe_key': dedupe_key,
+                'source': {'type': audience_type, 'id': audience_id},
+                'created_at': created_at,
+            } for user_id in chunk]
+
+            inserted_users = self._insert_chunk(documents)
+            inserted_total += len(inserted_users)
+            if inserted_users:
+                if self.unread_counter is not None:
+                    self.unread_counter.incr_many(inserted_users)
+                self._publish(inserted_users, {'message': message, 'type': notification_type})
+
+        return {
+            'mode': 'write',
+            'audience_size': len(user_ids),
+            'inserted': inserted_total,
+            'duplicates': len(user_ids) - inserted_total,
+        }
+
+    def _insert_chunk(self, documents):
+        """Inserta un bloque ignorando duplicados; devuelve los usuarios realmente notificados."""
+        try:
+            self.notifications.insert_many(documents, ordered=False)
+            return [document['user'] for document in documents]
+        except BulkWriteError as e:
+            write_errors = e.details.get('writeErrors', [])
+            if any(error.get('code') != DUPLICATE_KEY_ERROR for error in write_errors):
+                raise
+            failed_indexes = {error['index'] for error in write_errors}
+            return [document['user'] for index, document in enumerate(documents) if index not in failed_indexes]
+
+    def _fanout_on_read(self, audience_type, audience_id, message, notification_type, dedupe_key, audience_size):
+        """Guarda una única difusión que cada usuario recoge al leer su bandeja."""
+        broadcast = {
+            'audience_type': audience_type,
+            'audience_id': audience_id,
+            'message': message,
+            'type': notification_type,
+            'dedupe_key': dedupe_key,
+            'created_at': datetime.utcnow(),
+        }
+        result = self.broadcasts.insert_one(broadcast)
+
+        # Un único mensaje a la sala de la audiencia en lugar de uno por usuario
+        if self.publisher is not None:
+            self.publisher.broadcast(f"{audience_type}:{audience_id}", {'message': message, 'type': notification_type})
+
+        return {'mode': 'inbox', 'audience_size': audience_size, 'broadcast_id': str(result.inserted_id)}
+
+    def sync_inbox(self, user_id):
+        """Materializa en `notifications` las difusiones pendientes de un usuario.
+
+        Devuelve el número de notificaciones nuevas. Es idempotente gracias al
+        índice único (user, dedupe_key) y a la marca de agua por usuario.
+        """
+        state = self.inbox_state.find_one({'_id': user_id}) or {}
+        watermark = state.get('last_broadcast_id') or ObjectId.from_datetime(datetime.utcnow() - INBOX_INITIAL_WINDOW)
+
+        audiences = []
+        for audience_type, (collection_name, field) in AUDIENCES.items():
+            if field is None:
+                audience_ids = self.membership_repository.get_parent_ids(audience_type, user_id)
+            else:
+                audience_ids = [str(document['_id']) for document in self.db[collection_name].find({field: user_id}, {'_id': 1})]
+            if audience_ids:
+                audiences.append({'audience_type': audience_type, 'audience_id': {'$in': audience_ids}})
+        if not audiences:
+            return 0
+
+        pending = list(self.broadcasts.find({'$or': audiences, '_id': {'$gt': watermark}}).sort('_id', ASCENDING))
+        if not pending:
+            return 0
+
+        documents = [{
+            'user': user_id,
+            'message': broadcast['message'],
+            'type': broadcast['type'],
+            'status': 'unread',
+            'dedupe_key': broadcast['dedupe_key'],
+            'source': {'type': broadcast['audience_type'], 'id': broadcast['audience_id']},
+            'created_at': broadcast['created_at'],
+        } for broadcast in pending]
+        inserted = len(self._insert_chunk(documents))
+        if inserted and self.unread_counter is not None:
+            self.unread_counter.incr(user_id, inserted)
+
+        self.inbox_state.update_one(
+            {'_id': user_id},
+            {'$max': {'last_broadcast_id': pending[-1]['_id']}},
+            upsert=True
+        )
+        return inserted
+
+    def _publish(self, user_ids, payload):
+        """Envía el mensaje en tiempo real a las salas `user:{id}` del bloque."""
+        if self.publisher is not None:
+            self.publisher.to_users(user_ids, payload)
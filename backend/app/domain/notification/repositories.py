@@ -1,38 +1,91 @@
 # relative path: app/domain/notification/repositories.py
 
-from pymongo import MongoClient
+from datetime import datetime
+from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError
 from bson.objectid import ObjectId
+from .fanout import NotificationFanout
 
 class NotificationRepository:
     """Repositorio que maneja todas las operaciones CRUD relacionadas con las notificaciones."""
 
-    def __init__(self, db: MongoClient):
+    def __init__(self, db: MongoClient, unread_counter=None):
         self.notifications = db.notifications  # Colección de notificaciones en MongoDB
+        self.unread_counter = unread_counter  # Contador opcional de no leídas (Redis)
+
+    def ensure_indexes(self):
+        """Crea los índices usados por los listados y el conteo de no leídas."""
+        self.notifications.create_index([('user', ASCENDING), ('status', ASCENDING), ('_id', DESCENDING)])
+        self.notifications.create_index([('user', ASCENDING), ('_id', DESCENDING)])
+
+    def _adjust_unread(self, user_id, amount):
+        """Ajusta el contador de no leídas si está configurado."""
+        if self.unread_counter is not None and user_id:
+            self.unread_counter.incr(user_id, amount)
 
     def create_notification(self, data):
         """Crea una nueva notificación en la base de datos."""
-        # Validar si la notificación ya existe (basada en el usuario y el mensaje)
-        existing_notification = self.notifications.find_one({
-            'user': data['user'],
-            'message': data['message']
-        })
-        if existing_notification:
+        # Mismo usuario y mensaje: lo rechaza siempre (sin ventana) el índice único parcial (user, dedupe_key) de NotificationFanout
+        data.setdefault('dedupe_key', NotificationFanout.build_dedupe_key('user', data['user'], data['message'], window=None))
+        data.setdefault('status', 'unread')
+        data.setdefault('created_at', datetime.utcnow())
+        try:
+            result = self.notifications.insert_one(data)
+        except DuplicateKeyError:
             return {"error": "Ya existe una notificación similar para este usuario."}
-
-        result = self.notifications.insert_one(data)
+        if data['status'] == 'unread':
+            self._adjust_unread(data['user'], 1)
         return str(result.inserted_id)
 
     def mark_as_read(self, notification_id):
         """Marca una notificación como leída actualizando el campo status."""
-        # Verificar si la notificación existe
-        if not self.get_notification_by_id(notification_id):
-            return {"error": "La notificación no existe."}
+        try:
+            object_id = ObjectId(notification_id)
+        except Exception:
+            return {"error": "Formato de ID no válido."}
 
-        result = self.notifications.update_one(
-            {'_id': ObjectId(notification_id)},
-            {'$set': {'status': 'read'}}
+        # Solo se modifica si estaba sin leer, así el contador se decrementa una única vez
+        notification = self.notifications.find_one_and_update(
+            {'_id': object_id, 'status': {'$ne': 'read'}},
+            {'$set': {'status': 'read', 'read_at': datetime.utcnow()}},
+            projection={'user': 1}
         )
-        return result.modified_count > 0
+        if notification:
+            self._adjust_unread(notification.get('user'), -1)
+            return True
+
+        # Distinguir entre "ya estaba leída" y "no existe"
+        if not self.notifications.find_one({'_id': object_id}, {'_id': 1}):
+            return {"error": "La notificación no existe."}
+        return False
+
+    def mark_all_read(self, user_id, before=None):
+        """Marca como leídas todas las notificaciones de un usuario con un único update_many.
+
+        Si se indica `before`, solo se marcan las creadas hasta esa fecha (se usa el
+        timestamp del ObjectId, por lo que también cubre documentos sin created_at).
+        """
+        query = {'user': user_id, 'status': 'unread'}
+        if before is not None:
+            query['_id'] = {'$lte': ObjectId.from_datetime(before)}
+
+        result = self.notifications.update_many(query, {'$set': {'status': 'read', 'read_at': datetime.utcnow()}})
+        # Restar lo marcado (no poner a cero): las notificaciones creadas mientras tanto siguen contando
+        self._adjust_unread(user_id, -result.modified_count)
+        return result.modified_count
+
+    def count_unread(self, user_id):
+        """Devuelve el número de notificaciones no leídas, usando el contador de Redis si está cargado."""
+        if self.unread_counter is not None:
+            cached_count = self.unread_counter.get(user_id)
+            if cached_count is not None:
+                return cached_count
+
+        # Conteo cubierto por el índice (user, status, _id)
+        count_unread = lambda: self.notifications.count_documents({'user': user_id, 'status': 'unread'})
+        if self.unread_counter is not None:
+            return self.unread_counter.load(user_id, count_unread)
+        return count_unread()
 
     def get_notification_by_id(self, notification_id):
         """Obtiene una notificación por su ID."""
@@ -52,9 +105,16 @@ class NotificationRepository:
 
     def delete_notification(self, notification_id):
         """Elimina una notificación de la base de datos."""
-        # Verificar si la notificación existe
-        if not self.get_notification_by_id(notification_id):
+        try:
+            object_id = ObjectId(notification_id)
+        except Exception:
+            return {"error": "Formato de ID no válido."}
+
+        # find_one_and_delete devuelve el documento borrado para ajustar el contador
+        notification = self.notifications.find_one_and_delete({'_id': object_id}, projection={'user': 1, 'status': 1})
+        if not notification:
             return {"error": "La notificación no existe."}
 
-        result = self.notifications.delete_one({'_id': ObjectId(notification_id)})
-        return result.deleted_count > 0
+        if notification.get('status', 'unread') == 'unread':
+            self._adjust_unread(notification.get('user'), -1)
+        return True
@@ -0,0 +1,128 @@
+# relative path: app/domain/notification/retention.py
+
+from collections import Counter
+from datetime import datetime, timedelta
+from pymongo import MongoClient, ASCENDING
+from pymongo.errors import BulkWriteError, OperationFailure
+from bson.objectid import ObjectId
+from app.core.config import Config
+
+INDEX_OPTIONS_CONFLICT = 85
+READ_TTL_INDEX_NAME = 'read_at_ttl'
+
+class NotificationRetention:
+    """Política de retención de la colección `notifications`.
+
+    - Las notificaciones leídas expiran mediante un índice TTL sobre `read_at`.
+    - Las no leídas con más de M días se mueven a `notifications_archive`.
+    - La compactación informa del espacio recuperado en la colección caliente.
+    """
+
+    def __init__(self, db: MongoClient, unread_counter=None, read_ttl_days=None, unread_archive_days=None, batch_size=1000):
+        self.db = db
+        self.notifications = db.notifications  # Colección caliente
+        self.archive = db.notifications_archive  # Colección fría
+        self.unread_counter = unread_counter
+        self.read_ttl_days = read_ttl_days if read_ttl_days is not None else Config.NOTIFICATION_READ_TTL_DAYS
+        self.unread_archive_days = unread_archive_days if unread_archive_days is not None else Config.NOTIFICATION_UNREAD_ARCHIVE_DAYS
+        self.batch_size = batch_size
+
+    def ensure_indexes(self):
+        """Crea el índice TTL de leídas (o actualiza su expiración si cambió la configuración)."""
+        expire_after_seconds = int(timedelta(days=self.read_ttl_days).total_seconds())
+        try:
+            self.notifications.create_index(
+                [('read_at', ASCENDING)],
+                name=READ_TTL_INDEX_NAME,
+                expireAfterSeconds=expire_after_seconds,
+                partialFilterExpression={'status': 'read'}
+            )
+        except OperationFailure as e:
+            if e.code != INDEX_OPTIONS_CONFLICT:
+                raise
+            self.db.command('collMod', self.notifications.name, index={
+                'name': READ_TTL_INDEX_NAME,
+                'expireAfterSeconds': expire_after_seconds,
+            })
+        self.archive.create_index([('user', ASCENDING), ('_id', ASCENDING)])
+
+    def archive_stale_unread(self, now=None):
+        """Mueve a la colección fría las no leídas más antiguas que el umbral, por lotes.
+
+        Cada lote se copia primero en el archivo y luego se borra de la colección
+        caliente con un único delete_many con el mismo filtro de no leídas, por lo que
+        una interrupción nunca pierde documentos. Las que siguen en la colección
+        caliente tras el borrado (marcadas como leídas entre la lectura y el borrado)
+        se quitan del archivo, y el contador solo se decrementa por las borradas.
+        """
+        now = now or datetime.utcnow()
+        cutoff_id = ObjectId.from_datetime(now - timedelta(days=self.unread_archive_days))
+        query = {'status': 'unread', '_id': {'$lt': cutoff_id}}
+
+        archived = 0
+        while True:
+            batch = list(self.notifications.find(query).sort('_id', ASCENDING).limit(self.batch_size))
+            if not batch:
+                break
+
+            archived_at = datetime.utcnow()
+            for notification in batch:
+                notification['archived_at'] = archived_at
+            try:
+                self.archive.insert_many(batch, ordered=False)
+            except BulkWriteError as e:
+                # Reintento tras una ejecución interrumpida: los ya archivados se ignoran
+                if any(error.get('code') != 11000 for error in e.details.get('writeErrors', [])):
+                    raise
+
+            batch_ids = [notification['_id'] for notification in batch]
+            result = self.notifications.delete_many({'_id': {'$in': batch_ids}, 'status': 'unread'})
+
+            # Las que sobreviven al borrado ya no estaban sin leer: vuelven a la colección caliente
+            kept_ids = {notification['_id'] for notification in self.notifications.find({'_id': {'$in': batch_ids}}, {'_id': 1})}
+            if kept_ids:
+                self.archive.delete_many({'_id': {'$in': list(kept_ids)}})
+
+            removed_users = Counter(notification.get('user') for notification in batch if notification['_id'] not in kept_ids)
+            archived += result.deleted_count
+            if self.unread_counter is not None:
+                if result.deleted_count == sum(removed_users.values()):
+                    for user_id, count in removed_users.items():
+                        self.unread_counter.decr(user_id, count)
+                else:
+                    # Otra operación borró parte del lote a la vez: no se sabe cuáles, se recalculan los contadores
+                    self.unread_counter.forget(list(removed_users))
+
+        return archived
+
+    def collection_stats(self):
+        """Devuelve el número de documentos y el tamaño en disco de la colección caliente."""
+        stats = self.db.command('collStats', self.notifications.name)
+        return {
+            'count': stats.get('count', 0),
+            'size': stats.get('size', 0),
+            'storage_size': stats.get('storageSize', 0),
+            'total_index_size': stats.get('totalIndexSize', 0),
+        }
+
+    def compact(self, run_compact=False, now=None):
+        """Ejecuta la política completa y devuelve un informe con el espacio recuperado.
+
+        `run_compact` lanza además el comando `compact` de MongoDB, que bloquea la
+        colección y requiere privilegios de administrador.
+        """
+        before = self.collection_stats()
+        archived = self.archive_stale_unread(now)
+        if run_compact:
+            self.db.command('compact', self.notifications.name)
+        after = self.collection_stats()
+
+        return {
+            'archived_unread': archived,
+            'read_ttl_days': self.read_ttl_days,
+            'unread_archive_days': self.unread_archive_days,
+            'before': before,
+            'after': after,
+            'reclaimed_documents': before['count'] - after['count'],
+            'reclaimed_bytes': before['storage_size'] - after['storage_size'],
+        }
@@ -1,21 +1,88 @@
 # relative path: app/domain/notification/use_cases.py
 
 from marshmallow import ValidationError
+from bson.objectid import ObjectId
 from .repositories import NotificationRepository
 from .entities import NotificationSchema
+from .fanout import NotificationFanout
+from app.domain.validation import ValidationContext
+from app.domain.moderation.use_cases import MODERATOR_ROLES
 
 class NotificationUseCases:
     """Clase que define los casos de uso para la entidad Notification."""
 
-    def __init__(self, db):
-        self.notification_repository = NotificationRepository(db)
-        self.notification_schema = NotificationSchema()
+    notification_schema = NotificationSchema()
+
+    def __init__(self, db, unread_counter=None, publisher=None, **fanout_options):
+        self.db = db
+        self.notification_repository = NotificationRepository(db, unread_counter)
+        self.notification_fanout = NotificationFanout(db, unread_counter, publisher, **fanout_options)
+
+    def can_notify_audience(self, audience_type, audience_id, user_id):
+        """Indica si el usuario puede notificar a la audiencia.
+
+        Pueden hacerlo el creador del evento, el administrador o un moderador de la
+        comunidad, el propietario del calendario y los administradores y moderadores
+        de la plataforma.
+        """
+        try:
+            user = self.db.users.find_one({'_id': ObjectId(user_id)}, {'role': 1})
+            if user and user.get('role') in MODERATOR_ROLES:
+                return True
+            object_id = ObjectId(audience_id)
+        except Exception:
+            return False
+        user_id = str(user_id)
+        if audience_type == 'event':
+            event = self.db.events.find_one({'_id': object_id}, {'created_by': 1})
+            return bool(event) and str(event.get('created_by')) == user_id
+        if audience_type == 'community':
+            community = self.db.communities.find_one({'_id': object_id}, {'admin': 1, 'moderators': 1})
+            return bool(community) and (
+                str(community.get('admin')) == user_id
+                or user_id in [str(moderator) for moderator in community.get('moderators') or []]
+            )
+        if audience_type == 'calendar':
+            calendar = self.db.calendars.find_one({'_id': object_id}, {'owner': 1})
+            return bool(calendar) and str(calendar.get('owner')) == user_id
+        return False
+
+    def fanout_notification(self, fanout_data, user_id):
+        """Envía una notificación a todos los usuarios de una audiencia (evento, comunidad o calendario)."""
+        try:
+            if not self.can_notify_audience(fanout_data.get('audience_type'), fanout_data.get('audience_id'), user_id):
+                return {"error": "No tienes permisos para notificar a esta audiencia", "status": 403}
+            message = fanout_data.get('message')
+            notification_type = fanout_data.get('type')
+            if not message or len(message) > 255:
+                return {"error": "El mensaje debe tener entre 1 y 255 caracteres."}
+            if notification_type not in ("evento", "comentario", "recordatorio"):
+                return {"error": f"Tipo de notificación no válido: {notification_type}"}
+
+            return self.notification_fanout.fanout(
+                fanout_data.get('audience_type'),
+                fanout_data.get('audience_id'),
+                message,
+                notification_type,
+                fanout_data.get('dedupe_key')
+            )
+        except Exception as ex:
+            return {"error": str(ex)}
+
+    def sync_user_inbox(self, user_id):
+        """Recoge las difusiones pendientes del usuario (modelo de fan-out en lectura)."""
+        try:
+            return self.notification_fanout.sync_inbox(user_id)
+        except Exception as ex:
+            print(f"Error en sync_user_inbox: {str(ex)}")
+            return 0
 
     def create_notification(self, notification_data):
         """Crea una nueva notificación."""
         try:
             # Validar los datos de la notificación utilizando Marshmallow
-            validated_data = self.notification_schema.load(notification_data)
+            with ValidationContext(self.db, self.notification_schema, [notification_data]):
+                validated_data = self.notification_schema.load(notification_data)
             notification_id = self.notification_repository.create_notification(validated_data)
             return {"message": "Notificación creada exitosamente", "notification_id": notification_id}
         except ValidationError as e:
@@ -33,6 +100,21 @@ class NotificationUseCases:
         except Exception as ex:
             return {"error": str(ex)}
 
+    def mark_all_notifications_as_read(self, user_id, before=None):
+        """Marca como leídas todas las notificaciones de un usuario (opcionalmente hasta una fecha)."""
+        try:
+            modified = self.notification_repository.mark_all_read(user_id, before)
+            return {"message": "Notificaciones marcadas como leídas", "modified_count": modified}
+        except Exception as ex:
+            return {"error": str(ex)}
+
+    def get_unread_count(self, user_id):
+        """Obtiene el número de notificaciones no leídas de un usuario."""
+        try:
+            return {"user_id": user_id, "unread_count": self.notification_repository.count_unread(user_id)}
+        except Exception as ex:
+            return {"error": str(ex)}
+
     def get_notification_details(self, notification_id):
         """Obtiene los detalles de una notificación."""
         try:
@@ -1,6 +1,7 @@
 # relative path: app/domain/rating/repositories.py
 
-from pymongo import MongoClient
+from pymongo import MongoClient, ASCENDING
+from pymongo.errors import DuplicateKeyError, OperationFailure
 from bson.objectid import ObjectId
 
 class RatingRepository:
@@ -9,17 +10,20 @@ class RatingRepository:
     def __init__(self, db: MongoClient):
         self.ratings = db.ratings  # Colección de puntuaciones en MongoDB
 
+    def ensure_indexes(self):
+        """Crea el índice único de una puntuación por usuario y evento."""
+        try:
+            self.ratings.create_index([('event', ASCENDING), ('user', ASCENDING)], unique=True, name='event_user_unique')
+        except OperationFailure as e:
+            print(f"No se pudo crear el índice único de puntuaciones (¿duplicados existentes?): {e}")
+
     def create_rating(self, data):
         """Crea una nueva puntuación en la base de datos."""
-        # Validar si el usuario ya ha dado una puntuación para el mismo evento
-        existing_rating = self.ratings.find_one({
-            'event': data['event'],
-            'user': data['user']
-        })
-        if existing_rating:
+        # El índice único (event, user) impide puntuar dos veces el mismo evento
+        try:
+            result = self.ratings.insert_one(data)
+        except DuplicateKeyError:
             return {"error": "El usuario ya ha puntuado este evento."}
-
-        result = self.ratings.insert_one(data)
         return str(result.inserted_id)
 
     def update_rating(self, rating_id, data):
@@ -3,19 +3,24 @@
 from marshmallow import ValidationError
 from .repositories import RatingRepository
 from .entities import RatingSchema
+from app.domain.validation import FastValidator, ValidationContext
 
 class RatingUseCases:
     """Clase que define los casos de uso para la entidad Rating."""
 
+    rating_schema = RatingSchema()
+    rating_validator = FastValidator(rating_schema)  # Ruta rápida: endpoint de mucho volumen
+
     def __init__(self, db):
+        self.db = db
         self.rating_repository = RatingRepository(db)
-        self.rating_schema = RatingSchema()
 
     def create_rating(self, rating_data):
         """Crea una nueva puntuación."""
         try:
             # Validar los datos de la puntuación utilizando Marshmallow
-            validated_data = self.rating_schema.load(rating_data)
+            with ValidationContext(self.db, self.rating_schema, [rating_data]):
+                validated_data = self.rating_validator.load(rating_data)
             rating_id = self.rating_repository.create_rating(validated_data)
             return {"message": "Puntuación creada exitosamente", "rating_id": rating_id}
         except ValidationError as e:
@@ -27,7 +32,8 @@ class RatingUseCases:
         """Actualiza los detalles de una puntuación."""
         try:
             # Validar los nuevos datos de la puntuación
-            validated_data = self.rating_schema.load(new_data, partial=True)
+            with ValidationContext(self.db, self.rating_schema, [new_data]):
+                validated_data = self.rating_validator.load(new_data, partial=True)
             updated = self.rating_repository.update_rating(rating_id, validated_data)
             if updated:
                 return {"message": "Puntuación actualizada exitosamente"}
@@ -3,6 +3,7 @@
 import uuid
 from datetime import datetime
 from marshmallow import Schema, fields, validate, validates, ValidationError
+from app.domain.validation import reference_exists
 
 class Reply:
     """Clase que representa una respuesta a un comentario dentro del sistema."""
@@ -25,16 +26,16 @@ class ReplySchema(Schema):
     likes = fields.Integer(default=0)
     created_at = fields.DateTime(dump_only=True)
 
+    references = {'user': 'users', 'parent_comment': 'comments'}
+
     @validates('user')
     def validate_user_exists(self, user, **kwargs):
         """Valida que el usuario que responde exista en la base de datos."""
-        db = kwargs.get('db_instance')
-        if not db.users.find_one({"_id": user}):
+        if not reference_exists('users', user):
             raise ValidationError(f"El usuario con ID {user} no existe.")
     
     @validates('parent_comment')
     def validate_parent_comment_exists(self, parent_comment, **kwargs):
         """Valida que el comentario al que se responde exista en la base de datos."""
-        db = kwargs.get('db_instance')
-        if not db.comments.find_one({"_id": parent_comment}):
+        if not reference_exists('comments', parent_comment):
             raise ValidationError(f"El comentario padre con ID {parent_comment} no existe.")
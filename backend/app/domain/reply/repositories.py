@@ -1,12 +1,15 @@
 # relative path: app/domain/reply/repositories.py
 
 from bson.objectid import ObjectId
+from app.domain.like.repositories import LikeRepository
 
 class ReplyRepository:
     """Repositorio responsable de las interacciones con la base de datos para la entidad Reply."""
 
     def __init__(self, db):
         self.collection = db['replies']
+        self.comments = db['comments']
+        self.like_repository = LikeRepository(db)  # Likes en su propia colección
 
     def create_reply(self, data):
         """Crea una nueva respuesta."""
@@ -33,6 +36,8 @@ class ReplyRepository:
             return {"error": "La respuesta no existe."}
 
         result = self.collection.delete_one({"_id": ObjectId(reply_id)})
+        if result.deleted_count > 0:
+            self.like_repository.delete_target_likes('reply', reply_id)
         return result.deleted_count > 0
 
     def get_reply_by_id(self, reply_id):
@@ -45,31 +50,69 @@ class ReplyRepository:
         except Exception:
             return {"error": "Formato de ID no válido."}
 
-    def get_replies_by_comment(self, comment_id, page=1, limit=10):
-        """Devuelve una lista paginada de respuestas para un comentario específico."""
-        skip = (page - 1) * limit
-        replies = self.collection.find({"parent_comment": ObjectId(comment_id)}).skip(skip).limit(limit)
+    def get_replies_by_comment(self, comment_id, page=1, limit=10, after=None):
+        """Devuelve una lista paginada de respuestas para un comentario específico.
+
+        Si se indica `after` (ID de la última respuesta recibida) se pagina por cursor
+        en lugar de por número de página. Las respuestas de un comentario ocultado por
+        moderación no se listan.
+        """
+        # parent_comment puede estar guardado como string o como ObjectId
+        parent_ids = [comment_id]
+        if ObjectId.is_valid(comment_id):
+            parent_ids.append(ObjectId(comment_id))
+            if self.comments.find_one({"_id": ObjectId(comment_id), "hidden": True}, {"_id": 1}):
+                return []
+        query = {"parent_comment": {"$in": parent_ids}}
+        if after:
+            query["_id"] = {"$gt": ObjectId(after)}
+            replies = self.collection.find(query).sort("_id", 1).limit(limit)
+        else:
+            skip = (page - 1) * limit
+            replies = self.collection.find(query).sort("_id", 1).skip(skip).limit(limit)
         result = []
         for reply in replies:
             reply['_id'] = str(reply['_id'])
             result.append(reply)
         return result
 
+    def get_event_id_for_comment(self, comment_id):
+        """Devuelve el evento al que pertenece un comentario (para invalidar su caché)."""
+        try:
+            comment = self.comments.find_one({"_id": ObjectId(comment_id)}, {"event": 1})
+        except Exception:
+            return None
+        return comment.get('event') if comment else None
+
+    def get_event_id_for_reply(self, reply_id):
+        """Devuelve el evento del comentario al que pertenece una respuesta (para invalidar su caché)."""
+        try:
+            reply = self.collection.find_one({"_id": ObjectId(reply_id)}, {"parent_comment": 1})
+        except Exception:
+            return None
+        return self.get_event_id_for_comment(reply['parent_comment']) if reply else None
+
     def like_reply(self, reply_id, user_id):
         """Registra que un usuario ha dado like a una respuesta."""
         # Verificar si la respuesta existe antes de dar like
-        if not self.get_reply_by_id(reply_id):
+        if not self.collection.find_one({"_id": ObjectId(reply_id)}, {"_id": 1}):
             return {"error": "La respuesta no existe."}
 
-        result = self.collection.update_one(
-            {"_id": ObjectId(reply_id)},
-            {"$addToSet": {"likes": user_id}}  # Agregar el user_id a la lista de likes si no está presente
-        )
-        return result.modified_count > 0
+        # El índice único de la colección de likes rechaza el like repetido
+        if not self.like_repository.add_like('reply', reply_id, user_id):
+            return {"error": "El usuario ya ha dado like a esta respuesta."}
+        return True
+
+    def unlike_reply(self, reply_id, user_id):
+        """Retira el like de un usuario a una respuesta."""
+        if not self.like_repository.remove_like('reply', reply_id, user_id):
+            return {"error": "El usuario no ha dado like a esta respuesta."}
+        return True
+
+    def get_reply_likes(self, reply_id, page=1, limit=50):
+        """Devuelve una página de los usuarios que han dado like a una respuesta."""
+        return self.like_repository.get_likers('reply', reply_id, page, limit)
 
-    def get_reply_likes(self, reply_id):
-        """Devuelve la lista de usuarios que han dado like a una respuesta."""
-        reply = self.collection.find_one({"_id": ObjectId(reply_id)}, {"likes": 1})
-        if reply and 'likes' in reply:
-            return reply['likes']
-        return []
+    def get_liked_replies(self, user_id, reply_ids):
+        """Indica qué respuestas de la lista ha marcado el usuario (una sola consulta)."""
+        return self.like_repository.get_liked_targets('reply', user_id, reply_ids)
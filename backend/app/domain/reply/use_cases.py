@@ -3,19 +3,23 @@
 from marshmallow import ValidationError
 from .repositories import ReplyRepository
 from .entities import ReplySchema
+from app.domain.validation import ValidationContext
 
 class ReplyUseCases:
     """Clase que define los casos de uso para la entidad Reply."""
 
+    reply_schema = ReplySchema()
+
     def __init__(self, db):
+        self.db = db
         self.reply_repository = ReplyRepository(db)
-        self.reply_schema = ReplySchema()
 
     def create_reply(self, reply_data):
         """Crea una nueva respuesta."""
         try:
             # Validar los datos de la respuesta utilizando Marshmallow
-            validated_data = self.reply_schema.load(reply_data)
+            with ValidationContext(self.db, self.reply_schema, [reply_data]):
+                validated_data = self.reply_schema.load(reply_data)
             reply_id = self.reply_repository.create_reply(validated_data)
             return {"message": "Respuesta creada exitosamente", "reply_id": reply_id}
         except ValidationError as e:
@@ -27,7 +31,8 @@ class ReplyUseCases:
         """Actualiza el contenido de una respuesta."""
         try:
             # Validar los nuevos datos de la respuesta
-            validated_data = self.reply_schema.load(new_data, partial=True)
+            with ValidationContext(self.db, self.reply_schema, [new_data]):
+                validated_data = self.reply_schema.load(new_data, partial=True)
             updated = self.reply_repository.update_reply(reply_id, validated_data)
             if updated:
                 return {"message": "Respuesta actualizada exitosamente"}
@@ -57,26 +62,57 @@ class ReplyUseCases:
         except Exception as ex:
             return {"error": str(ex)}
 
-    def list_comment_replies(self, comment_id, page=1, limit=10):
-        """Lista las respuestas de un comentario."""
+    def list_comment_replies(self, comment_id, page=1, limit=10, after=None):
+        """Lista las respuestas de un comentario (por página o por cursor)."""
         try:
-            return self.reply_repository.get_replies_by_comment(comment_id, page, limit)
+            return self.reply_repository.get_replies_by_comment(comment_id, page, limit, after)
         except Exception as ex:
             return {"error": str(ex)}
 
+    def get_reply_event_id(self, reply_id):
+        """Obtiene el evento al que pertenece una respuesta."""
+        try:
+            return self.reply_repository.get_event_id_for_reply(reply_id)
+        except Exception:
+            return None
+
+    def get_comment_event_id(self, comment_id):
+        """Obtiene el evento al que pertenece un comentario."""
+        try:
+            return self.reply_repository.get_event_id_for_comment(comment_id)
+        except Exception:
+            return None
+
     def like_reply(self, reply_id, user_id):
         """Da like a una respuesta."""
         try:
             liked = self.reply_repository.like_reply(reply_id, user_id)
-            if liked:
-                return {"message": "Like registrado exitosamente"}
-            return {"error": "Error al registrar el like"}
+            if isinstance(liked, dict):
+                return liked
+            return {"message": "Like registrado exitosamente"}
+        except Exception as ex:
+            return {"error": str(ex)}
+
+    def unlike_reply(self, reply_id, user_id):
+        """Retira el like de una respuesta."""
+        try:
+            unliked = self.reply_repository.unlike_reply(reply_id, user_id)
+            if isinstance(unliked, dict):
+                return unliked
+            return {"message": "Like eliminado exitosamente"}
+        except Exception as ex:
+            return {"error": str(ex)}
+
+    def get_reply_likes(self, reply_id, page=1, limit=50):
+        """Obtiene una página de los usuarios que dieron like a una respuesta."""
+        try:
+            return self.reply_repository.get_reply_likes(reply_id, page, limit)
         except Exception as ex:
             return {"error": str(ex)}
 
-    def get_reply_likes(self, reply_id):
-        """Obtiene la lista de usuarios que dieron like a una respuesta."""
+    def get_liked_replies(self, user_id, reply_ids):
+        """Indica qué respuestas de la lista ha marcado el usuario."""
         try:
-            return self.reply_repository.get_reply_likes(reply_id)
+            return self.reply_repository.get_liked_replies(user_id, reply_ids)
         except Exception as ex:
             return {"error": str(ex)}
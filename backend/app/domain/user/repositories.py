@@ -1,4 +1,6 @@
 from werkzeug.security import generate_password_hash
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError, OperationFailure
 from bson.objectid import ObjectId
 
 class UserRepository:
@@ -7,20 +9,30 @@ class UserRepository:
     def __init__(self, db):
         self.collection = db['users']  # Asegúrate de que esta es la referencia correcta a la colección 'users'
 
+    def ensure_indexes(self):
+        """Crea el índice único de correo electrónico."""
+        try:
+            self.collection.create_index(
+                [('email', ASCENDING)],
+                unique=True,
+                partialFilterExpression={'email': {'$exists': True}},
+                name='email_unique'
+            )
+        except OperationFailure as e:
+            print(f"No se pudo crear el índice único de usuarios (¿duplicados existentes?): {e}")
+
     def create_user(self, data):
         """Crea un nuevo usuario en la base de datos."""
         try:
-            # Verificar si ya existe un usuario con el mismo correo electrónico
-            if self.get_user_by_email(data['email']):
-                return {"error": "El correo electrónico ya está registrado."}
-
             # Cifrar la contraseña antes de insertar el usuario
             if 'password' in data:
                 data['password'] = generate_password_hash(data['password'])
 
-            # Insertar el usuario en la base de datos
+            # Insertar el usuario: el índice único de email rechaza los correos ya registrados
             result = self.collection.insert_one(data)
             return str(result.inserted_id)
+        except DuplicateKeyError:
+            return {"error": "El correo electrónico ya está registrado."}
         except Exception as e:
             print(f"Error al crear usuario: {str(e)}")
             return {"error": "Error al crear usuario"}
@@ -0,0 +1,274 @@
+# relative path: app/domain/validation.py
+
+import contextvars
+import math
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Mapping
+from bson import ObjectId
+from marshmallow import ValidationError, EXCLUDE, INCLUDE, RAISE, fields, missing
+from marshmallow.decorators import VALIDATES, VALIDATES_SCHEMA, PRE_LOAD, POST_LOAD
+from marshmallow.error_store import merge_errors
+
+# Campos cuyo valor de entrada, si ya tiene el tipo nativo, es el propio valor deserializado
+_NATIVE_TYPES = {
+    fields.String: (str,),
+    fields.Integer: (int,),
+    fields.Float: (int, float),
+    fields.Boolean: (bool,),
+}
+
+def _store_error(errors, messages, field_name='_schema'):
+    """Acumula un error con el mismo formato que el ErrorStore de marshmallow."""
+    if field_name != '_schema' or not isinstance(messages, dict):
+        messages = {field_name: messages}
+    return merge_errors(errors, messages)
+
+def _compile_field(field_obj):
+    """Devuelve una función (valor, clave, datos) -> valor deserializado para el campo."""
+    native = _NATIVE_TYPES.get(type(field_obj))
+    if native is None:
+        return field_obj.deserialize
+
+    validators = tuple(field_obj.validators)
+    as_float = type(field_obj) is fields.Float
+
+    def load(value, key, data):
+        if type(value) in native and not (as_float and not math.isfinite(value)):
+            try:
+                valid = all(validator(value) is not False for validator in validators)
+            except ValidationError:
+                valid = False
+            if valid:
+                return float(value) if as_float else value
+        # Valores ausentes, nulos, convertibles o inválidos: marshmallow decide y genera los mensajes
+        return field_obj.deserialize(value, key, data)
+
+    return load
+
+class FastValidator:
+    """Ruta rápida equivalente a `schema.load()` para los endpoints de mucho volumen.
+
+    Los campos del esquema se precompilan una vez: los String, Integer, Float y
+    Boolean que llegan con su tipo nativo solo pasan por sus validadores (Length,
+    Range...), sin la maquinaria de Schema.load(); los demás valores, y cualquier
+    valor inválido, pasan por `field.deserialize()` para obtener los mismos mensajes
+    de error. Los hooks @validates y @validates_schema del esquema se ejecutan como
+    en marshmallow. Los esquemas con pre_load/post_load, `many`, validadores de
+    esquema con pass_many o atributos anidados usan siempre `schema.load()`.
+    """
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.compiled = self._is_supported(schema)
+        if not self.compiled:
+            return
+
+        self.unknown = schema.unknown
+        self.loaders = []
+        for attr_name, field_obj in schema.load_fields.items():
+            data_key = field_obj.data_key if field_obj.data_key is not None else attr_name
+            self.loaders.append((field_obj.attribute or attr_name, data_key, _compile_field(field_obj)))
+        self.data_keys = {data_key for _, data_key, _ in self.loaders}
+
+        self.field_hooks = []
+        for hook_name, _, hook_kwargs in schema._hooks[VALIDATES]:
+            field_name = hook_kwargs['field_name']
+            field_obj = schema.fields.get(field_name)
+            if field_obj is None:
+                continue
+            data_key = field_obj.data_key if field_obj.data_key is not None else field_name
+            self.field_hooks.append((getattr(schema, hook_name), field_name, field_obj.attribute or field_name, data_key))
+
+        self.schema_hooks = [
+            (getattr(schema, hook_name), hook_kwargs.get('pass_original', False), hook_kwargs['skip_on_field_errors'])
+            for hook_name, _, hook_kwargs in schema._hooks[VALIDATES_SCHEMA]
+        ]
+
+    @staticmethod
+    def _is_supported(schema):
+        if schema.many or schema._hooks[PRE_LOAD] or schema._hooks[POST_LOAD]:
+            return False
+        if any(hook_many for _, hook_many, _ in schema._hooks[VALIDATES_SCHEMA]):
+            return False
+        if any(name not in schema.fields and name not in schema.declared_fields
+               for name in (kwargs['field_name'] for _, _, kwargs in schema._hooks[VALIDATES])):
+            return False
+        return all('.' not in (field_obj.attribute or '') for field_obj in schema.load_fields.values())
+
+    def load(self, data, partial=None):
+        """Valida y deserializa `data` como `schema.load(data, partial=partial)`."""
+        if not self.compiled or partial not in (None, False, True) or not isinstance(data, Mapping):
+            return self.schema.load(data, partial=partial)
+
+        errors = {}
+        result = {}
+        for attribute, data_key, load in self.loaders:
+            raw_value = data.get(data_key, missing)
+            if raw_value is missing and partial is True:
+                continue
+            try:
+                value = load(raw_value, data_key, data)
+            except ValidationError as error:
+                errors = _store_error(errors, error.messages, data_key)
+                continue
+            if value is not missing:
+                result[attribute] = value
+
+        if self.unknown != EXCLUDE:
+            for key in set(data) - self.data_keys:
+                if self.unknown == INCLUDE:
+                    result[key] = data[key]
+                elif self.unknown == RAISE:
+                    errors = _store_error(errors, [self.schema.error_messages['unknown']], key)
+
+        for hook, field_name, attribute, data_key in self.field_hooks:
+            if attribute in result:
+                try:
+                    hook(result[attribute])
+                except ValidationError as error:
+                    errors = _store_error(errors, error.messages, data_key)
+                    result.pop(field_name, None)
+
+        field_errors = bool(errors)
+        for hook, pass_original, skip_on_field_errors in self.schema_hooks:
+            if field_errors and skip_on_field_errors:
+                continue
+            try:
+                if pass_original:
+                    hook(result, data, partial=partial, many=False)
+                else:
+                    hook(result, partial=partial, many=False)
+            except ValidationError as error:
+                errors = _store_error(errors, error.messages, error.field_name)
+
+        if errors:
+            raise ValidationError(errors, data=data, valid_data=result)
+        return result
+
+class ExistenceCache:
+    """Caché corta, en memoria del proceso, de los IDs que se sabe que existen.
+
+    Solo guarda resultados positivos: un documento recién creado se ve en la
+    siguiente validación, y uno borrado puede seguir aceptándose como referencia
+    durante `ttl_seconds` como mucho.
+    """
+
+    def __init__(self, ttl_seconds=30, max_entries=50000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._expires = {}  # (base de datos, colección, id) -> instante de caducidad
+        self._lock = threading.Lock()
+
+    def known(self, db_name, collection, ids):
+        """Devuelve cuáles de los IDs constan como existentes y no han caducado."""
+        now = time.monotonic()
+        expires = self._expires
+        return {value for value in ids if expires.get((db_name, collection, value), 0) > now}
+
+    def add(self, db_name, collection, ids):
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            if len(self._expires) + len(ids) > self.max_entries:
+                now = time.monotonic()
+                self._expires = {key: at for key, at in self._expires.items() if at > now}
+                if len(self._expires) + len(ids) > self.max_entries:
+                    self._expires = {}
+            for value in ids:
+                self._expires[(db_name, collection, value)] = expires_at
+
+    def clear(self):
+        with self._lock:
+            self._expires = {}
+
+# Caché de existencia compartida por todas las validaciones del proceso
+existence_cache = ExistenceCache()
+
+_current_context = contextvars.ContextVar('validation_context', default=None)
+
+class ValidationContext:
+    """Resuelve las referencias de un payload o de un lote con una consulta $in por colección.
+
+    Los esquemas declaran sus referencias en `references` (campo -> colección) y sus
+    hooks @validates llaman a `reference_exists()`. Al abrir el contexto se recogen
+    los IDs referenciados por todos los payloads; la primera comprobación los
+    resuelve todos a la vez, consultando solo los que no están en la caché de
+    existencia. Así, validar N registros cuesta como mucho una consulta por
+    colección referenciada, y no una por campo y registro.
+
+        with ValidationContext(db, schema, [payload]):
+            data = schema.load(payload)
+    """
+
+    def __init__(self, db, schema=None, payloads=(), cache=existence_cache):
+        self.db = db
+        self.cache = cache
+        self.pending = defaultdict(set)  # colección -> IDs aún sin resolver
+        self.existing = defaultdict(set)  # colección -> IDs que existen
+        self.checked = defaultdict(set)  # colección -> IDs ya resueltos
+        self._token = None
+        if schema is not None:
+            self.collect_references(schema, payloads)
+
+    def __enter__(self):
+        self._token = _current_context.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        _current_context.reset(self._token)
+        self._token = None
+
+    @staticmethod
+    def current():
+        """Devuelve el contexto activo o falla si la validación se hace fuera de uno."""
+        context = _current_context.get()
+        if context is None:
+            raise RuntimeError("La validación de referencias necesita un ValidationContext activo")
+        return context
+
+    def collect(self, collection, ids):
+        """Anota IDs referenciados para resolverlos en la próxima consulta."""
+        for value in ids:
+            if isinstance(value, (str, ObjectId)):
+                value = str(value)
+                if value not in self.checked[collection]:
+                    self.pending[collection].add(value)
+
+    def collect_references(self, schema, payloads):
+        """Anota los IDs de los campos de referencia declarados por el esquema."""
+        for field_name, collection in getattr(schema, 'references', {}).items():
+            field_obj = schema.fields.get(field_name)
+            data_key = field_obj.data_key if field_obj is not None and field_obj.data_key is not None else field_name
+            for payload in payloads:
+                value = payload.get(data_key) if isinstance(payload, Mapping) else None
+                self.collect(collection, value if isinstance(value, (list, tuple, set)) else (value,))
+
+    def resolve(self):
+        """Resuelve todos los IDs pendientes: una consulta $in por colección, sin los ya cacheados."""
+        for collection, ids in list(self.pending.items()):
+            if not ids:
+                continue
+            known = self.cache.known(self.db.name, collection, ids)
+            unknown = ids - known
+            found = set()
+            if unknown:
+                # Los IDs pueden guardarse como ObjectId o como string
+                lookup_ids = list(unknown) + [ObjectId(value) for value in unknown if ObjectId.is_valid(value)]
+                found = {str(document['_id']) for document in self.db[collection].find({'_id': {'$in': lookup_ids}}, {'_id': 1})}
+                self.cache.add(self.db.name, collection, found)
+            self.existing[collection] |= known | found
+            self.checked[collection] |= ids
+        self.pending.clear()
+
+    def exists(self, collection, value):
+        """Indica si el documento referenciado existe (resuelve los pendientes si hace falta)."""
+        value = str(value)
+        if value not in self.checked[collection]:
+            self.pending[collection].add(value)
+            self.resolve()
+        return value in self.existing[collection]
+
+def reference_exists(collection, value):
+    """Comprueba una referencia con el ValidationContext activo (para los hooks @validates)."""
+    return ValidationContext.current().exists(collection, value)
@@ -0,0 +1,121 @@
+# relative path: app/factory.py
+
+import os
+import time
+from flask import Flask
+from flask_jwt_extended import JWTManager
+from flask_cors import CORS  # Importar CORS
+from app.core.config import config_by_name
+from app.infrastructure.web.user_controller import user_controller
+from app.infrastructure.web.reply_controller import reply_controller
+from app.infrastructure.web.rating_controller import rating_controller
+from app.infrastructure.web.notification_controller import notification_controller
+from app.infrastructure.web.event_controller import event_controller
+from app.infrastructure.web.community_controller import community_controller
+from app.infrastructure.web.comment_controller import comment_controller
+from app.infrastructure.web.calendar_controller import calendar_controller
+from app.infrastructure.web.moderation_controller import moderation_controller
+from app.infrastructure.web.admin_controller import admin_controller
+from app.infrastructure.web.analytics_controller import analytics_controller
+from app.infrastructure.websockets.socketio import socketio  # Importar instancia de socketio
+from app.infrastructure.websockets.presence import presence  # Presencia y contadores en vivo de las salas
+from app.infrastructure.cache.redis_client import redis_client  # Cliente Redis perezoso
+from app.infrastructure.slow_queries import slow_query_log, slow_query_listener
+from app.infrastructure.causal_reads import causal_reads  # Lectura de las escrituras propias en secundarios
+from app.core.read_preferences import read_policies  # Read preference de los listados
+from app.infrastructure.db import get_db_instance  # Cliente de MongoDB compartido por proceso
+from app.infrastructure.indexes import ensure_indexes  # Creación de índices de MongoDB
+from app.infrastructure.cli import register_commands  # Comandos de mantenimiento (flask <comando>)
+from app.infrastructure.web.compression import register_compression  # Compresión gzip/brotli de respuestas
+from app.infrastructure.web.instrumentation import register_instrumentation  # Métricas y Server-Timing
+from app.infrastructure.metrics import startup_duration
+
+BLUEPRINTS = (
+    user_controller,
+    reply_controller,
+    rating_controller,
+    notification_controller,
+    event_controller,
+    community_controller,
+    comment_controller,
+    calendar_controller,
+    moderation_controller,
+    admin_controller,
+    analytics_controller,
+)
+
+def create_app(config_name=None, config_overrides=None):
+    """Crea y configura la aplicación Flask.
+
+    No abre conexiones: MongoDB y Redis se conectan en el primer uso dentro de cada
+    proceso, así que la app puede crearse antes de hacer fork de los workers. Los
+    índices solo se crean aquí si ENSURE_INDEXES_ON_STARTUP está activo (en
+    producción se crean una vez con `flask ensure-indexes`).
+    """
+    timings = {}
+    started = phase_started = time.perf_counter()
+
+    def mark(phase):
+        nonlocal phase_started
+        now = time.perf_counter()
+        timings[phase] = now - phase_started
+        phase_started = now
+
+    # Inicialización de la aplicación Flask
+    app = Flask(__name__)
+
+    # Habilitar CORS
+    CORS(app, resources={r"/*": {"origins": "*"}})
+
+    # Cargar la configuración según el entorno
+    config_name = config_name or os.getenv('FLASK_ENV', 'development')
+    app.config.from_object(config_by_name[config_name])
+    if config_overrides:
+        app.config.update(config_overrides)
+    mark('config')
+
+    # Inicializar JWT Manager
+    JWTManager(app)
+
+    # Clientes de infraestructura: solo se guarda la configuración, la conexión es perezosa
+    redis_client.init_app(app)
+    slow_query_log.init_app(app)
+    slow_query_listener.init_app(app)
+    read_policies.init_app(app)
+    causal_reads.init_app(app)
+    socketio.init_app(app, message_queue=app.config.get('SOCKETIO_MESSAGE_QUEUE'), cors_allowed_origins="*")
+    presence.init_app(app)
+    mark('clients')
+
+    # Métricas por ruta, Server-Timing y endpoint /metrics (antes de la compresión para medirla también)
+    register_instrumentation(app)
+
+    # Comprimir las respuestas según Accept-Encoding
+    register_compression(app)
+
+    # Registrar los comandos de mantenimiento del CLI de Flask
+    register_commands(app)
+
+    # Registrar Blueprints (controladores)
+    for blueprint in BLUEPRINTS:
+        app.register_blueprint(blueprint)
+
+    # Ruta de prueba para verificar que el servidor está funcionando
+    @app.route('/')
+    def index():
+        return "¡Bienvenido a la Plataforma de Calendario Comunitario!"
+    mark('routes')
+
+    # Asegurar los índices que usan las consultas de los repositorios
+    if app.config.get('ENSURE_INDEXES_ON_STARTUP', True):
+        with app.app_context():
+            ensure_indexes(get_db_instance())
+        mark('indexes')
+
+    timings['total'] = time.perf_counter() - started
+    for phase, seconds in timings.items():
+        startup_duration.set(round(seconds, 4), phase)
+    app.extensions['startup_timings'] = timings
+    summary = ', '.join(f"{phase}={seconds * 1000:.0f} ms" for phase, seconds in timings.items())
+    print(f"[arranque] pid {os.getpid()}: {summary}")
+    return app
@@ -0,0 +1,95 @@
+# relative path: app/infrastructure/cache/calendar_feed.py
+
+import hashlib
+import time
+from app.infrastructure.cache.redis_client import redis_client, get_generation, bump_generation
+
+# Tiempo que se conserva en Redis el cuerpo renderizado de un feed
+FEED_BODY_TTL_SECONDS = 24 * 60 * 60
+
+class CalendarFeedCache:
+    """Caché de los feeds ICS de calendario con validadores para GET condicional.
+
+    Por cada calendario guarda en un hash la generación renderizada, el ETag (hash
+    SHA-1 del contenido) y la fecha de última modificación; el cuerpo va en una
+    clave aparte con TTL. Una escritura solo incrementa la generación, y si al
+    volver a renderizar el contenido no ha cambiado se conservan ETag y fecha, de
+    modo que los clientes que sondean siguen recibiendo 304.
+
+    Junto a los validadores se guardan `is_public` y el hash del token del feed:
+    cualquier cambio del calendario incrementa la generación, así que con unos
+    validadores vigentes el acceso y el 304 se resuelven sin leer MongoDB.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    @staticmethod
+    def _validators_key(calendar_id):
+        return f"calendar_feed:{calendar_id}:validators"
+
+    @staticmethod
+    def _body_key(calendar_id):
+        return f"calendar_feed:{calendar_id}:body"
+
+    def invalidate(self, calendar_id):
+        """Marca el feed como desactualizado (O(1), sin borrar el cuerpo)."""
+        bump_generation(f"calendar_feed:{calendar_id}")
+
+    @staticmethod
+    def _token_hash(token):
+        return hashlib.sha256(token.encode('utf-8')).hexdigest() if token else ''
+
+    def get_fresh_validators(self, calendar_id):
+        """Devuelve {'etag', 'last_modified', 'is_public', 'token_hash'} si el feed cacheado corresponde a la generación actual."""
+        validators = self.client.hgetall(self._validators_key(calendar_id))
+        if not validators or validators.get('generation') != str(get_generation(f"calendar_feed:{calendar_id}")):
+            return None
+        if 'is_public' not in validators:
+            return None  # Guardado antes de cachear el acceso: se vuelve a comprobar en MongoDB
+        return {
+            'etag': validators['etag'],
+            'last_modified': int(validators['last_modified']),
+            'is_public': validators['is_public'] == '1',
+            'token_hash': validators.get('token_hash', ''),
+        }
+
+    def allows(self, validators, token):
+        """Indica si el token da acceso al feed según los datos guardados con los validadores."""
+        return validators['is_public'] or (bool(token) and self._token_hash(token) == validators['token_hash'])
+
+    def get_body(self, calendar_id):
+        """Devuelve el cuerpo cacheado del feed (o None si caducó)."""
+        return self.client.get(self._body_key(calendar_id))
+
+    def render_and_store(self, calendar_id, chunks, calendar):
+        """Genera el feed completo, guarda cuerpo, validadores y datos de acceso, y devuelve (cuerpo, validadores).
+
+        El cuerpo se reúne antes de responder para enviar ETag y Last-Modified ya en la
+        primera respuesta (el cuerpo se guardaba entero en Redis de todos modos).
+        """
+        generation = str(get_generation(f"calendar_feed:{calendar_id}"))
+        body = ''.join(chunks)
+        etag = hashlib.sha1(body.encode('utf-8')).hexdigest()
+        previous = self.client.hgetall(self._validators_key(calendar_id))
+        # Contenido idéntico: se mantiene la fecha para no invalidar las copias de los clientes
+        last_modified = previous['last_modified'] if previous.get('etag') == etag else str(int(time.time()))
+        pipeline = self.client.pipeline()
+        pipeline.set(self._body_key(calendar_id), body, ex=FEED_BODY_TTL_SECONDS)
+        pipeline.hset(self._validators_key(calendar_id), mapping={
+            'generation': generation,
+            'etag': etag,
+            'last_modified': last_modified,
+            'is_public': '1' if calendar.get('is_public', True) else '0',
+            'token_hash': self._token_hash(calendar.get('feed_token')),
+        })
+        pipeline.execute()
+        return body, {'etag': etag, 'last_modified': int(last_modified)}
+
+# Instancia global de la caché de feeds
+calendar_feed_cache = CalendarFeedCache(redis_client)
+
+def invalidate_calendar_feeds(calendar_ids):
+    """Invalida los feeds ICS de varios calendarios."""
+    for calendar_id in calendar_ids:
+        calendar_feed_cache.invalidate(calendar_id)
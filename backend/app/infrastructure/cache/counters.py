@@ -0,0 +1,80 @@
+# relative path: app/infrastructure/cache/counters.py
+
+from redis.exceptions import WatchError
+from app.infrastructure.cache.redis_client import redis_client
+
+# Incrementa solo si la clave ya existe, para no inventar un valor cuando el contador no está cargado.
+# Si no existe, anota la escritura en KEYS[2] para que una carga en curso (ver load) la detecte.
+_INCR_IF_EXISTS = redis_client.register_script("""
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    local value = redis.call('INCRBY', KEYS[1], ARGV[1])
+    if value < 0 then
+        redis.call('SET', KEYS[1], 0)
+        value = 0
+    end
+    return value
+end
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], 60)
+return nil
+""")
+
+class UnreadNotificationCounter:
+    """Contador de notificaciones no leídas por usuario almacenado en Redis."""
+
+    def __init__(self, client=redis_client):
+        self.client = client
+
+    @staticmethod
+    def _key(user_id):
+        return f"notifications:{user_id}:unread_count"
+
+    @staticmethod
+    def _writes_key(user_id):
+        return f"notifications:{user_id}:unread_count:writes"
+
+    def get(self, user_id):
+        """Devuelve el contador o None si todavía no está cargado en Redis."""
+        value = self.client.get(self._key(user_id))
+        return int(value) if value is not None else None
+
+    def load(self, user_id, compute):
+        """Calcula el contador con `compute()` (MongoDB) y lo carga sin pisar uno existente.
+
+        El cálculo se hace bajo WATCH de la clave y de sus escrituras pendientes: si
+        llega un incremento mientras se cuenta, no se guarda el valor (podría no
+        incluirlo) y la siguiente lectura vuelve a cargarlo. Devuelve el valor calculado.
+        """
+        with self.client.pipeline() as pipeline:
+            try:
+                pipeline.watch(self._key(user_id), self._writes_key(user_id))
+                value = int(compute())
+                pipeline.multi()
+                pipeline.set(self._key(user_id), value, nx=True)
+                pipeline.execute()
+            except WatchError:
+                pass
+        return value
+
+    def incr(self, user_id, amount=1):
+        """Incrementa (o decrementa con amount negativo) de forma atómica."""
+        if amount:
+            _INCR_IF_EXISTS(keys=[self._key(user_id), self._writes_key(user_id)], args=[amount], client=self.client)
+
+    def decr(self, user_id, amount=1):
+        self.incr(user_id, -amount)
+
+    def forget(self, user_ids):
+        """Descarta los contadores para que la siguiente lectura los recalcule desde MongoDB."""
+        if user_ids:
+            self.client.delete(*[self._key(user_id) for user_id in user_ids])
+
+    def incr_many(self, user_ids, amount=1):
+        """Incrementa el contador de varios usuarios en un único pipeline."""
+        pipeline = self.client.pipeline(transaction=False)
+        for user_id in user_ids:
+            _INCR_IF_EXISTS(keys=[self._key(user_id), self._writes_key(user_id)], args=[amount], client=pipeline)
+        pipeline.execute()
+
+# Instancia global del contador
+unread_counter = UnreadNotificationCounter()
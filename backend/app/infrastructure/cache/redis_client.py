@@ -1,24 +1,95 @@
 # relative path: app/infrastructure/cache/redis_client.py
 
+import time
 import redis
 from app.core.config import Config  # Importar la configuración
+from app.infrastructure.metrics import redis_command_duration, record_timing, record_cache_lookup
+
+# Comandos de lectura cuyo resultado cuenta como acierto o fallo de caché
+CACHE_READ_COMMANDS = ('GET', 'HGETALL')
+
+class InstrumentedRedis(redis.StrictRedis):
+    """Cliente Redis que mide cada comando y los aciertos/fallos de caché por familia de claves."""
+
+    def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            result = super().execute_command(*args, **options)
+        finally:
+            seconds = time.perf_counter() - start
+            redis_command_duration.observe(seconds, str(args[0]).upper())
+            record_timing('redis', seconds)
+        if str(args[0]).upper() in CACHE_READ_COMMANDS and len(args) > 1:
+            record_cache_lookup(args[1], bool(result))
+        return result
+
+class LazyScript:
+    """Script Lua que se registra en el cliente real la primera vez que se ejecuta."""
+
+    def __init__(self, redis_client, script):
+        self.redis_client = redis_client
+        self.script = script
+        self._script = None
+
+    def __call__(self, keys=[], args=[], client=None):
+        if self._script is None:
+            self._script = self.redis_client.client.register_script(self.script)
+        return self._script(keys=keys, args=args, client=client)
 
 class RedisClient:
+    """Cliente Redis perezoso: la conexión se crea en el primer comando, no al importar.
+
+    La URL sale de la configuración de la aplicación (init_app); sin ella se usa
+    Config.REDIS_URL. El pool de redis-py detecta los fork y abre conexiones nuevas
+    en cada worker.
+    """
+
     def __init__(self):
-        redis_url = Config.REDIS_URL  # Obtener la URL de Redis desde la configuración
-        self.client = redis.StrictRedis.from_url(redis_url, decode_responses=True)
+        self._client = None
+        self._url = None
+        self._connection_pool = None
+
+    def init_app(self, app):
+        self.configure(url=app.config['REDIS_URL'])
 
-    def get(self, key):
-        """Obtiene un valor de Redis."""
-        return self.client.get(key)
+    def configure(self, url=None, connection_pool=None):
+        """Cambia el destino del cliente; el siguiente comando usa la nueva conexión."""
+        self._url = url
+        self._connection_pool = connection_pool
+        self._client = None
 
-    def set(self, key, value, ex=None):
-        """Guarda un valor en Redis con una opción de expiración."""
-        return self.client.set(key, value, ex=ex)
+    @property
+    def client(self):
+        if self._client is None:
+            if self._connection_pool is not None:
+                self._client = InstrumentedRedis(connection_pool=self._connection_pool)
+            else:
+                self._client = InstrumentedRedis.from_url(self._url or Config.REDIS_URL, decode_responses=True)
+        return self._client
 
-    def delete(self, key):
-        """Elimina un valor de Redis."""
-        return self.client.delete(key)
+    def register_script(self, script):
+        return LazyScript(self, script)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
 
 # Instancia global del cliente Redis
-redis_client = RedisClient().client
+redis_client = RedisClient()
+
+def get_generation(name):
+    """Devuelve la generación actual de una familia de claves de caché."""
+    return redis_client.get(f"generation:{name}") or '0'
+
+# Funciones que se llaman con el nombre de la familia justo antes de incrementar su generación
+_generation_bump_hooks = []
+
+def on_generation_bump(hook):
+    """Registra una función que se ejecuta antes de cada bump_generation (p. ej. las vallas de lectura causal)."""
+    if hook not in _generation_bump_hooks:
+        _generation_bump_hooks.append(hook)
+
+def bump_generation(name):
+    """Invalida todas las claves de una familia incrementando su generación (O(1), sin SCAN)."""
+    for hook in _generation_bump_hooks:
+        hook(name)
+    return redis_client.incr(f"generation:{name}")
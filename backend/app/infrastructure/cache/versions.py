@@ -0,0 +1,57 @@
+# relative path: app/infrastructure/cache/versions.py
+
+from bson.objectid import ObjectId
+from app.infrastructure.cache.redis_client import redis_client
+
+# Las versiones se recalculan desde MongoDB como mucho tras este tiempo
+VERSION_TTL_SECONDS = 60 * 60
+
+# Guarda la versión solo si es mayor que la existente: una lectura lenta no puede pisar una escritura posterior
+_SET_IF_GREATER = redis_client.register_script("""
+local current = tonumber(redis.call('GET', KEYS[1]))
+local candidate = tonumber(ARGV[1])
+if current == nil or candidate > current then
+    redis.call('SET', KEYS[1], candidate, 'EX', ARGV[2])
+    return candidate
+end
+return current
+""")
+
+class DocumentVersionCache:
+    """Copia en Redis del campo `version` de los documentos, para validar ETags sin consultar MongoDB."""
+
+    def __init__(self, client=redis_client):
+        self.client = client
+
+    @staticmethod
+    def _key(collection, document_id):
+        return f"version:{collection}:{document_id}"
+
+    def get(self, collection, document_id):
+        """Devuelve la versión cacheada o None si no está en Redis."""
+        value = self.client.get(self._key(collection, document_id))
+        return int(value) if value is not None else None
+
+    def remember(self, collection, document_id, version):
+        """Guarda la versión leída de MongoDB (solo si es más reciente que la cacheada)."""
+        return int(_SET_IF_GREATER(keys=[self._key(collection, document_id)], args=[int(version), VERSION_TTL_SECONDS], client=self.client))
+
+    def refresh(self, db, collection, document_id):
+        """Lee la versión actual del documento en MongoDB y la guarda en Redis.
+
+        Devuelve None si el documento no existe.
+        """
+        if not ObjectId.is_valid(document_id):
+            return None
+        document = db[collection].find_one({'_id': ObjectId(document_id)}, {'version': 1})
+        if document is None:
+            self.forget(collection, document_id)
+            return None
+        return self.remember(collection, document_id, document.get('version', 0))
+
+    def forget(self, collection, document_id):
+        """Elimina la versión cacheada (documento borrado)."""
+        self.client.delete(self._key(collection, document_id))
+
+# Instancia global de la caché de versiones
+document_versions = DocumentVersionCache()
@@ -0,0 +1,193 @@
+# relative path: app/infrastructure/causal_reads.py
+
+import base64
+import bson
+from bson.raw_bson import RawBSONDocument
+from flask import g, has_request_context
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from pymongo import monitoring
+from app.core.read_preferences import read_policies
+from app.infrastructure.cache.redis_client import redis_client, on_generation_bump
+
+# Comandos cuya respuesta marca el momento de una escritura
+WRITE_COMMANDS = ('insert', 'update', 'delete', 'findAndModify')
+
+USER_FENCE_KEY = 'causal:fence:user:{}'
+GENERATION_FENCE_KEY = 'causal:fence:generation:{}'
+
+# Guarda la valla solo si es posterior a la actual (los workers escriben en cualquier orden)
+_ADVANCE_FENCE = redis_client.register_script("""
+local time = tonumber(redis.call('HGET', KEYS[1], 'time') or '-1')
+local inc = tonumber(redis.call('HGET', KEYS[1], 'inc') or '-1')
+local new_time, new_inc = tonumber(ARGV[1]), tonumber(ARGV[2])
+if new_time > time or (new_time == time and new_inc > inc) then
+    redis.call('HSET', KEYS[1], 'time', ARGV[1], 'inc', ARGV[2], 'fence', ARGV[3])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+""")
+
+def _request_user():
+    """ID del usuario autenticado de la petición o None (las rutas públicas no exigen JWT)."""
+    if not has_request_context():
+        return None
+    try:
+        verify_jwt_in_request(optional=True)
+        return get_jwt_identity()
+    except Exception:
+        return None
+
+def _encode(fence):
+    return base64.b64encode(bson.encode(fence)).decode('ascii')
+
+def _decode(encoded):
+    if not encoded:
+        return None
+    try:
+        # Sin reconvertir tipos: el $clusterTime firmado debe volver al servidor tal cual
+        return RawBSONDocument(base64.b64decode(encoded))
+    except Exception:
+        return None
+
+class CausalReads:
+    """Lectura de las escrituras ya confirmadas cuando los listados se leen de secundarios.
+
+    Las escrituras de una petición dejan una "valla" con su operationTime y
+    $clusterTime. El listener solo la guarda en `g` (sin ir a Redis por cada
+    escritura) y se persiste en Redis una vez por petición:
+
+    - la del usuario, en after_request (o en el teardown si la petición falla),
+      le garantiza leer sus propias escrituras;
+    - la de una familia de caché, justo antes de cada bump_generation de la
+      petición: quien lee un listado con la generación nueva (ETag o clave de
+      caché) parte de la valla de las escrituras que la produjeron, así que no
+      guarda ni valida un resultado anterior a ellas.
+
+    Las lecturas LISTING se hacen en una sesión causalmente consistente que parte
+    de la valla del usuario y de las de las generaciones del listado; el
+    secundario espera a haber replicado esas escrituras antes de responder. Las
+    vallas caducan al superar el retraso máximo admitido de los secundarios, cuando
+    ya no hacen falta. Solo los replica sets devuelven los tiempos de operación:
+    con un servidor standalone no se crea ninguna sesión.
+    """
+
+    def __init__(self, redis):
+        self.redis = redis
+
+    def init_app(self, app):
+        on_generation_bump(self.fence_generation)
+
+        @app.after_request
+        def flush_causal_fence(response):
+            self.flush()
+            return response
+
+        @app.teardown_request
+        def end_causal_session(exc):
+            # Escrituras de una petición fallida o del cuerpo en streaming
+            self.flush()
+            # En las respuestas en streaming se ejecuta al terminar de enviar el cuerpo
+            session = g.pop('causal_session', None)
+            if session is not None:
+                session.end_session()
+
+    def fence_ttl(self):
+        return read_policies.max_staleness_seconds + 30
+
+    def buffer(self, operation_time, cluster_time):
+        """Conserva en la petición la valla de su escritura más reciente (sin acceder a Redis)."""
+        if not has_request_context():
+            return
+        current = g.get('causal_fence')
+        if current is None or (operation_time.time, operation_time.inc) > (current['operation_time'].time, current['operation_time'].inc):
+            g.causal_fence = {'operation_time': operation_time, 'cluster_time': cluster_time}
+
+    def _advance(self, key, fence):
+        operation_time = fence['operation_time']
+        _ADVANCE_FENCE(keys=[key], args=[operation_time.time, operation_time.inc, _encode(fence), self.fence_ttl()])
+
+    def flush(self):
+        """Guarda la valla de las escrituras de la petición como valla del usuario autenticado."""
+        fence = g.pop('causal_fence', None) if has_request_context() else None
+        if fence is None:
+            return
+        user_id = _request_user()
+        if not user_id:
+            return
+        try:
+            self._advance(USER_FENCE_KEY.format(user_id), fence)
+        except Exception as e:
+            print(f"No se pudo registrar la valla de lectura causal: {e}")
+
+    def fence_generation(self, name):
+        """Asocia la valla de la petición a la generación que va a incrementarse (ver bump_generation)."""
+        fence = g.get('causal_fence') if has_request_context() else None
+        if fence is None:
+            return
+        try:
+            self._advance(GENERATION_FENCE_KEY.format(name), fence)
+        except Exception as e:
+            print(f"No se pudo registrar la valla de lectura causal: {e}")
+
+    def fences(self, user_id=None, generations=()):
+        """Vallas del usuario y de las generaciones indicadas (un único round trip a Redis)."""
+        keys = [GENERATION_FENCE_KEY.format(name) for name in generations]
+        if user_id:
+            keys.append(USER_FENCE_KEY.format(user_id))
+        if not keys:
+            return []
+        pipeline = self.redis.pipeline()
+        for key in keys:
+            pipeline.hget(key, 'fence')
+        fences = [_decode(encoded) for encoded in pipeline.execute()]
+        return [fence for fence in fences if fence is not None]
+
+    def session(self, db, *generations):
+        """Sesión causal para las lecturas LISTING de la petición actual, o None si no hace falta.
+
+        `generations` son las familias de caché de las que depende el listado (las de
+        su ETag o su clave de caché). La sesión dura hasta el final de la petición
+        (también si la respuesta se envía en streaming desde el cursor).
+        """
+        if not read_policies.routes_to_secondaries:
+            return None
+        session = g.get('causal_session')
+        if session is not None:
+            return session
+        fences = self.fences(_request_user(), generations)
+        if not fences:
+            return None
+        session = db.client.start_session(causal_consistency=True)
+        for fence in fences:
+            # Las sesiones conservan el mayor de los tiempos recibidos
+            session.advance_cluster_time(fence['cluster_time'])
+            session.advance_operation_time(fence['operation_time'])
+        g.causal_session = session
+        return session
+
+class CausalWriteListener(monitoring.CommandListener):
+    """Guarda en la petición la valla de cada escritura confirmada (ver CausalReads)."""
+
+    def __init__(self, causal_reads):
+        self.causal_reads = causal_reads
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        if event.command_name not in WRITE_COMMANDS or not read_policies.routes_to_secondaries:
+            return
+        reply = event.reply or {}
+        operation_time = reply.get('operationTime')
+        cluster_time = reply.get('$clusterTime')
+        if operation_time is None or cluster_time is None:
+            return
+        # Sin round trips a Redis: se persiste en el bump_generation y al terminar la petición
+        self.causal_reads.buffer(operation_time, cluster_time)
+
+    def failed(self, event):
+        pass
+
+# Instancias globales: el listener se pasa a MongoClient(event_listeners=[...]); init_app registra el volcado de vallas y el cierre de sesiones
+causal_reads = CausalReads(redis_client)
+causal_write_listener = CausalWriteListener(causal_reads)
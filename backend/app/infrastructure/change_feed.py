@@ -0,0 +1,286 @@
+# relative path: app/infrastructure/change_feed.py
+
+import json
+import secrets
+import time
+from datetime import datetime
+from bson import ObjectId
+from flask import current_app
+from pymongo.errors import OperationFailure
+from app.domain.calendar.use_cases import CalendarUseCases
+from app.domain.reply.use_cases import ReplyUseCases
+from app.infrastructure.db import get_use_cases
+from app.infrastructure.cache.redis_client import redis_client, bump_generation
+from app.infrastructure.cache.versions import document_versions
+from app.infrastructure.cache.calendar_feed import invalidate_calendar_feeds
+from app.infrastructure.websockets.socketio import socketio
+
+# Colecciones cuyas escrituras invalidan cachés o se publican en tiempo real
+WATCHED_COLLECTIONS = ('events', 'communities', 'calendars', 'comments', 'replies')
+
+# Colecciones que guardan la imagen previa: al borrar hace falta saber a qué evento pertenecían
+PRE_IMAGE_COLLECTIONS = ('comments', 'replies')
+
+# El historial del oplog ya no contiene el token guardado: no se puede reanudar
+CHANGE_STREAM_HISTORY_LOST = 286
+CHANGE_STREAM_FATAL_ERROR = 280
+
+# Prefijos de clave que se descartan si se pierde el historial de cambios
+CACHE_PREFIXES = ('event:', 'community:', 'calendar:', 'calendar_feed:', 'version:', 'comments:', 'replies:', 'discussion:')
+
+# Eventos de Socket.IO publicados por colección y operación
+REALTIME_EVENTS = {
+    'events': {'insert': 'event_created', 'update': 'event_updated', 'delete': 'event_deleted'},
+    'communities': {'insert': 'community_created', 'update': 'community_updated', 'delete': 'community_deleted'},
+    'calendars': {'insert': 'calendar_created', 'update': 'calendar_updated', 'delete': 'calendar_deleted'},
+}
+
+# Renueva el liderazgo solo si la clave sigue perteneciendo a este consumidor
+_RENEW_LEADERSHIP = redis_client.register_script("""
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+""")
+
+def serialize_doc(doc):
+    """
+    Recursively convierte ObjectId en strings dentro de un documento.
+    """
+    if isinstance(doc, list):
+        return [serialize_doc(item) for item in doc]
+    elif isinstance(doc, dict):
+        new_doc = {}
+        for key, value in doc.items():
+            if isinstance(value, ObjectId):
+                new_doc[key] = str(value)
+            elif isinstance(value, dict) or isinstance(value, list):
+                new_doc[key] = serialize_doc(value)
+            else:
+                new_doc[key] = value
+        return new_doc
+    else:
+        return doc
+
+class ChangePublisher:
+    """Punto único de invalidación de cachés y publicación en tiempo real tras una escritura.
+
+    Lo usa el consumidor del change stream y, si el change feed está desactivado,
+    los controladores a través de record_change().
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def apply(self, collection, operation, document_id, document=None, previous=None):
+        """Aplica un cambio: `operation` es 'insert', 'update' o 'delete'."""
+        handler = getattr(self, f"_on_{collection}", None)
+        if handler is not None:
+            handler(operation, str(document_id), document or {}, previous or {})
+
+    def _sync_version(self, collection, document_id, operation, document):
+        if operation == 'delete':
+            document_versions.forget(collection, document_id)
+        elif 'version' in document:
+            document_versions.remember(collection, document_id, document['version'])
+        else:
+            document_versions.refresh(self.db, collection, document_id)
+
+    def _publish(self, collection, operation, payload):
+        event_name = REALTIME_EVENTS.get(collection, {}).get(operation)
+        if event_name:
+            socketio.emit(event_name, payload)
+
+    def _on_events(self, operation, event_id, document, previous):
+        redis_client.delete(f"event:{event_id}")
+        self._sync_version('events', event_id, operation, document)
+        bump_generation('events')
+        # Los calendarios siguen referenciando el evento aunque se haya borrado
+        invalidate_calendar_feeds(get_use_cases(CalendarUseCases, self.db).list_calendar_ids_for_event(event_id))
+        self._publish('events', operation, {"event_id": event_id})
+
+    def _on_communities(self, operation, community_id, document, previous):
+        redis_client.delete(f"community:{community_id}")
+        self._sync_version('communities', community_id, operation, document)
+        bump_generation('communities')
+        self._publish('communities', operation, {"community_id": community_id})
+
+    def _on_calendars(self, operation, calendar_id, document, previous):
+        redis_client.delete(f"calendar:{calendar_id}")
+        self._sync_version('calendars', calendar_id, operation, document)
+        bump_generation('calendars')
+        invalidate_calendar_feeds([calendar_id])
+        self._publish('calendars', operation, {"calendar_id": calendar_id})
+
+    def _on_comments(self, operation, comment_id, document, previous):
+        event_id = document.get('event') or previous.get('event')
+        if not event_id and operation != 'delete':
+            event_id = get_use_cases(ReplyUseCases, self.db).get_comment_event_id(comment_id)
+        redis_client.delete(f"comments:{comment_id}")
+        if event_id:
+            bump_generation(f"discussion:{event_id}")
+        if operation == 'insert':
+            # Las fechas del documento del change stream se envían como texto
+            comment = json.loads(json.dumps(serialize_doc(document), default=str))
+            socketio.emit('new_comment', {'event_id': str(event_id), 'comment': comment})
+        elif operation == 'delete':
+            socketio.emit('comment_deleted', {"comment_id": comment_id})
+
+    def _on_replies(self, operation, reply_id, document, previous):
+        reply_use_cases = get_use_cases(ReplyUseCases, self.db)
+        comment_id = document.get('parent_comment') or previous.get('parent_comment')
+        if not comment_id and operation != 'delete':
+            reply = reply_use_cases.reply_repository.get_reply_by_id(reply_id) or {}
+            comment_id = reply.get('parent_comment') if isinstance(reply, dict) else None
+        redis_client.delete(f"replies:{reply_id}")
+        if comment_id:
+            for key in redis_client.scan_iter(f"replies:{comment_id}:page:*"):
+                redis_client.delete(key)
+            event_id = reply_use_cases.get_comment_event_id(comment_id)
+            if event_id:
+                bump_generation(f"discussion:{event_id}")
+        if operation == 'insert':
+            socketio.emit('new_reply', {'comment_id': str(comment_id), 'reply_id': reply_id})
+        elif operation == 'update':
+            socketio.emit('reply_updated', {"reply_id": reply_id})
+        else:
+            socketio.emit('reply_deleted', {'reply_id': reply_id})
+
+    def invalidate_all(self):
+        """Descarta todas las cachés derivadas (cuando no se puede reanudar el change stream)."""
+        for name in ('events', 'communities', 'calendars'):
+            bump_generation(name)
+        for prefix in CACHE_PREFIXES:
+            for key in redis_client.scan_iter(f"{prefix}*", count=1000):
+                redis_client.delete(key)
+
+def record_change(db, collection, operation, document_id, document=None, previous=None):
+    """Invalida cachés y publica el cambio desde el controlador, salvo que lo haga el change feed.
+
+    Con CHANGE_FEED_ENABLED el consumidor del change stream ve todas las escrituras
+    (también las que no pasan por un controlador) y esta llamada no hace nada.
+    """
+    if current_app.config.get('CHANGE_FEED_ENABLED'):
+        return
+    ChangePublisher(db).apply(collection, operation, document_id, document, previous)
+
+class ResumeTokenStore:
+    """Guarda en MongoDB el último resume token procesado de cada consumidor."""
+
+    def __init__(self, db, name):
+        self.state = db.change_stream_state
+        self.name = name
+
+    def load(self):
+        state = self.state.find_one({'_id': self.name})
+        return state.get('resume_token') if state else None
+
+    def save(self, token):
+        self.state.update_one(
+            {'_id': self.name},
+            {'$set': {'resume_token': token, 'updated_at': datetime.utcnow()}},
+            upsert=True
+        )
+
+    def clear(self):
+        self.state.delete_one({'_id': self.name})
+
+class ChangeFeedConsumer:
+    """Consume el change stream de la base de datos y aplica cada cambio con ChangePublisher.
+
+    El resume token se guarda tras procesar los cambios (cada `checkpoint_every`
+    cambios o `checkpoint_seconds`), así que al reiniciar se reanuda desde el último
+    punto confirmado: ningún cambio se pierde, aunque alguno puede aplicarse dos
+    veces (las invalidaciones son idempotentes). Solo un consumidor por nombre está
+    activo a la vez gracias a un liderazgo en Redis con expiración.
+    """
+
+    def __init__(self, db, name='cache-invalidation', collections=WATCHED_COLLECTIONS,
+                 checkpoint_every=100, checkpoint_seconds=1.0, leadership_seconds=30):
+        self.db = db
+        self.name = name
+        self.collections = tuple(collections)
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_seconds = checkpoint_seconds
+        self.leadership_seconds = leadership_seconds
+        self.publisher = ChangePublisher(db)
+        self.tokens = ResumeTokenStore(db, name)
+        self.leader_key = f"change_feed:{name}:leader"
+        self.leader_token = secrets.token_hex(8)
+
+    def ensure_setup(self):
+        """Activa las imágenes previas en las colecciones que las necesitan (MongoDB 6.0+)."""
+        for collection in PRE_IMAGE_COLLECTIONS:
+            try:
+                self.db.command('collMod', collection, changeStreamPreAndPostImages={'enabled': True})
+            except OperationFailure as e:
+                print(f"No se pudieron activar las imágenes previas en {collection}: {e}")
+
+    def acquire_leadership(self):
+        if redis_client.set(self.leader_key, self.leader_token, nx=True, ex=self.leadership_seconds):
+            return True
+        return bool(_RENEW_LEADERSHIP(keys=[self.leader_key], args=[self.leader_token, self.leadership_seconds]))
+
+    def release_leadership(self):
+        if redis_client.get(self.leader_key) == self.leader_token:
+            redis_client.delete(self.leader_key)
+
+    def _open_stream(self, resume_token):
+        pipeline = [{'$match': {
+            'ns.coll': {'$in': list(self.collections)},
+            'operationType': {'$in': ['insert', 'update', 'replace', 'delete']},
+        }}]
+        return self.db.watch(
+            pipeline,
+            full_document='updateLookup',
+            full_document_before_change='whenAvailable',
+            resume_after=resume_token,
+            max_await_time_ms=1000
+        )
+
+    def handle(self, change):
+        operation = change['operationType']
+        operation = 'update' if operation == 'replace' else operation
+        self.publisher.apply(
+            change['ns']['coll'],
+            operation,
+            change['documentKey']['_id'],
+            change.get('fullDocument'),
+            change.get('fullDocumentBeforeChange')
+        )
+
+    def run(self, should_stop=lambda: False):
+        """Procesa cambios hasta que `should_stop()` devuelva True."""
+        resume_token = self.tokens.load()
+        try:
+            stream = self._open_stream(resume_token)
+        except OperationFailure as e:
+            if resume_token is None or e.code not in (CHANGE_STREAM_HISTORY_LOST, CHANGE_STREAM_FATAL_ERROR):
+                raise
+            # El token es demasiado antiguo: se descarta todo lo cacheado y se empieza desde ahora
+            print(f"No se puede reanudar el change stream ({e}); invalidando todas las cachés")
+            self.publisher.invalidate_all()
+            self.tokens.clear()
+            stream = self._open_stream(None)
+
+        with stream:
+            pending, last_checkpoint, saved_token = 0, time.monotonic(), resume_token
+            last_renewal = 0
+            while not should_stop():
+                if time.monotonic() - last_renewal >= self.leadership_seconds / 3:
+                    if not self.acquire_leadership():
+                        print("Otro consumidor del change feed es el líder; deteniendo este")
+                        break
+                    last_renewal = time.monotonic()
+
+                change = stream.try_next()
+                if change is not None:
+                    self.handle(change)
+                    pending += 1
+
+                # El token avanza aunque no haya cambios (postBatchResumeToken): se guarda igualmente
+                token = stream.resume_token
+                due = pending >= self.checkpoint_every or time.monotonic() - last_checkpoint >= self.checkpoint_seconds
+                if token is not None and token != saved_token and (due or change is None):
+                    self.tokens.save(token)
+                    saved_token, pending, last_checkpoint = token, 0, time.monotonic()
@@ -0,0 +1,173 @@
+# relative path: app/infrastructure/cli.py
+
+import json
+import sys
+import time
+import click
+from app.infrastructure.db import get_db_instance, get_use_cases
+from app.infrastructure.cache.counters import unread_counter
+from app.domain.notification.retention import NotificationRetention
+from app.domain.calendar.reminders import ReminderScheduler
+from app.domain.event.use_cases import EventUseCases, BULK_FORMATS
+from app.domain.event.day_counts import EventDayCounts
+from app.domain.analytics.rollup import EngagementRollup
+from app.domain.like.repositories import LikeRepository, TARGET_COLLECTIONS
+from app.domain.membership.repositories import MembershipRepository
+from app.infrastructure.websockets.publisher import reminder_publisher
+from app.infrastructure.slow_queries import slow_query_log
+from app.infrastructure.indexes import ensure_indexes
+from app.infrastructure.change_feed import ChangeFeedConsumer
+
+def register_commands(app):
+    """Registra los comandos de mantenimiento en el CLI de Flask (`flask <comando>`)."""
+
+    @app.cli.command('notifications-compact')
+    @click.option('--compact', 'run_compact', is_flag=True, help='Ejecuta también el comando compact de MongoDB.')
+    def notifications_compact(run_compact):
+        """Archiva las notificaciones no leídas antiguas e informa del espacio recuperado."""
+        db = get_db_instance()
+        retention = NotificationRetention(
+            db,
+            unread_counter,
+            read_ttl_days=app.config.get('NOTIFICATION_READ_TTL_DAYS'),
+            unread_archive_days=app.config.get('NOTIFICATION_UNREAD_ARCHIVE_DAYS')
+        )
+        retention.ensure_indexes()
+        report = retention.compact(run_compact=run_compact)
+        click.echo(json.dumps(report, indent=2))
+
+    @app.cli.command('likes-migrate')
+    @click.option('--batch-size', type=int, default=1000, help='Likes insertados por lote.')
+    def likes_migrate(batch_size):
+        """Mueve los arrays `likes` de comentarios y respuestas a la colección de likes."""
+        db = get_db_instance()
+        like_repository = LikeRepository(db)
+        like_repository.ensure_indexes()
+        for target_type in TARGET_COLLECTIONS:
+            migrated = like_repository.migrate_embedded_likes(target_type, batch_size)
+            click.echo(f"{target_type}: {migrated} documentos migrados")
+
+    @app.cli.command('memberships-migrate')
+    @click.option('--batch-size', type=int, default=1000, help='Membresías insertadas por lote.')
+    def memberships_migrate(batch_size):
+        """Mueve los arrays `subscribers` de calendarios y `members` de comunidades a la colección de membresías."""
+        db = get_db_instance()
+        membership_repository = MembershipRepository(db)
+        membership_repository.ensure_indexes(migrate=False)
+        # Se fuerza el recorrido aunque un arranque anterior haya dejado ya el marcador
+        migrated = membership_repository.migrate_all_embedded_members(batch_size, force=True)
+        for parent_type, count in migrated.items():
+            click.echo(f"{parent_type}: {count} documentos migrados")
+
+    @app.cli.command('events-import')
+    @click.argument('source', type=click.File('r', encoding='utf-8'))
+    @click.option('--format', 'file_format', type=click.Choice(BULK_FORMATS), default=None, help='Formato del fichero (por defecto, según la extensión).')
+    @click.option('--community', default=None, help='Comunidad para las filas que no la indiquen.')
+    @click.option('--created-by', default=None, help='Usuario creador para las filas que no lo indiquen.')
+    def events_import(source, file_format, community, created_by):
+        """Importa eventos desde un fichero NDJSON o CSV (`-` para la entrada estándar)."""
+        file_format = file_format or ('csv' if source.name.endswith('.csv') else 'ndjson')
+        defaults = {key: value for key, value in (('community', community), ('created_by', created_by)) if value}
+        summary = get_use_cases(EventUseCases).import_events(
+            source, file_format, defaults, batch_size=app.config.get('EVENT_IMPORT_BATCH_SIZE', 1000)
+        )
+        click.echo(json.dumps(summary, indent=2, default=str))
+        if "error" in summary:
+            sys.exit(1)
+
+    @app.cli.command('events-export')
+    @click.option('--format', 'file_format', type=click.Choice(BULK_FORMATS), default='ndjson', help='Formato de salida.')
+    @click.option('--community', default=None, help='Exporta solo los eventos de esta comunidad.')
+    def events_export(file_format, community):
+        """Escribe los eventos en la salida estándar en NDJSON o CSV."""
+        for chunk in get_use_cases(EventUseCases).export_events(community, file_format):
+            click.echo(chunk, nl=False)
+
+    @app.cli.command('event-days-rebuild')
+    @click.option('--community', default=None, help='Recalcula solo esta comunidad.')
+    def event_days_rebuild(community):
+        """Recalcula desde los eventos el rollup por comunidad y día de la vista mensual."""
+        day_counts = EventDayCounts(get_db_instance())
+        day_counts.ensure_indexes()
+        written = day_counts.rebuild(community)
+        click.echo(f"{written} días escritos")
+
+    @app.cli.command('ensure-indexes')
+    def ensure_indexes_command():
+        """Crea los índices de MongoDB (una vez por despliegue, antes de arrancar los workers)."""
+        started = time.perf_counter()
+        ensure_indexes(get_db_instance())
+        click.echo(f"Índices asegurados en {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    @app.cli.command('change-feed-worker')
+    @click.option('--retry-seconds', type=float, default=5, help='Espera antes de reanudar tras un error.')
+    def change_feed_worker(retry_seconds):
+        """Consume el change stream de MongoDB: invalida cachés y publica los cambios en tiempo real."""
+        consumer = ChangeFeedConsumer(get_db_instance(), checkpoint_every=app.config.get('CHANGE_FEED_CHECKPOINT_EVERY', 100))
+        consumer.ensure_setup()
+        try:
+            while True:
+                try:
+                    consumer.run()
+                except Exception as e:
+                    # Se reanuda desde el último resume token guardado: no se pierde ningún cambio
+                    print(f"Error en el change feed: {e}")
+                time.sleep(retry_seconds)
+        finally:
+            consumer.release_leadership()
+
+    @app.cli.command('slow-queries')
+    @click.option('--limit', type=int, default=20, help='Número de formas de consulta a mostrar.')
+    @click.option('--reset', is_flag=True, help='Borra el ranking después de mostrarlo.')
+    def slow_queries(limit, reset):
+        """Muestra el ranking de formas de consulta lentas con su resumen de explain()."""
+        click.echo(json.dumps(slow_query_log.report(limit), indent=2))
+        if reset:
+            click.echo(f"Formas eliminadas: {slow_query_log.reset()}", err=True)
+
+    @app.cli.command('reminders-worker')
+    @click.option('--once', is_flag=True, help='Procesa los recordatorios vencidos y termina.')
+    @click.option('--batch-size', type=int, default=None, help='Recordatorios reclamados por lote.')
+    def reminders_worker(once, batch_size):
+        """Entrega los recordatorios vencidos (notificación + Socket.IO) sondeando por ventanas de tiempo."""
+        db = get_db_instance()
+        scheduler = ReminderScheduler(db, unread_counter, reminder_publisher, lease_seconds=app.config.get('REMINDER_LEASE_SECONDS', 60))
+        scheduler.ensure_indexes()
+        batch_size = batch_size or app.config.get('REMINDER_BATCH_SIZE', 500)
+        interval = app.config.get('REMINDER_POLL_INTERVAL_SECONDS', 5)
+
+        while True:
+            sent = scheduler.run_once(batch_size)
+            if sent:
+                click.echo(f"Recordatorios enviados: {sent}")
+            if once:
+                break
+            time.sleep(interval)
+
+    @app.cli.command('analytics-rollup')
+    @click.option('--once', is_flag=True, help='Procesa la actividad pendiente y termina.')
+    def analytics_rollup(once):
+        """Agrega la actividad nueva desde la marca de agua en los buckets por hora y día de las analíticas."""
+        rollup = EngagementRollup(
+            get_db_instance(),
+            lag_seconds=app.config.get('ANALYTICS_ROLLUP_LAG_SECONDS', 120),
+            window_seconds=app.config.get('ANALYTICS_ROLLUP_WINDOW_SECONDS', 3600),
+            lease_seconds=app.config.get('ANALYTICS_ROLLUP_LEASE_SECONDS', 300)
+        )
+        rollup.ensure_indexes()
+        interval = app.config.get('ANALYTICS_ROLLUP_INTERVAL_SECONDS', 60)
+
+        while True:
+            try:
+                processed = rollup.run_once()
+                if processed:
+                    click.echo(f"Ventanas agregadas: {processed}")
+            except Exception as e:
+                # La ventana en curso se repite en la siguiente pasada sin contarse dos veces
+                print(f"Error en el rollup de analíticas: {e}")
+                processed = 0
+            if once and not processed:
+                break
+            # Si quedan ventanas atrasadas se siguen procesando sin esperar
+            if not processed:
+                time.sleep(interval)
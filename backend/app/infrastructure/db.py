@@ -1,19 +1,68 @@
+import os
+import threading
 from pymongo import MongoClient
 from flask import current_app
+from app.infrastructure.metrics import mongo_command_listener  # Métricas de los comandos de MongoDB
+from app.infrastructure.slow_queries import slow_query_listener  # Registro de consultas lentas
+from app.infrastructure.causal_reads import causal_write_listener  # Momento de las escrituras de la petición
+
+# Un MongoClient por proceso y URI: el cliente mantiene su propio pool de conexiones
+_clients = {}
+_clients_lock = threading.Lock()
+
+# Casos de uso compartidos por proceso: (clase, cliente, base de datos) -> instancia
+_use_cases = {}
+
+def get_mongo_client(mongo_uri):
+    """Devuelve el cliente compartido para la URI, creándolo (sin conectar) en el primer uso."""
+    client = _clients.get(mongo_uri)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(mongo_uri)
+            if client is None:
+                client = MongoClient(mongo_uri, connect=False, event_listeners=[mongo_command_listener, slow_query_listener, causal_write_listener])
+                _clients[mongo_uri] = client
+    return client
+
+def close_clients():
+    """Cierra los clientes del proceso (por ejemplo, antes de hacer fork de los workers)."""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+        _use_cases.clear()
+
+def _forget_clients_after_fork():
+    # Los clientes de pymongo no son seguros tras un fork: el hijo crea los suyos
+    global _clients_lock
+    _clients.clear()
+    _use_cases.clear()
+    _clients_lock = threading.Lock()
+
+os.register_at_fork(after_in_child=_forget_clients_after_fork)
 
 def get_db_instance():
-    """Establece y devuelve la conexión a la base de datos MongoDB utilizando la configuración de Flask."""
-    
+    """Devuelve la base de datos MongoDB configurada en Flask usando el cliente compartido del proceso."""
+
     # Obtener la URI de MongoDB desde la configuración de Flask
-    mongo_uri = current_app.config['MONGODB_URI']
-    
-    # Establecer la conexión a MongoDB
-    client = MongoClient(mongo_uri)
-    
+    client = get_mongo_client(current_app.config['MONGODB_URI'])
+
     # Obtener el nombre de la base de datos desde la configuración de Flask
-    db_name = current_app.config.get('MONGODB_DB_NAME', 'Calendar') 
-    
+    db_name = current_app.config.get('MONGODB_DB_NAME', 'Calendar')
+
     # Obtener la instancia de la base de datos específica
-    db = client[db_name]
-    
-    return db
+    return client[db_name]
+
+def get_use_cases(use_cases_class, db=None):
+    """Devuelve la instancia de los casos de uso compartida por el proceso para `db`.
+
+    Los casos de uso y sus repositorios no guardan estado de la petición (solo las
+    colecciones del cliente compartido), así que se construyen una vez por base de
+    datos en lugar de en cada petición. Sin `db` se usa la de la aplicación actual.
+    """
+    db = db if db is not None else get_db_instance()
+    key = (use_cases_class, id(db.client), db.name)
+    instance = _use_cases.get(key)
+    if instance is None:
+        instance = _use_cases.setdefault(key, use_cases_class(db))
+    return instance
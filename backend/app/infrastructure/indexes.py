@@ -0,0 +1,41 @@
+# relative path: app/infrastructure/indexes.py
+
+from app.domain.event.repositories import EventRepository
+from app.domain.event.day_counts import EventDayCounts
+from app.domain.analytics.repositories import AnalyticsRepository
+from app.domain.community.repositories import CommunityRepository
+from app.domain.comment.repositories import CommentRepository
+from app.domain.like.repositories import LikeRepository
+from app.domain.membership.repositories import MembershipRepository
+from app.domain.moderation.repositories import ModerationRepository
+from app.domain.notification.repositories import NotificationRepository
+from app.domain.notification.fanout import NotificationFanout
+from app.domain.notification.retention import NotificationRetention
+from app.domain.calendar.reminders import ReminderScheduler
+from app.domain.calendar.repositories import CalendarRepository
+from app.domain.rating.repositories import RatingRepository
+from app.domain.user.repositories import UserRepository
+
+# Componentes que declaran sus índices con ensure_indexes()
+INDEXED_COMPONENTS = (
+    EventRepository,
+    EventDayCounts,
+    AnalyticsRepository,
+    CommunityRepository,
+    CommentRepository,
+    LikeRepository,
+    MembershipRepository,
+    ModerationRepository,
+    NotificationRepository,
+    NotificationFanout,
+    NotificationRetention,
+    ReminderScheduler,
+    CalendarRepository,
+    RatingRepository,
+    UserRepository,
+)
+
+def ensure_indexes(db):
+    """Crea (de forma idempotente) los índices que necesitan los repositorios."""
+    for component_class in INDEXED_COMPONENTS:
+        component_class(db).ensure_indexes()
@@ -0,0 +1,175 @@
+# relative path: app/infrastructure/metrics.py
+
+import threading
+from flask import g, has_request_context
+from pymongo import monitoring
+
+# Límites (en segundos) de los histogramas de latencia
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class Counter:
+    """Contador monótono con etiquetas (formato de texto de Prometheus)."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labels, label_values)} {value}"
+
+class Gauge:
+    """Valor instantáneo con etiquetas (se sobrescribe en cada set)."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, *label_values):
+        with self._lock:
+            self._values[label_values] = value
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labels, label_values)} {value}"
+
+class Histogram:
+    """Histograma de duraciones con buckets acumulados, suma y recuento por combinación de etiquetas."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                series = self._values[label_values] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def samples(self):
+        with self._lock:
+            values = {key: {'buckets': list(s['buckets']), 'sum': s['sum'], 'count': s['count']} for key, s in self._values.items()}
+        for label_values, series in sorted(values.items()):
+            for bound, count in zip(self.buckets, series['buckets']):
+                labels = _format_labels(self.labels, label_values, 'le="%s"' % bound)
+                yield f"{self.name}_bucket{labels} {count}"
+            labels = _format_labels(self.labels, label_values, 'le="+Inf"')
+            yield f"{self.name}_bucket{labels} {series['count']}"
+            yield f"{self.name}_sum{_format_labels(self.labels, label_values)} {series['sum']}"
+            yield f"{self.name}_count{_format_labels(self.labels, label_values)} {series['count']}"
+
+class MetricsRegistry:
+    """Registro de métricas del proceso; se expone en /metrics."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Devuelve todas las métricas en el formato de exposición de texto de Prometheus."""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+# Registro global y métricas de la aplicación
+registry = MetricsRegistry()
+
+http_request_duration = registry.register(Histogram(
+    'http_request_duration_seconds', 'Latencia de las peticiones HTTP por ruta', ('method', 'route', 'status')))
+mongo_command_duration = registry.register(Histogram(
+    'mongodb_command_duration_seconds', 'Duración de los comandos de MongoDB', ('command', 'collection')))
+mongo_command_failures = registry.register(Counter(
+    'mongodb_command_failures_total', 'Comandos de MongoDB fallidos', ('command', 'collection')))
+redis_command_duration = registry.register(Histogram(
+    'redis_command_duration_seconds', 'Duración de los comandos de Redis', ('command',)))
+cache_requests = registry.register(Counter(
+    'cache_requests_total', 'Lecturas de caché en Redis por familia de claves y resultado', ('family', 'result')))
+socketio_emits = registry.register(Counter(
+    'socketio_emits_total', 'Mensajes emitidos por Socket.IO', ('event',)))
+startup_duration = registry.register(Gauge(
+    'app_startup_seconds', 'Duración de cada fase del arranque de la aplicación', ('phase',)))
+
+def record_timing(component, seconds):
+    """Acumula tiempo y número de operaciones de un componente en la petición actual (Server-Timing)."""
+    if not has_request_context():
+        return
+    timings = g.setdefault('timings', {})
+    count, total = timings.get(component, (0, 0.0))
+    timings[component] = (count + 1, total + seconds)
+
+def record_cache_lookup(key, hit):
+    """Registra un acierto o fallo de caché; la familia es el prefijo de la clave (`events:filter:...` -> `events`)."""
+    family = str(key).split(':', 1)[0] if key else 'unknown'
+    cache_requests.inc(family, 'hit' if hit else 'miss')
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Mide cada comando que envía pymongo y lo atribuye a la petición HTTP en curso."""
+
+    def __init__(self):
+        self._collections = {}
+
+    def started(self, event):
+        command = event.command
+        collection = command.get('collection') if event.command_name == 'getMore' else command.get(event.command_name)
+        self._collections[event.request_id] = collection if isinstance(collection, str) else ''
+
+    def _finish(self, event):
+        collection = self._collections.pop(event.request_id, '')
+        seconds = event.duration_micros / 1_000_000
+        mongo_command_duration.observe(seconds, event.command_name, collection)
+        record_timing('mongo', seconds)
+        return collection
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        collection = self._finish(event)
+        mongo_command_failures.inc(event.command_name, collection)
+
+# Instancia global: se pasa a MongoClient(event_listeners=[...])
+mongo_command_listener = MongoCommandListener()
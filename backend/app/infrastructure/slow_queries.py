@@ -0,0 +1,243 @@
+# relative path: app/infrastructure/slow_queries.py
+
+import hashlib
+import json
+import queue
+import random
+import threading
+import time
+from pymongo import MongoClient, monitoring
+from app.core.config import Config  # Importar la configuración
+from app.infrastructure.cache.redis_client import redis_client  # Importar cliente Redis
+
+RANKING_KEY = 'slow_queries:total_ms'
+MAX_KEY = 'slow_queries:max_ms'
+SHAPE_KEY = 'slow_queries:shape:{}'
+
+# Campos que definen la forma de cada tipo de comando (los valores concretos se descartan)
+SHAPE_FIELDS = {
+    'find': ('filter', 'sort', 'projection'),
+    'aggregate': ('pipeline',),
+    'count': ('query',),
+    'distinct': ('key', 'query'),
+    'findAndModify': ('query', 'sort'),
+}
+
+# Comandos que admiten explain()
+EXPLAINABLE_COMMANDS = ('find', 'aggregate', 'count', 'distinct', 'findAndModify', 'update', 'delete')
+
+# Comandos de control que nunca se registran
+IGNORED_COMMANDS = ('hello', 'isMaster', 'ismaster', 'ping', 'endSessions', 'killCursors', 'saslStart', 'saslContinue', 'explain')
+
+# Campos de sesión o de escritura que explain() no acepta
+EXPLAIN_EXCLUDED_FIELDS = ('lsid', 'txnNumber', 'autocommit', 'startTransaction', 'writeConcern', 'readConcern')
+
+def normalize_value(value):
+    """Sustituye los valores por '?' conservando operadores y nombres de campo."""
+    if isinstance(value, dict):
+        return {key: normalize_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        if any(isinstance(item, dict) for item in value):
+            return [normalize_value(item) for item in value]
+        return '?'  # Listas de valores ($in, $nin...): su longitud no cambia la forma
+    return '?'
+
+def query_shape(command_name, command):
+    """Forma normalizada de un comando: tipo, colección y estructura del filtro/pipeline."""
+    if command_name == 'getMore':
+        collection = command.get('collection')
+    else:
+        collection = command.get(command_name)
+    shape = {'command': command_name, 'collection': collection if isinstance(collection, str) else ''}
+    if command_name in ('update', 'delete'):
+        statements = command.get('updates' if command_name == 'update' else 'deletes') or [{}]
+        shape['filter'] = normalize_value(statements[0].get('q', {}))
+    for field in SHAPE_FIELDS.get(command_name, ()):
+        if field in command:
+            # Sort, projection y key son estructurales: se conservan tal cual
+            shape[field] = command[field] if field in ('sort', 'projection', 'key') else normalize_value(command[field])
+    return shape
+
+def shape_id(shape):
+    return hashlib.sha1(json.dumps(shape, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+def _find_key(document, key):
+    """Busca recursivamente la primera aparición de una clave (el formato de explain varía según el comando)."""
+    if isinstance(document, dict):
+        if key in document:
+            return document[key]
+        values = document.values()
+    elif isinstance(document, list):
+        values = document
+    else:
+        return None
+    for value in values:
+        found = _find_key(value, key)
+        if found is not None:
+            return found
+    return None
+
+def summarize_explain(explain):
+    """Resume la salida de explain(): etapas del plan ganador, índice usado y documentos examinados vs devueltos."""
+    plan = _find_key(explain, 'winningPlan') or {}
+    plan = plan.get('queryPlan', plan)  # Motor SBE: el plan clásico va dentro de queryPlan
+    stages, index_name = [], None
+    while isinstance(plan, dict) and plan.get('stage'):
+        stages.append(plan['stage'])
+        index_name = index_name or plan.get('indexName')
+        plan = plan.get('inputStage') or (plan.get('inputStages') or [None])[0]
+    stats = _find_key(explain, 'executionStats') or {}
+    return {
+        'stages': stages,
+        'index': index_name,
+        'docs_examined': stats.get('totalDocsExamined'),
+        'keys_examined': stats.get('totalKeysExamined'),
+        'returned': stats.get('nReturned'),
+        'execution_ms': stats.get('executionTimeMillis'),
+    }
+
+class SlowQueryLog:
+    """Agrega las operaciones lentas por forma en Redis (compartido entre workers) y captura explain() por muestreo.
+
+    El listener de pymongo solo encola: las escrituras en Redis y los explain()
+    se hacen en un hilo de fondo para no alargar la petición que ya es lenta.
+    """
+
+    def __init__(self, redis, mongo_uri=None, queue_size=1000):
+        self.redis = redis
+        self.mongo_uri = mongo_uri or Config.MONGODB_URI
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._worker = None
+        self._lock = threading.Lock()
+        self._explain_client = None
+
+    def init_app(self, app):
+        self.mongo_uri = app.config['MONGODB_URI']
+        self._explain_client = None
+
+    def submit(self, database, shape, milliseconds, command=None):
+        """Encola una operación lenta; `command` solo se pasa si se ha muestreado para explain()."""
+        try:
+            self._queue.put_nowait((database, shape, milliseconds, command))
+        except queue.Full:
+            return  # Con la cola llena se descartan muestras antes que bloquear peticiones
+        self._ensure_worker()
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='slow-query-log', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            database, shape, milliseconds, command = self._queue.get()
+            try:
+                self.record(shape, milliseconds)
+                if command is not None:
+                    self.capture_explain(database, shape, command)
+            except Exception as e:
+                print(f"Error registrando consulta lenta: {e}")
+
+    def record(self, shape, milliseconds):
+        """Suma la operación al ranking de su forma."""
+        identifier = shape_id(shape)
+        key = SHAPE_KEY.format(identifier)
+        pipe = self.redis.pipeline()
+        pipe.zincrby(RANKING_KEY, milliseconds, identifier)
+        pipe.zadd(MAX_KEY, {identifier: milliseconds}, gt=True)
+        pipe.hset(key, mapping={'shape': json.dumps(shape, default=str), 'last_seen': int(time.time())})
+        pipe.hincrby(key, 'count', 1)
+        pipe.execute()
+
+    def capture_explain(self, database, shape, command):
+        """Ejecuta explain(executionStats) con un cliente propio (sin listeners) y guarda el resumen."""
+        if self._explain_client is None:
+            self._explain_client = MongoClient(self.mongo_uri)
+        explainable = {key: value for key, value in command.items()
+                       if not key.startswith('$') and key not in EXPLAIN_EXCLUDED_FIELDS}
+        explain = self._explain_client[database].command('explain', explainable, verbosity='executionStats')
+        summary = summarize_explain(explain)
+        self.redis.hset(SHAPE_KEY.format(shape_id(shape)), mapping={
+            'explain': json.dumps(summary, default=str),
+            'explained_at': int(time.time()),
+        })
+
+    def report(self, limit=20):
+        """Ranking de formas de consulta lentas por tiempo total acumulado."""
+        ranking = self.redis.zrevrange(RANKING_KEY, 0, limit - 1, withscores=True)
+        if not ranking:
+            return []
+        pipe = self.redis.pipeline()
+        for identifier, _ in ranking:
+            pipe.hgetall(SHAPE_KEY.format(identifier))
+            pipe.zscore(MAX_KEY, identifier)
+        results = pipe.execute()
+
+        report = []
+        for index, (identifier, total_ms) in enumerate(ranking):
+            details, max_ms = results[2 * index], results[2 * index + 1]
+            count = int(details.get('count', 0)) or 1
+            report.append({
+                'shape_id': identifier,
+                'shape': json.loads(details['shape']) if details.get('shape') else None,
+                'count': count,
+                'total_ms': round(total_ms, 1),
+                'avg_ms': round(total_ms / count, 1),
+                'max_ms': round(max_ms or 0, 1),
+                'last_seen': int(details['last_seen']) if details.get('last_seen') else None,
+                'explain': json.loads(details['explain']) if details.get('explain') else None,
+            })
+        return report
+
+    def reset(self):
+        """Borra el ranking y las formas registradas."""
+        identifiers = self.redis.zrange(RANKING_KEY, 0, -1)
+        keys = [SHAPE_KEY.format(identifier) for identifier in identifiers]
+        self.redis.delete(RANKING_KEY, MAX_KEY, *keys)
+        return len(identifiers)
+
+class SlowQueryListener(monitoring.CommandListener):
+    """Detecta los comandos de MongoDB que superan el umbral y los envía al registro de consultas lentas."""
+
+    def __init__(self, log, threshold_ms=100, explain_sample_rate=0.1):
+        self.log = log
+        self.threshold_ms = threshold_ms
+        self.explain_sample_rate = explain_sample_rate
+        self._commands = {}
+
+    def init_app(self, app):
+        self.threshold_ms = app.config.get('SLOW_QUERY_THRESHOLD_MS', self.threshold_ms)
+        self.explain_sample_rate = app.config.get('SLOW_QUERY_EXPLAIN_SAMPLE_RATE', self.explain_sample_rate)
+
+    def started(self, event):
+        if event.command_name not in IGNORED_COMMANDS:
+            self._commands[event.request_id] = event.command
+
+    def _finish(self, event):
+        command = self._commands.pop(event.request_id, None)
+        if command is None:
+            return
+        milliseconds = event.duration_micros / 1000
+        if milliseconds < self.threshold_ms:
+            return
+        shape = query_shape(event.command_name, command)
+        print(f"[slow-query] {milliseconds:.1f} ms {json.dumps(shape, default=str)}")
+        sampled = event.command_name in EXPLAINABLE_COMMANDS and random.random() < self.explain_sample_rate
+        self.log.submit(event.database_name, shape, milliseconds, command if sampled else None)
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event)
+
+# Instancias globales: el listener se pasa a MongoClient(event_listeners=[...]); init_app aplica la configuración de la app
+slow_query_log = SlowQueryLog(redis_client)
+slow_query_listener = SlowQueryListener(
+    slow_query_log,
+    threshold_ms=Config.SLOW_QUERY_THRESHOLD_MS,
+    explain_sample_rate=Config.SLOW_QUERY_EXPLAIN_SAMPLE_RATE
+)
@@ -0,0 +1,43 @@
+# relative path: app/infrastructure/web/admin_controller.py
+
+from functools import wraps
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.infrastructure.db import get_db_instance
+from app.infrastructure.slow_queries import slow_query_log  # Ranking de consultas lentas
+from bson import ObjectId
+
+admin_controller = Blueprint('admin_controller', __name__)
+
+def admin_required(view):
+    """Restringe la ruta a usuarios con rol de administrador."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            user = get_db_instance().users.find_one({'_id': ObjectId(get_jwt_identity())}, {'role': 1})
+        except Exception:
+            user = None
+        if not user or user.get('role') != 'admin':
+            return jsonify({"error": "No tienes permisos de administrador"}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+# Ruta para obtener el ranking de formas de consulta lentas
+@admin_controller.route('/api/admin/slow-queries', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_slow_queries():
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    try:
+        return jsonify(slow_query_log.report(limit)), 200
+    except Exception as e:
+        print(f"Error en la ruta /api/admin/slow-queries: {str(e)}")
+        return jsonify({"error": f"Error interno del servidor: {str(e)}"}), 500
+
+# Ruta para reiniciar el ranking de consultas lentas
+@admin_controller.route('/api/admin/slow-queries', methods=['DELETE'])
+@jwt_required()
+@admin_required
+def reset_slow_queries():
+    removed = slow_query_log.reset()
+    return jsonify({"message": "Ranking de consultas lentas reiniciado", "removed": removed}), 200
@@ -0,0 +1,70 @@
+# relative path: app/infrastructure/web/analytics_controller.py
+
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.domain.analytics.use_cases import AnalyticsUseCases
+from app.infrastructure.db import get_db_instance, get_use_cases
+from bson import ObjectId
+
+analytics_controller = Blueprint('analytics_controller', __name__)
+
+def serialize_doc(doc):
+    """
+    Recursively convierte ObjectId en strings dentro de un documento.
+    """
+    if isinstance(doc, list):
+        return [serialize_doc(item) for item in doc]
+    elif isinstance(doc, dict):
+        new_doc = {}
+        for key, value in doc.items():
+            if isinstance(value, ObjectId):
+                new_doc[key] = str(value)
+            elif isinstance(value, dict) or isinstance(value, list):
+                new_doc[key] = serialize_doc(value)
+            else:
+                new_doc[key] = value
+        return new_doc
+    else:
+        return doc
+
+def trends_response(result):
+    """Respuesta de una consulta de tendencias con el código de estado según el error."""
+    if "error" in result:
+        if "acceso" in result["error"]:
+            status = 403
+        elif "no encontrado" in result["error"]:
+            status = 404
+        else:
+            status = 400
+        return jsonify(result), status
+    return jsonify(serialize_doc(result)), 200
+
+# Ruta para obtener las tendencias de actividad de una comunidad (buckets por hora o día)
+@analytics_controller.route('/api/communities/<community_id>/analytics', methods=['GET'])
+@jwt_required()
+def get_community_analytics(community_id):
+    db = get_db_instance()
+    analytics_use_cases = get_use_cases(AnalyticsUseCases, db)
+    result = analytics_use_cases.get_community_trends(
+        community_id,
+        get_jwt_identity(),
+        request.args.get('granularity', 'day'),
+        request.args.get('from'),
+        request.args.get('to')
+    )
+    return trends_response(result)
+
+# Ruta para obtener las tendencias de actividad de un evento (buckets por hora o día)
+@analytics_controller.route('/api/events/<event_id>/analytics', methods=['GET'])
+@jwt_required()
+def get_event_analytics(event_id):
+    db = get_db_instance()
+    analytics_use_cases = get_use_cases(AnalyticsUseCases, db)
+    result = analytics_use_cases.get_event_trends(
+        event_id,
+        get_jwt_identity(),
+        request.args.get('granularity', 'day'),
+        request.args.get('from'),
+        request.args.get('to')
+    )
+    return trends_response(result)
@@ -1,11 +1,17 @@
 # relative path: app/infrastructure/web/calendar_controller.py
 
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required
+from datetime import datetime, timezone
+from flask import Blueprint, Response, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.domain.calendar.use_cases import CalendarUseCases
-from app.infrastructure.db import get_db_instance  # Asume que get_db_instance devuelve una instancia de la base de datos
+from app.infrastructure.db import get_db_instance, get_use_cases  # Asume que get_db_instance devuelve una instancia de la base de datos
 from app.infrastructure.cache.redis_client import redis_client  # Importar la instancia global de Redis
+from app.infrastructure.cache.calendar_feed import calendar_feed_cache  # Caché y validadores de los feeds ICS
+from app.infrastructure.change_feed import record_change  # Invalidación de cachés y avisos en tiempo real
+from app.infrastructure.causal_reads import causal_reads  # Sesiones causales para las lecturas desde secundarios
+from app.infrastructure.web.conditional import document_version, document_not_modified, with_document_etag, list_etag, not_modified, with_list_etag
 from app.infrastructure.websockets.socketio import socketio  # Importar la instancia global de SocketIO
+from app.domain.calendar.ics import render_calendar
 from bson import ObjectId
 import json
 
@@ -30,12 +36,16 @@ def serialize_doc(doc):
     else:
         return doc
 
+def refresh_calendar_version(db, calendar_id):
+    """Tras modificar un calendario: detalle cacheado, versión (ETag), listados, feed ICS y aviso `calendar_updated`."""
+    record_change(db, 'calendars', 'update', calendar_id)
+
 # Ruta para crear un nuevo calendario
 @calendar_controller.route('/api/calendars/create', methods=['POST'])
 @jwt_required()
 def create_calendar():
     db = get_db_instance()
-    calendar_use_cases = CalendarUseCases(db)
+    calendar_use_cases = get_use_cases(CalendarUseCases, db)
     calendar_data = request.get_json()
     
     # Crear el calendario
@@ -46,12 +56,8 @@ def create_calendar():
     # Obtener el ID del calendario creado
     calendar_id = str(result) if isinstance(result, ObjectId) else result
     
-    # Notificar a través de WebSocket usando la instancia global de SocketIO
-    socketio.emit('calendar_created', {"calendar_id": calendar_id})
-    
-    # Serializar los datos antes de almacenarlos en Redis
-    serialized_data = serialize_doc(calendar_data)
-    redis_client.set(f"calendar:{calendar_id}", json.dumps(serialized_data))
+    # Invalidar los listados en caché y notificar por WebSocket (o dejarlo al change feed)
+    record_change(db, 'calendars', 'insert', calendar_id)
     
     return jsonify({"message": "Calendario creado exitosamente", "calendar_id": calendar_id}), 201
 
@@ -59,7 +65,13 @@ def create_calendar():
 @calendar_controller.route('/api/calendars/<calendar_id>', methods=['GET'])
 def get_calendar_details(calendar_id):
     db = get_db_instance()
-    calendar_use_cases = CalendarUseCases(db)
+    calendar_use_cases = get_use_cases(CalendarUseCases, db)
+
+    # El cliente ya tiene la versión actual: 304 sin leer el documento
+    version = document_version(db, 'calendars', calendar_id)
+    cached_response = document_not_modified('calendars', calendar_id, version)
+    if cached_response:
+        return cached_response
     
     # Buscar en Redis primero
     cached_calendar = redis_client.get(f"calendar:{calendar_id}")
@@ -68,43 +80,38 @@ def get_calendar_details(calendar_id):
         # Convertir la cadena JSON almacenada en Redis a un diccionario
         try:
             calendar = json.loads(cached_calendar)
-            return jsonify(calendar), 200
+            return with_document_etag(jsonify(calendar), 'calendars', calendar_id, version), 200
         except json.JSONDecodeError:
             pass  # Si hay un error en la decodificación, proceder a buscar en la base de datos
     
     # Si no está en Redis, buscar en la base de datos
     calendar = calendar_use_cases.get_calendar_details(calendar_id)
-    if not calendar:
+    if not calendar or "error" in calendar:
         return jsonify({"error": "Calendario no encontrado"}), 404
     
-    # Serializar el documento
+    # Serializar el documento (el token del feed privado no se expone)
     serialized_calendar = serialize_doc(calendar)
+    serialized_calendar.pop('feed_token', None)
     
     # Almacenar en Redis para la próxima vez
-    redis_client.set(f"calendar:{calendar_id}", json.dumps(serialized_calendar))
+    redis_client.set(f"calendar:{calendar_id}", json.dumps(serialized_calendar, default=str))
     
-    return jsonify(serialized_calendar), 200
+    return with_document_etag(jsonify(serialized_calendar), 'calendars', calendar_id, version), 200
 
 # Ruta para actualizar los detalles de un calendario existente
 @calendar_controller.route('/api/calendars/update/<calendar_id>', methods=['PUT'])
 @jwt_required()
 def update_calendar(calendar_id):
     db = get_db_instance()
-    calendar_use_cases = CalendarUseCases(db)
+    calendar_use_cases = get_use_cases(CalendarUseCases, db)
     new_data = request.get_json()
     
-    result = calendar_use_cases.update_calendar(calendar_id, new_data)
+    result = calendar_use_cases.update_calendar(get_jwt_identity(), calendar_id, new_data)
     if "error" in result:
         return jsonify(result), 400
     
-    # Serializar los nuevos datos
-    serialized_data = serialize_doc(new_data)
-    
-    # Actualizar en Redis después de actualizar en la base de datos
-    redis_client.set(f"calendar:{calendar_id}", json.dumps(serialized_data))
-    
-    # Notificar a través de WebSocket que se actualizó un calendario
-    socketio.emit('calendar_updated', {"calendar_id": calendar_id})
+    # Descartar el detalle cacheado y publicar la nueva versión del calendario
+    refresh_calendar_version(db, calendar_id)
     
     return jsonify({"message": "Calendario actualizado exitosamente"}), 200
 
@@ -113,15 +120,12 @@ def update_calendar(calendar_id):
 @jwt_required()
 def delete_calendar(calendar_id):
     db = get_db_instance()
-    calendar_use_cases = CalendarUseCases(db)
+    calendar_use_cases = get_use_cases(CalendarUseCases, db)
     
-    result = calendar_use_cases.delete_calendar(calendar_id)
-    if result:
-        # Eliminar del cache Redis
-        redis_client.delete(f"calendar:{calendar_id}")
-        
-        # Notificar a través de WebSocket que se eliminó un calendario
-        socketio.emit('calendar_deleted', {"calendar_id": calendar_id})
+    result = calendar_use_cases.delete_calendar(get_jwt_identity(), calendar_id)
+    if "error" not in result:
+        # Eliminar del cache Redis, invalidar el feed y los listados y notificar por WebSocket
+        record_change(db, 'calendars', 'delete', calendar_id)
         
         return jsonify({"message": "Calendario eliminado exitosamente"}), 200
     
@@ -132,100 +136,203 @@ def delete_calendar(calendar_id):
 @jwt_required()
 def add_event_to_calendar(calendar_id):
     db = get_db_instance()
-    calendar_use_cases = CalendarUseCases(db)
+    calendar_use_cases = get_use_cases(CalendarUseCases, db)
     data = request.get_json()
     event_id = data.get('event_id')
     
-    result = calendar_use_cases.add_event_to_calendar(calendar_id, event_id)
-    if result:
+    result = calendar_use_cases.add_event_to_calendar(get_jwt_identity(), calendar_id, event_id)
+    if "error" not in result:
         # Convertir ObjectId a string si es necesario
         event_id_str = str(event_id) if isinstance(event_id, ObjectId) else event_id
+
+        # El feed ICS del calendario debe volver a renderizarse
+        refresh_calendar_version(db, calendar_id)
         
         # Notificar a través de WebSocket que se añadió un evento
         socketio.emit('event_added_to_calendar', {"calendar_id": calendar_id, "event_id": event_id_str})
         
         return jsonify({"message": "Evento añadido exitosamente al calendario"}), 200
     
-    return jsonify({"error": "Error al añadir el evento al calendario"}), 400
+    return jsonify(result), 400
 
 # Ruta para eliminar un evento de un calendario
 @calendar_controller.route('/api/calendars/<calendar_id>/remove-event/<event_id>', methods=['DELETE'])
 @jwt_required()
 def remove_event_from_calendar(calendar_id, event_id):
     db = get_db_instance()
-    calendar_use_cases = CalendarUseCases(db)
+    calendar_use_cases = get_use_cases(CalendarUseCases, db)
     
-    result = calendar_use_cases.remove_event_from_calendar(calendar_id, event_id)
-    if result:
+    result = calendar_use_cases.remove_event_from_calendar(get_jwt_identity(), calendar_id, event_id)
+    if "error" not in result:
         event_id_str = str(event_id) if isinstance(event_id, ObjectId) else event_id
+
+        # El feed ICS del calendario debe volver a renderizarse
+        refresh_calendar_version(db, calendar_id)
         
         # Notificar a través de WebSocket que se eliminó un evento
         socketio.emit('event_removed_from_calendar', {"calendar_id": calendar_id, "event_id": event_id_str})
         
         return jsonify({"message": "Evento eliminado exitosamente del calendario"}), 200
     
-    return jsonify({"error": "Error al eliminar el evento del calendario"}), 400
+    return jsonify(result), 400
 
-# Ruta para listar los suscriptores de un calendario con paginación
+# Ruta para listar los suscriptores de un calendario con paginación por cursor
 @calendar_controller.route('/api/calendars/<calendar_id>/subscribers', methods=['GET'])
 @jwt_required()
 def list_calendar_subscribers(calendar_id):
     db = get_db_instance()
-    calendar_use_cases = CalendarUseCases(db)
-    page = request.args.get('page', 1, type=int)
-    limit = request.args.get('limit', 10, type=int)
+    calendar_use_cases = get_use_cases(CalendarUseCases, db)
+    after = request.args.get('after')  # Cursor: `next_cursor` de la página anterior
+    limit = min(request.args.get('limit', 50, type=int), 100)
+
+    if after and not ObjectId.is_valid(after):
+        return jsonify({"error": "Cursor no válido"}), 400
     
-    result = calendar_use_cases.list_calendar_subscribers(calendar_id, page, limit)
+    result = calendar_use_cases.list_calendar_subscribers(calendar_id, after, limit)
+    if "error" in result:
+        return jsonify(result), 400
     
     # Serializar los documentos antes de enviarlos
     serialized_result = serialize_doc(result)
     
     return jsonify(serialized_result), 200
 
+# Ruta para suscribirse a un calendario
+@calendar_controller.route('/api/calendars/<calendar_id>/subscribe', methods=['POST'])
+@jwt_required()
+def subscribe_to_calendar(calendar_id):
+    db = get_db_instance()
+    calendar_use_cases = get_use_cases(CalendarUseCases, db)
+    user_id = get_jwt_identity()
+
+    result = calendar_use_cases.subscribe_to_calendar(user_id, calendar_id)
+    if "error" not in result:
+        # El contador de suscriptores forma parte del calendario
+        refresh_calendar_version(db, calendar_id)
+        socketio.emit('calendar_subscribed', {"calendar_id": calendar_id, "user_id": user_id})
+        return jsonify(result), 200
+
+    return jsonify(result), 400
+
+# Ruta para cancelar la suscripción a un calendario
+@calendar_controller.route('/api/calendars/<calendar_id>/subscribe', methods=['DELETE'])
+@jwt_required()
+def unsubscribe_from_calendar(calendar_id):
+    db = get_db_instance()
+    calendar_use_cases = get_use_cases(CalendarUseCases, db)
+    user_id = get_jwt_identity()
+
+    result = calendar_use_cases.unsubscribe_from_calendar(user_id, calendar_id)
+    if "error" not in result:
+        refresh_calendar_version(db, calendar_id)
+        socketio.emit('calendar_unsubscribed', {"calendar_id": calendar_id, "user_id": user_id})
+        return jsonify(result), 200
+
+    return jsonify(result), 400
+
 # Ruta para listar los calendarios públicos con paginación
 @calendar_controller.route('/api/calendars/public', methods=['GET'])
 def list_public_calendars():
     db = get_db_instance()
-    calendar_use_cases = CalendarUseCases(db)
+    calendar_use_cases = get_use_cases(CalendarUseCases, db)
     page = request.args.get('page', 1, type=int)
     limit = request.args.get('limit', 10, type=int)
     
-    result = calendar_use_cases.list_public_calendars(page, limit)
+    # Los listados usan ETags débiles ligados a la generación de calendarios
+    etag = list_etag('calendars')
+    cached_response = not_modified(etag, weak=True)
+    if cached_response:
+        return cached_response
+    
+    result = calendar_use_cases.list_public_calendars(page, limit, causal_reads.session(db, 'calendars'))
     
     # Serializar los documentos antes de enviarlos
     serialized_result = serialize_doc(result)
     
-    return jsonify(serialized_result), 200
+    return with_list_etag(jsonify(serialized_result), etag), 200
 
 # Ruta para generar una URL pública para compartir un calendario
 @calendar_controller.route('/api/calendars/<calendar_id>/share', methods=['POST'])
 @jwt_required()
 def share_calendar(calendar_id):
     db = get_db_instance()
-    calendar_use_cases = CalendarUseCases(db)
+    calendar_use_cases = get_use_cases(CalendarUseCases, db)
     
-    result = calendar_use_cases.share_calendar(calendar_id)
-    if result:
-        shared_url = result  # Asume que `result` es la URL generada
+    result = calendar_use_cases.share_calendar(get_jwt_identity(), calendar_id)
+    if "error" not in result:
+        shared_url = result['shared_url']
+        refresh_calendar_version(db, calendar_id)
         
         # Notificar a través de WebSocket que se compartió un calendario
         socketio.emit('calendar_shared', {"calendar_id": calendar_id, "shared_url": shared_url})
         
-        return jsonify({"message": "URL pública generada exitosamente", "shared_url": shared_url}), 200
+        return jsonify({"message": "URL pública generada exitosamente", **result}), 200
     
-    return jsonify({"error": "Error al generar la URL pública"}), 400
+    if "permisos" in result["error"]:
+        return jsonify(result), 403
+    if "no encontrado" in result["error"]:
+        return jsonify(result), 404
+    return jsonify(result), 400
+
+def feed_not_modified(validators):
+    """Comprueba If-None-Match / If-Modified-Since contra los validadores del feed."""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(validators['etag'])  # Comparación débil: el feed puede ir comprimido
+    if request.if_modified_since:
+        return request.if_modified_since.timestamp() >= validators['last_modified']
+    return False
+
+def feed_headers(validators):
+    """Cabeceras de caché HTTP del feed."""
+    last_modified = datetime.fromtimestamp(validators['last_modified'], tz=timezone.utc)
+    return {
+        'ETag': f'"{validators["etag"]}"',
+        'Last-Modified': last_modified.strftime('%a, %d %b %Y %H:%M:%S GMT'),
+        'Cache-Control': 'private, max-age=0, must-revalidate',
+    }
+
+# Ruta del feed iCalendar (ICS) para suscribirse desde aplicaciones de calendario externas
+@calendar_controller.route('/calendars/<calendar_id>/feed.ics', methods=['GET'])
+def get_calendar_feed(calendar_id):
+    token = request.args.get('token')
+
+    # Feed vigente en caché: acceso, 304 o cuerpo cacheado sin leer MongoDB
+    validators = calendar_feed_cache.get_fresh_validators(calendar_id)
+    if validators:
+        if not calendar_feed_cache.allows(validators, token):
+            return jsonify({"error": "No tienes acceso a este calendario"}), 403
+        if feed_not_modified(validators):
+            return Response(status=304, headers=feed_headers(validators))
+        body = calendar_feed_cache.get_body(calendar_id)
+        if body is not None:
+            return Response(body, mimetype='text/calendar', headers=feed_headers(validators))
+
+    db = get_db_instance()
+    calendar_use_cases = get_use_cases(CalendarUseCases, db)
+    calendar, events = calendar_use_cases.get_calendar_feed(calendar_id, token)
+    if "error" in calendar:
+        status = 403 if "acceso" in calendar["error"] else 404
+        return jsonify(calendar), status
+
+    # Renderizar desde el cursor y guardar el resultado: la primera respuesta ya lleva los validadores
+    body, validators = calendar_feed_cache.render_and_store(calendar_id, render_calendar(calendar, events), calendar)
+    if feed_not_modified(validators):
+        return Response(status=304, headers=feed_headers(validators))
+    return Response(body, mimetype='text/calendar', headers=feed_headers(validators))
 
 # Ruta para configurar recordatorios de eventos en un calendario
 @calendar_controller.route('/api/calendars/<calendar_id>/set-reminder', methods=['POST'])
 @jwt_required()
 def set_event_reminder(calendar_id):
     db = get_db_instance()
-    calendar_use_cases = CalendarUseCases(db)
+    calendar_use_cases = get_use_cases(CalendarUseCases, db)
     data = request.get_json()
     event_id = data.get('event_id')
     reminder_data = data.get('reminder_data')
     
-    result = calendar_use_cases.set_event_reminder(calendar_id, event_id, reminder_data)
+    result = calendar_use_cases.set_event_reminder(get_jwt_identity(), calendar_id, event_id, reminder_data)
+    if "error" in result:
+        return jsonify(result), 400
     if result:
         event_id_str = str(event_id) if isinstance(event_id, ObjectId) else event_id
         
@@ -235,3 +342,22 @@ def set_event_reminder(calendar_id):
         return jsonify({"message": "Recordatorio configurado exitosamente"}), 200
     
     return jsonify({"error": "Error al configurar el recordatorio"}), 400
+
+
+# Ruta para listar los recordatorios programados de un calendario
+@calendar_controller.route('/api/calendars/<calendar_id>/reminders', methods=['GET'])
+@jwt_required()
+def list_event_reminders(calendar_id):
+    db = get_db_instance()
+    calendar_use_cases = get_use_cases(CalendarUseCases, db)
+    event_id = request.args.get('event_id')
+
+    result = calendar_use_cases.list_event_reminders(get_jwt_identity(), calendar_id, event_id)
+    if isinstance(result, dict) and "error" in result:
+        if "permisos" in result["error"]:
+            return jsonify(result), 403
+        if "no encontrado" in result["error"]:
+            return jsonify(result), 404
+        return jsonify(result), 400
+
+    return jsonify(serialize_doc(result)), 200
@@ -3,9 +3,11 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.domain.comment.use_cases import CommentUseCases
-from app.infrastructure.db import get_db_instance
-from app.infrastructure.cache.redis_client import redis_client  # Asume que tienes un cliente Redis configurado
+from app.domain.moderation.use_cases import ModerationUseCases
+from app.infrastructure.db import get_db_instance, get_use_cases
+from app.infrastructure.cache.redis_client import redis_client, get_generation, bump_generation  # Asume que tienes un cliente Redis configurado
 from app.infrastructure.websockets.socketio import socketio  # Importar instancia de SocketIO
+from app.infrastructure.change_feed import record_change  # Invalidación de cachés y avisos en tiempo real
 from bson import ObjectId
 import json
 
@@ -30,12 +32,17 @@ def serialize_doc(doc):
     else:
         return doc
 
+def invalidate_discussion(event_id):
+    """Invalida todas las páginas cacheadas del hilo de discusión de un evento."""
+    if event_id:
+        bump_generation(f"discussion:{event_id}")
+
 # Ruta para crear un comentario en un evento
 @comment_controller.route('/api/comments/<event_id>', methods=['POST'])
 @jwt_required()
 def create_comment(event_id):
     db = get_db_instance()
-    comment_use_cases = CommentUseCases(db)
+    comment_use_cases = get_use_cases(CommentUseCases, db)
     comment_data = request.get_json()
     comment_data['user_id'] = get_jwt_identity()  # Añade el ID del usuario autenticado
 
@@ -47,13 +54,12 @@ def create_comment(event_id):
     # Serializar el resultado
     serialized_result = serialize_doc(result)
 
-    # Notificar a los clientes en tiempo real vía WebSocket
-    # Asegurarse de que 'comment' está serializado
-    socketio.emit('new_comment', {'event_id': event_id, 'comment': serialized_result})
-
     # Limpiar la caché de comentarios para este evento, ya que los datos han cambiado
     redis_client.delete(f"comments:{event_id}:page:*")
 
+    # Invalidar el hilo de discusión y notificar en tiempo real (o dejarlo al change feed)
+    record_change(db, 'comments', 'insert', result["_id"], document=serialized_result, previous={'event': event_id})
+
     return jsonify({"message": "Comentario creado exitosamente", "comment_id": str(result["_id"])}), 201
 
 # Ruta para actualizar un comentario
@@ -61,7 +67,7 @@ def create_comment(event_id):
 @jwt_required()
 def update_comment(comment_id):
     db = get_db_instance()
-    comment_use_cases = CommentUseCases(db)
+    comment_use_cases = get_use_cases(CommentUseCases, db)
     new_data = request.get_json()
 
     # Actualizar el comentario
@@ -73,7 +79,7 @@ def update_comment(comment_id):
     serialized_result = serialize_doc(result)
 
     # Limpiar la caché de comentarios relacionados al comentario actualizado
-    redis_client.delete(f"comments:{comment_id}")
+    record_change(db, 'comments', 'update', comment_id)
 
     return jsonify({"message": "Comentario actualizado exitosamente"}), 200
 
@@ -82,16 +88,16 @@ def update_comment(comment_id):
 @jwt_required()
 def delete_comment(comment_id):
     db = get_db_instance()
-    comment_use_cases = CommentUseCases(db)
+    comment_use_cases = get_use_cases(CommentUseCases, db)
+
+    # Obtener el evento antes de eliminar para poder invalidar su hilo de discusión
+    event_id = comment_use_cases.get_comment_event_id(comment_id)
 
     # Eliminar el comentario
     result = comment_use_cases.delete_comment(comment_id)
     if result:
-        # Limpiar la caché de comentarios relacionados al comentario eliminado
-        redis_client.delete(f"comments:{comment_id}")
-        
-        # Emitir notificación de eliminación a través de WebSocket
-        socketio.emit('comment_deleted', {"comment_id": comment_id})
+        # Limpiar la caché del comentario y del hilo y emitir la eliminación por WebSocket
+        record_change(db, 'comments', 'delete', comment_id, previous={'event': event_id})
         
         return jsonify({"message": "Comentario eliminado exitosamente"}), 200
 
@@ -101,7 +107,7 @@ def delete_comment(comment_id):
 @comment_controller.route('/api/comments/<event_id>', methods=['GET'])
 def list_event_comments(event_id):
     db = get_db_instance()
-    comment_use_cases = CommentUseCases(db)
+    comment_use_cases = get_use_cases(CommentUseCases, db)
     page = request.args.get('page', 1, type=int)
     limit = request.args.get('limit', 10, type=int)
 
@@ -121,7 +127,7 @@ def list_event_comments(event_id):
     serialized_comments = [serialize_doc(comment) for comment in comments]
 
     # Almacenar los comentarios en la caché de Redis
-    redis_client.set(cache_key, json.dumps(serialized_comments), ex=60*5)  # Expiración en 5 minutos
+    redis_client.set(cache_key, json.dumps(serialized_comments, default=str), ex=60*5)  # Expiración en 5 minutos
 
     return jsonify(serialized_comments), 200
 
@@ -130,47 +136,99 @@ def list_event_comments(event_id):
 @jwt_required()
 def like_comment(comment_id):
     db = get_db_instance()
-    comment_use_cases = CommentUseCases(db)
+    comment_use_cases = get_use_cases(CommentUseCases, db)
     user_id = get_jwt_identity()
 
     # Registrar el like
     result = comment_use_cases.like_comment(comment_id, user_id)
 
-    if result:
+    if "error" not in result:
         # Limpiar la caché de comentarios relacionados al comentario que ha recibido un like
         redis_client.delete(f"comments:{comment_id}")
+        invalidate_discussion(comment_use_cases.get_comment_event_id(comment_id))
 
         # Emitir evento de like a través de WebSocket
         socketio.emit('comment_liked', {"comment_id": comment_id, "user_id": user_id})
 
         return jsonify({"message": "Like registrado exitosamente"}), 200
 
-    return jsonify({"error": "Error al registrar el like"}), 400
+    return jsonify(result), 400
+
+# Ruta para retirar el like de un comentario
+@comment_controller.route('/api/comments/<comment_id>/like', methods=['DELETE'])
+@jwt_required()
+def unlike_comment(comment_id):
+    db = get_db_instance()
+    comment_use_cases = get_use_cases(CommentUseCases, db)
+    user_id = get_jwt_identity()
+
+    result = comment_use_cases.unlike_comment(comment_id, user_id)
+
+    if "error" not in result:
+        redis_client.delete(f"comments:{comment_id}")
+        invalidate_discussion(comment_use_cases.get_comment_event_id(comment_id))
+
+        # Emitir evento de retirada del like a través de WebSocket
+        socketio.emit('comment_unliked', {"comment_id": comment_id, "user_id": user_id})
+
+        return jsonify(result), 200
+
+    return jsonify(result), 400
 
 # Ruta para listar los likes de un comentario
 @comment_controller.route('/api/comments/<comment_id>/likes', methods=['GET'])
 def list_comment_likes(comment_id):
     db = get_db_instance()
-    comment_use_cases = CommentUseCases(db)
+    comment_use_cases = get_use_cases(CommentUseCases, db)
+    page = request.args.get('page', 1, type=int)
+    limit = min(request.args.get('limit', 50, type=int), 100)
 
-    # Obtener los likes
-    likes = comment_use_cases.get_comment_likes(comment_id)
+    # Obtener una página de los likes
+    likes = comment_use_cases.get_comment_likes(comment_id, page, limit)
+    if isinstance(likes, dict) and "error" in likes:
+        return jsonify(likes), 400
     serialized_likes = [serialize_doc(like) for like in likes]
 
-    return jsonify(serialized_likes), 200
+    response = jsonify(serialized_likes)
+    # El total sale del contador desnormalizado del comentario
+    like_count = comment_use_cases.get_comment_like_count(comment_id)
+    if isinstance(like_count, int):
+        response.headers['X-Total-Count'] = str(like_count)
+    return response, 200
+
+# Ruta para saber qué comentarios de una lista ha marcado el usuario actual
+@comment_controller.route('/api/comments/likes/status', methods=['GET'])
+@jwt_required()
+def get_comment_like_status():
+    db = get_db_instance()
+    comment_use_cases = get_use_cases(CommentUseCases, db)
+    user_id = get_jwt_identity()
+
+    # IDs separados por comas: ?ids=a,b,c
+    comment_ids = [comment_id for comment_id in request.args.get('ids', '').split(',') if comment_id]
+    if not comment_ids:
+        return jsonify({"error": "Debes indicar al menos un ID en 'ids'"}), 400
+    if len(comment_ids) > 100:
+        return jsonify({"error": "Se permiten como máximo 100 IDs por consulta"}), 400
+
+    liked = comment_use_cases.get_liked_comments(user_id, comment_ids)
+    if "error" in liked:
+        return jsonify(liked), 400
+    return jsonify(liked), 200
 
 # Ruta para reportar un comentario inapropiado
 @comment_controller.route('/api/comments/<comment_id>/report', methods=['POST'])
 @jwt_required()
 def report_comment(comment_id):
     db = get_db_instance()
-    comment_use_cases = CommentUseCases(db)
+    comment_use_cases = get_use_cases(CommentUseCases, db)
     report_data = request.get_json()
+    user_id = get_jwt_identity()
 
     # Reportar el comentario
-    result = comment_use_cases.report_comment(comment_id, report_data)
+    result = comment_use_cases.report_comment(comment_id, report_data, user_id)
 
-    if result:
+    if "error" not in result:
         # Limpiar la caché de comentarios relacionados al comentario reportado
         redis_client.delete(f"comments:{comment_id}")
 
@@ -179,4 +237,52 @@ def report_comment(comment_id):
 
         return jsonify({"message": "Comentario reportado exitosamente"}), 200
 
-    return jsonify({"error": "Error al reportar el comentario"}), 400
+    return jsonify(result), 400
+
+# Ruta para listar los comentarios reportados (solo moderadores)
+@comment_controller.route('/api/comments/reported', methods=['GET'])
+@jwt_required()
+def list_reported_comments():
+    db = get_db_instance()
+    if not get_use_cases(ModerationUseCases, db).is_moderator(get_jwt_identity()):
+        return jsonify({"error": "No tienes permisos de moderación"}), 403
+
+    comment_use_cases = get_use_cases(CommentUseCases, db)
+    page = request.args.get('page', 1, type=int)
+    limit = min(request.args.get('limit', 10, type=int), 100)
+
+    comments = comment_use_cases.list_reported_comments(page, limit)
+    if isinstance(comments, dict) and "error" in comments:
+        return jsonify(comments), 400
+    return jsonify([serialize_doc(comment) for comment in comments]), 200
+
+# Ruta para obtener el hilo de discusión de un evento: comentarios, primeras respuestas y likes
+@comment_controller.route('/api/events/<event_id>/discussion', methods=['GET'])
+def get_event_discussion(event_id):
+    db = get_db_instance()
+    comment_use_cases = get_use_cases(CommentUseCases, db)
+    after = request.args.get('after')  # Cursor: ID del último comentario recibido
+    limit = min(request.args.get('limit', 10, type=int), 50)
+    replies_limit = min(request.args.get('replies_limit', 3, type=int), 20)
+
+    if after and not ObjectId.is_valid(after):
+        return jsonify({"error": "Cursor no válido"}), 400
+
+    # Todas las páginas del hilo comparten una generación: cualquier cambio las invalida a la vez
+    generation = get_generation(f"discussion:{event_id}")
+    cache_key = f"discussion:{event_id}:{generation}:{after}:{limit}:{replies_limit}"
+    cached_discussion = redis_client.get(cache_key)
+    if cached_discussion:
+        try:
+            return jsonify(json.loads(cached_discussion)), 200
+        except json.JSONDecodeError:
+            pass  # Si hay un error en la decodificación, proceder a buscar en la base de datos
+
+    discussion = comment_use_cases.get_event_discussion(event_id, after, limit, replies_limit)
+    if "error" in discussion:
+        return jsonify(discussion), 400
+
+    serialized_discussion = serialize_doc(discussion)
+    redis_client.set(cache_key, json.dumps(serialized_discussion, default=str), ex=60*5)  # Expiración en 5 minutos
+
+    return jsonify(serialized_discussion), 200
@@ -1,13 +1,19 @@
 # relative path: app/infrastructure/web/community_controller.py
 
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required
+from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.domain.community.use_cases import CommunityUseCases
-from app.infrastructure.db import get_db_instance  # Asume que get_db_instance devuelve una instancia de la base de datos
-from app.infrastructure.cache.redis_client import redis_client  # Cliente Redis configurado
+from app.infrastructure.db import get_db_instance, get_use_cases  # Asume que get_db_instance devuelve una instancia de la base de datos
+from app.infrastructure.cache.redis_client import redis_client, get_generation  # Cliente Redis configurado
+from app.infrastructure.change_feed import record_change  # Invalidación de cachés y avisos en tiempo real
+from app.infrastructure.causal_reads import causal_reads  # Sesiones causales para las lecturas desde secundarios
+from app.infrastructure.web.conditional import document_version, document_not_modified, with_document_etag, list_etag, not_modified, with_list_etag
+from app.infrastructure.web.streaming import stream_json_array  # Arrays JSON en streaming desde el cursor
 from app.infrastructure.websockets.socketio import socketio  # Instancia de SocketIO
+from app.infrastructure.websockets.presence import presence  # Contadores en vivo de la sala de la comunidad
 from bson import ObjectId
 import json
+from datetime import datetime
 
 community_controller = Blueprint('community_controller', __name__)
 
@@ -35,12 +41,16 @@ def serialize_doc(doc):
     else:
         return doc
     
+def refresh_community_version(db, community_id):
+    """Tras modificar una comunidad: detalle cacheado, versión (ETag), listados y aviso `community_updated`."""
+    record_change(db, 'communities', 'update', community_id)
+
 # Ruta para crear una nueva comunidad
 @community_controller.route('/api/communities/create', methods=['POST'])
 @jwt_required()
 def create_community():
     db = get_db_instance()
-    community_use_cases = CommunityUseCases(db)
+    community_use_cases = get_use_cases(CommunityUseCases, db)
     community_data = request.get_json()
     
     # Crear la comunidad
@@ -51,12 +61,8 @@ def create_community():
     # Obtener el ID de la comunidad creada
     community_id = str(result) if isinstance(result, ObjectId) else result
     
-    # Emitir evento por WebSocket
-    socketio.emit('community_created', {'community_id': community_id})
-    
-    # Serializar los datos antes de almacenarlos en Redis
-    serialized_data = serialize_doc(community_data)
-    redis_client.set(f"community:{community_id}", json.dumps(serialized_data))
+    # Invalidar los listados en caché y emitir el evento por WebSocket (o dejarlo al change feed)
+    record_change(db, 'communities', 'insert', community_id)
     
     return jsonify({"message": "Comunidad creada exitosamente", "community_id": community_id}), 201
 
@@ -64,7 +70,13 @@ def create_community():
 @community_controller.route('/api/communities/<community_id>', methods=['GET'])
 def get_community_details(community_id):
     db = get_db_instance()
-    community_use_cases = CommunityUseCases(db)
+    community_use_cases = get_use_cases(CommunityUseCases, db)
+
+    # El cliente ya tiene la versión actual: 304 sin leer el documento
+    version = document_version(db, 'communities', community_id)
+    cached_response = document_not_modified('communities', community_id, version)
+    if cached_response:
+        return cached_response
 
     # Buscar en Redis primero
     cached_community = redis_client.get(f"community:{community_id}")
@@ -72,43 +84,37 @@ def get_community_details(community_id):
     if cached_community:
         try:
             community = json.loads(cached_community)
-            return jsonify(community), 200
+            return with_document_etag(jsonify(community), 'communities', community_id, version), 200
         except json.JSONDecodeError:
             pass  # Si hay un error en la decodificación, proceder a buscar en la base de datos
 
     # Si no está en Redis, buscar en la base de datos
     community = community_use_cases.get_community_details(community_id)
-    if not community:
+    if not community or "error" in community:
         return jsonify({"error": "Comunidad no encontrada"}), 404
 
     # Serializar el documento
     serialized_community = serialize_doc(community)
     
     # Almacenar en Redis para la próxima vez
-    redis_client.set(f"community:{community_id}", json.dumps(serialized_community))
+    redis_client.set(f"community:{community_id}", json.dumps(serialized_community, default=str))
     
-    return jsonify(serialized_community), 200
+    return with_document_etag(jsonify(serialized_community), 'communities', community_id, version), 200
 
 # Ruta para actualizar los detalles de una comunidad existente
 @community_controller.route('/api/communities/update/<community_id>', methods=['PUT'])
 @jwt_required()
 def update_community(community_id):
     db = get_db_instance()
-    community_use_cases = CommunityUseCases(db)
+    community_use_cases = get_use_cases(CommunityUseCases, db)
     new_data = request.get_json()
     
     result = community_use_cases.update_community(community_id, new_data)
     if "error" in result:
         return jsonify(result), 400
     
-    # Serializar los nuevos datos
-    serialized_data = serialize_doc(result)
-    
-    # Actualizar en Redis después de actualizar en la base de datos
-    redis_client.set(f"community:{community_id}", json.dumps(serialized_data))
-    
-    # Emitir evento por WebSocket que se actualizó una comunidad
-    socketio.emit('community_updated', {"community_id": community_id})
+    # Descartar el detalle cacheado y publicar la nueva versión de la comunidad
+    refresh_community_version(db, community_id)
     
     return jsonify({"message": "Comunidad actualizada exitosamente"}), 200
 
@@ -117,15 +123,12 @@ def update_community(community_id):
 @jwt_required()
 def delete_community(community_id):
     db = get_db_instance()
-    community_use_cases = CommunityUseCases(db)
+    community_use_cases = get_use_cases(CommunityUseCases, db)
 
     result = community_use_cases.delete_community(community_id)
-    if result:
-        # Eliminar del cache Redis
-        redis_client.delete(f"community:{community_id}")
-
-        # Emitir evento por WebSocket que se eliminó una comunidad
-        socketio.emit('community_deleted', {'community_id': community_id})
+    if "error" not in result:
+        # Eliminar del cache Redis, invalidar los listados y emitir el evento por WebSocket
+        record_change(db, 'communities', 'delete', community_id)
 
         return jsonify({"message": "Comunidad eliminada exitosamente"}), 200
 
@@ -136,7 +139,7 @@ def delete_community(community_id):
 @jwt_required()
 def add_moderator(community_id):
     db = get_db_instance()
-    community_use_cases = CommunityUseCases(db)
+    community_use_cases = get_use_cases(CommunityUseCases, db)
     data = request.get_json()
     user_id = data.get('user_id')
     
@@ -148,6 +151,8 @@ def add_moderator(community_id):
         # Convertir ObjectId a string si es necesario
         user_id_str = str(user_id) if isinstance(user_id, ObjectId) else user_id
 
+        refresh_community_version(db, community_id)
+
         # Emitir evento por WebSocket
         socketio.emit('moderator_added', {'community_id': community_id, 'user_id': user_id_str})
 
@@ -160,7 +165,7 @@ def add_moderator(community_id):
 @jwt_required()
 def remove_moderator(community_id):
     db = get_db_instance()
-    community_use_cases = CommunityUseCases(db)
+    community_use_cases = get_use_cases(CommunityUseCases, db)
     data = request.get_json()
     user_id = data.get('user_id')
     
@@ -171,6 +176,8 @@ def remove_moderator(community_id):
     if result:
         user_id_str = str(user_id) if isinstance(user_id, ObjectId) else user_id
 
+        refresh_community_version(db, community_id)
+
         # Emitir evento por WebSocket
         socketio.emit('moderator_removed', {'community_id': community_id, 'user_id': user_id_str})
 
@@ -178,44 +185,109 @@ def remove_moderator(community_id):
 
     return jsonify({"error": "Error al eliminar el moderador"}), 400
 
-# Ruta para listar los miembros de una comunidad con paginación
+# Ruta para listar los miembros de una comunidad con paginación por cursor
 @community_controller.route('/api/communities/<community_id>/members', methods=['GET'])
 @jwt_required()
 def list_community_members(community_id):
     db = get_db_instance()
-    community_use_cases = CommunityUseCases(db)
-    page = request.args.get('page', 1, type=int)
-    limit = request.args.get('limit', 10, type=int)
+    community_use_cases = get_use_cases(CommunityUseCases, db)
+    after = request.args.get('after')  # Cursor: `next_cursor` de la página anterior
+    limit = min(request.args.get('limit', 50, type=int), 100)
+
+    if after and not ObjectId.is_valid(after):
+        return jsonify({"error": "Cursor no válido"}), 400
 
     try:
-        result = community_use_cases.list_community_members(community_id, page, limit)
+        result = community_use_cases.list_community_members(community_id, after, limit)
+        if "error" in result:
+            return jsonify(result), 400
         # Serializar los documentos antes de enviarlos
-        serialized_result = [serialize_doc(member) for member in result]
-        return jsonify(serialized_result if serialized_result else []), 200
+        return jsonify(serialize_doc(result)), 200
     except Exception as e:
         print(f"Error en la ruta /api/communities/<community_id>/members: {str(e)}")
         return jsonify({"error": f"Error interno del servidor: {str(e)}"}), 500
 
+# Ruta para obtener la vista mensual del calendario de una comunidad (eventos por día)
+@community_controller.route('/api/communities/<community_id>/calendar', methods=['GET'])
+def get_community_calendar(community_id):
+    db = get_db_instance()
+    community_use_cases = get_use_cases(CommunityUseCases, db)
+    month = request.args.get('month') or datetime.utcnow().strftime('%Y-%m')
+
+    # El rollup cambia con cada escritura de eventos: ETag ligado a la generación de eventos
+    etag = list_etag('events')
+    cached_response = not_modified(etag, weak=True)
+    if cached_response:
+        return cached_response
+
+    result = community_use_cases.get_calendar_month(community_id, month)
+    if "error" in result:
+        return jsonify(result), 400
+    return with_list_etag(jsonify(result), etag), 200
+
+# Ruta para consultar los visitantes conectados y los miembros de una comunidad
+@community_controller.route('/api/communities/<community_id>/presence', methods=['GET'])
+def get_community_presence(community_id):
+    db = get_db_instance()
+    try:
+        return jsonify({"community_id": community_id, **presence.counts(db, f"community:{community_id}")}), 200
+    except Exception as e:
+        print(f"Error en la ruta /api/communities/<community_id>/presence: {str(e)}")
+        return jsonify({"error": f"Error interno del servidor: {str(e)}"}), 500
+
+# Ruta para unirse a una comunidad
+@community_controller.route('/api/communities/<community_id>/join', methods=['POST'])
+@jwt_required()
+def join_community(community_id):
+    db = get_db_instance()
+    community_use_cases = get_use_cases(CommunityUseCases, db)
+    user_id = get_jwt_identity()
+
+    result = community_use_cases.join_community(community_id, user_id)
+    if "error" not in result:
+        # El contador de miembros forma parte de la comunidad
+        refresh_community_version(db, community_id)
+        socketio.emit('member_joined', {'community_id': community_id, 'user_id': user_id})
+        presence.touch(f"community:{community_id}")
+        return jsonify(result), 200
+
+    return jsonify(result), 400
+
+# Ruta para abandonar una comunidad
+@community_controller.route('/api/communities/<community_id>/leave', methods=['POST'])
+@jwt_required()
+def leave_community(community_id):
+    db = get_db_instance()
+    community_use_cases = get_use_cases(CommunityUseCases, db)
+    user_id = get_jwt_identity()
+
+    result = community_use_cases.leave_community(community_id, user_id)
+    if "error" not in result:
+        refresh_community_version(db, community_id)
+        socketio.emit('member_left', {'community_id': community_id, 'user_id': user_id})
+        presence.touch(f"community:{community_id}")
+        return jsonify(result), 200
+
+    return jsonify(result), 400
+
 # Ruta para obtener una lista de comunidades destacadas con paginación
 @community_controller.route('/api/communities/featured', methods=['GET'])
 def list_featured_communities():
     db = get_db_instance()
-    community_use_cases = CommunityUseCases(db)
+    community_use_cases = get_use_cases(CommunityUseCases, db)
     page = request.args.get('page', 1, type=int)
     limit = request.args.get('limit', 10, type=int)
 
-    try:
-        # Obtener comunidades destacadas
-        result = community_use_cases.get_featured_communities(page, limit)
+    # Los listados usan ETags débiles ligados a la generación de comunidades
+    etag = list_etag('communities')
+    cached_response = not_modified(etag, weak=True)
+    if cached_response:
+        return cached_response
 
-        # Serializar los documentos antes de enviarlos
-        serialized_result = [serialize_doc(community) for community in result]
-
-        # Cambiar 404 por 200 con una lista vacía
-        if not serialized_result:
-            return jsonify([]), 200
-
-        return jsonify(serialized_result), 200
+    try:
+        # Las comunidades destacadas se serializan y envían a medida que llegan del cursor
+        cursor = community_use_cases.iter_featured_communities(page, limit)
+        return with_list_etag(stream_json_array(cursor, transform=serialize_doc), etag)
     except Exception as e:
         print(f"Error en la ruta /api/communities/featured: {str(e)}")
         return jsonify({"error": f"Error interno del servidor: {str(e)}"}), 500
@@ -224,16 +296,39 @@ def list_featured_communities():
 @community_controller.route('/api/communities/filter', methods=['GET'])
 def filter_communities():
     db = get_db_instance()
-    community_use_cases = CommunityUseCases(db)
+    community_use_cases = get_use_cases(CommunityUseCases, db)
     filters = request.args.to_dict()
     page = request.args.get('page', 1, type=int)
     limit = request.args.get('limit', 10, type=int)
 
+    # Validar los filtros y normalizar la consulta (campos permitidos y tipos)
     try:
-        result = community_use_cases.filter_communities(filters, page, limit)
+        built_query = community_use_cases.build_filter_query(filters, page, limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    etag = list_etag('communities')
+    cached_response = not_modified(etag, weak=True)
+    if cached_response:
+        return cached_response
+
+    # La clave incluye la generación de comunidades: cualquier escritura invalida todos los filtros
+    cache_key = built_query.cache_key(f"communities:filter:{get_generation('communities')}")
+    cached_result = redis_client.get(cache_key)
+    if cached_result:
+        try:
+            return with_list_etag(jsonify(json.loads(cached_result)), etag), 200
+        except json.JSONDecodeError:
+            pass  # Si hay un error en la decodificación, proceder a buscar en la base de datos
+
+    try:
+        result = community_use_cases.filter_communities(filters, page, limit, causal_reads.session(db, 'communities'))
+        if isinstance(result, dict) and "error" in result:
+            return jsonify(result), 400
         # Serializar los documentos antes de enviarlos
         serialized_result = [serialize_doc(community) for community in result]
-        return jsonify(serialized_result), 200
+        redis_client.set(cache_key, json.dumps(serialized_result, default=str), ex=60*5)  # Expiración en 5 minutos
+        return with_list_etag(jsonify(serialized_result), etag), 200
     except Exception as e:
         print(f"Error en la ruta /api/communities/filter: {str(e)}")
         return jsonify({"error": f"Error interno del servidor: {str(e)}"}), 500
@@ -243,19 +338,20 @@ def filter_communities():
 @jwt_required()
 def list_all_communities():
     db = get_db_instance()
-    community_use_cases = CommunityUseCases(db)
+    community_use_cases = get_use_cases(CommunityUseCases, db)
     
     page = request.args.get('page', 1, type=int)
     limit = request.args.get('limit', 10, type=int)
 
+    etag = list_etag('communities')
+    cached_response = not_modified(etag, weak=True)
+    if cached_response:
+        return cached_response
+
     try:
-        result = community_use_cases.list_all_communities(page, limit)
-        
-        # Serializar los documentos antes de enviarlos
-        serialized_result = [serialize_doc(community) for community in result]
-        
-        # Asegurarse de que siempre devuelva una lista
-        return jsonify(serialized_result if serialized_result else []), 200
+        # Se envía un array JSON en streaming (siempre una lista, aunque esté vacía)
+        cursor = community_use_cases.iter_all_communities(page, limit)
+        return with_list_etag(stream_json_array(cursor, transform=serialize_doc), etag)
     except Exception as e:
         print(f"Error en la ruta /api/communities: {str(e)}")
         return jsonify({"error": f"Error interno del servidor: {str(e)}"}), 500
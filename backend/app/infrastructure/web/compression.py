@@ -0,0 +1,77 @@
+# relative path: app/infrastructure/web/compression.py
+
+import zlib
+from flask import request
+
+try:
+    import brotli  # Dependencia opcional: sin ella solo se negocia gzip
+except ImportError:
+    brotli = None
+
+# Tipos de contenido que merece la pena comprimir
+COMPRESSIBLE_MIMETYPES = (
+    'application/json', 'application/x-ndjson', 'text/csv', 'text/calendar', 'text/html', 'text/plain',
+)
+
+def choose_encoding(accept_encodings):
+    """Elige la codificación preferida por el cliente entre las disponibles (br > gzip)."""
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+def _compressor(encoding, level):
+    if encoding == 'br':
+        return brotli.Compressor(quality=min(level, 11))
+    return zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31: formato gzip
+
+def _compress_chunks(chunks, encoding, level):
+    """Comprime un cuerpo en streaming sin acumularlo en memoria."""
+    compressor = _compressor(encoding, level)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        data = compressor.process(chunk) if encoding == 'br' else compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish() if encoding == 'br' else compressor.flush()
+
+def register_compression(app):
+    """Comprime las respuestas según Accept-Encoding (gzip y, si está instalado, brotli).
+
+    Las respuestas pequeñas (menos de COMPRESSION_MIN_SIZE bytes) se envían tal
+    cual; las respuestas en streaming se comprimen bloque a bloque.
+    """
+    min_size = app.config.get('COMPRESSION_MIN_SIZE', 1024)
+    level = app.config.get('COMPRESSION_LEVEL', 6)
+
+    @app.after_request
+    def compress_response(response):
+        if (response.status_code < 200 or response.status_code >= 300 or response.status_code == 204
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES
+                or 'Content-Encoding' in response.headers
+                or request.method == 'HEAD'):
+            return response
+
+        encoding = choose_encoding(request.accept_encodings)
+        response.vary.add('Accept-Encoding')
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = _compress_chunks(response.response, encoding, level)
+            response.direct_passthrough = False
+            response.headers.pop('Content-Length', None)
+        else:
+            body = response.get_data()
+            if len(body) < min_size:
+                return response
+            response.set_data(b''.join(_compress_chunks([body], encoding, level)))
+
+        response.headers['Content-Encoding'] = encoding
+        # El cuerpo codificado ya no es idéntico byte a byte: el ETag pasa a ser débil
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
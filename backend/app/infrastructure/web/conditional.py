@@ -0,0 +1,55 @@
+# relative path: app/infrastructure/web/conditional.py
+
+import hashlib
+from flask import Response, request
+from app.infrastructure.cache.redis_client import get_generation
+from app.infrastructure.cache.versions import document_versions
+
+def document_etag(collection, document_id, version):
+    """ETag fuerte de un documento: cambia con cada incremento de su versión."""
+    return f"{collection}-{document_id}-v{version}"
+
+def list_etag(generation_name):
+    """ETag débil de un listado: generación de la colección + ruta y parámetros de la petición."""
+    query_digest = hashlib.sha1(request.full_path.encode('utf-8')).hexdigest()[:16]
+    return f"{generation_name}-g{get_generation(generation_name)}-{query_digest}"
+
+def not_modified(etag, weak=False):
+    """Devuelve una respuesta 304 si If-None-Match coincide con el ETag, o None.
+
+    If-None-Match usa comparación débil (RFC 9110): así también valida el ETag
+    debilitado de una respuesta comprimida.
+    """
+    if not request.if_none_match or not request.if_none_match.contains_weak(etag):
+        return None
+    response = Response(status=304)
+    response.set_etag(etag, weak=weak)
+    return response
+
+def document_version(db, collection, document_id):
+    """Versión actual del documento: de Redis si está cacheada, si no de MongoDB.
+
+    Se consulta antes de leer el documento, de modo que una escritura concurrente
+    nunca deja un cuerpo antiguo con el ETag de la versión nueva.
+    """
+    version = document_versions.get(collection, document_id)
+    if version is None:
+        version = document_versions.refresh(db, collection, document_id)
+    return version
+
+def document_not_modified(collection, document_id, version):
+    """Devuelve 304 si el cliente ya tiene la versión actual del documento, o None."""
+    if version is None:
+        return None
+    return not_modified(document_etag(collection, document_id, version))
+
+def with_document_etag(response, collection, document_id, version):
+    """Añade el ETag fuerte del documento a la respuesta."""
+    if version is not None:
+        response.set_etag(document_etag(collection, document_id, version))
+    return response
+
+def with_list_etag(response, etag):
+    """Añade un ETag débil de listado a la respuesta."""
+    response.set_etag(etag, weak=True)
+    return response
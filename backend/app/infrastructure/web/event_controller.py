@@ -1,12 +1,18 @@
 # relative path: app/infrastructure/web/event_controller.py
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.domain.event.use_cases import EventUseCases
-from app.infrastructure.db import get_db_instance  # Asume que get_db_instance devuelve una instancia de la base de datos
-from app.infrastructure.cache.redis_client import redis_client  # Importar cliente Redis
+from app.infrastructure.db import get_db_instance, get_use_cases  # Asume que get_db_instance devuelve una instancia de la base de datos
+from app.infrastructure.cache.redis_client import redis_client, get_generation, bump_generation  # Importar cliente Redis
+from app.infrastructure.change_feed import record_change  # Invalidación de cachés y avisos en tiempo real
+from app.infrastructure.causal_reads import causal_reads  # Sesiones causales para las lecturas desde secundarios
+from app.infrastructure.web.conditional import document_version, document_not_modified, with_document_etag, list_etag, not_modified, with_list_etag
+from app.infrastructure.web.streaming import stream_json_array  # Arrays JSON en streaming desde el cursor
 from app.infrastructure.websockets.socketio import socketio  # Importar instancia de SocketIO
+from app.infrastructure.websockets.presence import presence  # Contadores en vivo de la sala del evento
 from bson import ObjectId
+import io
 import json
 
 event_controller = Blueprint('event_controller', __name__)
@@ -35,7 +41,7 @@ def serialize_doc(doc):
 @jwt_required()
 def create_event():
     db = get_db_instance()
-    event_use_cases = EventUseCases(db)
+    event_use_cases = get_use_cases(EventUseCases, db)
     event_data = request.get_json()
 
     # Crear el evento
@@ -46,63 +52,125 @@ def create_event():
     # Obtener el ID del evento creado
     event_id = str(result) if isinstance(result, ObjectId) else result
 
-    # Notificar a través de WebSocket usando la instancia global de SocketIO
-    socketio.emit('event_created', {"event_id": event_id})
-
-    # Serializar los datos antes de almacenarlos en Redis
-    serialized_data = serialize_doc(event_data)
-    redis_client.set(f"event:{event_id}", json.dumps(serialized_data))
+    # Invalidar los listados en caché y notificar por WebSocket (o dejarlo al change feed)
+    record_change(db, 'events', 'insert', event_id)
 
     return jsonify({"message": "Evento creado exitosamente", "event_id": event_id}), 201
 
+def refresh_event_version(db, event_id):
+    """Tras modificar un evento: detalle cacheado, versión (ETag), listados, feeds ICS y aviso `event_updated`."""
+    record_change(db, 'events', 'update', event_id)
+
+# Tipos de contenido de la importación y exportación masiva
+BULK_MIMETYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+def get_bulk_format():
+    """Determina el formato a partir de ?format= o del Content-Type de la petición."""
+    file_format = request.args.get('format')
+    if file_format:
+        return file_format.lower()
+    return 'csv' if (request.mimetype or '').endswith('csv') else 'ndjson'
+
+# Ruta para importar eventos en bloque (NDJSON o CSV en el cuerpo de la petición)
+@event_controller.route('/api/events/import', methods=['POST'])
+@jwt_required()
+def import_events():
+    db = get_db_instance()
+    event_use_cases = get_use_cases(EventUseCases, db)
+
+    # Comunidad por defecto para las filas que no la incluyan (el creador es siempre el usuario autenticado)
+    defaults = {}
+    if request.args.get('community'):
+        defaults['community'] = request.args.get('community')
+
+    # El cuerpo se lee como flujo de líneas: la memoria no depende del tamaño del fichero
+    lines = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+    summary = event_use_cases.import_events(
+        lines,
+        get_bulk_format(),
+        defaults,
+        batch_size=current_app.config.get('EVENT_IMPORT_BATCH_SIZE', 1000),
+        user_id=get_jwt_identity()
+    )
+    if "error" in summary:
+        return jsonify(summary), 400
+
+    if summary['inserted']:
+        # Invalidar los listados filtrados en caché y avisar una sola vez
+        bump_generation('events')
+        socketio.emit('events_imported', {"community_id": defaults.get('community'), "inserted": summary['inserted']})
+
+    return jsonify(serialize_doc(summary)), 200
+
+# Ruta para exportar eventos en streaming (NDJSON o CSV)
+@event_controller.route('/api/events/export', methods=['GET'])
+@jwt_required()
+def export_events():
+    db = get_db_instance()
+    event_use_cases = get_use_cases(EventUseCases, db)
+    community_id = request.args.get('community')
+    file_format = get_bulk_format()
+
+    try:
+        chunks = event_use_cases.export_events(community_id, file_format)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    filename = f"events-{community_id or 'all'}.{file_format}"
+    return Response(
+        stream_with_context(chunks),
+        mimetype=BULK_MIMETYPES[file_format],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
 # Ruta para obtener los detalles de un evento
 @event_controller.route('/api/events/<event_id>', methods=['GET'])
 def get_event_details(event_id):
     db = get_db_instance()
-    event_use_cases = EventUseCases(db)
+    event_use_cases = get_use_cases(EventUseCases, db)
+
+    # El cliente ya tiene la versión actual: 304 sin leer el documento
+    version = document_version(db, 'events', event_id)
+    cached_response = document_not_modified('events', event_id, version)
+    if cached_response:
+        return cached_response
 
     # Buscar el evento en Redis primero
     cached_event = redis_client.get(f"event:{event_id}")
     if cached_event:
         try:
             event = json.loads(cached_event)
-            return jsonify(event), 200
+            return with_document_etag(jsonify(event), 'events', event_id, version), 200
         except json.JSONDecodeError:
             pass  # Si hay un error en la decodificación, proceder a buscar en la base de datos
 
     # Si no está en Redis, buscar en la base de datos
     event = event_use_cases.get_event_details(event_id)
-    if not event:
+    if not event or "error" in event:
         return jsonify({"error": "Evento no encontrado"}), 404
 
     # Serializar el documento
     serialized_event = serialize_doc(event)
 
     # Almacenar en Redis para la próxima vez
-    redis_client.set(f"event:{event_id}", json.dumps(serialized_event))
+    redis_client.set(f"event:{event_id}", json.dumps(serialized_event, default=str))
 
-    return jsonify(serialized_event), 200
+    return with_document_etag(jsonify(serialized_event), 'events', event_id, version), 200
 
 # Ruta para actualizar los detalles de un evento existente
 @event_controller.route('/api/events/update/<event_id>', methods=['PUT'])
 @jwt_required()
 def update_event(event_id):
     db = get_db_instance()
-    event_use_cases = EventUseCases(db)
+    event_use_cases = get_use_cases(EventUseCases, db)
     new_data = request.get_json()
 
     result = event_use_cases.update_event(event_id, new_data)
     if "error" in result:
         return jsonify(result), 400
 
-    # Serializar los nuevos datos
-    serialized_data = serialize_doc(result)
-
-    # Actualizar en Redis después de actualizar en la base de datos
-    redis_client.set(f"event:{event_id}", json.dumps(serialized_data))
-
-    # Notificar a través de WebSocket que se actualizó un evento
-    socketio.emit('event_updated', {"event_id": event_id})
+    # Descartar el detalle cacheado, publicar la nueva versión y notificar por WebSocket
+    refresh_event_version(db, event_id)
 
     return jsonify({"message": "Evento actualizado exitosamente"}), 200
 
@@ -111,15 +179,12 @@ def update_event(event_id):
 @jwt_required()
 def delete_event(event_id):
     db = get_db_instance()
-    event_use_cases = EventUseCases(db)
+    event_use_cases = get_use_cases(EventUseCases, db)
 
     result = event_use_cases.delete_event(event_id)
-    if result:
-        # Eliminar del cache de Redis
-        redis_client.delete(f"event:{event_id}")
-
-        # Notificar a través de WebSocket que se eliminó un evento
-        socketio.emit('event_deleted', {"event_id": event_id})
+    if "error" not in result:
+        # Eliminar del cache de Redis, invalidar feeds y listados y notificar por WebSocket
+        record_change(db, 'events', 'delete', event_id)
 
         return jsonify({"message": "Evento eliminado exitosamente"}), 200
 
@@ -130,18 +195,20 @@ def delete_event(event_id):
 @jwt_required()
 def attend_event(event_id):
     db = get_db_instance()
-    event_use_cases = EventUseCases(db)
+    event_use_cases = get_use_cases(EventUseCases, db)
     user_id = get_jwt_identity()
 
     result = event_use_cases.add_attendee_to_event(event_id, user_id)
-    if result:
+    if "error" not in result:
         user_id_str = str(user_id) if isinstance(user_id, ObjectId) else user_id
 
         # Emitir notificación por WebSocket
         socketio.emit('attendee_added', {"event_id": event_id, "user_id": user_id_str})
+        presence.touch(f"event:{event_id}")
 
         # Limpiar la caché de asistentes para este evento
         redis_client.delete(f"attendees:{event_id}:page:*")
+        refresh_event_version(db, event_id)
 
         return jsonify({"message": "Asistencia registrada exitosamente"}), 200
 
@@ -152,29 +219,41 @@ def attend_event(event_id):
 @jwt_required()
 def remove_attendee(event_id):
     db = get_db_instance()
-    event_use_cases = EventUseCases(db)
+    event_use_cases = get_use_cases(EventUseCases, db)
     user_id = get_jwt_identity()
 
     result = event_use_cases.remove_attendee_from_event(event_id, user_id)
-    if result:
+    if "error" not in result:
         user_id_str = str(user_id) if isinstance(user_id, ObjectId) else user_id
 
         # Emitir notificación por WebSocket
         socketio.emit('attendee_removed', {"event_id": event_id, "user_id": user_id_str})
+        presence.touch(f"event:{event_id}")
 
         # Limpiar la caché de asistentes para este evento
         redis_client.delete(f"attendees:{event_id}:page:*")
+        refresh_event_version(db, event_id)
 
         return jsonify({"message": "Asistencia eliminada exitosamente"}), 200
 
     return jsonify({"error": "Error al eliminar la asistencia"}), 400
 
+# Ruta para consultar los visitantes conectados y los asistentes de un evento
+@event_controller.route('/api/events/<event_id>/presence', methods=['GET'])
+def get_event_presence(event_id):
+    db = get_db_instance()
+    try:
+        return jsonify({"event_id": event_id, **presence.counts(db, f"event:{event_id}")}), 200
+    except Exception as e:
+        print(f"Error en la ruta /api/events/<event_id>/presence: {str(e)}")
+        return jsonify({"error": f"Error interno del servidor: {str(e)}"}), 500
+
 # Ruta para listar los asistentes de un evento con paginación
 @event_controller.route('/api/events/<event_id>/attendees', methods=['GET'])
 @jwt_required()
 def list_event_attendees(event_id):
     db = get_db_instance()
-    event_use_cases = EventUseCases(db)
+    event_use_cases = get_use_cases(EventUseCases, db)
     page = request.args.get('page', 1, type=int)
     limit = request.args.get('limit', 10, type=int)
 
@@ -192,15 +271,16 @@ def list_event_attendees(event_id):
 @jwt_required()
 def mark_event_as_featured(event_id):
     db = get_db_instance()
-    event_use_cases = EventUseCases(db)
+    event_use_cases = get_use_cases(EventUseCases, db)
 
     result = event_use_cases.mark_event_as_featured(event_id)
-    if result:
+    if "error" not in result:
         # Emitir notificación por WebSocket
         socketio.emit('event_featured', {"event_id": event_id})
 
         # Actualizar en Redis el estado de destacado
-        redis_client.set(f"event:{event_id}:featured", True)
+        redis_client.set(f"event:{event_id}:featured", 1)
+        refresh_event_version(db, event_id)
 
         return jsonify({"message": "Evento marcado como destacado"}), 200
 
@@ -210,17 +290,20 @@ def mark_event_as_featured(event_id):
 @event_controller.route('/api/events/featured', methods=['GET'])
 def list_featured_events():
     db = get_db_instance()
-    event_use_cases = EventUseCases(db)
+    event_use_cases = get_use_cases(EventUseCases, db)
     page = request.args.get('page', 1, type=int)
     limit = request.args.get('limit', 10, type=int)
 
-    try:
-        # Obtener eventos destacados
-        result = event_use_cases.list_featured_events(page, limit)
-        # Serializar los documentos antes de enviarlos
-        serialized_result = [serialize_doc(event) for event in result]
+    # Los listados usan ETags débiles ligados a la generación de eventos
+    etag = list_etag('events')
+    cached_response = not_modified(etag, weak=True)
+    if cached_response:
+        return cached_response
 
-        return jsonify(serialized_result if serialized_result else []), 200
+    try:
+        # Los eventos destacados se serializan y envían a medida que llegan del cursor
+        cursor = event_use_cases.iter_featured_events(page, limit, causal_reads.session(db, 'events'))
+        return with_list_etag(stream_json_array(cursor, transform=serialize_doc), etag)
     except Exception as e:
         print(f"Error en la ruta /api/events/featured: {str(e)}")
         return jsonify({"error": f"Error interno del servidor: {str(e)}"}), 500
@@ -229,16 +312,39 @@ def list_featured_events():
 @event_controller.route('/api/events/filter', methods=['GET'])
 def filter_events():
     db = get_db_instance()
-    event_use_cases = EventUseCases(db)
+    event_use_cases = get_use_cases(EventUseCases, db)
     filters = request.args.to_dict()
     page = request.args.get('page', 1, type=int)
     limit = request.args.get('limit', 10, type=int)
 
+    # Validar los filtros y normalizar la consulta (campos permitidos y tipos)
+    try:
+        built_query = event_use_cases.build_filter_query(filters, page, limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    etag = list_etag('events')
+    cached_response = not_modified(etag, weak=True)
+    if cached_response:
+        return cached_response
+
+    # La clave incluye la generación de eventos: cualquier escritura invalida todos los filtros
+    cache_key = built_query.cache_key(f"events:filter:{get_generation('events')}")
+    cached_result = redis_client.get(cache_key)
+    if cached_result:
+        try:
+            return with_list_etag(jsonify(json.loads(cached_result)), etag), 200
+        except json.JSONDecodeError:
+            pass  # Si hay un error en la decodificación, proceder a buscar en la base de datos
+
     try:
         result = event_use_cases.filter_events(filters, page, limit)
+        if isinstance(result, dict) and "error" in result:
+            return jsonify(result), 400
         # Serializar los documentos antes de enviarlos
         serialized_result = [serialize_doc(event) for event in result]
-        return jsonify(serialized_result if serialized_result else []), 200
+        redis_client.set(cache_key, json.dumps(serialized_result, default=str), ex=60*5)  # Expiración en 5 minutos
+        return with_list_etag(jsonify(serialized_result if serialized_result else []), etag), 200
     except Exception as e:
         print(f"Error en la ruta /api/events/filter: {str(e)}")
         return jsonify({"error": f"Error interno del servidor: {str(e)}"}), 500
@@ -248,11 +354,14 @@ def filter_events():
 @jwt_required()
 def manage_event_recurrence(event_id):
     db = get_db_instance()
-    event_use_cases = EventUseCases(db)
+    event_use_cases = get_use_cases(EventUseCases, db)
     recurrence_data = request.get_json()
 
     result = event_use_cases.manage_recurrence(event_id, recurrence_data)
-    if result:
+    if "error" not in result:
+        # La regla RRULE del feed ICS cambia
+        refresh_event_version(db, event_id)
+
         # Emitir notificación por WebSocket
         socketio.emit('event_recurrence_updated', {"event_id": event_id})
 
@@ -268,15 +377,16 @@ def manage_event_recurrence(event_id):
 @jwt_required()
 def cancel_event(event_id):
     db = get_db_instance()
-    event_use_cases = EventUseCases(db)
+    event_use_cases = get_use_cases(EventUseCases, db)
 
     result = event_use_cases.cancel_event(event_id)
-    if result:
+    if "error" not in result:
         # Emitir notificación por WebSocket
         socketio.emit('event_cancelled', {"event_id": event_id})
 
         # Actualizar el estado de cancelado en Redis
-        redis_client.set(f"event:{event_id}:cancelled", True)
+        redis_client.set(f"event:{event_id}:cancelled", 1)
+        refresh_event_version(db, event_id)
 
         return jsonify({"message": "Evento cancelado exitosamente"}), 200
 
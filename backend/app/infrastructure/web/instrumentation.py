@@ -0,0 +1,48 @@
+# relative path: app/infrastructure/web/instrumentation.py
+
+import hmac
+import time
+from flask import Response, g, request
+from app.infrastructure.metrics import registry, http_request_duration
+
+def server_timing_header(total_seconds, timings):
+    """Cabecera Server-Timing: tiempo total y tiempo/operaciones de MongoDB y Redis de la petición."""
+    entries = [f"app;dur={total_seconds * 1000:.1f}"]
+    for component, (count, seconds) in sorted(timings.items()):
+        entries.append(f'{component};desc="{count} ops";dur={seconds * 1000:.1f}')
+    return ', '.join(entries)
+
+def register_instrumentation(app):
+    """Mide la latencia de cada ruta, añade Server-Timing y expone las métricas en /metrics.
+
+    Si METRICS_TOKEN está configurado, /metrics exige `Authorization: Bearer <token>`.
+    Las métricas son del proceso: con varios workers, Prometheus debe consultar cada uno.
+    Debe registrarse antes que la compresión para que su tiempo quede incluido.
+    """
+    metrics_token = app.config.get('METRICS_TOKEN')
+
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+        g.timings = {}
+
+    @app.after_request
+    def record_request(response):
+        start = g.get('request_start')
+        if start is None:
+            return response
+        total = time.perf_counter() - start
+        # Plantilla de la ruta (no la URL) para no crear una serie por cada ID
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        http_request_duration.observe(total, request.method, route, str(response.status_code))
+        # En respuestas en streaming solo se cuenta el trabajo previo al primer byte
+        response.headers['Server-Timing'] = server_timing_header(total, g.get('timings', {}))
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        if metrics_token:
+            provided = request.headers.get('Authorization', '').removeprefix('Bearer ')
+            if not hmac.compare_digest(provided, metrics_token):
+                return Response("No autorizado\n", status=401, mimetype='text/plain')
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,136 @@
+# relative path: app/infrastructure/web/moderation_controller.py
+
+from functools import wraps
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.domain.moderation.use_cases import ModerationUseCases
+from app.infrastructure.db import get_db_instance
+from app.infrastructure.cache.redis_client import redis_client, bump_generation  # Importar cliente Redis
+from app.infrastructure.websockets.socketio import socketio  # Importar instancia de SocketIO
+from bson import ObjectId
+
+moderation_controller = Blueprint('moderation_controller', __name__)
+
+def serialize_doc(doc):
+    """
+    Recursively convierte ObjectId en strings dentro de un documento.
+    """
+    if isinstance(doc, list):
+        return [serialize_doc(item) for item in doc]
+    elif isinstance(doc, dict):
+        new_doc = {}
+        for key, value in doc.items():
+            if isinstance(value, ObjectId):
+                new_doc[key] = str(value)
+            elif isinstance(value, dict) or isinstance(value, list):
+                new_doc[key] = serialize_doc(value)
+            else:
+                new_doc[key] = value
+        return new_doc
+    else:
+        return doc
+
+def build_moderation_use_cases(db):
+    """Construye los casos de uso de moderación con la duración de lease configurada."""
+    return ModerationUseCases(db, lease_seconds=current_app.config.get('MODERATION_LEASE_SECONDS', 300))
+
+def moderator_required(view):
+    """Restringe la ruta a usuarios con rol de administrador o moderador."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not build_moderation_use_cases(get_db_instance()).is_moderator(get_jwt_identity()):
+            return jsonify({"error": "No tienes permisos de moderación"}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+def invalidate_moderated_content(items):
+    """Invalida en bloque las cachés de los comentarios y discusiones afectados."""
+    comment_keys = [f"comments:{item['target']}" for item in items if item.get('target_type') == 'comment']
+    if comment_keys:
+        redis_client.delete(*comment_keys)
+    for event_id in {item.get('event') for item in items if item.get('event')}:
+        bump_generation(f"discussion:{event_id}")
+
+# Ruta para obtener la cola de moderación en orden de prioridad
+@moderation_controller.route('/api/moderation/queue', methods=['GET'])
+@jwt_required()
+@moderator_required
+def get_moderation_queue():
+    moderation_use_cases = build_moderation_use_cases(get_db_instance())
+    page = request.args.get('page', 1, type=int)
+    limit = min(request.args.get('limit', 10, type=int), 100)
+    status = request.args.get('status', 'open')
+    if status not in ('open', 'claimed', 'resolved'):
+        return jsonify({"error": f"Estado no válido: '{status}'"}), 400
+
+    items = moderation_use_cases.get_queue(page, limit, status)
+    if isinstance(items, dict) and "error" in items:
+        return jsonify(items), 400
+    return jsonify(serialize_doc(items)), 200
+
+# Ruta para consultar el historial de reportes de un comentario
+@moderation_controller.route('/api/moderation/comments/<comment_id>/reports', methods=['GET'])
+@jwt_required()
+@moderator_required
+def get_comment_reports(comment_id):
+    moderation_use_cases = build_moderation_use_cases(get_db_instance())
+    page = request.args.get('page', 1, type=int)
+    limit = min(request.args.get('limit', 20, type=int), 100)
+
+    reports = moderation_use_cases.get_reports('comment', comment_id, page, limit)
+    if isinstance(reports, dict) and "error" in reports:
+        return jsonify(reports), 400
+    return jsonify(serialize_doc(reports)), 200
+
+# Ruta para reclamar los siguientes elementos de la cola
+@moderation_controller.route('/api/moderation/claim', methods=['POST'])
+@jwt_required()
+@moderator_required
+def claim_moderation_items():
+    moderation_use_cases = build_moderation_use_cases(get_db_instance())
+    data = request.get_json(silent=True) or {}
+    default_batch_size = current_app.config.get('MODERATION_CLAIM_BATCH_SIZE', 20)
+    try:
+        batch_size = min(max(int(data.get('batch_size', default_batch_size)), 1), 100)
+    except (TypeError, ValueError):
+        return jsonify({"error": "El campo 'batch_size' debe ser un número entero"}), 400
+
+    result = moderation_use_cases.claim_items(get_jwt_identity(), batch_size)
+    if "error" in result:
+        return jsonify(result), 400
+    return jsonify(serialize_doc(result)), 200
+
+# Ruta para devolver a la cola elementos reclamados
+@moderation_controller.route('/api/moderation/release', methods=['POST'])
+@jwt_required()
+@moderator_required
+def release_moderation_items():
+    moderation_use_cases = build_moderation_use_cases(get_db_instance())
+    data = request.get_json(silent=True) or {}
+
+    result = moderation_use_cases.release_items(get_jwt_identity(), data.get('item_ids'))
+    if "error" in result:
+        return jsonify(result), 400
+    return jsonify(result), 200
+
+# Ruta para resolver en lote elementos reclamados
+@moderation_controller.route('/api/moderation/resolve', methods=['POST'])
+@jwt_required()
+@moderator_required
+def resolve_moderation_items():
+    moderation_use_cases = build_moderation_use_cases(get_db_instance())
+    resolution_data = request.get_json(silent=True) or {}
+
+    result = moderation_use_cases.resolve_items(get_jwt_identity(), resolution_data)
+    if "error" in result:
+        return jsonify(result), 400
+
+    resolved = result['resolved']
+    invalidate_moderated_content(resolved)
+    if resolved:
+        # Emitir un único evento con todos los comentarios moderados
+        socketio.emit('comments_moderated', {
+            "action": resolution_data.get('action'),
+            "comment_ids": [item['target'] for item in resolved if item.get('target_type') == 'comment'],
+        })
+    return jsonify({"resolved": len(resolved), "items": serialize_doc(resolved)}), 200
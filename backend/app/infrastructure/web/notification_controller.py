@@ -1,12 +1,15 @@
 # relative path: app/infrastructure/web/notification_controller.py
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.domain.notification.use_cases import NotificationUseCases
 from app.infrastructure.db import get_db_instance  # Asume que get_db_instance devuelve una instancia de la base de datos
 from app.infrastructure.cache.redis_client import redis_client  # Importar cliente Redis
+from app.infrastructure.cache.counters import unread_counter  # Contador de no leídas en Redis
 from app.infrastructure.websockets.socketio import socketio  # Importar instancia de SocketIO
+from app.infrastructure.websockets.publisher import notification_publisher  # Envío en lotes a salas de usuario
 from bson import ObjectId
+from datetime import datetime
 import json
 
 notification_controller = Blueprint('notification_controller', __name__)
@@ -30,12 +33,34 @@ def serialize_doc(doc):
     else:
         return doc
 
+# Intervalo mínimo entre sincronizaciones de la bandeja de un usuario
+INBOX_SYNC_INTERVAL_SECONDS = 60
+
+def build_notification_use_cases(db):
+    """Construye los casos de uso de notificaciones con el contador, el publicador y la configuración de fan-out."""
+    return NotificationUseCases(
+        db,
+        unread_counter,
+        notification_publisher,
+        chunk_size=current_app.config.get('NOTIFICATION_FANOUT_CHUNK_SIZE', 1000),
+        inbox_threshold=current_app.config.get('NOTIFICATION_FANOUT_INBOX_THRESHOLD', 10000)
+    )
+
+def sync_inbox_if_due(notification_use_cases, user_id):
+    """Sincroniza la bandeja del usuario como mucho una vez por intervalo."""
+    if not redis_client.set(f"notifications:{user_id}:inbox_synced", 1, ex=INBOX_SYNC_INTERVAL_SECONDS, nx=True):
+        return
+    if notification_use_cases.sync_user_inbox(user_id):
+        # Llegaron notificaciones nuevas: invalidar las páginas cacheadas
+        for key in redis_client.scan_iter(f"notifications:{user_id}:page:*"):
+            redis_client.delete(key)
+
 # Ruta para crear una nueva notificación
 @notification_controller.route('/api/notifications/create', methods=['POST'])
 @jwt_required()
 def create_notification():
     db = get_db_instance()
-    notification_use_cases = NotificationUseCases(db)
+    notification_use_cases = build_notification_use_cases(db)
 
     notification_data = request.get_json()
     notification_data['user_id'] = get_jwt_identity()  # Añade el ID del usuario autenticado
@@ -64,7 +89,7 @@ def create_notification():
 @jwt_required()
 def mark_notification_as_read(notification_id):
     db = get_db_instance()
-    notification_use_cases = NotificationUseCases(db)
+    notification_use_cases = build_notification_use_cases(db)
 
     # Marcar la notificación como leída
     result = notification_use_cases.mark_notification_as_read(notification_id)
@@ -86,7 +111,7 @@ def mark_notification_as_read(notification_id):
 @jwt_required()
 def get_notification_details(notification_id):
     db = get_db_instance()
-    notification_use_cases = NotificationUseCases(db)
+    notification_use_cases = build_notification_use_cases(db)
 
     # Buscar en Redis primero
     cached_notification = redis_client.get(f"notification:{notification_id}")
@@ -115,11 +140,14 @@ def get_notification_details(notification_id):
 @jwt_required()
 def list_user_notifications(user_id):
     db = get_db_instance()
-    notification_use_cases = NotificationUseCases(db)
+    notification_use_cases = build_notification_use_cases(db)
 
     page = request.args.get('page', 1, type=int)
     limit = request.args.get('limit', 10, type=int)
 
+    # Recoger las difusiones pendientes (fan-out en lectura) antes de leer la caché
+    sync_inbox_if_due(notification_use_cases, user_id)
+
     # Intentar obtener las notificaciones desde Redis
     cache_key = f"notifications:{user_id}:page:{page}"
     cached_notifications = redis_client.get(cache_key)
@@ -144,7 +172,7 @@ def list_user_notifications(user_id):
 @jwt_required()
 def delete_notification(notification_id):
     db = get_db_instance()
-    notification_use_cases = NotificationUseCases(db)
+    notification_use_cases = build_notification_use_cases(db)
 
     # Eliminar la notificación
     result = notification_use_cases.delete_notification(notification_id)
@@ -158,3 +186,67 @@ def delete_notification(notification_id):
         return jsonify({"message": "Notificación eliminada exitosamente"}), 200
 
     return jsonify({"error": "Error al eliminar la notificación"}), 400
+
+
+# Ruta para obtener el número de notificaciones no leídas de un usuario (O(1) desde Redis)
+@notification_controller.route('/api/notifications/user/<user_id>/unread-count', methods=['GET'])
+@jwt_required()
+def get_unread_count(user_id):
+    if user_id != get_jwt_identity():
+        return jsonify({"error": "No tienes acceso a las notificaciones de otro usuario"}), 403
+    db = get_db_instance()
+    notification_use_cases = build_notification_use_cases(db)
+
+    sync_inbox_if_due(notification_use_cases, user_id)
+    result = notification_use_cases.get_unread_count(user_id)
+    if "error" in result:
+        return jsonify(result), 400
+
+    return jsonify(result), 200
+
+# Ruta para marcar como leídas todas las notificaciones de un usuario
+@notification_controller.route('/api/notifications/user/<user_id>/mark-all-read', methods=['POST'])
+@jwt_required()
+def mark_all_notifications_as_read(user_id):
+    if user_id != get_jwt_identity():
+        return jsonify({"error": "No tienes acceso a las notificaciones de otro usuario"}), 403
+    db = get_db_instance()
+    notification_use_cases = build_notification_use_cases(db)
+
+    # Fecha límite opcional en formato ISO 8601 (por cuerpo JSON o query string)
+    data = request.get_json(silent=True) or {}
+    before = data.get('before') or request.args.get('before')
+    if before:
+        try:
+            before = datetime.fromisoformat(before.replace('Z', '+00:00'))
+        except ValueError:
+            return jsonify({"error": "Formato de fecha no válido para 'before'"}), 400
+
+    result = notification_use_cases.mark_all_notifications_as_read(user_id, before or None)
+    if "error" in result:
+        return jsonify(result), 400
+
+    # Invalidar las páginas de notificaciones cacheadas del usuario
+    for key in redis_client.scan_iter(f"notifications:{user_id}:page:*"):
+        redis_client.delete(key)
+
+    # Emitir a través de WebSocket que las notificaciones fueron leídas
+    socketio.emit('notifications_read', {"user_id": user_id, "modified_count": result["modified_count"]})
+
+    return jsonify(result), 200
+
+# Ruta para enviar una notificación a toda una audiencia (asistentes, miembros o suscriptores)
+@notification_controller.route('/api/notifications/fanout', methods=['POST'])
+@jwt_required()
+def fanout_notification():
+    db = get_db_instance()
+    notification_use_cases = build_notification_use_cases(db)
+
+    fanout_data = request.get_json() or {}
+    result = notification_use_cases.fanout_notification(fanout_data, get_jwt_identity())
+    if "error" in result:
+        # El caso de uso indica el código de estado de los errores que no son de validación
+        status = result.pop("status", 400)
+        return jsonify(result), status
+
+    return jsonify(result), 202
@@ -3,7 +3,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.domain.rating.use_cases import RatingUseCases
-from app.infrastructure.db import get_db_instance  # Asume que get_db_instance devuelve una instancia de la base de datos
+from app.infrastructure.db import get_db_instance, get_use_cases  # Asume que get_db_instance devuelve una instancia de la base de datos
 from app.infrastructure.cache.redis_client import redis_client  # Importar cliente Redis
 from app.infrastructure.websockets.socketio import socketio  # Importar instancia de SocketIO
 from bson import ObjectId
@@ -35,7 +35,7 @@ def serialize_doc(doc):
 @jwt_required()
 def create_rating(event_id):
     db = get_db_instance()
-    rating_use_cases = RatingUseCases(db)
+    rating_use_cases = get_use_cases(RatingUseCases, db)
 
     rating_data = request.get_json()
     rating_data['user_id'] = get_jwt_identity()  # Añade el ID del usuario autenticado
@@ -65,7 +65,7 @@ def create_rating(event_id):
 @jwt_required()
 def update_rating(rating_id):
     db = get_db_instance()
-    rating_use_cases = RatingUseCases(db)
+    rating_use_cases = get_use_cases(RatingUseCases, db)
 
     new_data = request.get_json()
 
@@ -93,7 +93,7 @@ def update_rating(rating_id):
 @jwt_required()
 def delete_rating(rating_id):
     db = get_db_instance()
-    rating_use_cases = RatingUseCases(db)
+    rating_use_cases = get_use_cases(RatingUseCases, db)
 
     # Eliminar la puntuación
     result = rating_use_cases.delete_rating(rating_id)
@@ -116,7 +116,7 @@ def delete_rating(rating_id):
 @rating_controller.route('/api/ratings/<event_id>', methods=['GET'])
 def list_event_ratings(event_id):
     db = get_db_instance()
-    rating_use_cases = RatingUseCases(db)
+    rating_use_cases = get_use_cases(RatingUseCases, db)
 
     page = request.args.get('page', 1, type=int)
     limit = request.args.get('limit', 10, type=int)
@@ -144,7 +144,7 @@ def list_event_ratings(event_id):
 @rating_controller.route('/api/ratings/<event_id>/average', methods=['GET'])
 def calculate_average_rating(event_id):
     db = get_db_instance()
-    rating_use_cases = RatingUseCases(db)
+    rating_use_cases = get_use_cases(RatingUseCases, db)
 
     # Intentar obtener el promedio desde Redis
     cache_key = f"average_rating:{event_id}"
@@ -3,9 +3,10 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.domain.reply.use_cases import ReplyUseCases
-from app.infrastructure.db import get_db_instance  # Asume que get_db_instance devuelve una instancia de la base de datos
-from app.infrastructure.cache.redis_client import redis_client  # Importar cliente Redis
+from app.infrastructure.db import get_db_instance, get_use_cases  # Asume que get_db_instance devuelve una instancia de la base de datos
+from app.infrastructure.cache.redis_client import redis_client, bump_generation  # Importar cliente Redis
 from app.infrastructure.websockets.socketio import socketio  # Importar instancia de SocketIO
+from app.infrastructure.change_feed import record_change  # Invalidación de cachés y avisos en tiempo real
 from bson import ObjectId
 import json
 
@@ -30,12 +31,17 @@ def serialize_doc(doc):
     else:
         return doc
 
+def invalidate_discussion(event_id):
+    """Invalida todas las páginas cacheadas del hilo de discusión de un evento."""
+    if event_id:
+        bump_generation(f"discussion:{event_id}")
+
 # Ruta para crear una respuesta a un comentario
 @reply_controller.route('/api/comments/<comment_id>/replies', methods=['POST'])
 @jwt_required()
 def create_reply(comment_id):
     db = get_db_instance()
-    reply_use_cases = ReplyUseCases(db)
+    reply_use_cases = get_use_cases(ReplyUseCases, db)
     
     reply_data = request.get_json()
     reply_data['user_id'] = get_jwt_identity()  # Añade el ID del usuario autenticado
@@ -51,26 +57,9 @@ def create_reply(comment_id):
     # Obtener el ID de la respuesta creada
     reply_id = str(result["_id"]) if isinstance(result.get("_id"), ObjectId) else result.get("_id")
 
-    # Emitir notificación a través de WebSocket
-    socketio.emit('new_reply', {'comment_id': comment_id, 'reply_id': reply_id})
-
-    # Limpiar la caché relacionada con las respuestas del comentario
-    # Para patrones de caché con paginación, usar expresiones regulares o prefijos según la configuración de Redis
-    # Aquí se asume que se está usando Redis con patrones específicos de claves
-    # Si Redis no soporta patrones en el comando DELETE, considera usar SCAN y DELETE en un loop
-    # Por simplicidad, se muestra cómo eliminar claves específicas
-    # Aquí eliminamos todas las páginas relacionadas
-    # Puedes implementar una lógica más robusta si es necesario
-    # Ejemplo:
-    # for key in redis_client.scan_iter(f"replies:{comment_id}:page:*"):
-    #     redis_client.delete(key)
-    
-    # Si tu cliente Redis soporta patrones en el comando DELETE (como Redis 6.2+), puedes usar:
-    # redis_client.delete_pattern(f"replies:{comment_id}:page:*")
-    # Sin embargo, Flask-Redis no tiene un método delete_pattern por defecto
-    # Por lo tanto, aquí usamos scan_iter
-    for key in redis_client.scan_iter(f"replies:{comment_id}:page:*"):
-        redis_client.delete(key)
+    # Limpiar las páginas cacheadas de respuestas del comentario (con scan_iter), invalidar
+    # el hilo y emitir `new_reply` (o dejarlo al change feed)
+    record_change(db, 'replies', 'insert', reply_id, previous={'parent_comment': comment_id})
 
     return jsonify({"message": "Respuesta creada exitosamente", "reply_id": reply_id}), 201
 
@@ -79,7 +68,7 @@ def create_reply(comment_id):
 @jwt_required()
 def update_reply(reply_id):
     db = get_db_instance()
-    reply_use_cases = ReplyUseCases(db)
+    reply_use_cases = get_use_cases(ReplyUseCases, db)
     
     new_data = request.get_json()
 
@@ -91,11 +80,8 @@ def update_reply(reply_id):
     # Serializar los nuevos datos
     serialized_result = serialize_doc(result)
 
-    # Limpiar la caché relacionada con la respuesta actualizada
-    redis_client.delete(f"replies:{reply_id}")
-
-    # Emitir notificación a través de WebSocket indicando que la respuesta fue actualizada
-    socketio.emit('reply_updated', {"reply_id": reply_id})
+    # Limpiar la caché relacionada con la respuesta y notificar por WebSocket
+    record_change(db, 'replies', 'update', reply_id)
 
     return jsonify({"message": "Respuesta actualizada exitosamente"}), 200
 
@@ -104,19 +90,17 @@ def update_reply(reply_id):
 @jwt_required()
 def delete_reply(reply_id):
     db = get_db_instance()
-    reply_use_cases = ReplyUseCases(db)
+    reply_use_cases = get_use_cases(ReplyUseCases, db)
     
+    # Obtener el comentario padre antes de eliminar la respuesta
+    reply = reply_use_cases.get_reply_details(reply_id)
+    comment_id = reply.get('parent_comment') if isinstance(reply, dict) else None
+
     # Eliminar la respuesta
     result = reply_use_cases.delete_reply(reply_id)
     if result:
-        # Obtener el ID del evento asociado si es necesario
-        event_id = result.get('event_id')  # Asume que `result` contiene `event_id`
-
-        # Limpiar la caché de la respuesta eliminada
-        redis_client.delete(f"replies:{reply_id}")
-
-        # Emitir notificación a través de WebSocket sobre la eliminación
-        socketio.emit('reply_deleted', {'reply_id': reply_id})
+        # Limpiar la caché de la respuesta eliminada y notificar por WebSocket
+        record_change(db, 'replies', 'delete', reply_id, previous={'parent_comment': comment_id})
 
         return jsonify({"message": "Respuesta eliminada exitosamente"}), 200
 
@@ -126,10 +110,19 @@ def delete_reply(reply_id):
 @reply_controller.route('/api/comments/<comment_id>/replies', methods=['GET'])
 def list_comment_replies(comment_id):
     db = get_db_instance()
-    reply_use_cases = ReplyUseCases(db)
+    reply_use_cases = get_use_cases(ReplyUseCases, db)
     
     page = request.args.get('page', 1, type=int)
     limit = request.args.get('limit', 10, type=int)
+    after = request.args.get('after')  # Cursor opcional: ID de la última respuesta recibida
+
+    if after:
+        if not ObjectId.is_valid(after):
+            return jsonify({"error": "Cursor no válido"}), 400
+        replies = reply_use_cases.list_comment_replies(comment_id, page, limit, after)
+        if isinstance(replies, dict) and "error" in replies:
+            return jsonify(replies), 400
+        return jsonify([serialize_doc(reply) for reply in replies]), 200
 
     # Intentar obtener las respuestas desde Redis
     cache_key = f"replies:{comment_id}:page:{page}"
@@ -143,10 +136,12 @@ def list_comment_replies(comment_id):
 
     # Si no están en caché, obtenerlas de la base de datos
     replies = reply_use_cases.list_comment_replies(comment_id, page, limit)
+    if isinstance(replies, dict) and "error" in replies:
+        return jsonify(replies), 400
     serialized_replies = [serialize_doc(reply) for reply in replies]
 
     # Cachear las respuestas en Redis
-    redis_client.set(cache_key, json.dumps(serialized_replies), ex=60*5)  # Expiración de 5 minutos
+    redis_client.set(cache_key, json.dumps(serialized_replies, default=str), ex=60*5)  # Expiración de 5 minutos
 
     return jsonify(serialized_replies), 200
 
@@ -155,44 +150,78 @@ def list_comment_replies(comment_id):
 @jwt_required()
 def like_reply(reply_id):
     db = get_db_instance()
-    reply_use_cases = ReplyUseCases(db)
+    reply_use_cases = get_use_cases(ReplyUseCases, db)
     
     user_id = get_jwt_identity()
     result = reply_use_cases.like_reply(reply_id, user_id)
-    if result:
+    if "error" not in result:
         user_id_str = str(user_id) if isinstance(user_id, ObjectId) else user_id
 
         # Limpiar la caché relacionada con la respuesta que ha recibido un like
         redis_client.delete(f"replies:{reply_id}")
+        invalidate_discussion(reply_use_cases.get_reply_event_id(reply_id))
 
         # Emitir notificación a través de WebSocket
         socketio.emit('reply_liked', {"reply_id": reply_id, "user_id": user_id_str})
 
         return jsonify({"message": "Like registrado exitosamente"}), 200
 
-    return jsonify({"error": "Error al registrar el like"}), 400
+    return jsonify(result), 400
+
+# Ruta para retirar el like de una respuesta
+@reply_controller.route('/api/replies/<reply_id>/like', methods=['DELETE'])
+@jwt_required()
+def unlike_reply(reply_id):
+    db = get_db_instance()
+    reply_use_cases = get_use_cases(ReplyUseCases, db)
+
+    user_id = get_jwt_identity()
+    result = reply_use_cases.unlike_reply(reply_id, user_id)
+    if "error" not in result:
+        user_id_str = str(user_id) if isinstance(user_id, ObjectId) else user_id
+
+        redis_client.delete(f"replies:{reply_id}")
+        invalidate_discussion(reply_use_cases.get_reply_event_id(reply_id))
+
+        # Emitir notificación a través de WebSocket
+        socketio.emit('reply_unliked', {"reply_id": reply_id, "user_id": user_id_str})
+
+        return jsonify(result), 200
+
+    return jsonify(result), 400
 
 # Ruta para listar los likes de una respuesta
 @reply_controller.route('/api/replies/<reply_id>/likes', methods=['GET'])
 def list_reply_likes(reply_id):
     db = get_db_instance()
-    reply_use_cases = ReplyUseCases(db)
-    
-    # Intentar obtener los likes desde Redis
-    cache_key = f"likes:{reply_id}"
-    cached_likes = redis_client.get(cache_key)
-    if cached_likes:
-        try:
-            likes = json.loads(cached_likes)
-            return jsonify(likes), 200
-        except json.JSONDecodeError:
-            pass  # Si hay un error en la decodificación, proceder a obtener desde la base de datos
+    reply_use_cases = get_use_cases(ReplyUseCases, db)
+    page = request.args.get('page', 1, type=int)
+    limit = min(request.args.get('limit', 50, type=int), 100)
 
-    # Si no hay caché, obtener los likes desde la base de datos
-    likes = reply_use_cases.get_reply_likes(reply_id)
+    # Lectura por índice de la colección de likes; ya no necesita caché en Redis
+    likes = reply_use_cases.get_reply_likes(reply_id, page, limit)
+    if isinstance(likes, dict) and "error" in likes:
+        return jsonify(likes), 400
     serialized_likes = [serialize_doc(like) for like in likes]
 
-    # Cachear los likes en Redis
-    redis_client.set(cache_key, json.dumps(serialized_likes), ex=60*5)  # Expiración de 5 minutos
-
     return jsonify(serialized_likes), 200
+
+# Ruta para saber qué respuestas de una lista ha marcado el usuario actual
+@reply_controller.route('/api/replies/likes/status', methods=['GET'])
+@jwt_required()
+def get_reply_like_status():
+    db = get_db_instance()
+    reply_use_cases = get_use_cases(ReplyUseCases, db)
+    user_id = get_jwt_identity()
+
+    # IDs separados por comas: ?ids=a,b,c
+    reply_ids = [reply_id for reply_id in request.args.get('ids', '').split(',') if reply_id]
+    if not reply_ids:
+        return jsonify({"error": "Debes indicar al menos un ID en 'ids'"}), 400
+    if len(reply_ids) > 100:
+        return jsonify({"error": "Se permiten como máximo 100 IDs por consulta"}), 400
+
+    liked = reply_use_cases.get_liked_replies(user_id, reply_ids)
+    if "error" in liked:
+        return jsonify(liked), 400
+    return jsonify(liked), 200
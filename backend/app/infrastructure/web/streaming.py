@@ -0,0 +1,35 @@
+# relative path: app/infrastructure/web/streaming.py
+
+from flask import Response, current_app, stream_with_context
+
+def iter_json_array(documents, transform=None, batch_size=500):
+    """Genera un array JSON elemento a elemento a partir de un cursor de MongoDB.
+
+    Los elementos se codifican con el proveedor JSON de Flask (mismo formato que
+    jsonify) y se emiten en bloques de `batch_size`, de modo que nunca se materializa
+    la lista completa ni su copia serializada.
+    """
+    encode = current_app.json.dumps
+    yield '['
+    buffer = []
+    first = True
+    for document in documents:
+        if transform is not None:
+            document = transform(document)
+        buffer.append(('' if first else ',') + encode(document))
+        first = False
+        if len(buffer) >= batch_size:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+    yield ']'
+
+def stream_json_array(documents, transform=None, batch_size=None, status=200):
+    """Respuesta HTTP con un array JSON en streaming (ver iter_json_array)."""
+    batch_size = batch_size or current_app.config.get('STREAM_JSON_BATCH_SIZE', 500)
+    return Response(
+        stream_with_context(iter_json_array(documents, transform, batch_size)),
+        status=status,
+        mimetype='application/json'
+    )
@@ -9,7 +9,7 @@ from flask_jwt_extended import (
     create_refresh_token,
 )
 from app.domain.user.use_cases import UserUseCases
-from app.infrastructure.db import get_db_instance  # Asume que get_db_instance devuelve una instancia de la base de datos
+from app.infrastructure.db import get_db_instance, get_use_cases  # Asume que get_db_instance devuelve una instancia de la base de datos
 from app.infrastructure.cache.redis_client import redis_client  # Importar cliente Redis
 from app.infrastructure.websockets.socketio import socketio  # Importar instancia de SocketIO
 from bson import ObjectId
@@ -41,7 +41,7 @@ def serialize_doc(doc):
 @user_controller.route('/api/users/register', methods=['POST'])
 def register_user():
     db = get_db_instance()
-    user_use_cases = UserUseCases(db)
+    user_use_cases = get_use_cases(UserUseCases, db)
 
     try:
         print("-> Inicio de solicitud de registro")
@@ -84,7 +84,7 @@ def register_user():
 @user_controller.route('/api/users/login', methods=['POST'])
 def login_user():
     db = get_db_instance()
-    user_use_cases = UserUseCases(db)
+    user_use_cases = get_use_cases(UserUseCases, db)
 
     try:
         print("-> Inicio de solicitud de login")
@@ -148,7 +148,7 @@ def refresh_token():
 @jwt_required()
 def get_user_profile():
     db = get_db_instance()
-    user_use_cases = UserUseCases(db)
+    user_use_cases = get_use_cases(UserUseCases, db)
 
     user_id = get_jwt_identity()
 
@@ -179,7 +179,7 @@ def get_user_profile():
 @jwt_required()
 def update_user_profile():
     db = get_db_instance()
-    user_use_cases = UserUseCases(db)
+    user_use_cases = get_use_cases(UserUseCases, db)
 
     user_id = get_jwt_identity()
     new_data = request.get_json()
@@ -207,7 +207,7 @@ def update_user_profile():
 @user_controller.route('/api/users/reset-password', methods=['POST'])
 def reset_password():
     db = get_db_instance()
-    user_use_cases = UserUseCases(db)
+    user_use_cases = get_use_cases(UserUseCases, db)
 
     data = request.get_json()
     email = data.get('email')
@@ -225,7 +225,7 @@ def reset_password():
 @user_controller.route('/api/users/update-password', methods=['POST'])
 def update_password():
     db = get_db_instance()
-    user_use_cases = UserUseCases(db)
+    user_use_cases = get_use_cases(UserUseCases, db)
 
     data = request.get_json()
     user_id = data.get('user_id')
@@ -253,7 +253,7 @@ def update_password():
 @jwt_required()
 def disable_user():
     db = get_db_instance()
-    user_use_cases = UserUseCases(db)
+    user_use_cases = get_use_cases(UserUseCases, db)
 
     user_id = get_jwt_identity()
 
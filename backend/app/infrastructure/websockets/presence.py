@@ -0,0 +1,224 @@
+# relative path: app/infrastructure/websockets/presence.py
+
+import threading
+import time
+from flask import request
+from app.core.config import Config
+from app.domain.event.use_cases import EventUseCases
+from app.domain.community.use_cases import CommunityUseCases
+from app.infrastructure.db import get_db_instance, get_use_cases
+from app.infrastructure.cache.redis_client import redis_client
+from app.infrastructure.websockets.socketio import socketio
+
+# Salas con presencia y nombre del contador de la sala que se publica junto a los visitantes
+PRESENCE_ROOMS = {
+    'event': 'attendees',
+    'community': 'members',
+}
+
+ROOM_KEY = 'presence:room:{}'  # ZSET "visitante|sid" -> último latido (un miembro por socket)
+ROOMS_KEY = 'presence:rooms'  # ZSET sala -> última actividad
+COUNTS_KEY = 'presence:counts:{}'  # HASH con los últimos contadores publicados de la sala
+THROTTLE_KEY = 'presence:throttle:{}'
+SWEEP_KEY = 'presence:sweep'
+
+# Purga los sockets caducados y cuenta visitantes distintos (varias pestañas o nodos cuentan una vez)
+_COUNT_VIEWERS = redis_client.register_script("""
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+local viewers, count = {}, 0
+for _, member in ipairs(redis.call('ZRANGE', KEYS[1], 0, -1)) do
+    local viewer = string.match(member, '^(.*)|') or member
+    if not viewers[viewer] then
+        viewers[viewer] = true
+        count = count + 1
+    end
+end
+return count
+""")
+
+class PresenceTracker:
+    """Visitantes conectados por sala de evento o comunidad y contadores en vivo.
+
+    Cada sala es un ZSET de Redis con un miembro por socket ("visitante|sid" -> último
+    latido), así que la presencia no depende de qué nodo atiende cada pestaña: al
+    salir un socket solo se elimina su miembro, y los contadores cuentan visitantes
+    distintos. Los clientes envían `presence_heartbeat` cada `ttl_seconds / 3` y los
+    sockets sin latido durante `ttl_seconds` se purgan, también los de un nodo que
+    haya caído. Los cambios no se emiten uno a uno: las salas afectadas se marcan y
+    un hilo de fondo publica, como mucho una vez por `broadcast_interval` y sala en
+    todo el clúster (lock en Redis), el evento `presence_count` con los contadores y
+    sus deltas. La emisión pasa por la cola de mensajes de Socket.IO, así que llega
+    a los clientes de todos los nodos.
+    """
+
+    def __init__(self, redis, ttl_seconds=90, broadcast_interval=2.0):
+        self.redis = redis
+        self.ttl_seconds = ttl_seconds
+        self.broadcast_interval = broadcast_interval
+        self._viewers = {}  # sid -> identificador del visitante
+        self._rooms = {}  # sid -> salas con presencia del socket
+        self._dirty = set()  # Salas con cambios pendientes de publicar
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._app = None
+
+    def init_app(self, app):
+        self.ttl_seconds = app.config.get('PRESENCE_TTL_SECONDS', self.ttl_seconds)
+        self.broadcast_interval = app.config.get('PRESENCE_BROADCAST_INTERVAL_SECONDS', self.broadcast_interval)
+        self._app = app
+
+    @staticmethod
+    def tracks(room):
+        return room.split(':', 1)[0] in PRESENCE_ROOMS
+
+    def identify(self, sid, user_id):
+        """Asocia el socket a un usuario: varias pestañas del mismo usuario cuentan como un visitante."""
+        if not self._rooms.get(sid):  # Con salas ya contadas se conserva el identificador anónimo
+            self._viewers[sid] = f"user:{user_id}"
+
+    def _member(self, sid):
+        """Miembro del ZSET de la sala para el socket: visitante y sid."""
+        return f"{self._viewers.get(sid, f'sid:{sid}')}|{sid}"
+
+    def join(self, sid, room):
+        now = time.time()
+        pipeline = self.redis.pipeline(transaction=False)
+        pipeline.zadd(ROOM_KEY.format(room), {self._member(sid): now})
+        pipeline.zadd(ROOMS_KEY, {room: now})
+        pipeline.execute()
+        with self._lock:
+            self._rooms.setdefault(sid, set()).add(room)
+            self._dirty.add(room)
+        self._ensure_flusher()
+
+    def leave(self, sid, room):
+        with self._lock:
+            rooms = self._rooms.get(sid, set())
+            if room not in rooms:
+                return
+            rooms.discard(room)
+            # Si el visitante sigue en la sala con otro socket (de este u otro nodo) el contador no cambia y no se publica
+            self._dirty.add(room)
+        self.redis.zrem(ROOM_KEY.format(room), self._member(sid))
+
+    def disconnect(self, sid):
+        for room in list(self._rooms.get(sid, ())):
+            self.leave(sid, room)
+        with self._lock:
+            self._rooms.pop(sid, None)
+        self._viewers.pop(sid, None)
+
+    def heartbeat(self, sid):
+        """Renueva la presencia del socket en todas sus salas."""
+        rooms = list(self._rooms.get(sid, ()))
+        if not rooms:
+            return
+        member = self._member(sid)
+        now = time.time()
+        pipeline = self.redis.pipeline(transaction=False)
+        for room in rooms:
+            pipeline.zadd(ROOM_KEY.format(room), {member: now})
+            pipeline.zadd(ROOMS_KEY, {room: now})
+        added = pipeline.execute()[::2]
+        # Si el socket había caducado vuelve a contar
+        readded = [room for room, count in zip(rooms, added) if count]
+        if readded:
+            with self._lock:
+                self._dirty.update(readded)
+
+    def touch(self, room):
+        """Marca la sala para publicar sus contadores (por ejemplo, tras registrar una asistencia)."""
+        with self._lock:
+            self._dirty.add(room)
+        self._ensure_flusher()
+
+    def counts(self, db, room):
+        """Contadores actuales de la sala: visitantes conectados y asistentes o miembros."""
+        kind, room_id = room.split(':', 1)
+        viewers = _COUNT_VIEWERS(keys=[ROOM_KEY.format(room)], args=[time.time() - self.ttl_seconds])
+        if kind == 'event':
+            parent_count = get_use_cases(EventUseCases, db).get_attendee_count(room_id)
+        else:
+            parent_count = get_use_cases(CommunityUseCases, db).get_member_count(room_id)
+        return {'viewers': viewers, PRESENCE_ROOMS[kind]: parent_count}
+
+    def publish(self, db, room):
+        """Emite `presence_count` a la sala si algún contador ha cambiado desde la última publicación."""
+        counts = {name: value for name, value in self.counts(db, room).items() if value is not None}
+        previous = self.redis.hgetall(COUNTS_KEY.format(room))
+        deltas = {f"{name}_delta": value - int(previous.get(name, 0)) for name, value in counts.items()}
+        if previous and not any(deltas.values()):
+            return False
+        pipeline = self.redis.pipeline(transaction=False)
+        pipeline.hset(COUNTS_KEY.format(room), mapping=counts)
+        pipeline.expire(COUNTS_KEY.format(room), self.ttl_seconds * 10)
+        pipeline.execute()
+        socketio.emit('presence_count', {'room': room, **counts, **deltas}, to=room)
+        return True
+
+    def flush(self, db):
+        """Publica las salas con cambios; las que otro nodo acaba de publicar esperan al siguiente ciclo."""
+        self._sweep()
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        postponed = set()
+        throttle_ms = int(self.broadcast_interval * 1000)
+        for room in dirty:
+            if not self.redis.set(THROTTLE_KEY.format(room), 1, nx=True, px=throttle_ms):
+                postponed.add(room)
+                continue
+            self.publish(db, room)
+        if postponed:
+            with self._lock:
+                self._dirty |= postponed
+
+    def _sweep(self):
+        """Purga los visitantes caducados de todas las salas (un nodo cada tercio del TTL)."""
+        if not self.redis.set(SWEEP_KEY, 1, nx=True, px=int(self.ttl_seconds * 1000 / 3)):
+            return
+        cutoff = time.time() - self.ttl_seconds
+        rooms = self.redis.zrange(ROOMS_KEY, 0, -1)
+        if not rooms:
+            return
+        pipeline = self.redis.pipeline(transaction=False)
+        for room in rooms:
+            pipeline.zremrangebyscore(ROOM_KEY.format(room), '-inf', cutoff)
+        removed = pipeline.execute()
+        # Las salas sin actividad durante el TTL ya están vacías
+        self.redis.zremrangebyscore(ROOMS_KEY, '-inf', cutoff)
+        with self._lock:
+            self._dirty.update(room for room, count in zip(rooms, removed) if count)
+
+    def _ensure_flusher(self):
+        if self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = socketio.start_background_task(self._run)
+
+    def _run(self):
+        with self._app.app_context():
+            db = get_db_instance()
+            while True:
+                socketio.sleep(self.broadcast_interval)
+                try:
+                    self.flush(db)
+                except Exception as e:
+                    print(f"Error al publicar la presencia: {e}")
+
+# Instancia global; init_app aplica la configuración de la app
+presence = PresenceTracker(
+    redis_client,
+    ttl_seconds=Config.PRESENCE_TTL_SECONDS,
+    broadcast_interval=Config.PRESENCE_BROADCAST_INTERVAL_SECONDS
+)
+
+@socketio.on('presence_heartbeat')
+def handle_presence_heartbeat(data=None):
+    """Latido del cliente: mantiene su presencia en las salas a las que se ha unido."""
+    presence.heartbeat(request.sid)
+    return {"interval": presence.ttl_seconds / 3}
+
+@socketio.on('disconnect')
+def handle_disconnect(*args):
+    presence.disconnect(request.sid)
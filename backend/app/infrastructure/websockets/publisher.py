@@ -0,0 +1,27 @@
+# relative path: app/infrastructure/websockets/publisher.py
+
+from app.infrastructure.websockets.socketio import socketio  # Importar instancia de SocketIO
+
+class RealtimePublisher:
+    """Publica mensajes de Socket.IO hacia las salas de usuario en lotes."""
+
+    def __init__(self, event='notification_created', batch_size=500):
+        self.event = event
+        self.batch_size = batch_size
+
+    def to_users(self, user_ids, payload):
+        """Emite el mismo mensaje a las salas `user:{id}`, un publish por lote en lugar de uno por usuario."""
+        user_ids = list(user_ids)
+        for start in range(0, len(user_ids), self.batch_size):
+            rooms = [f"user:{user_id}" for user_id in user_ids[start:start + self.batch_size]]
+            socketio.emit(self.event, payload, to=rooms)
+
+    def broadcast(self, room, payload):
+        """Emite el mensaje a una sala compartida (por ejemplo `community:{id}`)."""
+        socketio.emit(self.event, payload, to=room)
+
+# Instancia global del publicador de notificaciones
+notification_publisher = RealtimePublisher()
+
+# Instancia global del publicador de recordatorios
+reminder_publisher = RealtimePublisher(event='reminder_due')
@@ -1,10 +1,64 @@
 # relative path: app/infrastructure/websockets/socketio.py
 
+from flask import request
 from flask_socketio import SocketIO
-from app.core.config import Config  # Importar la configuración
+from app.infrastructure.metrics import socketio_emits
 
-# Configuración de SocketIO con Redis como backend de mensajes
-socketio = SocketIO(
-    message_queue=Config.REDIS_URL,  # Obtener la URL de Redis desde la configuración
+class InstrumentedSocketIO(SocketIO):
+    """SocketIO que cuenta los mensajes emitidos por nombre de evento."""
+
+    def emit(self, event, *args, **kwargs):
+        socketio_emits.inc(event)
+        return super().emit(event, *args, **kwargs)
+
+# Instancia de SocketIO; create_app la inicializa con la cola de mensajes de Redis configurada
+socketio = InstrumentedSocketIO(
     cors_allowed_origins="*"  # Permitir CORS desde cualquier origen
 )
+
+# Salas a las que un cliente puede unirse además de la suya propia
+ALLOWED_ROOM_PREFIXES = ('event:', 'community:', 'calendar:')
+
+@socketio.on('join_user_room')
+def handle_join_user_room(data):
+    """Une al cliente a la sala `user:{id}` del usuario autenticado con su token JWT."""
+    from flask_socketio import join_room
+    from flask_jwt_extended import decode_token
+    try:
+        user_id = decode_token((data or {}).get('token', ''))['sub']
+    except Exception:
+        return {"error": "Token no válido"}
+    join_room(f"user:{user_id}")
+    from app.infrastructure.websockets.presence import presence
+    presence.identify(request.sid, user_id)
+    return {"room": f"user:{user_id}"}
+
+@socketio.on('join_room')
+def handle_join_room(data):
+    """Une al cliente a la sala de un evento, comunidad o calendario."""
+    from flask_socketio import join_room
+    room = (data or {}).get('room', '')
+    if not room.startswith(ALLOWED_ROOM_PREFIXES):
+        return {"error": "Sala no permitida"}
+    join_room(room)
+    from app.infrastructure.websockets.presence import presence
+    if presence.tracks(room):
+        presence.join(request.sid, room)
+    return {"room": room}
+
+@socketio.on('leave_room')
+def handle_leave_room(data):
+    """Saca al cliente de la sala de un evento, comunidad o calendario."""
+    from flask_socketio import leave_room
+    from app.infrastructure.websockets.presence import presence
+    room = (data or {}).get('room', '')
+    leave_room(room)
+    presence.leave(request.sid, room)
+    return {"room": room}
+
+@socketio.on('redis_test_event')
+def handle_redis_test_event(data):
+    """Evento de WebSocket de prueba para usar Redis como backend."""
+    print(f"Mensaje recibido: {data}")
+    # Emitir respuesta a través de WebSocket utilizando Redis como backend
+    socketio.emit('redis_response_event', {'message': 'Redis está funcionando correctamente'})
@@ -0,0 +1,283 @@
+# relative path: bench/run.py
+"""Benchmark de las rutas más usadas de la API.
+
+Uso (desde backend/):
+    python -m bench.run --mode spawn --scale 1 --clients 8 --requests 2000 --output bench.json
+    python -m bench.run --mode inmemory --baseline bench.json
+
+Modos:
+    local     usa MONGODB_URI / REDIS_URL del entorno (base de datos `calendar_bench`)
+    spawn     arranca mongod y redis-server efímeros en un directorio temporal
+    inmemory  mongomock + fakeredis (micro-benchmarks, sin round trips a MongoDB)
+"""
+
+import argparse
+import json
+import math
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from bench.standins import spawn_local_servers, stop_local_servers, install_inmemory_standins, INMEMORY_CONFIG
+from bench.seed import seed
+
+BENCH_DB_NAME = 'calendar_bench'
+
+def _query_date(offset_days):
+    return (datetime.utcnow() + timedelta(days=offset_days)).strftime('%Y-%m-%dT%H:%M:%S')
+
+# Rutas calientes: nombre -> función que construye (url, requiere_jwt) a partir de los datos sembrados
+ROUTES = {
+    'events_featured': lambda fx, rng: (f"/api/events/featured?page={rng.randint(1, 3)}&limit=20", False),
+    'events_filter': lambda fx, rng: (
+        f"/api/events/filter?community={rng.choice(fx['community_ids'])}&date_from={_query_date(-7)}&date_to={_query_date(60)}&limit=20", False),
+    'event_detail': lambda fx, rng: (f"/api/events/{rng.choice(fx['event_ids'])}", False),
+    'event_discussion': lambda fx, rng: (f"/api/events/{rng.choice(fx['event_ids'])}/discussion?limit=10", False),
+    'event_comments': lambda fx, rng: (f"/api/comments/{rng.choice(fx['event_ids'])}?page=1&limit=10", False),
+    'event_rating_average': lambda fx, rng: (f"/api/ratings/{rng.choice(fx['event_ids'])}/average", False),
+    'communities_featured': lambda fx, rng: ("/api/communities/featured?page=1&limit=20", False),
+    'communities_list': lambda fx, rng: (f"/api/communities?page={rng.randint(1, 3)}&limit=20", True),
+}
+
+def percentile(sorted_values, fraction):
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def install_round_trip_counter():
+    """Registra en pymongo un listener que cuenta los comandos enviados desde cada hilo cliente.
+
+    Se cuenta en el proceso del benchmark y no con la cabecera Server-Timing, que se
+    emite antes de iterar los cuerpos en streaming: así también se incluyen los
+    getMore de los cursores que se consumen al enviar la respuesta. Debe llamarse
+    después de eventlet.monkey_patch() (threading.local por greenlet) y antes de
+    crear el MongoClient.
+    """
+    from pymongo import monitoring
+
+    class RoundTripCounter(monitoring.CommandListener):
+        def __init__(self):
+            self._local = threading.local()
+
+        def reset(self):
+            self._local.count = 0
+
+        def count(self):
+            return getattr(self._local, 'count', 0)
+
+        def started(self, event):
+            self._local.count = self.count() + 1
+
+        def succeeded(self, event):
+            pass
+
+        def failed(self, event):
+            pass
+
+    counter = RoundTripCounter()
+    monitoring.register(counter)
+    return counter
+
+def load_app(mode):
+    """Crea la aplicación contra MongoDB/Redis según el modo y asegura sus índices.
+
+    Devuelve la aplicación y el contador de round trips a MongoDB.
+    """
+    import eventlet
+    eventlet.monkey_patch()
+    round_trip_counter = install_round_trip_counter()
+    from app.factory import create_app
+    from app.infrastructure.db import get_db_instance
+    from app.infrastructure.indexes import ensure_indexes
+
+    overrides = {'MONGODB_DB_NAME': BENCH_DB_NAME, 'TESTING': True, 'ENSURE_INDEXES_ON_STARTUP': False}
+    if mode == 'inmemory':
+        overrides.update(INMEMORY_CONFIG)
+    app = create_app(config_overrides=overrides)
+    if mode == 'inmemory':
+        install_inmemory_standins()
+    with app.app_context():
+        ensure_indexes(get_db_instance())
+    return app, round_trip_counter
+
+def run_route(app, name, fixtures, args, token, round_trip_counter):
+    """Lanza `args.requests` peticiones a una ruta con `args.clients` clientes concurrentes."""
+    rng = random.Random(args.seed)
+    build = ROUTES[name]
+    plan = [build(fixtures, rng) for _ in range(args.warmup + args.requests)]
+    headers_for = lambda needs_jwt: {'Authorization': f"Bearer {token}"} if needs_jwt else {}
+
+    # Calentamiento (cachés, pools de conexiones): no se mide; los fallos se verán en la medición
+    client = app.test_client()
+    for url, needs_jwt in plan[:args.warmup]:
+        try:
+            client.get(url, headers=headers_for(needs_jwt)).get_data()
+        except Exception:
+            pass
+
+    pending = list(reversed(plan[args.warmup:]))
+    lock = threading.Lock()
+    latencies, round_trips, statuses = [], [], {}
+    failures = {}  # Excepciones de la aplicación -> número de peticiones
+
+    def worker():
+        worker_client = app.test_client()
+        while True:
+            with lock:
+                if not pending:
+                    return
+                url, needs_jwt = pending.pop()
+            round_trip_counter.reset()
+            start = time.perf_counter()
+            try:
+                response = worker_client.get(url, headers=headers_for(needs_jwt))
+                response.get_data()  # Consumir también los cuerpos en streaming
+                status = response.status_code
+            except Exception as e:
+                # Con TESTING la excepción de la vista llega al cliente: se cuenta como error 500
+                status = 500
+                failure = f"{type(e).__name__}: {e}"
+                with lock:
+                    failures[failure] = failures.get(failure, 0) + 1
+            elapsed = time.perf_counter() - start
+            trips = round_trip_counter.count()
+            with lock:
+                latencies.append(elapsed)
+                round_trips.append(trips)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_time = time.perf_counter() - started
+
+    latencies.sort()
+    to_ms = lambda seconds: round(seconds * 1000, 2) if seconds is not None else None
+    return {
+        'requests': len(latencies),
+        'errors': sum(count for status, count in statuses.items() if status >= 400),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'exceptions': failures,
+        'throughput_rps': round(len(latencies) / wall_time, 1) if wall_time else None,
+        'p50_ms': to_ms(percentile(latencies, 0.50)),
+        'p95_ms': to_ms(percentile(latencies, 0.95)),
+        'p99_ms': to_ms(percentile(latencies, 0.99)),
+        'mongo_round_trips_per_request': (round(sum(round_trips) / len(round_trips), 2)
+                                          if round_trips and args.mode != 'inmemory' else None),
+    }
+
+def compare(results, baseline):
+    """Variación porcentual de throughput y p95 respecto a un resultado anterior."""
+    comparison = {}
+    for name, current in results['routes'].items():
+        previous = baseline.get('routes', {}).get(name)
+        if not previous:
+            continue
+        deltas = {}
+        for metric in ('throughput_rps', 'p95_ms', 'mongo_round_trips_per_request'):
+            if current.get(metric) is not None and previous.get(metric):
+                deltas[metric] = round((current[metric] - previous[metric]) / previous[metric] * 100, 1)
+        comparison[name] = deltas
+    return comparison
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de las rutas calientes de la API")
+    parser.add_argument('--mode', choices=('local', 'spawn', 'inmemory'), default='inmemory')
+    parser.add_argument('--scale', type=float, default=1.0, help="Multiplicador del volumen de datos sintéticos")
+    parser.add_argument('--clients', type=int, default=8, help="Clientes concurrentes por ruta")
+    parser.add_argument('--requests', type=int, default=500, help="Peticiones medidas por ruta")
+    parser.add_argument('--warmup', type=int, default=50, help="Peticiones de calentamiento por ruta")
+    parser.add_argument('--routes', default=','.join(ROUTES), help="Rutas a medir, separadas por comas")
+    parser.add_argument('--seed', type=int, default=42, help="Semilla de los datos y de las peticiones")
+    parser.add_argument('--no-seed', action='store_true', help="Reutiliza los datos ya sembrados (solo modo local)")
+    parser.add_argument('--output', help="Fichero JSON de resultados (por defecto, stdout)")
+    parser.add_argument('--baseline', help="Resultado JSON anterior con el que comparar")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    routes = [name for name in args.routes.split(',') if name]
+    unknown = [name for name in routes if name not in ROUTES]
+    if unknown:
+        sys.exit(f"Rutas desconocidas: {', '.join(unknown)}")
+
+    processes = []
+    workdir = tempfile.mkdtemp(prefix='calendar-bench-')
+    try:
+        if args.mode == 'spawn':
+            processes = spawn_local_servers(workdir)
+        app, round_trip_counter = load_app(args.mode)
+
+        from flask_jwt_extended import create_access_token
+        from app.infrastructure.db import get_db_instance
+        from app.infrastructure.cache.redis_client import redis_client
+        with app.app_context():
+            db = get_db_instance()
+            if args.no_seed and args.mode == 'local':
+                fixtures = {
+                    'counts': None,
+                    'user_ids': [str(user['_id']) for user in db.users.find({}, {'_id': 1}).limit(1000)],
+                    'community_ids': [str(c['_id']) for c in db.communities.find({}, {'_id': 1}).limit(1000)],
+                    'event_ids': [str(event['_id']) for event in db.events.find({}, {'_id': 1}).limit(5000)],
+                }
+            else:
+                fixtures = seed(db, args.scale, args.seed)
+            token = create_access_token(identity=fixtures['user_ids'][0])
+        if args.mode != 'local':
+            redis_client.flushdb()  # Servidores efímeros: empezar con la caché vacía
+
+        results = {
+            'commit': git_commit(),
+            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'python': platform.python_version(),
+            'mode': args.mode,
+            'scale': args.scale,
+            'clients': args.clients,
+            'requests_per_route': args.requests,
+            'seeded': fixtures['counts'],
+            'startup_ms': {phase: round(seconds * 1000, 1) for phase, seconds in app.extensions['startup_timings'].items()},
+            'routes': {},
+        }
+        for name in routes:
+            print(f"Midiendo {name}...", file=sys.stderr)
+            try:
+                results['routes'][name] = run_route(app, name, fixtures, args, token, round_trip_counter)
+            except Exception as e:
+                # Una ruta rota no impide medir las demás
+                print(f"Error al medir {name}: {e}", file=sys.stderr)
+                results['routes'][name] = {'requests': 0, 'errors': args.requests, 'exceptions': {f"{type(e).__name__}: {e}": 1}}
+
+        if args.baseline:
+            with open(args.baseline, encoding='utf-8') as baseline_file:
+                baseline = json.load(baseline_file)
+                results['baseline'] = {'commit': baseline.get('commit'), 'delta_percent': compare(results, baseline)}
+
+        output = json.dumps(results, indent=2, ensure_ascii=False)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as output_file:
+                output_file.write(output + '\n')
+        else:
+            print(output)
+    finally:
+        stop_local_servers(processes)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+# relative path: bench/seed.py
+
+import random
+from datetime import datetime, timedelta
+from bson import ObjectId
+
+# Volumen base de cada colección (se multiplica por --scale)
+BASE_COUNTS = {
+    'users': 1000,
+    'communities': 50,
+    'events': 2000,
+    'comments': 10000,
+    'ratings': 5000,
+}
+
+CATEGORIES = ('Tecnología', 'Deportes', 'Música', 'Arte', 'Educación', 'Gastronomía')
+LOCATIONS = ('Buenos Aires', 'Córdoba', 'Rosario', 'Mendoza', 'La Plata')
+
+SEEDED_COLLECTIONS = ('users', 'communities', 'events', 'comments', 'replies', 'ratings', 'likes', 'calendars')
+
+def _insert(collection, documents, batch_size=1000):
+    for start in range(0, len(documents), batch_size):
+        collection.insert_many(documents[start:start + batch_size], ordered=False)
+
+def seed(db, scale=1.0, random_seed=42):
+    """Vacía las colecciones del benchmark y genera datos sintéticos reproducibles.
+
+    Devuelve los IDs generados (como strings) para construir las peticiones.
+    """
+    rng = random.Random(random_seed)
+    counts = {name: max(1, int(count * scale)) for name, count in BASE_COUNTS.items()}
+    now = datetime.utcnow().replace(microsecond=0)
+
+    for name in SEEDED_COLLECTIONS:
+        db[name].delete_many({})
+
+    users = [{
+        '_id': ObjectId(),
+        'name': f"Usuario {index}",
+        'email': f"usuario{index}@bench.local",
+        'password': 'bench',
+        'role': 'admin' if index == 0 else 'member',
+        'communities': [],
+        'is_active': True,
+        'created_at': now,
+    } for index in range(counts['users'])]
+    user_ids = [str(user['_id']) for user in users]
+    _insert(db.users, users)
+
+    communities = []
+    for index in range(counts['communities']):
+        members = rng.sample(user_ids, min(len(user_ids), rng.randint(5, 200)))
+        communities.append({
+            '_id': ObjectId(),
+            'name': f"Comunidad {index}",
+            'description': f"Comunidad sintética {index}",
+            'admin': members[0],
+            'category': rng.choice(CATEGORIES),
+            'location': rng.choice(LOCATIONS),
+            'type': 'Pública',
+            'moderators': members[:2],
+            'members': members,
+            'events': [],
+            'featured': rng.random() < 0.2,
+            'popularity': rng.randint(0, 1000),
+            'participation': rng.randint(0, 500),
+            'created_at': now,
+            'version': 1,
+        })
+    community_ids = [str(community['_id']) for community in communities]
+    _insert(db.communities, communities)
+
+    events = []
+    for index in range(counts['events']):
+        community = rng.choice(communities)
+        events.append({
+            '_id': ObjectId(),
+            'title': f"Evento {index}",
+            'description': f"Evento sintético {index}",
+            'community': str(community['_id']),
+            'category': community['category'],
+            'date_time': now + timedelta(hours=rng.randint(-24 * 180, 24 * 180)),
+            'location': community['location'],
+            'created_by': community['admin'],
+            'attendees': rng.sample(community['members'], min(len(community['members']), rng.randint(0, 50))),
+            'featured': rng.random() < 0.1,
+            'status': 'scheduled',
+            'popularity': rng.randint(0, 1000),
+            'rating': 0.0,
+            'created_at': now,
+            'version': 1,
+        })
+    event_ids = [str(event['_id']) for event in events]
+    _insert(db.events, events)
+
+    comments = [{
+        '_id': ObjectId(),
+        'event': rng.choice(event_ids),
+        'user': rng.choice(user_ids),
+        'content': f"Comentario sintético {index}",
+        'like_count': rng.randint(0, 20),
+        'report_count': 0,
+        'created_at': now - timedelta(minutes=index),
+    } for index in range(counts['comments'])]
+    _insert(db.comments, comments)
+
+    # Un usuario puntúa cada evento como mucho una vez
+    rating_pairs = {(rng.choice(event_ids), rng.choice(user_ids)) for _ in range(counts['ratings'])}
+    ratings = [{
+        '_id': ObjectId(),
+        'event': event_id,
+        'user': user_id,
+        'score': rng.randint(1, 5),
+        'created_at': now,
+    } for event_id, user_id in sorted(rating_pairs)]
+    _insert(db.ratings, ratings)
+
+    return {
+        'counts': counts,
+        'user_ids': user_ids,
+        'community_ids': community_ids,
+        'event_ids': event_ids,
+    }
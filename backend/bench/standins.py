@@ -0,0 +1,79 @@
+# relative path: bench/standins.py
+
+import functools
+import os
+import shutil
+import socket
+import subprocess
+import time
+
+def wait_for_port(port, timeout=30):
+    """Espera a que un servidor local acepte conexiones en el puerto indicado."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"El servidor del puerto {port} no respondió en {timeout} s")
+
+def spawn_local_servers(workdir, mongo_port=27117, redis_port=6399):
+    """Arranca `mongod` y `redis-server` efímeros (sin persistencia) y devuelve sus procesos.
+
+    Configura MONGODB_URI y REDIS_URL en el entorno: debe llamarse antes de importar la aplicación.
+    """
+    for binary in ('mongod', 'redis-server'):
+        if shutil.which(binary) is None:
+            raise RuntimeError(f"No se encontró '{binary}' en el PATH")
+
+    dbpath = os.path.join(workdir, 'mongo')
+    os.makedirs(dbpath, exist_ok=True)
+    processes = [
+        subprocess.Popen(['mongod', '--dbpath', dbpath, '--port', str(mongo_port), '--bind_ip', '127.0.0.1', '--quiet'],
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL),
+        subprocess.Popen(['redis-server', '--port', str(redis_port), '--save', '', '--appendonly', 'no'],
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL),
+    ]
+    wait_for_port(mongo_port)
+    wait_for_port(redis_port)
+
+    os.environ['MONGODB_URI'] = f"mongodb://127.0.0.1:{mongo_port}/calendar_bench"
+    os.environ['REDIS_URL'] = f"redis://127.0.0.1:{redis_port}/0"
+    return processes
+
+def stop_local_servers(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+# Configuración de la app en modo en memoria: sin cola de mensajes de Socket.IO
+INMEMORY_CONFIG = {'SOCKETIO_MESSAGE_QUEUE': None}
+
+def install_inmemory_standins():
+    """Sustituye MongoDB y Redis por mongomock y fakeredis para micro-benchmarks.
+
+    Debe llamarse después de create_app (que configura Redis) y antes de la primera
+    consulta. Todos los MongoClient comparten el mismo almacén en memoria; los
+    scripts Lua de Redis necesitan `lupa`. mongomock no emite eventos de
+    monitorización, así que en este modo no hay recuento de round trips a MongoDB.
+    """
+    import mongomock
+    import fakeredis
+    import redis
+    from app.infrastructure import db as db_module
+    from app.infrastructure.cache.redis_client import redis_client
+
+    store = mongomock.store.ServerStore()
+    db_module.close_clients()
+    db_module.MongoClient = functools.partial(mongomock.MongoClient, _store=store)
+
+    redis_client.configure(connection_pool=redis.ConnectionPool(
+        connection_class=fakeredis.FakeConnection,
+        server=fakeredis.FakeServer(),
+        decode_responses=True
+    ))
@@ -0,0 +1,113 @@
+# relative path: bench/validation.py
+"""Micro-benchmark de la validación de los endpoints de mucho volumen.
+
+Compara, por payload, tres formas de validar:
+    per_request  construir el esquema y llamar a load() (lo que se hacía en cada petición)
+    shared       load() sobre el esquema compartido por el proceso
+    fast         FastValidator sobre el esquema compartido
+
+Los hooks que consultan la base de datos se sustituyen por no-ops (como en
+EventImportSchema): su coste es el mismo en las tres variantes y aquí se mide
+solo la validación y deserialización de los campos.
+
+Uso (desde backend/):
+    python -m bench.validation --iterations 20000
+"""
+
+import argparse
+import json
+import sys
+import time
+import warnings
+
+from marshmallow import ValidationError
+from app.domain.comment.entities import CommentSchema
+from app.domain.rating.entities import RatingSchema
+from app.domain.validation import FastValidator
+
+class BenchCommentSchema(CommentSchema):
+    """CommentSchema sin las comprobaciones contra MongoDB."""
+
+    def validate_user_exists(self, user, **kwargs):
+        pass
+
+    def validate_event_exists(self, event, **kwargs):
+        pass
+
+class BenchRatingSchema(RatingSchema):
+    """RatingSchema sin las comprobaciones contra MongoDB."""
+
+    def validate_event_exists(self, event, **kwargs):
+        pass
+
+    def validate_user_exists(self, user, **kwargs):
+        pass
+
+# Payloads: nombre -> (clase del esquema, datos, partial)
+CASES = {
+    'comment_create': (BenchCommentSchema, {'user': '64b7f0c2a1b2c3d4e5f60718', 'event': '64b7f0c2a1b2c3d4e5f60719', 'content': 'Nos vemos allí'}, None),
+    'comment_update': (BenchCommentSchema, {'content': 'Nos vemos allí a las ocho'}, True),
+    'rating_create': (BenchRatingSchema, {'user': '64b7f0c2a1b2c3d4e5f60718', 'event': '64b7f0c2a1b2c3d4e5f60719', 'score': 4}, None),
+    'rating_invalid': (BenchRatingSchema, {'user': '64b7f0c2a1b2c3d4e5f60718', 'event': '64b7f0c2a1b2c3d4e5f60719', 'score': 9}, None),
+}
+
+def measure(function, iterations):
+    """Microsegundos por llamada (la mejor de tres rondas)."""
+    best = None
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            function()
+        elapsed = (time.perf_counter() - started) / iterations
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best * 1_000_000, 2)
+
+def outcome(function):
+    try:
+        return function()
+    except ValidationError as error:
+        return {'errors': error.messages}
+
+def run_case(schema_class, data, partial, iterations):
+    shared_schema = schema_class()
+    validator = FastValidator(shared_schema)
+
+    def per_request():
+        return outcome(lambda: schema_class().load(data, partial=partial))
+
+    def shared():
+        return outcome(lambda: shared_schema.load(data, partial=partial))
+
+    def fast():
+        return outcome(lambda: validator.load(data, partial=partial))
+
+    # Las tres variantes deben producir exactamente el mismo resultado
+    if not (per_request() == shared() == fast()):
+        raise AssertionError(f"FastValidator difiere de schema.load() para {data!r}")
+
+    timings = {name: measure(function, iterations) for name, function in
+               (('per_request', per_request), ('shared', shared), ('fast', fast))}
+    return {
+        'us_per_call': timings,
+        'speedup_vs_per_request': round(timings['per_request'] / timings['fast'], 1),
+        'speedup_vs_shared': round(timings['shared'] / timings['fast'], 1),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmark de la validación de esquemas")
+    parser.add_argument('--iterations', type=int, default=20000, help="Llamadas por ronda y variante")
+    parser.add_argument('--cases', default=','.join(CASES), help="Payloads a medir, separados por comas")
+    args = parser.parse_args(argv)
+
+    warnings.simplefilter('ignore')  # Avisos de deprecación de marshmallow al construir esquemas
+    results = {}
+    for name in (name for name in args.cases.split(',') if name):
+        if name not in CASES:
+            sys.exit(f"Payload desconocido: {name}")
+        schema_class, data, partial = CASES[name]
+        print(f"Midiendo {name}...", file=sys.stderr)
+        results[name] = run_case(schema_class, data, partial, args.iterations)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""Punto de entrada de producción: N workers eventlet, uno por puerto, con la cola de mensajes de Redis compartida.
+
+Socket.IO necesita sesiones persistentes (sticky sessions) con el transporte de
+long-polling, así que cada worker escucha en su propio puerto y un balanceador
+con afinidad por IP (nginx `ip_hash`) reparte los clientes. Los mensajes entre
+workers viajan por SOCKETIO_MESSAGE_QUEUE (Redis).
+
+Uso (desde backend/):
+    python serve.py --workers 4 --base-port 5000
+    python serve.py --workers 4 --print-nginx > calendar.conf
+
+Señales del proceso maestro:
+    SIGTERM / SIGINT  detiene todos los workers
+    SIGHUP            reinicio escalonado: los workers se reemplazan de uno en uno, y
+                      no se detiene el siguiente hasta que el reemplazo acepta conexiones
+
+El maestro no importa la aplicación ni eventlet: cada worker hace el
+monkey-patching y crea su app después del fork, y los clientes de MongoDB y
+Redis se conectan de forma perezosa dentro de cada proceso.
+"""
+
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+NGINX_TEMPLATE = """upstream calendar_api {{
+    ip_hash;  # Afinidad por IP: necesaria para el long-polling de Socket.IO
+{servers}
+}}
+
+server {{
+    listen 80;
+
+    location / {{
+        proxy_pass http://calendar_api;
+        proxy_http_version 1.1;
+        proxy_set_header Upgrade $http_upgrade;
+        proxy_set_header Connection "upgrade";
+        proxy_set_header Host $host;
+        proxy_set_header X-Forwarded-For $proxy_add_x_forwarded_for;
+        proxy_buffering off;  # Respuestas en streaming (exportaciones, listados grandes)
+    }}
+}}
+"""
+
+def run_worker(index, host, port):
+    """Cuerpo del proceso hijo: parchea con eventlet, crea la app y sirve en su puerto."""
+    started = time.perf_counter()
+    import eventlet
+    eventlet.monkey_patch()
+    from app.factory import create_app
+    from app.infrastructure.websockets.socketio import socketio
+
+    app = create_app()
+    print(f"[worker {index}] pid {os.getpid()} escuchando en {host}:{port} (listo en {(time.perf_counter() - started) * 1000:.0f} ms)", flush=True)
+    socketio.run(app, host=host, port=port, log_output=False)
+
+class Supervisor:
+    """Mantiene N workers vivos y los reinicia en cuanto terminan."""
+
+    def __init__(self, workers, host, base_port, restart_delay=1.0, ready_timeout=60.0):
+        self.host = host
+        self.ports = [base_port + index for index in range(workers)]
+        self.restart_delay = restart_delay
+        self.ready_timeout = ready_timeout  # Espera máxima a que un reemplazo acepte conexiones
+        self.children = {}  # pid -> (índice, momento de arranque)
+        self.stopping = False
+        self.rolling_restart = []
+
+    def spawn(self, index):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGHUP, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            try:
+                run_worker(index, self.host, self.ports[index])
+            finally:
+                os._exit(0)
+        self.children[pid] = (index, time.monotonic())
+        return pid
+
+    def handle_stop(self, signum, frame):
+        self.stopping = True
+        for pid in list(self.children):
+            self._kill(pid, signal.SIGTERM)
+
+    def handle_reload(self, signum, frame):
+        # Los workers se sustituyen de uno en uno para no dejar el servicio sin capacidad
+        self.rolling_restart = list(self.children)
+
+    def _is_listening(self, index):
+        """Indica si el worker ya acepta conexiones en su puerto."""
+        host = {'0.0.0.0': '127.0.0.1', '::': '::1', '': '127.0.0.1'}.get(self.host, self.host)
+        try:
+            with socket.create_connection((host, self.ports[index]), timeout=0.5):
+                return True
+        except OSError:
+            return False
+
+    def _kill(self, pid, signum):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.handle_stop)
+        signal.signal(signal.SIGINT, self.handle_stop)
+        signal.signal(signal.SIGHUP, self.handle_reload)
+
+        for index in range(len(self.ports)):
+            self.spawn(index)
+
+        replacing = None  # pid del worker que se está deteniendo en el reinicio escalonado
+        warming = None  # (índice, límite) del reemplazo que todavía no escucha en su puerto
+        while self.children:
+            if warming is not None:
+                index, deadline = warming
+                if self._is_listening(index):
+                    warming = None
+                elif time.monotonic() > deadline:
+                    print(f"[maestro] el worker {index} no acepta conexiones tras {self.ready_timeout:.0f} s; se cancela el reinicio escalonado", flush=True)
+                    self.rolling_restart = []
+                    warming = None
+
+            if not self.stopping and replacing is None and warming is None and self.rolling_restart:
+                replacing = self.rolling_restart.pop(0)
+                if replacing in self.children:
+                    self._kill(replacing, signal.SIGTERM)
+                else:
+                    replacing = None
+
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                time.sleep(0.2)
+                continue
+
+            index, started_at = self.children.pop(pid)
+            replaced = pid == replacing
+            if replaced:
+                replacing = None
+            if self.stopping:
+                continue
+            uptime = time.monotonic() - started_at
+            print(f"[maestro] worker {index} (pid {pid}) terminó con estado {status} tras {uptime:.1f} s; reiniciando", flush=True)
+            if uptime < self.restart_delay:
+                time.sleep(self.restart_delay)  # Evita un bucle de reinicios si el worker falla al arrancar
+            self.spawn(index)
+            if replaced:
+                # El siguiente worker no se detiene hasta que este reemplazo escuche en su puerto
+                warming = (index, time.monotonic() + self.ready_timeout)
+
+def ensure_indexes_once():
+    """Crea los índices una sola vez antes de arrancar los workers."""
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-m', 'flask', '--app', 'api_server', 'ensure-indexes'],
+                            cwd=os.path.dirname(os.path.abspath(__file__)),
+                            env={**os.environ, 'ENSURE_INDEXES_ON_STARTUP': 'false'})
+    if result.returncode != 0:
+        sys.exit("No se pudieron crear los índices de MongoDB")
+    print(f"[maestro] índices listos en {(time.perf_counter() - started) * 1000:.0f} ms", flush=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor de producción multi-worker")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Número de workers (por defecto, uno por núcleo)")
+    parser.add_argument('--host', default='127.0.0.1', help="Interfaz de escucha de los workers")
+    parser.add_argument('--base-port', type=int, default=int(os.getenv('PORT', 5000)), help="Puerto del primer worker")
+    parser.add_argument('--skip-indexes', action='store_true', help="No crear los índices antes de arrancar")
+    parser.add_argument('--print-nginx', action='store_true', help="Muestra la configuración de nginx para los workers y termina")
+    args = parser.parse_args(argv)
+
+    if args.print_nginx:
+        servers = '\n'.join(f"    server {args.host}:{args.base_port + index};" for index in range(args.workers))
+        print(NGINX_TEMPLATE.format(servers=servers))
+        return
+
+    if not args.skip_indexes:
+        ensure_indexes_once()
+    # Los workers no repiten la creación de índices al arrancar
+    os.environ['ENSURE_INDEXES_ON_STARTUP'] = 'false'
+
+    print(f"[maestro] pid {os.getpid()}: {args.workers} workers en los puertos {args.base_port}-{args.base_port + args.workers - 1}", flush=True)
+    Supervisor(args.workers, args.host, args.base_port).run()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,30 @@
+# relative path: tests/conftest.py
+
+import os
+import sys
+import uuid
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Servidor MongoDB para las pruebas que necesitan planes de ejecución reales
+MONGODB_TEST_URI = os.getenv('MONGODB_TEST_URI', 'mongodb://localhost:27017')
+
+@pytest.fixture(scope='session')
+def mongo_client():
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+    client = MongoClient(MONGODB_TEST_URI, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command('ping')
+    except PyMongoError:
+        pytest.skip(f"MongoDB no disponible en {MONGODB_TEST_URI}")
+    yield client
+    client.close()
+
+@pytest.fixture
+def db(mongo_client):
+    """Base de datos temporal que se elimina al terminar la prueba."""
+    name = f"test_{uuid.uuid4().hex[:12]}"
+    yield mongo_client[name]
+    mongo_client.drop_database(name)
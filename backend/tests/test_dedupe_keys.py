@@ -0,0 +1,21 @@
+# relative path: tests/test_dedupe_keys.py
+
+from datetime import datetime, timedelta
+from app.domain.notification.fanout import NotificationFanout, DEFAULT_DEDUPE_WINDOW
+
+build_dedupe_key = NotificationFanout.build_dedupe_key
+
+def test_fanout_default_key_changes_between_windows():
+    now = datetime(2030, 1, 1, 12, 0)
+    same_window = build_dedupe_key('event', 'e1', 'hola', now=now)
+    assert build_dedupe_key('event', 'e1', 'hola', now=now + timedelta(minutes=59)) == same_window
+    assert build_dedupe_key('event', 'e1', 'hola', now=now + DEFAULT_DEDUPE_WINDOW) != same_window
+
+def test_direct_create_key_has_no_window():
+    # La creación directa rechaza para siempre el mismo mensaje al mismo usuario
+    now = datetime(2030, 1, 1, 12, 0)
+    first = build_dedupe_key('user', 'u1', 'hola', now=now, window=None)
+    assert build_dedupe_key('user', 'u1', 'hola', now=now + timedelta(days=30), window=None) == first
+
+def test_explicit_key_is_kept():
+    assert build_dedupe_key('event', 'e1', 'hola', dedupe_key='reminder:1') == 'reminder:1'
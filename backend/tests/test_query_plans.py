@@ -0,0 +1,71 @@
+# relative path: tests/test_query_plans.py
+
+from datetime import datetime
+from itertools import combinations
+import pytest
+from app.domain.event.repositories import EventRepository, EVENT_FILTERS, EVENT_SORT_FIELDS
+from app.domain.community.repositories import CommunityRepository, COMMUNITY_FILTERS, COMMUNITY_SORT_FIELDS
+
+# Valor de ejemplo (como llega en la petición) según el tipo del filtro
+SAMPLE_VALUES = {str: 'valor', int: '1', bool: 'true', datetime: '2024-01-01T00:00:00'}
+
+def collscan_stages(plan):
+    """Devuelve las etapas COLLSCAN de un plan de explain() (también con el motor SBE)."""
+    if isinstance(plan, dict):
+        stages = [plan] if plan.get('stage') == 'COLLSCAN' else []
+        for value in plan.values():
+            stages += collscan_stages(value)
+        return stages
+    if isinstance(plan, list):
+        return [stage for item in plan for stage in collscan_stages(item)]
+    return []
+
+def combinations_to_check(filters, sort_fields):
+    """Filtros sueltos y por parejas, con cada ordenamiento permitido en ambas direcciones y el ordenamiento por defecto."""
+    filter_sets = [()] + [combo for size in (1, 2) for combo in combinations(sorted(filters), size)]
+    sorts = [None] + [prefix + field for field in sort_fields for prefix in ('', '-')]
+    for filter_names in filter_sets:
+        for sort in sorts:
+            params = {name: SAMPLE_VALUES[filters[name].value_type] for name in filter_names}
+            if sort:
+                params['sort'] = sort
+            yield params
+
+def assert_no_collscan(repository, collection, filters, sort_fields):
+    failures = []
+    for params in combinations_to_check(filters, sort_fields):
+        plan = repository.query_builder.build(params).explain(collection)
+        if collscan_stages(plan.get('queryPlanner', {}).get('winningPlan', {})):
+            failures.append(params)
+    assert not failures, f"Consultas sin índice (COLLSCAN): {failures}"
+
+def test_event_filters_use_indexes(db):
+    repository = EventRepository(db)
+    repository.ensure_indexes()
+    db.events.insert_many([
+        {'title': f"Evento {i}", 'community': 'c', 'category': 'valor', 'featured': i % 2 == 0, 'status': 'active',
+         'date_time': datetime(2024, 1, 1 + i), 'popularity': i, 'created_at': datetime(2023, 12, 1 + i)}
+        for i in range(20)
+    ])
+    assert_no_collscan(repository, db.events, EVENT_FILTERS, EVENT_SORT_FIELDS)
+
+def test_community_filters_use_indexes(db):
+    repository = CommunityRepository(db)
+    repository.ensure_indexes()
+    db.communities.insert_many([
+        {'name': f"Comunidad {i}", 'category': 'valor', 'location': 'valor', 'type': 'valor', 'featured': i % 2 == 0,
+         'popularity': i, 'participation': i, 'created_at': datetime(2023, 12, 1 + i)}
+        for i in range(20)
+    ])
+    assert_no_collscan(repository, db.communities, COMMUNITY_FILTERS, COMMUNITY_SORT_FIELDS)
+
+def test_collscan_detection():
+    plan = {'stage': 'SORT', 'inputStage': {'stage': 'COLLSCAN'}}
+    assert collscan_stages(plan) == [{'stage': 'COLLSCAN'}]
+    assert collscan_stages({'queryPlan': {'stage': 'FETCH', 'inputStage': {'stage': 'IXSCAN'}}}) == []
+
+@pytest.mark.parametrize('filters,sort_fields', [(EVENT_FILTERS, EVENT_SORT_FIELDS), (COMMUNITY_FILTERS, COMMUNITY_SORT_FIELDS)])
+def test_every_filter_and_sort_is_checked(filters, sort_fields):
+    checked = list(combinations_to_check(filters, sort_fields))
+    assert {name for params in checked for name in params if name != 'sort'} == set(filters)
+    assert {params['sort'].lstrip('-') for params in checked if 'sort' in params} == set(sort_fields)